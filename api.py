@@ -0,0 +1,269 @@
+"""API HTTP do MindGlass (sem interface): validar, triar, gerar preview, enviar e consultar propostas
+
+Para outros sistemas internos (intranet das lojas, ferramenta de service desk) usarem o mesmo
+pipeline do formulário sem o custo de rerun do Streamlit. Os handlers são assíncronos; as funções
+do utils.py (bloqueantes) rodam no pool de threads, com um limite de requisições simultâneas por
+grupo de rotas. Acima do limite, a requisição espera até API_ESPERA_MAXIMA segundos e depois
+recebe 503 com Retry-After. Toda rota exige Authorization: Bearer <API_TOKEN>; sem API_TOKEN
+configurado, a API fica fechada (503).
+
+As respostas seguem o esquema de gerar_json_proposta (metadata, autor, entrada, saida, analise,
+nps_analysis, proximos_passos); a triagem devolve o esquema sem a saída. O JSON vem de
+montar_json_proposta, que não chama a interface do Streamlit: um erro vira 500 em JSON.
+
+Starlette e uvicorn já vêm como dependências do Streamlit. Uso (da raiz do projeto):
+    python -m api --host 0.0.0.0 --porta 8600
+
+Rotas:
+    POST /v1/validar             formulário → {"valido", "erro"}
+    POST /v1/triagem             formulário → tipo, NPS, prioridade e prazo de resposta
+    POST /v1/preview             formulário → proposta resumida (status "preview")
+    POST /v1/propostas           formulário → 202 {"id", "estado"} (processa em segundo plano)
+    GET  /v1/propostas/{id}      200 com a proposta, 202 enquanto processa, 500 se falhou, 404 se não existir
+    GET  /v1/saude               disjuntor da OpenAI e fila de envios
+"""
+import argparse
+import asyncio
+import contextlib
+import hmac
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import metricas
+import utils
+from tarefas import CONCLUIDA, FALHOU, FilaCheia
+from triagem import prazo_resposta
+
+CAMPOS_OBRIGATORIOS = ("nome", "area", "ideia")
+
+# Valores padrão dos campos opcionais (os mesmos do formulário)
+CAMPOS_OPCIONAIS = {
+    "nivel": "Intermediário",
+    "foco": "Não especificado",
+    "problema": "",
+    "recursos": "",
+    "prazo": ""
+}
+
+# Blocos do JSON da proposta devolvidos pela triagem (sem a proposta gerada)
+BLOCOS_TRIAGEM = ("metadata", "autor", "entrada", "analise", "nps_analysis")
+
+
+class ErroRequisicao(Exception):
+    """Erro com status HTTP e mensagem para o cliente"""
+
+    def __init__(self, status, mensagem, cabecalhos=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.cabecalhos = cabecalhos or {}
+
+
+class LimiteConcorrencia:
+    """Semáforo por grupo de rotas: acima do limite espera até espera_maxima segundos, depois recusa"""
+
+    def __init__(self, nome, limite, espera_maxima):
+        self.nome = nome
+        self.limite = limite
+        self.espera_maxima = espera_maxima
+        self._semaforo = None
+        self._em_uso = 0
+
+    async def __aenter__(self):
+        # Criado no loop do servidor (não na importação do módulo)
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.limite)
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_maxima)
+        except asyncio.TimeoutError:
+            metricas.incrementar("api_recusadas", grupo=self.nome)
+            raise ErroRequisicao(503, f"Limite de {self.limite} requisições simultâneas atingido ({self.nome})",
+                                 {"Retry-After": "1"})
+        self._em_uso += 1
+        metricas.definir("api_em_uso", self._em_uso, grupo=self.nome)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._em_uso -= 1
+        metricas.definir("api_em_uso", self._em_uso, grupo=self.nome)
+        self._semaforo.release()
+
+
+ESPERA_MAXIMA = float(utils.obter_config("API_ESPERA_MAXIMA", 2))
+API_TOKEN = utils.obter_config("API_TOKEN")
+
+# "leve": sem chamadas ao modelo; "modelo": triagem e preview (chamadas à OpenAI na requisição)
+limites = {
+    "leve": LimiteConcorrencia("leve", int(utils.obter_config("API_CONCORRENCIA_LEVE", 64)), ESPERA_MAXIMA),
+    "modelo": LimiteConcorrencia("modelo", int(utils.obter_config("API_CONCORRENCIA_MODELO", 8)), ESPERA_MAXIMA)
+}
+
+
+def rota(nome, grupo):
+    """Decorador: autenticação, limite de concorrência, erros em JSON e métricas por rota"""
+    def decorador(handler):
+        async def envolvido(request):
+            inicio = time.perf_counter()
+            try:
+                if not API_TOKEN:
+                    raise ErroRequisicao(503, "API desativada: configure API_TOKEN")
+                if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {API_TOKEN}"):
+                    raise ErroRequisicao(401, "Token inválido ou ausente")
+                async with limites[grupo]:
+                    resposta = await handler(request)
+            except ErroRequisicao as e:
+                resposta = JSONResponse({"erro": str(e)}, status_code=e.status, headers=e.cabecalhos)
+            except Exception as e:
+                resposta = JSONResponse({"erro": f"Erro ao processar: {str(e)}"}, status_code=500)
+            metricas.incrementar("api_requisicoes", rota=nome, status=resposta.status_code)
+            metricas.observar("api_latencia_s", time.perf_counter() - inicio, rota=nome)
+            return resposta
+        return envolvido
+    return decorador
+
+
+async def ler_formulario(request, validar=True):
+    """Corpo JSON → dados no formato do formulário (campos obrigatórios + padrões dos opcionais)"""
+    try:
+        corpo = await request.json()
+    except ValueError:
+        raise ErroRequisicao(400, "Corpo da requisição deve ser JSON")
+    if not isinstance(corpo, dict):
+        raise ErroRequisicao(400, "Corpo da requisição deve ser um objeto JSON")
+
+    faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not isinstance(corpo.get(campo), str)]
+    if faltando:
+        raise ErroRequisicao(422, f"Campos obrigatórios ausentes: {', '.join(faltando)}")
+
+    dados = {campo: corpo[campo] for campo in CAMPOS_OBRIGATORIOS}
+    for campo, padrao in CAMPOS_OPCIONAIS.items():
+        valor = corpo.get(campo)
+        dados[campo] = valor if isinstance(valor, str) and valor else padrao
+
+    if validar:
+        validacao = utils.validar_entrada(dados["nome"], dados["ideia"])
+        if not validacao["valido"]:
+            raise ErroRequisicao(422, validacao["erro"])
+    return dados
+
+
+def triar(dados):
+    """Tipo de projeto e pontuação NPS (mesmos estágios do formulário, em paralelo)"""
+    return utils.executar_pipeline(dados, utils.ALVOS_TRIAGEM)
+
+
+@rota("validar", "leve")
+async def validar(request):
+    dados = await ler_formulario(request, validar=False)
+    return JSONResponse(utils.validar_entrada(dados["nome"], dados["ideia"]))
+
+
+@rota("triagem", "modelo")
+async def triagem(request):
+    dados = await ler_formulario(request)
+    dados["prioridade"] = "preview"
+    dados = await run_in_threadpool(triar, dados)
+
+    json_proposta = await run_in_threadpool(utils.montar_json_proposta, dados, "")
+    resposta = {bloco: json_proposta[bloco] for bloco in BLOCOS_TRIAGEM}
+    resposta["metadata"]["status"] = "triagem"
+    horas, texto = prazo_resposta(dados["pontuacao_nps"])
+    resposta["proximos_passos"] = dict(json_proposta["proximos_passos"], prazo_resposta=texto,
+                                       prazo_resposta_horas=horas)
+    return JSONResponse(resposta)
+
+
+@rota("preview", "modelo")
+async def preview(request):
+    dados = await ler_formulario(request)
+    dados["prioridade"] = "preview"
+
+    def gerar():
+        utils.executar_pipeline(dados, utils.ALVOS_PREVIEW)
+        return utils.montar_json_proposta(dados, dados["proposta_preview"])
+
+    json_proposta = await run_in_threadpool(gerar)
+    json_proposta["metadata"]["status"] = "provisorio" if dados.get("proposta_provisoria") else "preview"
+    return JSONResponse(json_proposta)
+
+
+@rota("enviar", "leve")
+async def enviar(request):
+    dados = await ler_formulario(request)
+    try:
+        id_proposta, nova = utils.enviar_submissao(dados)
+    except FilaCheia as e:
+        raise ErroRequisicao(503, str(e), {"Retry-After": "5"})
+    return JSONResponse(
+        {"id": id_proposta, "nova": nova, "estado": utils.pool_envios.status(id_proposta)["estado"],
+         "url": f"/v1/propostas/{id_proposta}"},
+        status_code=202
+    )
+
+
+@rota("consultar", "leve")
+async def consultar(request):
+    id_proposta = request.path_params["id_proposta"]
+    status = await run_in_threadpool(utils.consultar_submissao, id_proposta)
+    if status is None:
+        raise ErroRequisicao(404, f"Proposta {id_proposta} não encontrada")
+
+    if status["estado"] == CONCLUIDA:
+        resultado, _ = status["resultado"]
+        if resultado.get("json_proposta") is None:
+            # Concluída sem JSON não é uma proposta: erro, nunca 200 com corpo null
+            erro = "Envio concluído sem o JSON da proposta"
+            return JSONResponse({"id": id_proposta, "estado": FALHOU, "erro": erro}, status_code=500)
+        return JSONResponse(resultado["json_proposta"])
+    if status["estado"] == FALHOU:
+        return JSONResponse({"id": id_proposta, "estado": FALHOU, "erro": status["erro"]}, status_code=500)
+    return JSONResponse(
+        {"id": id_proposta, "estado": status["estado"], "posicao": status.get("posicao")},
+        status_code=202, headers={"Retry-After": "2"}
+    )
+
+
+@rota("saude", "leve")
+async def saude(request):
+    return JSONResponse({
+        "disjuntor_openai": utils.disjuntor_openai.estado,
+        "envios": utils.pool_envios.estatisticas()
+    })
+
+
+@contextlib.asynccontextmanager
+async def ciclo_de_vida(app):
+    # Threads de fundo sobem com o servidor, não na importação
+    utils.iniciar_servicos()
+    yield
+
+
+app = Starlette(lifespan=ciclo_de_vida, routes=[
+    Route("/v1/validar", validar, methods=["POST"]),
+    Route("/v1/triagem", triagem, methods=["POST"]),
+    Route("/v1/preview", preview, methods=["POST"]),
+    Route("/v1/propostas", enviar, methods=["POST"]),
+    Route("/v1/propostas/{id_proposta}", consultar, methods=["GET"]),
+    Route("/v1/saude", saude, methods=["GET"]),
+])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8600)
+    args = parser.parse_args()
+    if not API_TOKEN:
+        parser.error("API_TOKEN não configurado: sem ele, todas as rotas respondem 503")
+
+    # Um processo só: a fila de envios e o acompanhamento por ID vivem na memória do processo
+    uvicorn.run(app, host=args.host, port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Segmentos de arquivo do histórico: JSONL comprimido, imutável, um segmento por mês e compactação
+
+Cada segmento é uma sequência de blocos comprimidos independentes (membros gzip ou frames zstd
+concatenados, então o arquivo inteiro continua legível por zcat/zstdcat). O índice é uma tabela
+hash em arquivo, lida via mmap: ID → (segmento, deslocamento e tamanho do bloco, posição no
+bloco). Buscar uma proposta arquivada descomprime só o bloco dela.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional; gzip sempre disponível
+    zstandard = None
+
+# Tamanho (bytes, antes da compressão) a partir do qual o bloco é fechado
+TAMANHO_BLOCO = 64 * 1024
+
+CODECS = {
+    "gzip": (1, ".gz"),
+    "zstd": (2, ".zst")
+}
+_CODEC_POR_ID = {codigo: nome for nome, (codigo, _) in CODECS.items()}
+
+_MAGICO = b"MGIDX001"
+_CABECALHO = struct.Struct("<8sQQ")      # mágico, slots, ocupados
+_SLOT = struct.Struct("<QIBQII")         # chave, segmento, codec, deslocamento, tamanho, posição
+_ARQUIVO_INDICE = "indice.bin"
+_ARQUIVO_MANIFESTO = "manifesto.json"
+
+
+def _chave(proposta_id):
+    """Hash de 8 bytes do ID (0 é reservado para slot vazio)"""
+    chave = int.from_bytes(hashlib.blake2b(proposta_id.encode("utf-8"), digest_size=8).digest(), "little")
+    return chave or 1
+
+
+def _comprimir(codec, dados):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(dados)
+    return gzip.compress(dados, compresslevel=6)
+
+
+def _descomprimir(codec, dados):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(dados)
+    return gzip.decompress(dados)
+
+
+class _EscritorSegmento:
+    """Acumula linhas em blocos e grava cada bloco comprimido ao passar de TAMANHO_BLOCO"""
+
+    def __init__(self, pasta, numero, periodo, codec):
+        self.numero = numero
+        self.periodo = periodo
+        self.codec = codec
+        self.nome = f"{numero:06d}-{periodo}.jsonl{CODECS[codec][1]}"
+        self.caminho = os.path.join(pasta, self.nome)
+        self._arquivo = open(self.caminho + ".tmp", "wb")
+        self._bloco = []
+        self._tamanho_bloco = 0
+        self.registros = 0
+        self.entradas = []
+
+    def adicionar(self, proposta_id, linha):
+        self.entradas.append((proposta_id, len(self._bloco)))
+        self._bloco.append(linha)
+        self._tamanho_bloco += len(linha)
+        self.registros += 1
+        if self._tamanho_bloco >= TAMANHO_BLOCO:
+            self._gravar_bloco()
+
+    def fechar(self):
+        """Grava o último bloco e torna o segmento visível (rename atômico)"""
+        self._gravar_bloco()
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self._arquivo.close()
+        os.replace(self.caminho + ".tmp", self.caminho)
+
+    def _gravar_bloco(self):
+        if not self._bloco:
+            return
+        comprimido = _comprimir(self.codec, "".join(self._bloco).encode("utf-8"))
+        deslocamento = self._arquivo.tell()
+        self._arquivo.write(comprimido)
+
+        # Completa as entradas do bloco com a localização dele no segmento
+        pendentes = len(self._bloco)
+        for i in range(len(self.entradas) - pendentes, len(self.entradas)):
+            proposta_id, posicao = self.entradas[i]
+            self.entradas[i] = (proposta_id, self.numero, CODECS[self.codec][0], deslocamento, len(comprimido), posicao)
+        self._bloco = []
+        self._tamanho_bloco = 0
+
+
+class Arquivo:
+    """Pasta de segmentos arquivados + índice de IDs mapeado em memória"""
+
+    def __init__(self, pasta, codec="gzip"):
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("codec zstd requer o pacote 'zstandard'")
+        self.pasta = pasta
+        self.codec = codec
+        self._mapa = None
+        self._assinatura = None
+        self._nomes = {}
+        self._assinatura_manifesto = None
+
+    def segmentos(self):
+        """Segmentos na ordem de criação (do manifesto)"""
+        caminho = os.path.join(self.pasta, _ARQUIVO_MANIFESTO)
+        if not os.path.exists(caminho):
+            return []
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)["segmentos"]
+
+    def arquivar(self, registros):
+        """Grava (id, periodo, linha JSON) em novos segmentos, um por período; devolve o total
+
+        Os registros devem vir em ordem de gravação: para IDs repetidos, o índice aponta para o último.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        segmentos = self.segmentos()
+        proximo = max((s["numero"] for s in segmentos), default=0) + 1
+        escritores = {}
+
+        for proposta_id, periodo, linha in registros:
+            if periodo not in escritores:
+                escritores[periodo] = _EscritorSegmento(self.pasta, proximo, periodo, self.codec)
+                proximo += 1
+            escritores[periodo].adicionar(proposta_id, linha)
+
+        if not escritores:
+            return 0
+
+        novas_entradas = []
+        for escritor in sorted(escritores.values(), key=lambda e: e.numero):
+            escritor.fechar()
+            novas_entradas.extend(escritor.entradas)
+            segmentos.append({
+                "numero": escritor.numero,
+                "arquivo": escritor.nome,
+                "periodo": escritor.periodo,
+                "codec": escritor.codec,
+                "registros": escritor.registros,
+                "bytes": os.path.getsize(escritor.caminho)
+            })
+
+        # Ordem de visibilidade: segmentos → manifesto → índice
+        self._gravar_atomico(_ARQUIVO_MANIFESTO, json.dumps({"segmentos": segmentos}, indent=1).encode("utf-8"))
+        self._reconstruir_indice(novas_entradas)
+        return sum(e.registros for e in escritores.values())
+
+    def buscar(self, proposta_id):
+        """Proposta arquivada pelo ID (ou None), descomprimindo só o bloco onde ela está"""
+        mapa = self._indice()
+        if mapa is None:
+            return None
+
+        _, slots, _ = _CABECALHO.unpack_from(mapa, 0)
+        chave = _chave(proposta_id)
+        posicao_slot = chave % slots
+        for _ in range(slots):
+            chave_slot, segmento, codec, deslocamento, tamanho, posicao = _SLOT.unpack_from(
+                mapa, _CABECALHO.size + posicao_slot * _SLOT.size
+            )
+            if chave_slot == 0:
+                return None
+            if chave_slot == chave:
+                proposta = self._ler_registro(segmento, _CODEC_POR_ID[codec], deslocamento, tamanho, posicao)
+                if proposta.get("metadata", {}).get("id") == proposta_id:
+                    return proposta
+            posicao_slot = (posicao_slot + 1) % slots
+        return None
+
+    def ler(self):
+        """Itera todas as propostas arquivadas, segmento a segmento, sem carregar segmentos inteiros"""
+        for segmento in self.segmentos():
+            caminho = os.path.join(self.pasta, segmento["arquivo"])
+            if segmento["codec"] == "zstd":
+                bruto = open(caminho, "rb")
+                fluxo = zstandard.ZstdDecompressor().stream_reader(bruto, read_across_frames=True)
+                linhas = io.TextIOWrapper(fluxo, encoding="utf-8")
+            else:
+                bruto = None
+                linhas = gzip.open(caminho, "rt", encoding="utf-8")
+            try:
+                for linha in linhas:
+                    yield json.loads(linha)
+            finally:
+                linhas.close()
+                if bruto:
+                    bruto.close()
+
+    def _ler_registro(self, segmento, codec, deslocamento, tamanho, posicao):
+        with open(os.path.join(self.pasta, self._nome_segmento(segmento)), "rb") as arquivo:
+            bloco = os.pread(arquivo.fileno(), tamanho, deslocamento)
+        linha = _descomprimir(codec, bloco).decode("utf-8").split("\n")[posicao]
+        return json.loads(linha)
+
+    def _nome_segmento(self, numero):
+        """Arquivo do segmento (manifesto em cache enquanto não mudar)"""
+        info = os.stat(os.path.join(self.pasta, _ARQUIVO_MANIFESTO))
+        assinatura = (info.st_ino, info.st_mtime_ns)
+        if assinatura != self._assinatura_manifesto:
+            self._nomes = {s["numero"]: s["arquivo"] for s in self.segmentos()}
+            self._assinatura_manifesto = assinatura
+        return self._nomes[numero]
+
+    def _indice(self):
+        """mmap do índice, reaberto se a compactação o substituiu"""
+        caminho = os.path.join(self.pasta, _ARQUIVO_INDICE)
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            return None
+
+        assinatura = (info.st_ino, info.st_mtime_ns)
+        if assinatura != self._assinatura:
+            with open(caminho, "rb") as arquivo:
+                self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+            self._assinatura = assinatura
+        return self._mapa
+
+    def _reconstruir_indice(self, novas_entradas):
+        """Novo índice com as entradas atuais + novas (carga ≤ 50%), trocado por rename"""
+        atuais = []
+        mapa = self._indice()
+        if mapa is not None:
+            _, slots, _ = _CABECALHO.unpack_from(mapa, 0)
+            for i in range(slots):
+                slot = _SLOT.unpack_from(mapa, _CABECALHO.size + i * _SLOT.size)
+                if slot[0]:
+                    atuais.append(slot)
+
+        slots = 1024
+        while slots < 2 * (len(atuais) + len(novas_entradas)):
+            slots *= 2
+
+        tabela = bytearray(_CABECALHO.size + slots * _SLOT.size)
+        ocupados = 0
+
+        def inserir(slot):
+            nonlocal ocupados
+            posicao = slot[0] % slots
+            while True:
+                deslocamento = _CABECALHO.size + posicao * _SLOT.size
+                chave_slot = _SLOT.unpack_from(tabela, deslocamento)[0]
+                if chave_slot == 0 or chave_slot == slot[0]:
+                    # Mesmo hash: a entrada mais nova substitui (colisões reais de 64 bits são ignoradas)
+                    ocupados += chave_slot == 0
+                    _SLOT.pack_into(tabela, deslocamento, *slot)
+                    return
+                posicao = (posicao + 1) % slots
+
+        for slot in atuais:
+            inserir(slot)
+        for proposta_id, *localizacao in novas_entradas:
+            inserir((_chave(proposta_id), *localizacao))
+
+        _CABECALHO.pack_into(tabela, 0, _MAGICO, slots, ocupados)
+        self._gravar_atomico(_ARQUIVO_INDICE, bytes(tabela))
+
+    def _gravar_atomico(self, nome, conteudo):
+        caminho = os.path.join(self.pasta, nome)
+        with open(caminho + ".tmp", "wb") as arquivo:
+            arquivo.write(conteudo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(caminho + ".tmp", caminho)
+
@@ -0,0 +1 @@
+"""Benchmarks do MindGlass (rodar da raiz do projeto com `python -m benchmarks.<script>`)"""
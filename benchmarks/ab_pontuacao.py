@@ -0,0 +1,293 @@
+"""A/B offline: pontuação NPS e tipo do projeto pela IA × fallback heurístico × modelo local
+
+Reexecuta as ideias gravadas no histórico pelos três caminhos e mede, tomando a IA como
+referência: concordância, correlação de postos (Spearman) da pontuação, confusão entre as
+categorias de classificar_categoria_nps e latência e custo por ideia. Serve para decidir quais
+estágios precisam mesmo da IA.
+
+A IA pode vir:
+- do próprio histórico (--fonte-ia historico): as respostas gravadas, sem nenhuma chamada;
+- do OpenAI falso dos benchmarks (--fonte-ia falso) ou do provedor configurado (--fonte-ia openai),
+  com as respostas guardadas em --cache (JSONL) para não pagar de novo na próxima rodada.
+
+O modelo local é treinado com a parte mais antiga do histórico (--treino) e todos os caminhos são
+comparados na parte mais recente.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.ab_pontuacao --historico dados/propostas.jsonl
+    python -m benchmarks.ab_pontuacao --fonte-ia openai --cache dados/ab_cache.jsonl --limite 300
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.comum import metadados, resumir, salvar_resultado
+
+# Preço padrão (USD por 1M tokens) do nível "rapido" (gpt-4o-mini), que atende tipo e NPS
+PRECO_ENTRADA = 0.15
+PRECO_SAIDA = 0.60
+
+
+def postos(valores):
+    """Postos (1..n) com empates na média, para a correlação de Spearman"""
+    ordem = sorted(range(len(valores)), key=valores.__getitem__)
+    resultado = [0.0] * len(valores)
+    inicio = 0
+    while inicio < len(ordem):
+        fim = inicio
+        while fim + 1 < len(ordem) and valores[ordem[fim + 1]] == valores[ordem[inicio]]:
+            fim += 1
+        for posicao in range(inicio, fim + 1):
+            resultado[ordem[posicao]] = (inicio + fim) / 2 + 1
+        inicio = fim + 1
+    return resultado
+
+
+def spearman(a, b):
+    """Correlação de postos (None com menos de 3 pares ou sem variação)"""
+    if len(a) < 3:
+        return None
+    try:
+        return round(statistics.correlation(postos(a), postos(b)), 4)
+    except statistics.StatisticsError:
+        return None
+
+
+def confusao(pares):
+    """{referência: {candidato: n}} a partir de pares (referência, candidato)"""
+    matriz = defaultdict(Counter)
+    for referencia, candidato in pares:
+        matriz[referencia][candidato] += 1
+    return {referencia: dict(linha) for referencia, linha in sorted(matriz.items())}
+
+
+def comparar(referencias, candidatos, categoria):
+    """Concordância do candidato com a referência (IA) no tipo e na pontuação NPS"""
+    tipos = [(r["tipo"], c["tipo"]) for r, c in zip(referencias, candidatos) if r["tipo"] and c["tipo"]]
+    notas = [(r["nps"], c["nps"]) for r, c in zip(referencias, candidatos) if r["nps"] is not None and c["nps"] is not None]
+    categorias = [(categoria(r), categoria(c)) for r, c in notas]
+    return {
+        "tipo": {
+            "n": len(tipos),
+            "concordancia": round(sum(r == c for r, c in tipos) / max(len(tipos), 1), 4),
+            "confusao": confusao(tipos)
+        },
+        "nps": {
+            "n": len(notas),
+            "spearman": spearman([r for r, _ in notas], [c for _, c in notas]),
+            "erro_medio_abs": round(sum(abs(r - c) for r, c in notas) / max(len(notas), 1), 2),
+            "concordancia_categoria": round(sum(r == c for r, c in categorias) / max(len(categorias), 1), 4),
+            "confusao_categoria": confusao(categorias)
+        }
+    }
+
+
+def custo_ia(utils, ideia, area, foco, tipo, nps, justificativa, preco_entrada, preco_saida):
+    """Custo estimado (USD) das duas chamadas: ≈4 caracteres por token no prompt e na resposta"""
+    entrada = (len(utils.prompt_tipo(ideia, area)) + len(utils.prompt_nps(ideia, area, foco))) // 4
+    saida = (len(tipo or "") + len(f"{nps} - {justificativa or ''}")) // 4 + 2
+    return (entrada * preco_entrada + saida * preco_saida) / 1e6
+
+
+class CacheIA:
+    """Respostas da IA por (estágio, entradas) em JSONL, para reexecutar sem novas chamadas"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.respostas = {}
+        if caminho and os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    registro = json.loads(linha)
+                    self.respostas[registro["chave"]] = registro
+
+    @staticmethod
+    def chave(estagio, *entradas):
+        return hashlib.sha256("\x1f".join((estagio,) + entradas).encode("utf-8")).hexdigest()[:20]
+
+    def obter(self, chave, funcao):
+        """Registro em cache ou {"valor", "latencia_s", "falhou"} de uma chamada nova (gravado no arquivo)"""
+        if chave in self.respostas:
+            return self.respostas[chave]
+
+        inicio = time.perf_counter()
+        valor, falhou = funcao()
+        registro = {"chave": chave, "valor": valor, "latencia_s": time.perf_counter() - inicio, "falhou": falhou}
+        if not falhou:
+            self.respostas[chave] = registro
+            if self.caminho:
+                with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        return registro
+
+
+def replay_ia(utils, casos, fonte, cache):
+    """Respostas da IA para cada caso: do histórico ou chamando detectar_tipo_projeto/calcular_pontuacao_nps"""
+    respostas = []
+    for ideia, area, foco, tipo, nps in casos:
+        if fonte == "historico":
+            respostas.append({"tipo": tipo, "nps": nps, "justificativa": "", "latencia_tipo": None, "latencia_nps": None})
+            continue
+
+        def tipo_ia():
+            dados = {"prioridade": "fundo"}
+            valor = utils.detectar_tipo_projeto(ideia, area, dados)
+            return valor, dados.get("modelos_estagio", {}).get("tipo") == "heuristica"
+
+        def nps_ia():
+            dados = {"prioridade": "fundo"}
+            valor = list(utils.calcular_pontuacao_nps(ideia, area, foco, dados))
+            return valor, dados.get("modelos_estagio", {}).get("nps") == "heuristica"
+
+        registro_tipo = cache.obter(CacheIA.chave("tipo", ideia, area), tipo_ia)
+        registro_nps = cache.obter(CacheIA.chave("nps", ideia, area, foco), nps_ia)
+        # Falha da IA (o utils caiu no fallback) fica fora da comparação
+        respostas.append({
+            "tipo": None if registro_tipo["falhou"] else registro_tipo["valor"],
+            "nps": None if registro_nps["falhou"] else registro_nps["valor"][0],
+            "justificativa": None if registro_nps["falhou"] else registro_nps["valor"][1],
+            "latencia_tipo": registro_tipo["latencia_s"],
+            "latencia_nps": registro_nps["latencia_s"]
+        })
+    return respostas
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    valor = funcao(*args)
+    return valor, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--historico", default=os.environ.get("HISTORICO_ARQUIVO", "dados/propostas.jsonl"))
+    parser.add_argument("--fonte-ia", choices=["historico", "falso", "openai"], default="historico")
+    parser.add_argument("--cache", help="JSONL com as respostas da IA já obtidas (fontes falso e openai)")
+    parser.add_argument("--limite", type=int, default=0, help="máximo de ideias comparadas (as mais recentes); 0 = todas")
+    parser.add_argument("--treino", type=float, default=0.8, help="fração (mais antiga) usada no treino do modelo local")
+    parser.add_argument("--sem-local", action="store_true", help="não treina nem compara o modelo local")
+    parser.add_argument("--latencia", type=float, default=0.3, help="latência base do OpenAI falso (s)")
+    parser.add_argument("--preco-entrada", type=float, default=PRECO_ENTRADA, help="USD por 1M tokens de entrada")
+    parser.add_argument("--preco-saida", type=float, default=PRECO_SAIDA, help="USD por 1M tokens de saída")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    servidores = []
+    if args.fonte_ia == "falso":
+        from benchmarks.servidores_falsos import ServidorOpenAIFalso, SinkSMTP, configurar_ambiente
+        servidores = [ServidorOpenAIFalso(latencia_base=args.latencia).iniciar(), SinkSMTP().iniciar()]
+        configurar_ambiente(*servidores)
+    # Tipo e NPS sempre pela IA no utils (o modelo local é medido à parte) e sem jobs em segundo plano
+    os.environ.update({"MODELO_LOCAL": "false", "HISTORICO_COMPACTACAO_HORAS": "0", "LEMBRETES_HORAS": "0"})
+    os.environ.setdefault("OPENAI_API_KEY", "sk-ab-offline")
+
+    import utils
+    from historico import ler_registros
+    from modelo_local import ModeloLocal, rotulos_da_proposta
+
+    propostas = sorted(ler_registros(args.historico), key=lambda r: str(r.timestamp))
+    corte = int(len(propostas) * args.treino)
+    casos = [r for r in map(rotulos_da_proposta, propostas[corte:]) if r and (r[3] or r[4] is not None)]
+    if args.limite:
+        casos = casos[-args.limite:]
+    print(f"▶ {len(casos)} ideias comparadas ({len(propostas)} no histórico, IA: {args.fonte_ia})")
+
+    try:
+        ia = replay_ia(utils, casos, args.fonte_ia, CacheIA(args.cache))
+    finally:
+        for servidor in servidores:
+            servidor.parar()
+
+    resultados = {"ia": [], "heuristica": []}
+    latencias = defaultdict(lambda: defaultdict(list))
+    custos = defaultdict(list)
+    for (ideia, area, foco, _, _), resposta in zip(casos, ia):
+        resultados["ia"].append(resposta)
+        for estagio in ("tipo", "nps"):
+            if resposta[f"latencia_{estagio}"] is not None:
+                latencias["ia"][estagio].append(resposta[f"latencia_{estagio}"])
+        custos["ia"].append(custo_ia(utils, ideia, area, foco, resposta["tipo"], resposta["nps"],
+                                     resposta["justificativa"], args.preco_entrada, args.preco_saida))
+
+        tipo, duracao_tipo = medir(utils.tipo_heuristico, ideia)
+        (nps, _), duracao_nps = medir(utils.nps_heuristico, ideia)
+        resultados["heuristica"].append({"tipo": tipo, "nps": nps})
+        latencias["heuristica"]["tipo"].append(duracao_tipo)
+        latencias["heuristica"]["nps"].append(duracao_nps)
+        custos["heuristica"].append(0.0)
+
+    confiantes = {}
+    if not args.sem_local:
+        modelo = ModeloLocal(caminho_historico=None, minimo_exemplos=0)
+        modelo.treinar(propostas[:corte], epocas=3, avaliar=False)
+        resultados["local"] = []
+        previsoes = []
+        for ideia, area, foco, _, _ in casos:
+            previsao_tipo, duracao_tipo = medir(modelo.prever_tipo, ideia, area)
+            previsao_nps, duracao_nps = medir(modelo.prever_nps, ideia, area, foco)
+            previsoes.append((previsao_tipo, previsao_nps))
+            resultados["local"].append({
+                "tipo": previsao_tipo.valor if previsao_tipo else None,
+                "nps": previsao_nps.valor if previsao_nps else None
+            })
+            latencias["local"]["tipo"].append(duracao_tipo)
+            latencias["local"]["nps"].append(duracao_nps)
+            custos["local"].append(0.0)
+
+        # Só as previsões acima do limiar de confiança (as que dispensariam a IA em produção)
+        for estagio, indice in (("tipo", 0), ("nps", 1)):
+            pares = [(r, p[indice]) for r, p in zip(ia, previsoes) if p[indice] and r[estagio] is not None]
+            acima = [(r, p) for r, p in pares if p.confianca >= modelo.limiar]
+            confiantes[estagio] = {
+                "limiar": modelo.limiar,
+                "cobertura": round(len(acima) / max(len(pares), 1), 4),
+                "comparacao": comparar([r for r, _ in acima],
+                                       [{"tipo": None, "nps": None, estagio: p.valor} for _, p in acima],
+                                       utils.classificar_categoria_nps)[estagio]
+            }
+
+    resultado = {"meta": metadados(vars(args)), "ideias": len(casos), "caminhos": {}}
+    for caminho, respostas in resultados.items():
+        resultado["caminhos"][caminho] = {
+            "comparacao_com_ia": comparar(ia, respostas, utils.classificar_categoria_nps) if caminho != "ia" else None,
+            "latencia": {estagio: resumir(valores) for estagio, valores in latencias[caminho].items()},
+            "custo_por_ideia_usd": round(sum(custos[caminho]) / max(len(custos[caminho]), 1), 8)
+        }
+    if confiantes:
+        resultado["caminhos"]["local"]["acima_do_limiar"] = confiantes
+
+    print(f"\n{'caminho':>10} | {'tipo conc.':>10} | {'NPS categ.':>10} | {'Spearman':>8} | {'erro NPS':>8} | "
+          f"{'p50 tipo':>10} | {'p50 NPS':>10} | {'USD/ideia':>10}")
+    for caminho, medidas in resultado["caminhos"].items():
+        comparacao = medidas["comparacao_com_ia"]
+        latencia = medidas["latencia"]
+        p50 = {e: f"{latencia[e]['p50_ms']:.3f} ms" if latencia.get(e, {}).get("n") else "-" for e in ("tipo", "nps")}
+        if comparacao:
+            colunas = (f"{comparacao['tipo']['concordancia']:>10.1%} | {comparacao['nps']['concordancia_categoria']:>10.1%} | "
+                       f"{str(comparacao['nps']['spearman']):>8} | {comparacao['nps']['erro_medio_abs']:>8}")
+        else:
+            colunas = f"{'referência':>10} | {'':>10} | {'':>8} | {'':>8}"
+        print(f"{caminho:>10} | {colunas} | {p50['tipo']:>10} | {p50['nps']:>10} | {medidas['custo_por_ideia_usd']:>10.6f}")
+
+    for estagio, medidas in confiantes.items():
+        comparacao = medidas["comparacao"]
+        acerto = comparacao["concordancia"] if estagio == "tipo" else comparacao["concordancia_categoria"]
+        print(f"\nlocal ≥ limiar {medidas['limiar']} ({estagio}): cobre {medidas['cobertura']:.0%} das ideias, "
+              f"concordância {acerto:.1%}")
+
+    for caminho in ("heuristica", "local"):
+        if caminho in resultado["caminhos"]:
+            print(f"\nConfusão das categorias de NPS (linhas: IA, colunas: {caminho})")
+            for referencia, linha in resultado["caminhos"][caminho]["comparacao_com_ia"]["nps"]["confusao_categoria"].items():
+                print(f"  {referencia:>15}: {linha}")
+
+    caminho = salvar_resultado("ab_pontuacao", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark da API HTTP (api.py) contra OpenAI falso e sink SMTP
+
+Sobe a API num thread, dispara N clientes simultâneos por rota e mede vazão, percentis de
+latência e respostas por status (503 = recusada pelo limite de concorrência). O envio mede o
+ciclo completo: POST /v1/propostas e consultas ao GET até a proposta ficar pronta.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_api --clientes 1,8,32 --requisicoes 64 --latencia 0.3
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.comum import metadados, resumir, salvar_resultado
+from benchmarks.corpus import gerar_formularios
+from benchmarks.servidores_falsos import ServidorOpenAIFalso, SinkSMTP, configurar_ambiente
+
+ROTAS = ["validar", "triagem", "preview", "envio"]
+TOKEN = "token-benchmark"
+
+
+def requisitar(metodo, url, corpo=None):
+    """(status, corpo JSON) da requisição"""
+    dados = json.dumps(corpo).encode("utf-8") if corpo is not None else None
+    cabecalhos = {"Content-Type": "application/json", "Authorization": f"Bearer {TOKEN}"}
+    pedido = urllib.request.Request(url, data=dados, method=metodo, headers=cabecalhos)
+    try:
+        with urllib.request.urlopen(pedido, timeout=120) as resposta:
+            return resposta.status, json.loads(resposta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def chamar(base, rota, formulario):
+    if rota == "envio":
+        status, corpo = requisitar("POST", f"{base}/v1/propostas", formulario)
+        if status != 202:
+            return status
+        while True:
+            status, _ = requisitar("GET", f"{base}{corpo['url']}")
+            if status != 202:
+                return status
+            time.sleep(0.05)
+    return requisitar("POST", f"{base}/v1/{rota}", formulario)[0]
+
+
+def medir(base, rota, formularios, clientes):
+    latencias = []
+    status = Counter()
+
+    def uma(formulario):
+        inicio = time.perf_counter()
+        codigo = chamar(base, rota, formulario)
+        return time.perf_counter() - inicio, codigo
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clientes) as executor:
+        for duracao, codigo in executor.map(uma, formularios):
+            latencias.append(duracao)
+            status[codigo] += 1
+    total = time.perf_counter() - inicio
+    return {
+        "requisicoes": len(formularios),
+        "vazao_rps": round(len(formularios) / total, 2),
+        "latencia": resumir(latencias),
+        "status": {str(codigo): n for codigo, n in sorted(status.items())}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", default="1,8,32", help="clientes simultâneos (lista)")
+    parser.add_argument("--requisicoes", type=int, default=32, help="requisições por rota e nível")
+    parser.add_argument("--rotas", default=",".join(ROTAS))
+    parser.add_argument("--latencia", type=float, default=0.2, help="latência base do OpenAI falso (s)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=80.0)
+    parser.add_argument("--porta", type=int, default=8611)
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAIFalso(latencia_base=args.latencia, tokens_por_segundo=args.tokens_por_segundo).iniciar()
+    sink = SinkSMTP().iniciar()
+    configurar_ambiente(servidor, sink)
+    os.environ["API_TOKEN"] = TOKEN
+
+    import uvicorn
+    from api import app
+
+    api = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.porta, log_level="warning"))
+    threading.Thread(target=api.run, daemon=True).start()
+    while not api.started:
+        time.sleep(0.05)
+    base = f"http://127.0.0.1:{args.porta}"
+
+    resultado = {"meta": metadados(vars(args)), "rotas": {}}
+    try:
+        for rota in args.rotas.split(","):
+            resultado["rotas"][rota] = {}
+            for clientes in map(int, args.clientes.split(",")):
+                # Formulários distintos por nível: o envio não reaproveita resultados do nível anterior
+                formularios = gerar_formularios(args.requisicoes, semente=clientes * 1000 + len(rota))
+                medida = medir(base, rota, formularios, clientes)
+                resultado["rotas"][rota][str(clientes)] = medida
+                print(f"{rota:>8} | {clientes:>3} clientes | {medida['vazao_rps']:>7.1f} req/s | "
+                      f"p50 {medida['latencia']['p50_ms']:>7.0f} ms | p95 {medida['latencia']['p95_ms']:>7.0f} ms | "
+                      f"status {medida['status']}")
+    finally:
+        api.should_exit = True
+        servidor.parar()
+        sink.parar()
+
+    caminho = salvar_resultado("api", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Benchmark ponta a ponta dos fluxos de preview e envio contra OpenAI falso e sink SMTP
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_e2e --submissoes 20 --latencia 0.3 --tokens-por-segundo 60
+    python -m benchmarks.bench_e2e --taxa-erro 0.2 --comparar benchmarks/resultados/e2e-abc123.json
+"""
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+
+from benchmarks.comum import (
+    comparar_distribuicoes, imprimir_comparacao, metadados, resumir, salvar_resultado
+)
+from benchmarks.corpus import gerar_formularios
+from benchmarks.servidores_falsos import ServidorOpenAIFalso, SinkSMTP, configurar_ambiente
+
+# Funções do utils.py cronometradas (chamadas aninhadas também são registradas)
+ESTAGIOS = [
+    "validar_entrada",
+    "detectar_tipo_projeto",
+    "calcular_pontuacao_nps",
+    "estruturar_ideia_avancada",
+    "gerar_json_proposta",
+    "enviar_email_estruturado",
+    "salvar_json_proposta",
+    "processar_submissao",
+]
+
+# Registro global (não por thread): os estágios paralelos do pipeline rodam em threads do pool;
+# as submissões do benchmark são sequenciais
+_registro = types.SimpleNamespace(tempos=None)
+
+
+def instrumentar(utils):
+    """Substitui as funções do utils por versões cronometradas"""
+    for nome in ESTAGIOS:
+        original = getattr(utils, nome)
+
+        @functools.wraps(original)
+        def cronometrada(*args, _original=original, _nome=nome, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                tempos = getattr(_registro, "tempos", None)
+                if tempos is not None:
+                    tempos[_nome].append(time.perf_counter() - inicio)
+
+        setattr(utils, nome, cronometrada)
+
+
+def fluxo_preview(utils, dados):
+    """Mesma sequência do botão '👁️ Gerar Preview' do streamlit_app.py"""
+    utils.validar_entrada(dados["nome"], dados["ideia"])
+    utils.executar_pipeline(dados, utils.ALVOS_TRIAGEM)
+    utils.executar_pipeline(dados, utils.ALVOS_PREVIEW)
+    return dados
+
+
+def fluxo_envio(utils, dados):
+    """Mesma sequência do botão '🚀 Estruturar e Enviar' do streamlit_app.py"""
+    utils.validar_entrada(dados["nome"], dados["ideia"])
+    resultado, _ = utils.processar_submissao(dados)
+    if resultado["json_proposta"]:
+        utils.salvar_json_proposta(resultado["json_proposta"])
+    return resultado["dados"]
+
+
+def executar(utils, servidor, fluxo, formularios):
+    """Roda o fluxo para cada formulário e coleta latências e chamadas ao modelo"""
+    ponta_a_ponta = []
+    por_estagio = defaultdict(list)
+    pipeline = defaultdict(list)
+    chamadas_por_submissao = defaultdict(list)
+    falhas = 0
+
+    for formulario in formularios:
+        _registro.tempos = defaultdict(list)
+        antes = servidor.contadores()["chamadas"]
+
+        inicio = time.perf_counter()
+        try:
+            dados = fluxo(utils, dict(formulario))
+            # Rastro do executor do grafo: duração de cada estágio efetivamente executado
+            for passo in dados.get("rastro_pipeline", []):
+                if passo["origem"] == "executado":
+                    pipeline[passo["estagio"]].append(passo["duracao_ms"] / 1000)
+        except Exception as e:
+            falhas += 1
+            print(f"  falha: {e}", file=sys.stderr)
+        ponta_a_ponta.append(time.perf_counter() - inicio)
+
+        for estagio, tempos in _registro.tempos.items():
+            por_estagio[estagio].append(sum(tempos))
+
+        depois = servidor.contadores()["chamadas"]
+        for estagio in set(antes) | set(depois):
+            chamadas_por_submissao[estagio].append(depois.get(estagio, 0) - antes.get(estagio, 0))
+
+    _registro.tempos = None
+    return {
+        "submissoes": len(formularios),
+        "falhas": falhas,
+        "ponta_a_ponta": resumir(ponta_a_ponta),
+        "estagios": {nome: resumir(tempos) for nome, tempos in por_estagio.items()},
+        "pipeline": {nome: resumir(tempos) for nome, tempos in pipeline.items()},
+        "chamadas_modelo_por_submissao": {
+            estagio: round(sum(v) / len(v), 3) for estagio, v in chamadas_por_submissao.items()
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissoes", type=int, default=10)
+    parser.add_argument("--modo", choices=["preview", "envio", "ambos"], default="ambos")
+    parser.add_argument("--latencia", type=float, default=0.2, help="latência base do OpenAI falso (s)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=80.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas com erro")
+    parser.add_argument("--codigo-erro", type=int, default=500)
+    parser.add_argument("--taxa-truncamento", type=float, default=0.0, help="fração de propostas cortadas no meio")
+    parser.add_argument("--latencia-smtp", type=float, default=0.0)
+    parser.add_argument("--prazo-envio", type=float, default=0.0, help="orçamento de tempo do envio (s); 0 desliga")
+    parser.add_argument("--geracao-dupla", action="store_true",
+                        help="gera a proposta nos dois templates em todas as submissões (como se o tipo fosse incerto)")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument("--comparar", help="resultado JSON anterior para comparação")
+    parser.add_argument("--limite", type=float, default=1.2, help="razão p95 atual/base que conta como regressão")
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAIFalso(
+        latencia_base=args.latencia, tokens_por_segundo=args.tokens_por_segundo,
+        taxa_erro=args.taxa_erro, codigo_erro=args.codigo_erro, taxa_truncamento=args.taxa_truncamento
+    ).iniciar()
+    sink = SinkSMTP(latencia=args.latencia_smtp).iniciar()
+    configurar_ambiente(servidor, sink)
+    os.environ["PRAZO_ENVIO"] = str(args.prazo_envio)
+    if args.geracao_dupla:
+        os.environ["GERACAO_DUPLA"] = "true"
+        os.environ["GERACAO_DUPLA_LIMIAR"] = "1.01"
+
+    import metricas
+    import utils
+    instrumentar(utils)
+
+    formularios = gerar_formularios(args.submissoes)
+    fluxos = {"preview": fluxo_preview, "envio": fluxo_envio}
+    modos = ["preview", "envio"] if args.modo == "ambos" else [args.modo]
+
+    resultado = {"meta": metadados(vars(args)), "fluxos": {}}
+    try:
+        for modo in modos:
+            print(f"▶ {modo}: {len(formularios)} submissões")
+            # Diário próprio por fase: o envio não retoma estágios de outra fase nem de rodadas anteriores
+            utils.diario_estagios.diretorio = tempfile.mkdtemp(prefix=f"mindglass-diario-{modo}-")
+            resultado["fluxos"][modo] = executar(utils, servidor, fluxos[modo], formularios)
+    finally:
+        servidor.parar()
+        sink.parar()
+
+    resultado["servidor"] = servidor.contadores()
+    resultado["degradacao"] = {
+        chave: valor for chave, valor in metricas.instantaneo()["contadores"].items()
+        if chave.startswith("estagios_degradados")
+    }
+    resultado["geracao_dupla"] = {
+        chave: valor for chave, valor in metricas.instantaneo()["contadores"].items()
+        if chave.startswith("geracao_dupla")
+    }
+    resultado["emails"] = {
+        "quantidade": len(sink.mensagens),
+        "bytes_medio": round(sum(map(len, sink.mensagens)) / max(len(sink.mensagens), 1))
+    }
+
+    for modo, dados in resultado["fluxos"].items():
+        e2e = dados["ponta_a_ponta"]
+        print(f"\n{modo}: p50 {e2e['p50_ms']:.0f} ms | p95 {e2e['p95_ms']:.0f} ms | falhas {dados['falhas']}")
+        print(f"  chamadas ao modelo por submissão: {dados['chamadas_modelo_por_submissao']}")
+    if resultado["degradacao"]:
+        print(f"\nestágios degradados pelo prazo do envio: {resultado['degradacao']}")
+    if resultado["geracao_dupla"]:
+        print(f"\ngeração nos dois templates: {resultado['geracao_dupla']}")
+
+    caminho = salvar_resultado("e2e", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+    if args.comparar:
+        base = json.load(open(args.comparar, encoding="utf-8"))
+        regrediu = False
+        for modo, dados in resultado["fluxos"].items():
+            if modo not in base.get("fluxos", {}):
+                continue
+            atual = dict(dados["estagios"], ponta_a_ponta=dados["ponta_a_ponta"])
+            anterior = dict(base["fluxos"][modo]["estagios"], ponta_a_ponta=base["fluxos"][modo]["ponta_a_ponta"])
+            print(f"\n== {modo} ==")
+            regrediu |= imprimir_comparacao(comparar_distribuicoes(atual, anterior, limite=args.limite))
+        sys.exit(1 if regrediu else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark da montagem do email: tempo de renderização/MIME e bytes da mensagem por formato
+
+Formatos comparados, todos com o mesmo corpo de texto:
+    legado   – corpo completo via yagmail com prettify_html=True (como era enviado antes)
+    completo – corpo completo via yagmail com prettify_html=False (padrão atual)
+    compacto – multipart texto+HTML enxuto com a proposta em anexo .json.gz (EMAIL_COMPACTO=true)
+
+Ao final, envia uma mensagem de cada formato para um sink SMTP local para conferir o envio.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_email
+    python -m benchmarks.bench_email --corpus 100 --tokens-proposta 4000
+"""
+import argparse
+import os
+import statistics
+import time
+
+from benchmarks.comum import metadados, percentil, salvar_resultado
+from benchmarks.corpus import gerar_formularios, gerar_propostas
+from benchmarks.servidores_falsos import ServidorOpenAIFalso, SinkSMTP, configurar_ambiente
+
+
+def montar_casos(utils, formularios, propostas):
+    """Lista de (dados, proposta, json_proposta) como chegam em enviar_email_estruturado"""
+    casos = []
+    for i, (formulario, proposta) in enumerate(zip(formularios, propostas)):
+        dados = dict(formulario, pontuacao_nps=35 + (i * 7) % 60, justificativa_nps="Benchmark",
+                     tipo_projeto="TECNOLÓGICO" if i % 2 else "PROCESSO")
+        casos.append((dados, proposta, utils.gerar_json_proposta(dados, proposta)))
+    return casos
+
+
+def montar_mensagem(utils, yag, formato, dados, proposta, json_proposta):
+    """Bytes da mensagem pronta para o SMTP no formato pedido"""
+    pontuacao = dados["pontuacao_nps"]
+    categoria = utils.classificar_categoria_nps(pontuacao)
+    potencial = utils.calcular_potencial_melhoria(pontuacao)
+    assunto = f"Benchmark {dados['nome']}"
+
+    if formato == "compacto":
+        mensagem = utils.montar_email_compacto(
+            yag.user, "lideranca@mindglass.local", assunto, dados, proposta, json_proposta, categoria, potencial
+        )
+        return mensagem.as_bytes()
+
+    corpo = utils.renderizar_corpo(dados, proposta, json_proposta, categoria, potencial)
+    _, conteudo = yag.prepare_send(
+        to="lideranca@mindglass.local", subject=assunto, contents=corpo, prettify_html=formato == "legado"
+    )
+    return conteudo.encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=50, help="quantidade de propostas")
+    parser.add_argument("--tokens-proposta", type=int, default=2500)
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    servidor, sink = ServidorOpenAIFalso(), SinkSMTP()
+    servidor.iniciar()
+    sink.iniciar()
+    configurar_ambiente(servidor, sink)
+    import utils
+
+    try:
+        casos = montar_casos(
+            utils,
+            gerar_formularios(args.corpus),
+            gerar_propostas(args.corpus, tokens_alvo=args.tokens_proposta)
+        )
+        yag = utils.conectar_smtp()
+        resultado = {"meta": metadados(vars(args)), "formatos": {}}
+
+        # Renderização isolada do corpo (templates pré-compilados)
+        tempos_render = []
+        for dados, proposta, json_proposta in casos:
+            inicio = time.perf_counter()
+            utils.renderizar_corpo(dados, proposta, json_proposta, "Alto", "Médio")
+            tempos_render.append((time.perf_counter() - inicio) * 1e6)
+        resultado["renderizacao_us"] = {
+            "mediana": round(statistics.median(tempos_render), 2),
+            "p95": round(percentil(tempos_render, 95), 2)
+        }
+        print(f"Renderização do corpo: mediana {resultado['renderizacao_us']['mediana']:.1f} µs\n")
+
+        print(f"{'formato':<12}{'mediana ms':>12}{'p95 ms':>10}{'bytes médios':>15}{'bytes máx':>12}")
+        for formato in ("legado", "completo", "compacto"):
+            tempos, tamanhos = [], []
+            for dados, proposta, json_proposta in casos:
+                inicio = time.perf_counter()
+                conteudo = montar_mensagem(utils, yag, formato, dados, proposta, json_proposta)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                tamanhos.append(len(conteudo))
+
+            r = resultado["formatos"][formato] = {
+                "mediana_ms": round(statistics.median(tempos), 3),
+                "p95_ms": round(percentil(tempos, 95), 3),
+                "bytes_medios": round(statistics.fmean(tamanhos)),
+                "bytes_max": max(tamanhos),
+                "acima_orcamento": sum(t > utils.ORCAMENTO_BYTES_EMAIL for t in tamanhos)
+            }
+            print(f"{formato:<12}{r['mediana_ms']:>12.2f}{r['p95_ms']:>10.2f}{r['bytes_medios']:>15}{r['bytes_max']:>12}")
+
+        legado = resultado["formatos"]["legado"]["bytes_medios"]
+        for formato in ("completo", "compacto"):
+            print(f"\n{formato}: {resultado['formatos'][formato]['bytes_medios'] / legado:.0%} dos bytes do legado", end="")
+        print()
+
+        # Envio real pelo caminho do utils, um por formato
+        dados, proposta, json_proposta = casos[0]
+        for compacto in ("false", "true"):
+            os.environ["EMAIL_COMPACTO"] = compacto
+            utils.enviar_email_estruturado(dados, proposta, json_proposta)
+        os.environ.pop("EMAIL_COMPACTO")
+        resultado["mensagens_no_sink"] = len(sink.mensagens)
+        print(f"\n📬 Mensagens recebidas pelo sink SMTP: {len(sink.mensagens)}")
+    finally:
+        sink.parar()
+        servidor.parar()
+
+    caminho = salvar_resultado("email", resultado, args.saida)
+    print(f"💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Microbenchmark das funções heurísticas (só CPU) do utils.py
+
+Mede tempo por chamada e alocações (tracemalloc) sobre um corpus determinístico de ideias
+de ~2000 caracteres e propostas de ~2500 tokens. Os ramos de fallback das funções de IA
+são exercitados com um cliente OpenAI que falha imediatamente.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_heuristicas
+    python -m benchmarks.bench_heuristicas --base benchmarks/resultados/heuristicas-abc123.json --limite 1.15
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.comum import metadados, percentil, salvar_resultado
+from benchmarks.corpus import gerar_formularios, gerar_propostas
+
+
+class _ClienteIndisponivel:
+    """Imita o cliente OpenAI falhando sem rede, para medir só o custo dos fallbacks"""
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, **kwargs):
+        raise ConnectionError("benchmark: provedor indisponível")
+
+
+def montar_casos(utils, formularios, propostas):
+    """Lista de (nome, função, lista de argumentos)"""
+    ideias = [f["ideia"] for f in formularios]
+    return [
+        ("validar_entrada", utils.validar_entrada, [(f["nome"], f["ideia"]) for f in formularios]),
+        ("extrair_palavras_chave", utils.extrair_palavras_chave, [(i,) for i in ideias]),
+        ("avaliar_complexidade", utils.avaliar_complexidade, [(i,) for i in ideias]),
+        ("classificar_projeto", utils.classificar_projeto, [(f["ideia"], f["foco"]) for f in formularios]),
+        ("identificar_areas_impacto_nps", utils.identificar_areas_impacto_nps, [(i,) for i in ideias]),
+        ("extrair_estrutura_proposta", utils.extrair_estrutura_proposta, [(p,) for p in propostas]),
+        ("detectar_tipo_projeto[fallback]", utils.detectar_tipo_projeto, [(f["ideia"], f["area"]) for f in formularios]),
+        ("calcular_pontuacao_nps[fallback]", utils.calcular_pontuacao_nps,
+         [(f["ideia"], f["area"], f["foco"]) for f in formularios]),
+        ("estruturar_ideia_avancada[fallback]", lambda dados: utils.estruturar_ideia_avancada(dict(dados)),
+         [(f,) for f in formularios]),
+    ]
+
+
+def medir_tempo(funcao, argumentos, repeticoes):
+    """Tempo por chamada (µs) em cada repetição completa sobre o corpus"""
+    por_chamada = []
+    for _ in range(repeticoes):
+        gc.disable()
+        inicio = time.perf_counter_ns()
+        for args in argumentos:
+            funcao(*args)
+        decorrido = time.perf_counter_ns() - inicio
+        gc.enable()
+        por_chamada.append(decorrido / len(argumentos) / 1000)
+    return por_chamada
+
+
+def medir_alocacoes(funcao, argumentos):
+    """Pico e memória retida por chamada (bytes), via tracemalloc"""
+    picos = []
+    tracemalloc.start()
+    try:
+        inicio_atual, _ = tracemalloc.get_traced_memory()
+        for args in argumentos:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            funcao(*args)
+            _, pico = tracemalloc.get_traced_memory()
+            picos.append(pico - base)
+        fim_atual, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "pico_medio_bytes": round(statistics.fmean(picos)),
+        "pico_max_bytes": max(picos),
+        "retido_por_chamada_bytes": round((fim_atual - inicio_atual) / len(argumentos), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=int, default=200, help="quantidade de ideias/propostas")
+    parser.add_argument("--tamanho-ideia", type=int, default=2000)
+    parser.add_argument("--tokens-proposta", type=int, default=2500)
+    parser.add_argument("--repeticoes", type=int, default=7)
+    parser.add_argument("--filtro", help="mede apenas funções cujo nome contém este texto")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument("--base", help="resultado anterior para verificação de regressão")
+    parser.add_argument("--limite", type=float, default=1.15, help="razão mediana atual/base tolerada")
+    args = parser.parse_args()
+
+    # Import sem rede: chave fictícia e cliente que falha na hora
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    import utils
+    utils.client = _ClienteIndisponivel()
+
+    formularios = gerar_formularios(args.corpus, tamanho_alvo=args.tamanho_ideia)
+    propostas = gerar_propostas(args.corpus, tokens_alvo=args.tokens_proposta)
+
+    resultado = {"meta": metadados(vars(args)), "funcoes": {}}
+    print(f"{'função':<40}{'mediana µs':>12}{'p95 µs':>10}{'min µs':>10}{'pico KiB':>10}")
+
+    for nome, funcao, argumentos in montar_casos(utils, formularios, propostas):
+        if args.filtro and args.filtro not in nome:
+            continue
+
+        medir_tempo(funcao, argumentos[:10], 1)  # aquecimento
+        tempos = medir_tempo(funcao, argumentos, args.repeticoes)
+        alocacoes = medir_alocacoes(funcao, argumentos)
+
+        resultado["funcoes"][nome] = dict({
+            "mediana_us": round(statistics.median(tempos), 3),
+            "p95_us": round(percentil(tempos, 95), 3),
+            "min_us": round(min(tempos), 3)
+        }, **alocacoes)
+        r = resultado["funcoes"][nome]
+        print(f"{nome:<40}{r['mediana_us']:>12.2f}{r['p95_us']:>10.2f}{r['min_us']:>10.2f}"
+              f"{r['pico_medio_bytes'] / 1024:>10.1f}")
+
+    caminho = salvar_resultado("heuristicas", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+    if args.base:
+        base = json.load(open(args.base, encoding="utf-8"))["funcoes"]
+        regressoes = []
+        for nome, r in resultado["funcoes"].items():
+            if nome in base and base[nome]["mediana_us"] > 0:
+                razao = r["mediana_us"] / base[nome]["mediana_us"]
+                if razao > args.limite:
+                    regressoes.append(f"{nome}: {base[nome]['mediana_us']:.2f} → {r['mediana_us']:.2f} µs ({razao:.2f}x)")
+
+        if regressoes:
+            print(f"\n❌ Regressões acima de {args.limite:.2f}x:")
+            for linha in regressoes:
+                print(f"  {linha}")
+            sys.exit(1)
+        print(f"\n✅ Nenhuma regressão acima de {args.limite:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
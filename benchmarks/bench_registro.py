@@ -0,0 +1,140 @@
+"""Benchmark da carga do histórico: dicionários (ler_propostas) × RegistroProposta (ler_registros)
+
+Grava N propostas sintéticas num histórico temporário e carrega tudo das duas formas, medindo
+memória retida e pico (tracemalloc), blocos alocados que ficam vivos, tempo de carga e o tempo
+de uma varredura que lê campos derivados (prioridade, categoria NPS, áreas de impacto). Antes,
+confere que de_json(j).para_json() devolve o mesmo JSON.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_registro --propostas 100000 --tokens-proposta 250
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta
+
+from benchmarks.comum import metadados, salvar_resultado
+from benchmarks.corpus import gerar_formularios, gerar_propostas
+from historico import ler_propostas, ler_registros
+from registro_proposta import RegistroProposta
+from secoes import ParserSecoes
+
+
+def estruturar(texto):
+    parser = ParserSecoes()
+    parser.alimentar(texto)
+    parser.finalizar()
+    return parser.estrutura
+
+
+def gravar_historico(caminho, quantidade, tokens_proposta, semente=42):
+    """Histórico JSONL com o JSON de gerar_json_proposta (propostas sorteadas de um conjunto de textos)"""
+    rng = random.Random(semente)
+    textos = gerar_propostas(64, tokens_proposta, semente=semente) if tokens_proposta else [""]
+    estruturas = [estruturar(t) for t in textos]
+    inicio = datetime(2025, 1, 1)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for i, formulario in enumerate(gerar_formularios(quantidade, semente=semente)):
+            dados = dict(formulario, id_proposta=f"{i:016x}", pontuacao_nps=rng.randint(10, 95),
+                         justificativa_nps="Reduz contatos ao SAC e dá transparência ao cliente.",
+                         tipo_projeto=rng.choice(["TECNOLÓGICO", "PROCESSO"]), confianca_tipo=0.9,
+                         modelos_estagio={"proposta": "gpt-4o", "nps": "gpt-4o-mini"})
+            indice = rng.randrange(len(textos))
+            registro = RegistroProposta.de_dados(dados, textos[indice], estruturas[indice],
+                                                 timestamp=inicio + timedelta(minutes=i))
+            arquivo.write(json.dumps(registro.para_json(), ensure_ascii=False) + "\n")
+
+
+def medir_carga(carregar, caminho):
+    """(itens, memória retida, pico, blocos vivos a mais, segundos) de list(carregar(caminho))"""
+    gc.collect()
+    inicio = time.perf_counter()
+    itens = list(carregar(caminho))
+    segundos = time.perf_counter() - inicio
+    del itens
+
+    gc.collect()
+    blocos_antes = sys.getallocatedblocks()
+    tracemalloc.start()
+    itens = list(carregar(caminho))
+    gc.collect()
+    retida, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocos = sys.getallocatedblocks() - blocos_antes
+    return itens, retida, pico, blocos, segundos
+
+
+def varrer_dicionarios(propostas):
+    return Counter((j["analise"]["prioridade_sugerida"], j["nps_analysis"]["categoria"],
+                    len(j["nps_analysis"]["areas_impacto"])) for j in propostas)
+
+
+def varrer_registros(registros):
+    return Counter((r.prioridade_sugerida, r.categoria_nps, len(r.areas_impacto)) for r in registros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--propostas", type=int, default=100000)
+    parser.add_argument("--tokens-proposta", type=int, default=250, help="tamanho do texto de cada proposta (0 = sem texto)")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "propostas.jsonl")
+        gravar_historico(caminho, args.propostas, args.tokens_proposta)
+        tamanho = os.path.getsize(caminho)
+        print(f"▶ {args.propostas} propostas | histórico {tamanho / 2**20:.1f} MiB")
+
+        for json_proposta in ler_propostas(caminho):
+            assert RegistroProposta.de_json(json_proposta).para_json() == json_proposta, \
+                "de_json(j).para_json() diferente do JSON gravado"
+            break
+
+        resultado = {"meta": metadados(vars(args)), "historico_mib": round(tamanho / 2**20, 1)}
+        varreduras = {}
+        for nome, carregar, varrer in (("dicionarios", ler_propostas, varrer_dicionarios),
+                                       ("registros", ler_registros, varrer_registros)):
+            itens, retida, pico, blocos, segundos = medir_carga(carregar, caminho)
+            inicio = time.perf_counter()
+            varreduras[nome] = varrer(itens)
+            varredura = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            varrer(itens)
+            segunda = time.perf_counter() - inicio
+            resultado[nome] = {
+                "memoria_mib": round(retida / 2**20, 1),
+                "pico_mib": round(pico / 2**20, 1),
+                "bytes_por_proposta": round(retida / len(itens)),
+                "blocos_vivos": blocos,
+                "blocos_por_proposta": round(blocos / len(itens), 1),
+                "carga_s": round(segundos, 2),
+                "varredura_ms": round(varredura * 1000, 1),
+                "varredura_repetida_ms": round(segunda * 1000, 1)
+            }
+            print(f"{nome:12s} memória {retida / 2**20:7.1f} MiB (pico {pico / 2**20:7.1f}) | "
+                  f"{blocos / len(itens):6.1f} blocos/proposta | carga {segundos:5.2f}s | "
+                  f"varredura {varredura * 1000:6.1f} ms (repetida {segunda * 1000:6.1f} ms)")
+            del itens
+            gc.collect()
+
+        assert varreduras["dicionarios"] == varreduras["registros"], "derivados diferentes entre as duas cargas"
+        dicionarios, registros = resultado["dicionarios"], resultado["registros"]
+        resultado["fracao_memoria"] = round(registros["memoria_mib"] / dicionarios["memoria_mib"], 3)
+        resultado["fracao_blocos"] = round(registros["blocos_vivos"] / dicionarios["blocos_vivos"], 3)
+        print(f"\nregistros: {resultado['fracao_memoria']:.0%} da memória e "
+              f"{resultado['fracao_blocos']:.0%} dos blocos dos dicionários")
+
+    caminho = salvar_resultado("registro", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
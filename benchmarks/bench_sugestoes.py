@@ -0,0 +1,104 @@
+"""Benchmark do índice de sugestões (sugestoes.py): memória, montagem, consulta enquanto digita e inserção
+
+As ideias do corpus recebem palavras extras sorteadas (distribuição de Zipf) de um vocabulário
+sintético, para o índice ter um vocabulário e listas de ocorrências parecidos com os de um
+histórico real, e não só as poucas frases-base do corpus.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.bench_sugestoes --propostas 100000 --consultas 300
+"""
+import argparse
+import itertools
+import random
+import time
+import tracemalloc
+
+from benchmarks.comum import metadados, resumir, salvar_resultado
+from benchmarks.corpus import gerar_ideias
+from sugestoes import IndiceSugestoes
+
+
+def vocabulario_sintetico(tamanho, rng):
+    silabas = ["ca", "ro", "vi", "dro", "pa", "ra", "bri", "sa", "lo", "ja", "ofi", "ci", "na", "te", "men", "to", "ge", "ral"]
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add("".join(rng.choice(silabas) for _ in range(rng.randint(2, 4))))
+    return sorted(palavras)
+
+
+def gerar_propostas(quantidade, tamanho_vocabulario, semente=42):
+    """json_proposta mínimos (o que o índice lê) com ideias do corpus + palavras de cauda longa"""
+    rng = random.Random(semente)
+    vocabulario = vocabulario_sintetico(tamanho_vocabulario, rng)
+    acumulados = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulario))))
+    for i, ideia in enumerate(gerar_ideias(quantidade, semente=semente)):
+        extras = " ".join(rng.choices(vocabulario, cum_weights=acumulados, k=rng.randint(3, 8)))
+        yield {
+            "metadata": {"id": f"{i:012d}", "status": "processado", "timestamp": "2025-01-01T00:00:00"},
+            "autor": {"area": "Operações"},
+            "entrada": {"ideia_original": f"{ideia} {extras}"}
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--propostas", type=int, default=100000)
+    parser.add_argument("--vocabulario", type=int, default=60000, help="palavras de cauda longa sorteadas")
+    parser.add_argument("--consultas", type=int, default=300, help="ideias digitadas (várias consultas cada)")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    propostas = list(gerar_propostas(args.propostas + args.consultas, args.vocabulario))
+    base, digitadas = propostas[:args.propostas], propostas[args.propostas:]
+
+    # Sem histórico em disco: só o que for adicionado
+    indice = IndiceSugestoes("/nonexistent/propostas.jsonl")
+    indice.sincronizar()
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for json_proposta in base:
+        indice.adicionar(json_proposta)
+    montagem = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    estatisticas = indice.estatisticas()
+    print(f"▶ {estatisticas['propostas']} propostas | vocabulário {estatisticas['vocabulario']} | "
+          f"{estatisticas['ocorrencias']} ocorrências | montagem {montagem:.1f}s | memória {memoria / 2**20:.1f} MiB")
+
+    # Digitação: uma consulta a cada 8 caracteres, como reruns enquanto a pessoa escreve
+    latencias = []
+    encontradas = 0
+    for json_proposta in digitadas:
+        texto = json_proposta["entrada"]["ideia_original"]
+        for corte in range(16, len(texto) + 1, 8):
+            inicio = time.perf_counter()
+            sugestoes = indice.sugerir(texto[:corte], k=5)
+            latencias.append(time.perf_counter() - inicio)
+        encontradas += bool(sugestoes)
+
+    insercoes = []
+    for json_proposta in digitadas:
+        inicio = time.perf_counter()
+        indice.adicionar(json_proposta)
+        insercoes.append(time.perf_counter() - inicio)
+
+    resultado = {
+        "meta": metadados(vars(args)),
+        "indice": dict(estatisticas, montagem_s=round(montagem, 2), memoria_mib=round(memoria / 2**20, 1),
+                       bytes_por_proposta=round(memoria / max(estatisticas["propostas"], 1))),
+        "consulta": resumir(latencias),
+        "insercao": resumir(insercoes),
+        "ideias_com_sugestao": round(encontradas / max(len(digitadas), 1), 3)
+    }
+    consulta = resultado["consulta"]
+    print(f"consulta ({consulta['n']}): p50 {consulta['p50_ms']:.3f} ms | p99 {consulta['p99_ms']:.3f} ms | "
+          f"máx {consulta['max_ms']:.3f} ms")
+    print(f"inserção: p50 {resultado['insercao']['p50_ms']:.3f} ms | p99 {resultado['insercao']['p99_ms']:.3f} ms")
+
+    caminho = salvar_resultado("sugestoes", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Teste de carga do streamlit_app.py com N sessões simultâneas (AppTest + backends falsos)
+
+Cada sessão simulada abre o app, preenche o formulário, gera o preview e envia a proposta.
+Para cada N são medidos vazão, percentis de latência de rerun por etapa e memória por sessão.
+
+Uso (da raiz do projeto):
+    python -m benchmarks.carga_streamlit --sessoes 1,2,4,8,16 --ciclos 2 --latencia 0.3
+"""
+import argparse
+import resource
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.comum import metadados, resumir, salvar_resultado
+from benchmarks.corpus import gerar_formularios
+from benchmarks.servidores_falsos import ServidorOpenAIFalso, SinkSMTP, configurar_ambiente
+
+CAMINHO_APP = str(Path(__file__).resolve().parent.parent / "streamlit_app.py")
+
+
+def memoria_residente():
+    """RSS atual do processo em bytes (Linux); 0 se indisponível"""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * resource.getpagesize()
+    except Exception:
+        return 0
+
+
+def clicar(app, rotulo):
+    """Clica no botão (inclusive de formulário) cujo rótulo contém `rotulo`"""
+    for botao in app.button:
+        if rotulo in botao.label:
+            botao.click()
+            return
+    raise LookupError(f"botão '{rotulo}' não encontrado")
+
+
+def sessao(formulario, ciclos, timeout, latencias, erros, trava):
+    """Uma sessão de navegador: render inicial, preenchimento, preview e envio"""
+    from streamlit.testing.v1 import AppTest
+
+    def rerun(etapa, app):
+        inicio = time.perf_counter()
+        app.run(timeout=timeout)
+        decorrido = time.perf_counter() - inicio
+        with trava:
+            latencias[etapa].append(decorrido)
+            if app.exception:
+                erros.append(f"{etapa}: {app.exception[0].message}")
+
+    try:
+        app = AppTest.from_file(CAMINHO_APP, default_timeout=timeout)
+        rerun("inicial", app)
+
+        for _ in range(ciclos):
+            app.text_input[0].input(formulario["nome"])
+            app.text_area[0].input(formulario["ideia"])
+            clicar(app, "Gerar Preview")
+            rerun("preview", app)
+
+            clicar(app, "Estruturar e Enviar")
+            rerun("envio", app)
+    except Exception as e:
+        # AppTest não é totalmente thread-safe; registra e segue com as outras sessões
+        with trava:
+            erros.append(f"sessão: {type(e).__name__}: {e}")
+
+
+def rodar_carga(n, formularios, ciclos, timeout):
+    """Dispara n sessões em paralelo e devolve as métricas agregadas"""
+    latencias = defaultdict(list)
+    erros = []
+    trava = threading.Lock()
+
+    memoria_antes = memoria_residente()
+    threads = [
+        threading.Thread(
+            target=sessao,
+            args=(formularios[i % len(formularios)], ciclos, timeout, latencias, erros, trava)
+        )
+        for i in range(n)
+    ]
+
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    memoria_depois = memoria_residente()
+
+    envios = len(latencias["envio"])
+    return {
+        "sessoes": n,
+        "duracao_s": round(duracao, 3),
+        "envios": envios,
+        "vazao_envios_por_s": round(envios / duracao, 3) if duracao else 0,
+        "reruns": {etapa: resumir(v) for etapa, v in latencias.items()},
+        "memoria_por_sessao_kib": round((memoria_depois - memoria_antes) / n / 1024, 1),
+        "erros": erros[:20],
+        "quantidade_erros": len(erros)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessoes", default="1,2,4,8", help="lista de N separada por vírgula")
+    parser.add_argument("--ciclos", type=int, default=1, help="preview+envio por sessão")
+    parser.add_argument("--latencia", type=float, default=0.2)
+    parser.add_argument("--tokens-por-segundo", type=float, default=80.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="timeout de cada rerun (s)")
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    args = parser.parse_args()
+
+    servidor = ServidorOpenAIFalso(
+        latencia_base=args.latencia, tokens_por_segundo=args.tokens_por_segundo, taxa_erro=args.taxa_erro
+    ).iniciar()
+    sink = SinkSMTP().iniciar()
+    configurar_ambiente(servidor, sink)
+
+    niveis = [int(n) for n in args.sessoes.split(",")]
+    formularios = gerar_formularios(max(niveis))
+    resultado = {"meta": metadados(vars(args)), "niveis": []}
+
+    print(f"{'N':>4}{'envios/s':>10}{'rerun p50':>11}{'rerun p95':>11}{'rerun p99':>11}{'KiB/sessão':>12}{'erros':>7}")
+    try:
+        for n in niveis:
+            nivel = rodar_carga(n, formularios, args.ciclos, args.timeout)
+            resultado["niveis"].append(nivel)
+            envio = nivel["reruns"].get("envio", {})
+            print(f"{n:>4}{nivel['vazao_envios_por_s']:>10.2f}{envio.get('p50_ms', 0):>11.0f}"
+                  f"{envio.get('p95_ms', 0):>11.0f}{envio.get('p99_ms', 0):>11.0f}"
+                  f"{nivel['memoria_por_sessao_kib']:>12.1f}{nivel['quantidade_erros']:>7}")
+    finally:
+        servidor.parar()
+        sink.parar()
+
+    resultado["servidor"] = servidor.contadores()
+    caminho = salvar_resultado("carga", resultado, args.saida)
+    print(f"\n💾 Resultado salvo em {caminho}")
+
+
+if __name__ == "__main__":
+    main()
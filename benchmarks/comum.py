@@ -0,0 +1,90 @@
+"""Utilitários compartilhados pelos benchmarks: estatísticas, resultados em JSON e comparação"""
+import json
+import platform
+import statistics
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+PASTA_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolação linear"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicao - inferior)
+
+
+def resumir(valores):
+    """Distribuição resumida (em milissegundos se os valores vierem em segundos)"""
+    if not valores:
+        return {"n": 0}
+    ms = [v * 1000 for v in valores]
+    return {
+        "n": len(ms),
+        "media_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(percentil(ms, 50), 3),
+        "p90_ms": round(percentil(ms, 90), 3),
+        "p95_ms": round(percentil(ms, 95), 3),
+        "p99_ms": round(percentil(ms, 99), 3),
+        "max_ms": round(max(ms), 3)
+    }
+
+
+def commit_atual():
+    """SHA curto do commit atual (ou 'desconhecido' fora de um repositório git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def metadados(configuracao):
+    """Bloco `meta` comum a todos os resultados"""
+    return {
+        "commit": commit_atual(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "configuracao": configuracao
+    }
+
+
+def salvar_resultado(nome, resultado, caminho=None):
+    """Grava o resultado em JSON (padrão: benchmarks/resultados/<nome>-<commit>.json)"""
+    if caminho is None:
+        PASTA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+        caminho = PASTA_RESULTADOS / f"{nome}-{resultado['meta']['commit']}.json"
+    caminho = Path(caminho)
+    caminho.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    return caminho
+
+
+def comparar_distribuicoes(atual, base, chave="p95_ms", limite=1.2):
+    """Compara dicionários {nome: resumo}; retorna lista de (nome, base, atual, razão, regrediu)"""
+    linhas = []
+    for nome, resumo in atual.items():
+        if nome not in base or not base[nome].get(chave):
+            continue
+        razao = resumo.get(chave, 0) / base[nome][chave]
+        linhas.append((nome, base[nome][chave], resumo.get(chave, 0), razao, razao > limite))
+    return linhas
+
+
+def imprimir_comparacao(linhas, chave="p95_ms"):
+    """Imprime a tabela de comparação e retorna True se houve regressão"""
+    print(f"\n{'estágio':<32}{'base ' + chave:>16}{'atual':>14}{'razão':>9}")
+    regrediu = False
+    for nome, valor_base, valor_atual, razao, piorou in linhas:
+        marca = "  ❌" if piorou else ""
+        print(f"{nome:<32}{valor_base:>16.3f}{valor_atual:>14.3f}{razao:>9.2f}{marca}")
+        regrediu = regrediu or piorou
+    return regrediu
@@ -0,0 +1,140 @@
+"""Corpus determinístico de ideias (formulário) usado pelos benchmarks"""
+import random
+
+AREAS = [
+    "TI - Desenvolvimento", "TI - Dados/BI", "RH - Treinamento",
+    "Atendimento - SAC", "Loja - Operações", "Oficina - Técnica",
+    "Oficina - Qualidade", "Marketing - Digital", "Operações", "Logística"
+]
+
+FOCOS = [
+    "Experiência do Cliente", "Redução de Custos", "Melhoria de Processo",
+    "Nova Tecnologia", "Inovação", "Automação", "Análise de Dados"
+]
+
+NIVEIS = ["Básico", "Intermediário", "Completo", "Executivo"]
+
+PRAZOS = ["Urgente (1 mês)", "Curto (3 meses)", "Médio (6 meses)", "Longo (1 ano+)"]
+
+IDEIAS_BASE = [
+    "Que tal se os clientes pudessem acompanhar o reparo em tempo real pelo app, com fotos de cada etapa?",
+    "Podemos simplificar o processo de check-in na oficina trocando o formulário de papel por um checklist único.",
+    "Criar um dashboard com os indicadores de NPS por loja atualizado diariamente para os gerentes.",
+    "Enviar mensagem automática pelo WhatsApp quando o vidro chegar na loja, evitando ligações do cliente.",
+    "Padronizar o procedimento de inspeção de qualidade após a troca do para-brisa com treinamento da equipe.",
+    "Integrar o sistema de agendamento com as seguradoras para reduzir o tempo de aprovação do sinistro.",
+    "Criar uma política de comunicação proativa sobre atrasos, com ligação do atendimento antes do prazo vencer.",
+    "Automação da conferência de estoque de vidros com leitura de código de barras no recebimento.",
+]
+
+COMPLEMENTOS = [
+    " Hoje o cliente liga várias vezes para saber o status e o atendimento fica sobrecarregado.",
+    " Isso melhora a transparência e a experiência do cliente, além de reduzir retrabalho.",
+    " A ideia é começar com um piloto em duas lojas e medir a satisfação antes e depois.",
+    " O processo atual é manual e gera erros de digitação que atrasam o serviço.",
+    " Poderíamos usar a plataforma que já existe e apenas adicionar uma tela simples.",
+    " A equipe técnica teria mais tempo para o reparo e menos tempo com papelada.",
+]
+
+
+def gerar_ideias(quantidade, tamanho_alvo=None, semente=42):
+    """Gera `quantidade` descrições de ideia; com tamanho_alvo, completa até ~N caracteres"""
+    rng = random.Random(semente)
+    ideias = []
+
+    for _ in range(quantidade):
+        ideia = rng.choice(IDEIAS_BASE)
+        limite = tamanho_alvo or rng.randint(150, 600)
+        while len(ideia) < limite:
+            ideia += rng.choice(COMPLEMENTOS)
+        ideias.append(ideia[:limite].strip() if tamanho_alvo else ideia)
+
+    return ideias
+
+
+def gerar_formularios(quantidade, tamanho_alvo=None, semente=42):
+    """Gera dicionários `dados` no mesmo formato montado pelo streamlit_app.py"""
+    rng = random.Random(semente + 1)
+    formularios = []
+
+    for i, ideia in enumerate(gerar_ideias(quantidade, tamanho_alvo, semente)):
+        formularios.append({
+            "nome": f"Colaborador Benchmark {i}",
+            "area": rng.choice(AREAS),
+            "ideia": ideia,
+            "nivel": rng.choice(NIVEIS),
+            "foco": rng.choice(FOCOS),
+            "problema": rng.choice(["", "Clientes reclamam da falta de informação sobre o serviço."]),
+            "recursos": rng.choice(["", "Equipe de TI e verba de treinamento"]),
+            "prazo": rng.choice(PRAZOS)
+        })
+
+    return formularios
+
+
+SECOES_TECNOLOGICO = [
+    "# 🎯 **PROJETO TECNOLÓGICO: Acompanhamento Digital**",
+    "## 📊 **1. IMPACTO NO NPS (85/100)**",
+    "## 📋 **2. RESUMO EXECUTIVO**",
+    "## 🎯 **3. PROBLEMA & OPORTUNIDADE**",
+    "## 🏗️ **4. ARQUITETURA TECNOLÓGICA**",
+    "### **Stack Recomendado:**",
+    "## 📂 **5. ESTRUTURA DE DESENVOLVIMENTO**",
+    "## 📅 **6. CRONOGRAMA DE DESENVOLVIMENTO**",
+    "## 🎯 **7. MÉTRICAS DE SUCESSO**",
+    "## 💰 **8. ANÁLISE DE INVESTIMENTO**",
+    "## ⚠️ **9. RISCOS TECNOLÓGICOS**",
+    "## 🚀 **10. PRÓXIMOS PASSOS**",
+]
+
+SECOES_PROCESSO = [
+    "# 📋 **MELHORIA DE PROCESSO: Check-in Simplificado**",
+    "## 📊 **1. IMPACTO NO NPS (62/100)**",
+    "## 📋 **2. RESUMO EXECUTIVO**",
+    "## 🎯 **3. PROCESSO ATUAL vs PROPOSTO**",
+    "## 📋 **4. DOCUMENTAÇÃO NECESSÁRIA**",
+    "## 👥 **5. PLANO DE IMPLEMENTAÇÃO**",
+    "## 🎯 **6. MÉTRICAS DE PROCESSO**",
+    "## 💰 **7. INVESTIMENTO NECESSÁRIO**",
+    "## ⚠️ **8. RISCOS E RESISTÊNCIAS**",
+    "## 🚀 **9. PRÓXIMOS PASSOS**",
+    "## 👥 **10. EQUIPE NECESSÁRIA**",
+]
+
+LINHAS_CONTEUDO = [
+    "- **Frontend:** React com design responsivo para o cliente acompanhar o serviço",
+    "- **Backend:** Python com FastAPI integrado ao sistema de ordens de serviço",
+    "- **Database:** PostgreSQL com réplicas de leitura",
+    "- **Integração:** [Risco de indisponibilidade] → **Mitigação:** [Fila com reprocessamento]",
+    "- **NPS:** Aumento de 8 pontos em seis meses",
+    "- **Adoção:** 60% dos clientes usando no primeiro trimestre",
+    "- **Equipe:** 3 desenvolvedores por 4 meses",
+    "- [ ] Treinamento da equipe de atendimento nas lojas piloto",
+    "O projeto reduz ligações ao SAC e dá transparência ao cliente sobre cada etapa do reparo.",
+    "### **Sprint 1-2: Setup e Fundação (2 semanas)**",
+]
+
+
+def gerar_propostas(quantidade, tokens_alvo=2500, semente=42):
+    """Gera propostas em markdown no formato dos templates, com ~tokens_alvo tokens (4 caracteres/token)"""
+    rng = random.Random(semente + 2)
+    propostas = []
+
+    for i in range(quantidade):
+        secoes = SECOES_TECNOLOGICO if i % 2 == 0 else SECOES_PROCESSO
+        alvo = tokens_alvo * 4
+        por_secao = alvo // len(secoes)
+        partes = []
+
+        for titulo in secoes:
+            corpo = []
+            tamanho = 0
+            while tamanho < por_secao:
+                linha = rng.choice(LINHAS_CONTEUDO)
+                corpo.append(linha)
+                tamanho += len(linha) + 1
+            partes.append(titulo + "\n" + "\n".join(corpo) + "\n")
+
+        propostas.append("\n".join(partes)[:alvo])
+
+    return propostas
@@ -0,0 +1,295 @@
+"""Servidores locais para benchmarks: OpenAI falso (latência/erros configuráveis) e sink SMTP"""
+import json
+import os
+import random
+import re
+import socketserver
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Aproximação usada em todo o benchmark: ~4 caracteres por token
+CARACTERES_POR_TOKEN = 4
+
+
+def classificar_estagio(prompt):
+    """Identifica qual função do utils.py gerou o prompt"""
+    if "SEÇÕES FALTANTES:" in prompt:
+        return "secoes"
+    if "CONTINUAÇÃO:" in prompt:
+        return "continuacao"
+    if 'Responda apenas com: "TECNOLÓGICO" ou "PROCESSO"' in prompt:
+        return "tipo"
+    if "RESPONDA APENAS COM O NÚMERO" in prompt:
+        return "nps"
+    if "PREVIEW" in prompt:
+        return "preview"
+    return "proposta"
+
+
+def _titulos(texto):
+    return [linha.strip() for linha in texto.split("\n") if re.match(r"\s*#{1,3} ", linha)]
+
+
+def gerar_conteudo(estagio, prompt, max_tokens, rng, mensagens=None):
+    """Gera uma resposta plausível para o estágio, respeitando max_tokens"""
+    if estagio == "tipo":
+        palavras_tech = ['app', 'sistema', 'software', 'digital', 'automação', 'dashboard', 'plataforma']
+        ideia = prompt.split("IDEIA:", 1)[-1].lower()
+        return "TECNOLÓGICO" if any(p in ideia for p in palavras_tech) else "PROCESSO"
+
+    if estagio == "nps":
+        return f"{rng.randint(25, 95)} - Justificativa simulada pelo servidor falso"
+
+    # Preview e proposta: reaproveita os títulos do template pedido no prompt
+    titulos = _titulos(prompt)
+    prefixo = ""
+    if estagio == "continuacao":
+        # Termina o parágrafo cortado e segue com os títulos do template que ainda não saíram
+        ja_escritos = set(_titulos(mensagens[-2]["content"]))
+        titulos = [t for t in _titulos(mensagens[1]["content"]) if t not in ja_escritos]
+        prefixo = " e indicadores de acompanhamento.\n\n"
+    elif estagio == "secoes":
+        titulos = _titulos(mensagens[-1]["content"])
+    if not titulos:
+        titulos = ["## 🎯 **Resumo Executivo**"]
+
+    alvo_caracteres = int(max_tokens * rng.uniform(0.6, 0.95)) * CARACTERES_POR_TOKEN
+    por_secao = max(alvo_caracteres // len(titulos), 40)
+    filler = (
+        "- Texto simulado descrevendo a etapa do projeto com foco em experiência "
+        "do cliente, prazos, responsáveis e indicadores de acompanhamento.\n"
+    )
+
+    partes = []
+    for titulo in titulos:
+        corpo = (filler * (por_secao // len(filler) + 1))[:por_secao]
+        partes.append(f"{titulo}\n{corpo}\n")
+
+    return (prefixo + "\n".join(partes))[:max_tokens * CARACTERES_POR_TOKEN]
+
+
+class _ManipuladorOpenAI(BaseHTTPRequestHandler):
+    """Implementa POST /v1/chat/completions (com e sem stream)"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        servidor = self.server.falso
+        tamanho = int(self.headers.get("Content-Length", 0))
+        corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+
+        prompt = "\n".join(m.get("content", "") for m in corpo.get("messages", []))
+        estagio = classificar_estagio(prompt)
+
+        with servidor.trava:
+            servidor.chamadas[estagio] += 1
+            falhar = servidor.rng.random() < servidor.taxa_erro
+            conteudo = gerar_conteudo(estagio, prompt, corpo.get("max_tokens") or 1000, servidor.rng,
+                                      corpo.get("messages", []))
+            # Proposta cortada no meio (como ao bater max_tokens)
+            cortar = estagio == "proposta" and servidor.rng.random() < servidor.taxa_truncamento
+            if cortar:
+                conteudo = conteudo[:int(len(conteudo) * servidor.rng.uniform(0.5, 0.9))]
+
+        time.sleep(servidor.latencia_base)
+
+        if falhar:
+            with servidor.trava:
+                servidor.erros[estagio] += 1
+            self._responder_json(servidor.codigo_erro, {
+                "error": {"message": "erro injetado", "type": "server_error", "code": None}
+            })
+            return
+
+        tokens_saida = max(len(conteudo) // CARACTERES_POR_TOKEN, 1)
+        truncado = cortar or tokens_saida >= (corpo.get("max_tokens") or 10 ** 9)
+        uso = {
+            "prompt_tokens": len(prompt) // CARACTERES_POR_TOKEN,
+            "completion_tokens": tokens_saida,
+            "total_tokens": len(prompt) // CARACTERES_POR_TOKEN + tokens_saida
+        }
+        with servidor.trava:
+            servidor.tokens[estagio] += uso["total_tokens"]
+
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "created": int(time.time()),
+            "model": corpo.get("model", "falso")
+        }
+        finish_reason = "length" if truncado else "stop"
+
+        if corpo.get("stream"):
+            self._responder_stream(base, conteudo, finish_reason, servidor.tokens_por_segundo)
+            return
+
+        time.sleep(tokens_saida / servidor.tokens_por_segundo)
+        self._responder_json(200, dict(base, **{
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": conteudo},
+                "finish_reason": finish_reason
+            }],
+            "usage": uso
+        }))
+
+    def _responder_json(self, codigo, dados):
+        bruto = json.dumps(dados).encode()
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(bruto)))
+        self.end_headers()
+        self.wfile.write(bruto)
+
+    def _responder_stream(self, base, conteudo, finish_reason, tokens_por_segundo):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        # Envia ~8 tokens por chunk no ritmo configurado
+        passo = 8 * CARACTERES_POR_TOKEN
+        for inicio in range(0, len(conteudo), passo):
+            time.sleep(8 / tokens_por_segundo)
+            self._enviar_evento(dict(base, **{
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": conteudo[inicio:inicio + passo]}, "finish_reason": None}]
+            }))
+
+        self._enviar_evento(dict(base, **{
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}]
+        }))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _enviar_evento(self, dados):
+        self.wfile.write(f"data: {json.dumps(dados)}\n\n".encode())
+        self.wfile.flush()
+
+
+class ServidorOpenAIFalso:
+    """Servidor HTTP compatível com a API de chat da OpenAI, rodando em thread própria"""
+
+    def __init__(self, latencia_base=0.2, tokens_por_segundo=80.0, taxa_erro=0.0, codigo_erro=500, semente=42,
+                 taxa_truncamento=0.0):
+        self.latencia_base = latencia_base
+        self.taxa_truncamento = taxa_truncamento
+        self.tokens_por_segundo = tokens_por_segundo
+        self.taxa_erro = taxa_erro
+        self.codigo_erro = codigo_erro
+        self.rng = random.Random(semente)
+        self.trava = threading.Lock()
+        self.chamadas = Counter()
+        self.erros = Counter()
+        self.tokens = Counter()
+        self._http = None
+
+    @property
+    def url(self):
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}/v1"
+
+    def iniciar(self):
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), _ManipuladorOpenAI)
+        self._http.daemon_threads = True
+        self._http.falso = self
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        if self._http:
+            self._http.shutdown()
+            self._http.server_close()
+
+    def contadores(self):
+        """Cópia dos contadores (chamadas, erros e tokens por estágio)"""
+        with self.trava:
+            return {"chamadas": dict(self.chamadas), "erros": dict(self.erros), "tokens": dict(self.tokens)}
+
+
+class _ManipuladorSMTP(socketserver.StreamRequestHandler):
+    """Subconjunto mínimo do SMTP: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT"""
+
+    def _escrever(self, linha):
+        self.wfile.write((linha + "\r\n").encode())
+
+    def handle(self):
+        sink = self.server.sink
+        self._escrever("220 sink-mindglass ESMTP")
+
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode("utf-8", "replace").strip().upper()
+
+            if comando.startswith("EHLO"):
+                self._escrever("250-sink-mindglass")
+                self._escrever("250-8BITMIME")
+                self._escrever("250 SIZE 52428800")
+            elif comando.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._escrever("250 OK")
+            elif comando == "DATA":
+                self._escrever("354 Fim com <CRLF>.<CRLF>")
+                mensagem = bytearray()
+                while True:
+                    parte = self.rfile.readline()
+                    if not parte or parte == b".\r\n":
+                        break
+                    mensagem.extend(parte)
+                time.sleep(sink.latencia)
+                sink.registrar(bytes(mensagem))
+                self._escrever("250 OK mensagem aceita")
+            elif comando == "QUIT":
+                self._escrever("221 Tchau")
+                return
+            else:
+                self._escrever("502 Comando não implementado")
+
+
+class SinkSMTP:
+    """Servidor SMTP local que apenas guarda as mensagens recebidas"""
+
+    def __init__(self, latencia=0.0):
+        self.latencia = latencia
+        self.mensagens = []
+        self.trava = threading.Lock()
+        self._tcp = None
+
+    @property
+    def porta(self):
+        return self._tcp.server_address[1]
+
+    def registrar(self, mensagem):
+        with self.trava:
+            self.mensagens.append(mensagem)
+
+    def iniciar(self):
+        self._tcp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ManipuladorSMTP)
+        self._tcp.daemon_threads = True
+        self._tcp.sink = self
+        threading.Thread(target=self._tcp.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        if self._tcp:
+            self._tcp.shutdown()
+            self._tcp.server_close()
+
+
+def configurar_ambiente(servidor_openai, sink_smtp):
+    """Aponta o utils.py para os servidores locais (chamar ANTES de importar utils)"""
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": servidor_openai.url,
+        "EMAIL_USER": "benchmark@mindglass.local",
+        "EMAIL_PASS": "benchmark",
+        "EMAIL_DESTINO": "lideranca@mindglass.local",
+        "EMAIL_HOST": "127.0.0.1",
+        "EMAIL_PORT": str(sink_smtp.porta),
+        "EMAIL_SSL": "false"
+    })
@@ -0,0 +1,80 @@
+"""IDs determinísticos por conteúdo e execução única (single-flight) de submissões idênticas
+
+Os resultados concluídos ficam na memória do processo até TTL_RESULTADO depois de prontos.
+Não há thread de limpeza: os vencidos saem na próxima chamada a executar_uma_vez (um processo
+ocioso guarda no máximo os resultados dos últimos TTL_RESULTADO s de atividade).
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+import metricas
+
+# Campos do formulário que definem uma submissão (mesmo conteúdo → mesmo ID)
+CAMPOS_SUBMISSAO = ["nome", "area", "ideia", "nivel", "foco", "problema", "recursos", "prazo"]
+
+# Por quanto tempo (s) um resultado concluído continua valendo para reenvios idênticos
+TTL_RESULTADO = 600
+
+_trava = threading.Lock()
+_em_andamento = {}
+# chave → (instante em que ficou pronto, resultado), em ordem de conclusão
+_concluidas = {}
+
+
+def normalizar_texto(texto):
+    """Unicode NFC, minúsculas e espaços colapsados"""
+    return " ".join(unicodedata.normalize("NFC", str(texto or "")).lower().split())
+
+
+def gerar_id_conteudo(dados):
+    """ID de 12 caracteres derivado do conteúdo normalizado da submissão"""
+    conteudo = "\x1f".join(normalizar_texto(dados.get(campo, "")) for campo in CAMPOS_SUBMISSAO)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()[:12]
+
+
+def executar_uma_vez(chave, funcao):
+    """Executa funcao() uma única vez por chave entre todas as sessões do processo
+
+    Chamadas simultâneas (ou repetidas dentro do TTL) com a mesma chave recebem o mesmo
+    resultado. Devolve (resultado, compartilhado); se a execução falhar, a chave é liberada
+    para uma nova tentativa.
+    """
+    with _trava:
+        # Vencidos saem aqui, na chamada: em ordem de conclusão, basta parar no primeiro válido
+        agora = time.monotonic()
+        while _concluidas:
+            antiga, (instante, _) = next(iter(_concluidas.items()))
+            if agora - instante <= TTL_RESULTADO:
+                break
+            del _concluidas[antiga]
+
+        if chave in _concluidas:
+            metricas.incrementar("submissoes_coalescidas", origem="concluida")
+            return _concluidas[chave][1], True
+
+        futuro = _em_andamento.get(chave)
+        lider = futuro is None
+        if lider:
+            futuro = Future()
+            _em_andamento[chave] = futuro
+
+    if not lider:
+        metricas.incrementar("submissoes_coalescidas", origem="em_andamento")
+        return futuro.result(), True
+
+    try:
+        resultado = funcao()
+    except BaseException as e:
+        with _trava:
+            del _em_andamento[chave]
+        futuro.set_exception(e)
+        raise
+
+    with _trava:
+        del _em_andamento[chave]
+        _concluidas[chave] = (time.monotonic(), resultado)
+    futuro.set_result(resultado)
+    return resultado, False
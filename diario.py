@@ -0,0 +1,172 @@
+"""Diário dos estágios concluídos de cada submissão, para retomar um envio que falhou
+
+Cada estágio do grafo que termina grava na hora suas saídas (e as chaves que ele preenche de
+lado em dados, ex: estrutura da proposta, modelos usados) numa linha de <diretorio>/<id>.jsonl,
+onde o id é o do conteúdo (gerar_id_conteudo). A primeira linha guarda os campos do formulário,
+então dá para retomar só pelo ID.
+
+Uma nova tentativa da mesma submissão restaura essas saídas antes de rodar o grafo, que pula os
+estágios já concluídos (origem "contexto") e recomeça do primeiro que falta: um email que falhou
+depois de 30 s de geração não paga a geração de novo. Quando a proposta é gravada no histórico,
+o diário dela é apagado; diários abandonados expiram depois de ttl_horas.
+"""
+import json
+import os
+import threading
+import time
+
+import metricas
+from deduplicacao import CAMPOS_SUBMISSAO, gerar_id_conteudo
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+ENTRADA = "_entrada"
+
+# Intervalo (s) entre varreduras dos diários expirados
+INTERVALO_LIMPEZA = 600
+
+
+class DiarioEstagios:
+    """Saídas dos estágios por submissão, em disco (vale para todos os processos do host)"""
+
+    def __init__(self, diretorio, estagios, extras=None, contar_tokens=None, ttl_horas=24):
+        """estagios: nomes que vão para o diário; extras: {estágio: chaves laterais de dados};
+        contar_tokens(dados, estágio): tokens gastos pelo estágio (para medir a economia)"""
+        self.diretorio = diretorio
+        self.estagios = set(estagios)
+        self.extras = extras or {}
+        self.contar_tokens = contar_tokens
+        self.ttl = ttl_horas * 3600
+        self._trava = threading.Lock()
+        self._ultima_limpeza = 0
+
+    def caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.jsonl")
+
+    # ── Gravação (chamada pelo grafo ao fim de cada estágio) ─────────────────
+
+    def gravar(self, dados, estagio, saidas):
+        """Acrescenta as saídas do estágio ao diário da submissão (erros de disco não derrubam o envio)"""
+        if estagio not in self.estagios:
+            return
+        chave = dados.get("id_proposta") or gerar_id_conteudo(dados)
+        linhas = []
+        if not os.path.exists(self.caminho(chave)):
+            linhas.append({"estagio": ENTRADA, "saidas": {c: dados.get(c, "") for c in CAMPOS_SUBMISSAO}})
+        linhas.append({
+            "estagio": estagio,
+            "saidas": saidas,
+            "extras": {c: dados[c] for c in self.extras.get(estagio, ()) if c in dados},
+            "modelos": dict(dados.get("modelos_estagio", {})),
+            "tokens": self.contar_tokens(dados, estagio) if self.contar_tokens else 0,
+            "em": time.time()
+        })
+        try:
+            self._acrescentar(chave, "".join(json.dumps(l, ensure_ascii=False) + "\n" for l in linhas))
+            metricas.incrementar("diario_gravacoes", estagio=estagio)
+        except (OSError, TypeError, ValueError):
+            metricas.incrementar("diario_falhas", estagio=estagio)
+        self._limpar_se_preciso()
+
+    def _acrescentar(self, chave, texto):
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self.caminho(chave), "a", encoding="utf-8") as arquivo:
+            if fcntl:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                arquivo.write(texto)
+                arquivo.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    # ── Retomada ─────────────────────────────────────────────────────────────
+
+    def ler(self, chave):
+        """Linhas do diário (as incompletas, de uma gravação interrompida, ficam de fora)"""
+        linhas = []
+        try:
+            with open(self.caminho(chave), encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    try:
+                        linhas.append(json.loads(linha))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return linhas
+
+    def entrada(self, chave):
+        """Campos do formulário da submissão (None se não há diário)"""
+        for linha in self.ler(chave):
+            if linha["estagio"] == ENTRADA:
+                return linha["saidas"]
+        return None
+
+    def restaurar(self, dados):
+        """Coloca em dados as saídas dos estágios já concluídos que ainda faltam; devolve esses estágios
+
+        Conta a retomada, os estágios pulados e os tokens que eles tinham gasto.
+        """
+        chave = dados.get("id_proposta") or gerar_id_conteudo(dados)
+        retomados = []
+        tokens = 0
+        for linha in self.ler(chave):
+            estagio, saidas = linha["estagio"], linha["saidas"]
+            if estagio == ENTRADA or all(s in dados for s in saidas):
+                continue
+            dados.update(saidas)
+            for campo, valor in linha.get("extras", {}).items():
+                dados[campo] = valor
+            modelos = dados.setdefault("modelos_estagio", {})
+            for nome, modelo in linha.get("modelos", {}).items():
+                modelos.setdefault(nome, modelo)
+            retomados.append(estagio)
+            tokens += linha.get("tokens", 0)
+            metricas.incrementar("diario_estagios_retomados", estagio=estagio)
+
+        if retomados:
+            metricas.incrementar("diario_retomadas")
+            metricas.incrementar("diario_tokens_economizados", tokens)
+            dados["estagios_retomados"] = retomados
+        return retomados
+
+    def descartar(self, chave):
+        """Apaga o diário (a submissão terminou)"""
+        try:
+            os.remove(self.caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    # ── Limpeza ──────────────────────────────────────────────────────────────
+
+    def _limpar_se_preciso(self):
+        agora = time.time()
+        with self._trava:
+            if agora - self._ultima_limpeza < INTERVALO_LIMPEZA:
+                return
+            self._ultima_limpeza = agora
+        self.limpar_expirados(agora)
+
+    def limpar_expirados(self, agora=None):
+        """Apaga diários sem gravação há mais de ttl_horas; devolve quantos apagou"""
+        agora = agora or time.time()
+        apagados = 0
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return 0
+        for nome in nomes:
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                if nome.endswith(".jsonl") and agora - os.path.getmtime(caminho) > self.ttl:
+                    os.remove(caminho)
+                    apagados += 1
+            except OSError:
+                continue
+        if apagados:
+            metricas.incrementar("diario_expirados", apagados)
+        return apagados
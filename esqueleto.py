@@ -0,0 +1,185 @@
+"""Esqueleto local da proposta (sem IA): usado quando a geração pelo modelo falha
+
+Monta o mesmo formato de seções das propostas TECNOLÓGICO/PROCESSO a partir dos campos do
+formulário e da análise heurística. Os títulos seguem os usados pelo ParserSecoes, então a
+estrutura do JSON continua sendo extraída normalmente.
+"""
+from datetime import datetime
+
+AVISO_PROVISORIO = (
+    "> ⚠️ **PROPOSTA PROVISÓRIA** – gerada automaticamente sem IA (provedor indisponível). "
+    "A versão completa será gerada e reenviada assim que o serviço voltar."
+)
+
+# Duração total (semanas) por complexidade e tipo de projeto
+SEMANAS_POR_COMPLEXIDADE = {
+    "TECNOLÓGICO": {"Baixa": 4, "Média": 8, "Alta": 12},
+    "PROCESSO": {"Baixa": 2, "Média": 4, "Alta": 6}
+}
+
+# Stack sugerido por categoria heurística do projeto
+STACK_POR_CATEGORIA = {
+    "Automação": [("Automação", "Python + agendador de tarefas / RPA"), ("Backend", "API REST em Python"),
+                  ("Database", "PostgreSQL")],
+    "Dashboard/BI": [("Visualização", "Power BI ou Metabase"), ("Dados", "SQL + pipeline de extração diária"),
+                     ("Database", "PostgreSQL / data warehouse")],
+    "Mobile": [("Mobile", "React Native ou Flutter"), ("Backend", "API REST (Node.js/Python)"),
+               ("Notificações", "Push + SMS/WhatsApp")],
+    "Integração": [("Integração", "APIs REST + fila de mensagens"), ("Backend", "Serviço em Python/Node.js"),
+                   ("Monitoramento", "Logs centralizados e alertas")],
+    "UX/Interface": [("Frontend", "React"), ("Backend", "API REST (Node.js/Python)"),
+                     ("Design", "Protótipo no Figma + testes com usuários")]
+}
+STACK_PADRAO = [("Frontend", "React"), ("Backend", "API REST (Python/Node.js)"), ("Database", "PostgreSQL"),
+                ("Cloud", "AWS/Azure")]
+
+
+def _linhas_contexto(dados):
+    linhas = []
+    for rotulo, campo in (("Problema atual", "problema"), ("Recursos disponíveis", "recursos"),
+                          ("Prazo desejado", "prazo")):
+        if dados.get(campo):
+            linhas.append(f"- **{rotulo}:** {dados[campo]}")
+    return "\n".join(linhas)
+
+
+def _fases(semanas, nomes):
+    """Divide o total de semanas entre as fases (a última absorve o arredondamento)"""
+    base = max(1, semanas // len(nomes))
+    duracoes = [base] * (len(nomes) - 1) + [max(1, semanas - base * (len(nomes) - 1))]
+    return list(zip(nomes, duracoes))
+
+
+def renderizar_esqueleto(dados, analise, preview=False):
+    """Markdown da proposta provisória
+
+    analise traz a heurística: complexidade, categoria, areas_impacto, prioridade e palavras_chave.
+    """
+    tipo = "TECNOLÓGICO" if dados.get("tipo_projeto", "TECNOLÓGICO") == "TECNOLÓGICO" else "PROCESSO"
+    pontuacao = dados.get("pontuacao_nps", 50)
+    justificativa = dados.get("justificativa_nps", "")
+    areas = analise["areas_impacto"]
+    beneficios = "\n".join(f"- {area}" for area in areas)
+
+    if preview:
+        return f"""{AVISO_PROVISORIO}
+
+## 🎯 **Resumo Executivo**
+{dados["ideia"].strip()}
+
+## 📊 **Impacto no NPS**
+{beneficios}
+
+## ⚡ **Implementação**
+- Projeto {tipo.lower()} de complexidade {analise["complexidade"].lower()} ({analise["categoria"]})
+- Prioridade sugerida: {analise["prioridade"]}
+"""
+
+    semanas = SEMANAS_POR_COMPLEXIDADE[tipo][analise["complexidade"]]
+    nome_projeto = " ".join(p.capitalize() for p in analise["palavras_chave"][:3]) or dados["area"]
+    contexto = _linhas_contexto(dados)
+    rodape = (f"**Proposta provisória gerada por:** MindGlass V2 (sem IA) | **Autor:** {dados['nome']} | "
+              f"**Data:** {datetime.now().strftime('%d/%m/%Y')}")
+
+    if tipo == "TECNOLÓGICO":
+        stack = STACK_POR_CATEGORIA.get(analise["categoria"], STACK_PADRAO)
+        fases = _fases(semanas, ["Setup e Fundação", "Desenvolvimento Core", "Finalização e Deploy"])
+        cronograma = "\n\n".join(
+            f"### **Fase {i}: {nome} ({duracao} semana{'s' if duracao > 1 else ''})**"
+            for i, (nome, duracao) in enumerate(fases, 1)
+        )
+        return f"""{AVISO_PROVISORIO}
+
+# 🎯 **PROJETO TECNOLÓGICO: {nome_projeto}**
+
+## 📊 **1. IMPACTO NO NPS ({pontuacao}/100)**
+**Justificativa:** {justificativa}
+
+**Áreas de impacto:**
+{beneficios}
+
+## 📋 **2. RESUMO EXECUTIVO**
+{dados["ideia"].strip()}
+
+## 🎯 **3. CONTEXTO**
+- **Área:** {dados["area"]}
+- **Foco:** {dados.get("foco", "Não especificado")}
+- **Categoria:** {analise["categoria"]} | **Complexidade:** {analise["complexidade"]}
+{contexto}
+
+## 🏗️ **4. ARQUITETURA TECNOLÓGICA**
+{chr(10).join(f"- **{camada}:** {tecnologia}" for camada, tecnologia in stack)}
+
+## 📅 **5. CRONOGRAMA DE DESENVOLVIMENTO ({semanas} semanas)**
+{cronograma}
+
+## 🎯 **6. MÉTRICAS DE SUCESSO**
+- NPS das jornadas afetadas ({", ".join(areas)})
+- Adoção da solução pelos clientes/equipes
+- Tempo de resposta e disponibilidade
+
+## 💰 **7. INVESTIMENTO**
+- Equipe de desenvolvimento por {semanas} semanas (dimensionar na análise técnica)
+
+## ⚠️ **8. RISCOS**
+- Integração com sistemas existentes
+- Segurança e privacidade dos dados de clientes
+- Adoção pelos usuários finais
+
+## 🚀 **9. PRÓXIMOS PASSOS**
+1. Aguardar a versão completa gerada pela IA
+2. Aprovação técnica e priorização ({analise["prioridade"]})
+
+---
+
+{rodape}
+"""
+
+    fases = _fases(semanas, ["Preparação", "Treinamento e Piloto", "Implementação"])
+    plano = "\n\n".join(
+        f"### **Fase {i}: {nome} ({duracao} semana{'s' if duracao > 1 else ''})**"
+        for i, (nome, duracao) in enumerate(fases, 1)
+    )
+    return f"""{AVISO_PROVISORIO}
+
+# 📋 **MELHORIA DE PROCESSO: {nome_projeto}**
+
+## 📊 **1. IMPACTO NO NPS ({pontuacao}/100)**
+**Justificativa:** {justificativa}
+
+**Áreas de impacto:**
+{beneficios}
+
+## 📋 **2. RESUMO EXECUTIVO**
+{dados["ideia"].strip()}
+
+## 🎯 **3. CONTEXTO**
+- **Área:** {dados["area"]}
+- **Foco:** {dados.get("foco", "Não especificado")}
+- **Categoria:** {analise["categoria"]} | **Complexidade:** {analise["complexidade"]}
+{contexto}
+
+## 👥 **4. PLANO DE IMPLEMENTAÇÃO ({semanas} semanas)**
+{plano}
+
+## 🎯 **5. MÉTRICAS DE PROCESSO**
+- Tempo de execução do processo
+- Taxa de erro e retrabalho
+- NPS das jornadas afetadas ({", ".join(areas)})
+
+## 💰 **6. INVESTIMENTO**
+- Horas de treinamento e materiais (dimensionar com o gestor da área)
+
+## ⚠️ **7. RISCOS**
+- Resistência à mudança
+- Falta de adesão ao novo procedimento
+- Problemas na transição
+
+## 🚀 **8. PRÓXIMOS PASSOS**
+1. Aguardar a versão completa gerada pela IA
+2. Aprovação gerencial e priorização ({analise["prioridade"]})
+
+---
+
+{rodape}
+"""
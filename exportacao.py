@@ -0,0 +1,301 @@
+"""Exportação do histórico de propostas para Parquet ou CSV (BI / data warehouse)
+
+Lê o histórico em streaming (como RegistroProposta) e grava em blocos de N linhas, então a memória fica limitada ao
+tamanho do bloco, qualquer que seja o tamanho do histórico. O esquema é o JSON de
+gerar_json_proposta achatado (uma coluna por campo; listas viram list<string> no Parquet e
+texto separado por "; " no CSV). Cada versão gravada de uma proposta vira uma linha: para ter
+só a versão atual, fique com o maior `timestamp` de cada `id`.
+
+Exportação incremental: com --marca, só saem as propostas ainda não exportadas, e a marca é
+atualizada ao final. O timestamp é o da montagem do JSON, não o da gravação: uma proposta pode
+chegar ao histórico depois de outra mais nova já exportada. Por isso a marca guarda o maior
+timestamp exportado e as versões (id, timestamp) exportadas na janela anterior a ele
+(--janela-horas); a próxima exportação relê essa janela e pula só as versões já exportadas.
+
+Uso (da raiz do projeto):
+    python -m exportacao --formato parquet --saida propostas.parquet
+    python -m exportacao --formato csv --saida novas.csv --marca dados/exportacao.marca
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # sem getrusage (ex: Windows): o resumo sai sem o pico de memória
+    resource = None
+
+from historico import ARQUIVO_PADRAO, ler_registros
+from registro_proposta import RegistroProposta
+
+# (coluna, caminho no JSON da proposta, tipo) – tipos: texto, inteiro, instante, lista, json
+ESQUEMA = [
+    ("id", ("metadata", "id"), "texto"),
+    ("timestamp", ("metadata", "timestamp"), "instante"),
+    ("versao_esquema", ("metadata", "versao"), "texto"),
+    ("status", ("metadata", "status"), "texto"),
+    ("sistema", ("metadata", "sistema"), "texto"),
+    ("modelos_estagio", ("metadata", "modelos_estagio"), "json"),
+    ("continuacoes", ("metadata", "continuacoes"), "inteiro"),
+    ("degradacao", ("metadata", "degradacao"), "json"),
+    ("autor_nome", ("autor", "nome"), "texto"),
+    ("autor_area", ("autor", "area"), "texto"),
+    ("autor_area_detalhada", ("autor", "area_detalhada"), "texto"),
+    ("ideia_original", ("entrada", "ideia_original"), "texto"),
+    ("nivel_detalhamento", ("entrada", "nivel_detalhamento"), "texto"),
+    ("foco_principal", ("entrada", "foco_principal"), "texto"),
+    ("problema_contexto", ("entrada", "problema_contexto"), "texto"),
+    ("recursos_disponiveis", ("entrada", "recursos_disponiveis"), "texto"),
+    ("prazo_desejado", ("entrada", "prazo_desejado"), "texto"),
+    ("caracteres_ideia", ("entrada", "caracteres_ideia"), "inteiro"),
+    ("palavras_chave", ("entrada", "palavras_chave"), "lista"),
+    ("proposta_completa", ("saida", "proposta_completa"), "texto"),
+    ("tipo_alternativo", ("saida", "proposta_alternativa", "tipo_projeto"), "texto"),
+    ("proposta_alternativa", ("saida", "proposta_alternativa", "proposta_completa"), "texto"),
+    ("resumo_executivo", ("saida", "resumo_executivo"), "texto"),
+    ("tecnologias_sugeridas", ("saida", "tecnologias_sugeridas"), "lista"),
+    ("cronograma_estimado", ("saida", "cronograma_estimado"), "texto"),
+    ("investimento_estimado", ("saida", "investimento_estimado"), "texto"),
+    ("riscos_identificados", ("saida", "riscos_identificados"), "lista"),
+    ("metricas_sucesso", ("saida", "metricas_sucesso"), "lista"),
+    ("tipo_projeto", ("analise", "tipo_projeto"), "texto"),
+    ("pontuacao_nps", ("analise", "pontuacao_nps"), "inteiro"),
+    ("justificativa_nps", ("analise", "justificativa_nps"), "texto"),
+    ("categoria_nps", ("analise", "categoria_nps"), "texto"),
+    ("complexidade", ("analise", "complexidade"), "texto"),
+    ("categoria_projeto", ("analise", "categoria_projeto"), "texto"),
+    ("viabilidade_tecnica", ("analise", "viabilidade_tecnica"), "texto"),
+    ("impacto_estimado", ("analise", "impacto_estimado"), "texto"),
+    ("prioridade_sugerida", ("analise", "prioridade_sugerida"), "texto"),
+    ("potencial_melhoria", ("nps_analysis", "potencial_melhoria"), "texto"),
+    ("areas_impacto", ("nps_analysis", "areas_impacto"), "lista"),
+    ("acao_imediata", ("proximos_passos", "acao_imediata"), "texto"),
+    ("responsavel_proximo", ("proximos_passos", "responsavel_proximo"), "texto"),
+    ("prazo_resposta", ("proximos_passos", "prazo_resposta"), "texto"),
+]
+
+TAMANHO_BLOCO = 1000
+
+# Atraso máximo esperado entre montar o JSON e gravá-lo no histórico
+JANELA_PADRAO = timedelta(hours=1)
+
+# Maior timestamp exportado e as versões (id, timestamp) já exportadas na janela anterior a ele
+Marca = namedtuple("Marca", ["instante", "vistas"])
+
+
+def achatar_proposta(proposta):
+    """Dicionário coluna → valor de um RegistroProposta ou JSON de proposta (campos ausentes viram None)"""
+    if isinstance(proposta, RegistroProposta):
+        # Mesmos objetos do registro (textos internados), sem copiar
+        proposta = proposta.para_json()
+    linha = {}
+    for coluna, caminho, tipo in ESQUEMA:
+        valor = proposta
+        for chave in caminho:
+            valor = valor.get(chave) if isinstance(valor, dict) else None
+
+        if valor is None:
+            linha[coluna] = None
+        elif tipo == "instante":
+            linha[coluna] = datetime.fromisoformat(valor)
+        elif tipo == "inteiro":
+            linha[coluna] = int(valor)
+        elif tipo == "lista":
+            linha[coluna] = [str(item) for item in valor]
+        elif tipo == "json":
+            linha[coluna] = json.dumps(valor, ensure_ascii=False)
+        else:
+            linha[coluna] = str(valor)
+    return linha
+
+
+def ler_marca(caminho):
+    """Marca da última exportação (ou None se ainda não houve)
+
+    Aceita também o formato antigo (só o timestamp em ISO 8601), sem versões vistas.
+    """
+    if caminho and os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            conteudo = arquivo.read().strip()
+        if not conteudo:
+            return None
+        if not conteudo.startswith("{"):
+            return Marca(datetime.fromisoformat(conteudo), frozenset())
+        marca = json.loads(conteudo)
+        return Marca(
+            datetime.fromisoformat(marca["instante"]),
+            frozenset((proposta_id, datetime.fromisoformat(instante)) for proposta_id, instante in marca["vistas"])
+        )
+    return None
+
+
+def gravar_marca(caminho, marca):
+    """Grava a marca de forma atômica (arquivo temporário + rename)"""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump({
+            "instante": marca.instante.isoformat(),
+            "vistas": sorted([proposta_id, instante.isoformat()] for proposta_id, instante in marca.vistas)
+        }, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def nova_marca(anterior, exportadas, janela=JANELA_PADRAO):
+    """Marca depois de exportar as versões (id, timestamp) em exportadas, a partir da anterior"""
+    instantes = [instante for _, instante in exportadas]
+    if anterior is not None:
+        instantes.append(anterior.instante)
+    if not instantes:
+        return anterior
+    instante = max(instantes)
+    vistas = set(exportadas) | set(anterior.vistas if anterior else ())
+    return Marca(instante, frozenset(v for v in vistas if v[1] > instante - janela))
+
+
+def blocos_de_linhas(propostas, marca=None, tamanho_bloco=TAMANHO_BLOCO, janela=JANELA_PADRAO):
+    """Agrupa as propostas achatadas em listas de até tamanho_bloco, filtrando pela marca
+
+    Saem as versões com timestamp dentro da janela anterior à marca (ou depois dela) que ainda
+    não constam entre as vistas da marca.
+    """
+    corte = marca.instante - janela if marca is not None else None
+    bloco = []
+    for proposta in propostas:
+        linha = achatar_proposta(proposta)
+        if corte is not None and (linha["timestamp"] is None or linha["timestamp"] <= corte
+                                  or (linha["id"], linha["timestamp"]) in marca.vistas):
+            continue
+        bloco.append(linha)
+        if len(bloco) >= tamanho_bloco:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def anotar_exportadas(blocos, exportadas, janela=JANELA_PADRAO):
+    """Repassa os blocos guardando em exportadas as versões (id, timestamp) da janela final
+
+    As versões anteriores à janela do maior timestamp visto até aqui são descartadas a cada
+    bloco: a memória fica limitada às propostas da janela.
+    """
+    maior = None
+    for bloco in blocos:
+        yield bloco
+        for linha in bloco:
+            if linha["timestamp"] is not None:
+                exportadas.add((linha["id"], linha["timestamp"]))
+                maior = linha["timestamp"] if maior is None else max(maior, linha["timestamp"])
+        if maior is not None:
+            for versao in [v for v in exportadas if v[1] <= maior - janela]:
+                exportadas.discard(versao)
+
+
+def _maior_instante(atual, bloco):
+    instantes = [linha["timestamp"] for linha in bloco if linha["timestamp"]]
+    if atual is not None:
+        instantes.append(atual)
+    return max(instantes) if instantes else None
+
+
+def _esquema_arrow():
+    import pyarrow as pa
+
+    tipos = {
+        "texto": pa.string(),
+        "inteiro": pa.int64(),
+        "instante": pa.timestamp("us"),
+        "lista": pa.list_(pa.string()),
+        "json": pa.string()
+    }
+    return pa.schema([(coluna, tipos[tipo]) for coluna, _, tipo in ESQUEMA])
+
+
+def exportar(blocos, formato, saida, compressao="zstd"):
+    """Grava os blocos no arquivo de saída; devolve (linhas, maior timestamp exportado)"""
+    total = 0
+    maior = None
+
+    if formato == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = _esquema_arrow()
+        escritor = None
+        try:
+            for bloco in blocos:
+                if escritor is None:
+                    escritor = pq.ParquetWriter(saida, esquema, compression=compressao)
+                escritor.write_batch(pa.RecordBatch.from_pylist(bloco, schema=esquema))
+                total += len(bloco)
+                maior = _maior_instante(maior, bloco)
+        finally:
+            if escritor is not None:
+                escritor.close()
+        return total, maior
+
+    colunas = [coluna for coluna, _, _ in ESQUEMA]
+    with open(saida, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        for bloco in blocos:
+            for linha in bloco:
+                escritor.writerow({
+                    coluna: "; ".join(valor) if isinstance(valor, list) else
+                    valor.isoformat() if isinstance(valor, datetime) else valor
+                    for coluna, valor in linha.items()
+                })
+            total += len(bloco)
+            maior = _maior_instante(maior, bloco)
+    return total, maior
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formato", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--saida", required=True, help="arquivo de saída")
+    parser.add_argument("--historico", default=os.environ.get("HISTORICO_ARQUIVO", ARQUIVO_PADRAO))
+    parser.add_argument("--desde", help="só propostas com timestamp posterior (ISO 8601)")
+    parser.add_argument("--marca", help="arquivo com a marca da última exportação (incremental)")
+    parser.add_argument("--janela-horas", type=float, default=JANELA_PADRAO.total_seconds() / 3600,
+                        help="com --marca, quanto antes da marca reler (propostas gravadas com atraso)")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="linhas por bloco gravado")
+    parser.add_argument("--compressao", default="zstd", help="codec do Parquet (zstd, snappy, gzip, none)")
+    args = parser.parse_args()
+
+    janela = timedelta(hours=args.janela_horas)
+    if args.desde:
+        # --desde é um corte estrito: sem releitura da janela
+        marca, janela_corte = Marca(datetime.fromisoformat(args.desde), frozenset()), timedelta(0)
+    else:
+        marca, janela_corte = ler_marca(args.marca), janela
+    inicio = time.perf_counter()
+
+    exportadas = set()
+    blocos = blocos_de_linhas(ler_registros(args.historico), marca, args.bloco, janela_corte)
+    total, maior = exportar(anotar_exportadas(blocos, exportadas, janela), args.formato, args.saida, args.compressao)
+
+    if total == 0:
+        print(f"Nenhuma proposta nova desde {marca.instante.isoformat() if marca else 'o início'}.")
+        return
+
+    marca = nova_marca(marca, exportadas, janela)
+    if args.marca and marca is not None:
+        gravar_marca(args.marca, marca)
+
+    memoria = ""
+    if resource is not None:
+        memoria = f" | pico de memória {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB"
+    print(f"✅ {total} propostas exportadas para {args.saida} ({os.path.getsize(args.saida) / 1024:.1f} KiB) "
+          f"em {time.perf_counter() - inicio:.2f}s{memoria}")
+    if maior:
+        print(f"🕒 Marca: {maior.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Histórico persistente das propostas: um JSON por linha (JSONL), só acrescentando no fim do arquivo
+
+Várias sessões e processos podem gravar ao mesmo tempo (flock por escrita); na leitura, se um
+mesmo ID aparecer mais de uma vez, vale a última linha.
+
+O arquivo JSONL é a camada quente. A compactação (em segundo plano) move as propostas mais
+antigas para segmentos comprimidos e imutáveis em <pasta do histórico>/arquivo (ver arquivamento.py).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # sem flock (ex: Windows): a trava vale só dentro do processo
+    fcntl = None
+
+from arquivamento import Arquivo
+from registro_proposta import RegistroProposta
+
+ARQUIVO_PADRAO = os.path.join("dados", "propostas.jsonl")
+
+# IDs gravados lembrados por processo (os mais antigos são esquecidos)
+MAX_GRAVADAS = 10000
+
+_trava = threading.Lock()
+_gravadas = OrderedDict()
+_arquivos = {}
+_compactacao_iniciada = set()
+
+
+def arquivo_do_historico(caminho=ARQUIVO_PADRAO, codec="gzip"):
+    """Arquivo (segmentos + índice) associado ao histórico, um por processo"""
+    pasta = os.path.join(os.path.dirname(caminho) or ".", "arquivo")
+    if (pasta, codec) not in _arquivos:
+        _arquivos[(pasta, codec)] = Arquivo(pasta, codec)
+    return _arquivos[(pasta, codec)]
+
+
+def registrar_proposta(json_proposta, caminho=ARQUIVO_PADRAO, substituir=False):
+    """Acrescenta a proposta ao histórico; devolve False se este processo já a gravou
+
+    Com substituir=True grava mesmo assim (nova versão da mesma proposta; na leitura vale a última).
+    """
+    proposta_id = json_proposta["metadata"]["id"]
+    linha = json.dumps(json_proposta, ensure_ascii=False) + "\n"
+
+    with _trava:
+        if not substituir and (caminho, proposta_id) in _gravadas:
+            return False
+
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with _abrir_para_acrescentar(caminho) as arquivo:
+            try:
+                arquivo.write(linha)
+                arquivo.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+        _gravadas[(caminho, proposta_id)] = True
+        _gravadas.move_to_end((caminho, proposta_id))
+        while len(_gravadas) > MAX_GRAVADAS:
+            _gravadas.popitem(last=False)
+    return True
+
+
+def _abrir_para_acrescentar(caminho):
+    """Abre com flock exclusivo, garantindo que é o arquivo atual (a compactação o substitui)"""
+    while True:
+        arquivo = open(caminho, "a", encoding="utf-8")
+        if not fcntl:
+            return arquivo
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        if os.fstat(arquivo.fileno()).st_ino == os.stat(caminho).st_ino:
+            return arquivo
+        fcntl.flock(arquivo, fcntl.LOCK_UN)
+        arquivo.close()
+
+
+def ler_propostas(caminho=ARQUIVO_PADRAO):
+    """Itera as propostas gravadas: primeiro as arquivadas, depois a camada quente (linhas corrompidas são ignoradas)"""
+    yield from arquivo_do_historico(caminho).ler()
+    if not os.path.exists(caminho):
+        return
+
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                continue
+
+
+def ler_registros(caminho=ARQUIVO_PADRAO):
+    """Itera as propostas gravadas como RegistroProposta (carga em massa: fração da memória dos dicionários)"""
+    for json_proposta in ler_propostas(caminho):
+        try:
+            yield RegistroProposta.de_json(json_proposta)
+        except (AttributeError, TypeError):
+            continue
+
+
+def buscar_proposta(proposta_id, caminho=ARQUIVO_PADRAO):
+    """Última versão gravada da proposta com este ID (ou None)
+
+    Procura na camada quente e, se não achar, no índice do arquivo (sem varrer os segmentos).
+    """
+    encontrada = None
+    if os.path.exists(caminho):
+        with open(caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                if proposta_id not in linha:
+                    continue
+                try:
+                    proposta = json.loads(linha)
+                except ValueError:
+                    continue
+                if proposta.get("metadata", {}).get("id") == proposta_id:
+                    encontrada = proposta
+    return encontrada or arquivo_do_historico(caminho).buscar(proposta_id)
+
+
+def compactar(caminho=ARQUIVO_PADRAO, dias_quente=30, codec="gzip"):
+    """Move as propostas com mais de dias_quente dias para segmentos arquivados; devolve quantas
+
+    Só um processo compacta por vez (os demais desistem na hora). Os gravadores ficam bloqueados
+    enquanto a camada quente é reescrita.
+    """
+    if not os.path.exists(caminho):
+        return 0
+
+    arquivo_morto = arquivo_do_historico(caminho, codec)
+    os.makedirs(arquivo_morto.pasta, exist_ok=True)
+    limite = (datetime.now() - timedelta(days=dias_quente)).isoformat()
+
+    with open(os.path.join(arquivo_morto.pasta, ".compactacao.lock"), "w") as trava_compactacao:
+        if fcntl:
+            try:
+                fcntl.flock(trava_compactacao, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+
+        # O arquivo aberto por _abrir_para_acrescentar só segura o flock das gravações até o fim
+        with _trava, _abrir_para_acrescentar(caminho), open(caminho, encoding="utf-8") as quente:
+            temporario = caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as nova_camada:
+
+                def antigas():
+                    for linha in quente:
+                        try:
+                            metadata = json.loads(linha)["metadata"]
+                        except (ValueError, KeyError, TypeError):
+                            nova_camada.write(linha)
+                            continue
+                        if metadata["timestamp"] < limite:
+                            yield metadata["id"], metadata["timestamp"][:7], linha
+                        else:
+                            nova_camada.write(linha)
+
+                total = arquivo_morto.arquivar(antigas())
+                nova_camada.flush()
+                os.fsync(nova_camada.fileno())
+
+            if total:
+                os.replace(temporario, caminho)
+            else:
+                os.remove(temporario)
+    return total
+
+
+def iniciar_compactacao_periodica(caminho=ARQUIVO_PADRAO, intervalo=6 * 3600, dias_quente=30, codec="gzip"):
+    """Thread em segundo plano (uma por processo e histórico) que compacta a cada intervalo segundos"""
+    with _trava:
+        if caminho in _compactacao_iniciada:
+            return
+        _compactacao_iniciada.add(caminho)
+
+    def ciclo():
+        while True:
+            time.sleep(intervalo)
+            try:
+                compactar(caminho, dias_quente, codec)
+            except Exception:
+                continue
+
+    threading.Thread(target=ciclo, name="compactacao-historico", daemon=True).start()
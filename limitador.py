@@ -0,0 +1,216 @@
+"""Limite de requisições/min e tokens/min compartilhado entre processos do host, com fila por prioridade
+
+O estado dos baldes fica num arquivo JSON pequeno protegido por flock, então todas as sessões e
+workers da mesma máquina consomem da mesma cota. Dentro do processo, quem espera forma uma fila
+ordenada por prioridade; entre processos, cada um publica quantas chamadas tem esperando por
+prioridade e uma chamada só é liberada se nenhum outro processo tiver espera mais prioritária.
+"""
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # sem flock (ex: Windows): o limite vale só dentro do processo
+    fcntl = None
+
+import metricas
+
+# Menor valor = mais prioritário
+PRIORIDADES = {
+    "envio": 0,
+    "preview": 1,
+    "fundo": 2
+}
+
+# Entradas de espera de outros processos mais antigas que isso (s) são ignoradas (processo morto)
+VALIDADE_ESPERA = 2.0
+
+# Intervalo máximo (s) entre novas tentativas de quem está esperando
+INTERVALO_TENTATIVA = 0.05
+
+
+class FilaEsgotada(Exception):
+    """A chamada não conseguiu cota dentro do prazo"""
+    pass
+
+
+class LimitadorCompartilhado:
+    """Dois baldes de fichas (requisições e tokens) reabastecidos continuamente por minuto"""
+
+    def __init__(self, caminho, requisicoes_por_minuto=None, tokens_por_minuto=None):
+        self.caminho = caminho
+        self.rpm = requisicoes_por_minuto
+        self.tpm = tokens_por_minuto
+        self._condicao = threading.Condition()
+        self._fila = []
+        self._sequencia = itertools.count()
+
+    @property
+    def ativo(self):
+        return bool(self.rpm or self.tpm)
+
+    def adquirir(self, tokens, prioridade="fundo", prazo=None):
+        """Bloqueia até haver cota para 1 requisição + tokens; devolve a espera em segundos
+
+        Levanta FilaEsgotada se o prazo (segundos) acabar antes.
+        """
+        if not self.ativo:
+            return 0.0
+
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        entrada = (PRIORIDADES[prioridade], next(self._sequencia))
+        inicio = time.monotonic()
+        limite = inicio + prazo if prazo is not None else None
+
+        with self._condicao:
+            heapq.heappush(self._fila, entrada)
+            self._publicar_fila()
+            try:
+                while True:
+                    espera = INTERVALO_TENTATIVA
+                    if self._fila[0] == entrada:
+                        espera = self._tentar_consumir(tokens, entrada[0])
+                        if espera == 0:
+                            break
+
+                    agora = time.monotonic()
+                    if limite is not None and agora + min(espera, INTERVALO_TENTATIVA) > limite:
+                        metricas.incrementar("limitador_esgotadas", prioridade=prioridade)
+                        raise FilaEsgotada(f"Sem cota da OpenAI em {prazo:.0f}s (prioridade {prioridade})")
+                    self._condicao.wait(min(espera, INTERVALO_TENTATIVA))
+            finally:
+                self._fila.remove(entrada)
+                heapq.heapify(self._fila)
+                self._publicar_fila()
+                self._condicao.notify_all()
+
+        decorrido = time.monotonic() - inicio
+        metricas.observar("limitador_espera_s", decorrido, prioridade=prioridade)
+        return decorrido
+
+    def ajustar_tokens(self, diferenca):
+        """Devolve (positivo) ou cobra (negativo) tokens quando o uso real difere da estimativa"""
+        if not self.tpm or not diferenca:
+            return
+        with self._estado() as estado:
+            estado["tokens"] = min(self.tpm, estado["tokens"] + diferenca)
+
+    def instantaneo(self):
+        """Fichas disponíveis e chamadas esperando por prioridade (todos os processos)"""
+        if not self.ativo:
+            return {"ativo": False}
+        with self._estado() as estado:
+            fila = {nome: 0 for nome in PRIORIDADES}
+            for _, *contagens in self._esperas_validas(estado, incluir_proprio=True):
+                for nome, indice in PRIORIDADES.items():
+                    fila[nome] += contagens[indice]
+            return {
+                "ativo": True,
+                "requisicoes_disponiveis": round(estado["requisicoes"], 1) if self.rpm else None,
+                "tokens_disponiveis": round(estado["tokens"]) if self.tpm else None,
+                "fila": fila
+            }
+
+    def _tentar_consumir(self, tokens, prioridade):
+        """0 se consumiu; senão, segundos estimados até haver cota"""
+        with self._estado() as estado:
+            # Renova o registro da própria fila para os outros processos não o darem como expirado
+            self._gravar_fila(estado, self._contar_fila())
+            mais_prioritarias = sum(
+                sum(contagens[:prioridade]) for _, *contagens in self._esperas_validas(estado)
+            )
+            if mais_prioritarias:
+                return INTERVALO_TENTATIVA
+
+            faltam = []
+            if self.rpm and estado["requisicoes"] < 1:
+                faltam.append((1 - estado["requisicoes"]) * 60 / self.rpm)
+            if self.tpm and estado["tokens"] < tokens:
+                faltam.append((tokens - estado["tokens"]) * 60 / self.tpm)
+            if faltam:
+                return max(faltam)
+
+            estado["requisicoes"] -= 1
+            estado["tokens"] -= tokens
+            return 0
+
+    def _publicar_fila(self):
+        """Atualiza no arquivo quantas chamadas deste processo esperam em cada prioridade"""
+        contagens = self._contar_fila()
+        for nome, indice in PRIORIDADES.items():
+            metricas.definir("limitador_fila", contagens[indice], prioridade=nome)
+
+        with self._estado() as estado:
+            self._gravar_fila(estado, contagens)
+
+    def _contar_fila(self):
+        contagens = [0] * len(PRIORIDADES)
+        for prioridade, _ in self._fila:
+            contagens[prioridade] += 1
+        return contagens
+
+    def _gravar_fila(self, estado, contagens):
+        if any(contagens):
+            estado["espera"][str(os.getpid())] = [time.time()] + contagens
+        else:
+            estado["espera"].pop(str(os.getpid()), None)
+
+    def _esperas_validas(self, estado, incluir_proprio=False):
+        agora = time.time()
+        proprio = str(os.getpid())
+        return [
+            valores for pid, valores in estado["espera"].items()
+            if (incluir_proprio or pid != proprio) and agora - valores[0] < VALIDADE_ESPERA
+        ]
+
+    def _estado(self):
+        return _EstadoArquivo(self)
+
+
+class _EstadoArquivo:
+    """Abre o arquivo com flock exclusivo, reabastece os baldes e grava de volta ao sair"""
+
+    _trava_local = threading.Lock()
+
+    def __init__(self, limitador):
+        self.limitador = limitador
+
+    def __enter__(self):
+        self._trava_local.acquire()
+        self._arquivo = open(self.limitador.caminho, "a+", encoding="utf-8")
+        if fcntl:
+            fcntl.flock(self._arquivo, fcntl.LOCK_EX)
+
+        self._arquivo.seek(0)
+        try:
+            estado = json.loads(self._arquivo.read() or "{}")
+        except ValueError:
+            estado = {}
+
+        agora = time.time()
+        decorrido = max(0.0, agora - estado.get("instante", agora))
+        rpm, tpm = self.limitador.rpm or 0, self.limitador.tpm or 0
+        estado["requisicoes"] = min(rpm, estado.get("requisicoes", rpm) + decorrido * rpm / 60)
+        estado["tokens"] = min(tpm, estado.get("tokens", tpm) + decorrido * tpm / 60)
+        estado["instante"] = agora
+        estado.setdefault("espera", {})
+        self.estado = estado
+        return estado
+
+    def __exit__(self, *excecao):
+        try:
+            self._arquivo.seek(0)
+            self._arquivo.truncate()
+            self._arquivo.write(json.dumps(self.estado))
+            self._arquivo.flush()
+        finally:
+            if fcntl:
+                fcntl.flock(self._arquivo, fcntl.LOCK_UN)
+            self._arquivo.close()
+            self._trava_local.release()
+        return False
@@ -0,0 +1,74 @@
+"""Métricas em memória do processo (contadores, medidores e distribuições de latência)"""
+import threading
+from collections import defaultdict, deque
+
+# Quantas observações recentes cada distribuição guarda para os percentis
+JANELA_OBSERVACOES = 1000
+
+_trava = threading.Lock()
+_contadores = defaultdict(float)
+_medidores = {}
+_observacoes = defaultdict(lambda: deque(maxlen=JANELA_OBSERVACOES))
+
+
+def _chave(metrica, rotulos):
+    """Nome no formato `metrica{rotulo=valor,...}` (rótulos em ordem alfabética)"""
+    if not rotulos:
+        return metrica
+    return metrica + "{" + ",".join(f"{k}={v}" for k, v in sorted(rotulos.items())) + "}"
+
+
+def incrementar(metrica, valor=1, **rotulos):
+    """Soma `valor` ao contador"""
+    with _trava:
+        _contadores[_chave(metrica, rotulos)] += valor
+
+
+def definir(metrica, valor, **rotulos):
+    """Define o valor atual de um medidor (ex: profundidade de fila, estado do disjuntor)"""
+    with _trava:
+        _medidores[_chave(metrica, rotulos)] = valor
+
+
+def observar(metrica, valor, **rotulos):
+    """Registra uma observação (ex: latência em segundos) na distribuição"""
+    with _trava:
+        _observacoes[_chave(metrica, rotulos)].append(valor)
+
+
+def valor_contador(metrica, **rotulos):
+    """Valor atual de um contador (0 se nunca incrementado)"""
+    with _trava:
+        return _contadores.get(_chave(metrica, rotulos), 0)
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+def instantaneo():
+    """Cópia de todas as métricas, com p50/p95/p99 das distribuições"""
+    with _trava:
+        contadores = dict(_contadores)
+        medidores = dict(_medidores)
+        observacoes = {nome: sorted(valores) for nome, valores in _observacoes.items() if valores}
+
+    distribuicoes = {
+        nome: {
+            "n": len(valores),
+            "p50": _percentil(valores, 50),
+            "p95": _percentil(valores, 95),
+            "p99": _percentil(valores, 99),
+            "max": valores[-1]
+        }
+        for nome, valores in observacoes.items()
+    }
+    return {"contadores": contadores, "medidores": medidores, "distribuicoes": distribuicoes}
+
+
+def zerar():
+    """Limpa todas as métricas (uso em benchmarks)"""
+    with _trava:
+        _contadores.clear()
+        _medidores.clear()
+        _observacoes.clear()
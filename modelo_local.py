@@ -0,0 +1,428 @@
+"""Modelo local treinado com o histórico: tipo do projeto e pontuação NPS sem chamar a IA
+
+Modelos lineares sobre n-gramas de palavras com hashing (ideia + área, e o foco para o NPS),
+treinados por SGD com as respostas da IA gravadas no histórico:
+- tipo: regressão logística TECNOLÓGICO × PROCESSO;
+- NPS: logística multinomial na faixa de prioridade (limiares do SLA: 80/65/45) e regressão
+  linear no valor, limitado à faixa prevista.
+
+A confiança é a probabilidade da classe prevista (do tipo ou da faixa); abaixo do limiar, o
+utils chama a IA como antes. O treino é incremental: acompanha o fim do histórico (como o índice
+de triagem) e aprende só as propostas novas, em todos os processos. Ele roda só no thread
+aberto por iniciar_treino (a previsão nunca lê o histórico). Estágios atendidos pela heurística
+ou pelo próprio modelo local não viram exemplos de treino.
+
+Avaliação offline (da raiz do projeto):
+    python -m modelo_local --historico dados/propostas.jsonl --limiares 0.8,0.9,0.95
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+import metricas
+from historico import ARQUIVO_PADRAO, ler_registros
+from registro_proposta import RegistroProposta
+from triagem import SLA_POR_NPS
+
+DIMENSOES = 2 ** 18
+TIPOS = ["TECNOLÓGICO", "PROCESSO"]
+
+# Faixas de NPS: as mesmas do prazo de resposta (CRÍTICA, Alta, Média, Baixa)
+FAIXAS = [minimo for minimo, _, _ in SLA_POR_NPS]
+
+# Estágios atendidos por estes "modelos" não servem de rótulo
+ORIGENS_SEM_ROTULO = ("heuristica", "local")
+
+Previsao = namedtuple("Previsao", ["valor", "confianca"])
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def extrair_caracteristicas(ideia, area, foco=None):
+    """(índices, valores) esparsos: unigramas e bigramas da ideia + área (+ foco), com hashing e sinal"""
+    palavras = re.findall(r"\w+", _normalizar(ideia))
+    termos = palavras + [f"{a} {b}" for a, b in zip(palavras, palavras[1:])]
+    termos.append(f"area={_normalizar(area)}")
+    if foco is not None:
+        termos.append(f"foco={_normalizar(foco)}")
+
+    acumulado = {}
+    for termo in termos:
+        h = zlib.crc32(termo.encode("utf-8"))
+        indice = h & (DIMENSOES - 1)
+        acumulado[indice] = acumulado.get(indice, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+
+    indices = np.fromiter(acumulado.keys(), dtype=np.int64, count=len(acumulado))
+    valores = np.fromiter(acumulado.values(), dtype=np.float32, count=len(acumulado))
+    return indices, valores / math.sqrt(max(len(termos), 1))
+
+
+def faixa_nps(pontuacao):
+    """Índice da faixa de prioridade da pontuação (0 = CRÍTICA)"""
+    for indice, minimo in enumerate(FAIXAS):
+        if pontuacao >= minimo:
+            return indice
+    return len(FAIXAS) - 1
+
+
+def _limites_faixa(indice):
+    return FAIXAS[indice], (100 if indice == 0 else FAIXAS[indice - 1] - 1)
+
+
+def rotulos_da_proposta(registro):
+    """(ideia, área, foco, tipo ou None, nps ou None) do RegistroProposta: só os estágios respondidos pela IA"""
+    modelos = registro.modelos_estagio if isinstance(registro.modelos_estagio, dict) else {}
+    if not registro.ideia or not isinstance(registro.ideia, str):
+        return None
+    tipo = registro.tipo_projeto if modelos.get("tipo") not in ORIGENS_SEM_ROTULO else None
+    nps = registro.pontuacao_nps if modelos.get("nps") not in ORIGENS_SEM_ROTULO else None
+    try:
+        nps = int(nps) if nps is not None else None
+    except (TypeError, ValueError):
+        nps = None
+    return registro.ideia, registro.area, registro.foco, tipo if tipo in TIPOS else None, nps
+
+
+class ModeloLocal:
+    """Classificador de tipo e preditor de NPS, treinados incrementalmente a partir do histórico"""
+
+    def __init__(self, caminho_historico=ARQUIVO_PADRAO, caminho_modelo=None, limiar=0.9, minimo_exemplos=200,
+                 intervalo_treino=60, taxa_aprendizado=0.3):
+        self.caminho_historico = caminho_historico
+        self.caminho_modelo = caminho_modelo
+        self.limiar = limiar
+        self.minimo_exemplos = minimo_exemplos
+        self.intervalo_treino = intervalo_treino
+        self.taxa_aprendizado = taxa_aprendizado
+        self._trava = threading.Lock()
+        self._proximo_treino = 0
+        self._treino_iniciado = False
+        self._zerar()
+        if caminho_modelo:
+            self._carregar()
+
+    # ── Previsão ─────────────────────────────────────────────────────────────
+
+    def prever_tipo(self, ideia, area):
+        """Previsao(tipo, confiança) ou None se o modelo ainda não tem exemplos suficientes"""
+        if self.exemplos_tipo < self.minimo_exemplos:
+            return None
+        indices, valores = extrair_caracteristicas(ideia, area)
+        p = self._prob_tipo(indices, valores)
+        return Previsao(TIPOS[0], p) if p >= 0.5 else Previsao(TIPOS[1], 1 - p)
+
+    def prever_nps(self, ideia, area, foco):
+        """Previsao(pontuação, confiança da faixa) ou None se o modelo ainda não tem exemplos suficientes"""
+        if self.exemplos_nps < self.minimo_exemplos:
+            return None
+        indices, valores = extrair_caracteristicas(ideia, area, foco)
+        probabilidades = self._prob_faixas(indices, valores)
+        faixa = int(np.argmax(probabilidades))
+        minimo, maximo = _limites_faixa(faixa)
+        pontuacao = int(round(50 + 50 * self._valor_nps(indices, valores)))
+        return Previsao(min(max(pontuacao, minimo), maximo), float(probabilidades[faixa]))
+
+    def comparar(self, estagio, previsao, resposta_ia):
+        """Registra o acerto da previsão local contra a resposta da IA (a acurácia do painel)"""
+        if previsao is None:
+            return
+        confiante = "confiante" if previsao.confianca >= self.limiar else "incerta"
+        if estagio == "nps":
+            acertou = faixa_nps(previsao.valor) == faixa_nps(resposta_ia)
+            metricas.observar("modelo_local_erro_nps", abs(previsao.valor - resposta_ia), faixa=confiante)
+        else:
+            acertou = previsao.valor == resposta_ia
+        metricas.incrementar("modelo_local_comparacoes", estagio=estagio, faixa=confiante)
+        if acertou:
+            metricas.incrementar("modelo_local_acertos", estagio=estagio, faixa=confiante)
+
+    # ── Treino ───────────────────────────────────────────────────────────────
+
+    def iniciar_treino(self):
+        """Thread em segundo plano (um por modelo) que treina já e depois a cada intervalo_treino segundos
+
+        Até o primeiro treino terminar, as previsões devolvem None.
+        """
+        with self._trava:
+            if self._treino_iniciado:
+                return
+            self._treino_iniciado = True
+        threading.Thread(target=self._treinar_periodicamente, name="treino-modelo-local", daemon=True).start()
+
+    def treinar(self, propostas, epocas=1, avaliar=True):
+        """Aprende com as propostas (RegistroProposta) ainda não vistas; devolve quantas foram usadas
+
+        Com avaliar=True, cada exemplo é previsto antes de ser aprendido (acurácia progressiva).
+        """
+        exemplos = []
+        for registro in propostas:
+            rotulos = rotulos_da_proposta(registro)
+            chave = _chave_proposta(registro)
+            if rotulos is None or chave is None or chave in self._vistas:
+                continue
+            ideia, area, foco, tipo, nps = rotulos
+            if tipo is None and nps is None:
+                continue
+            self._vistas.add(chave)
+            exemplos.append((extrair_caracteristicas(ideia, area), extrair_caracteristicas(ideia, area, foco), tipo, nps))
+            self.exemplos_tipo += tipo is not None
+            self.exemplos_nps += nps is not None
+
+        for epoca in range(epocas):
+            if epoca:
+                random.Random(epoca).shuffle(exemplos)
+            for caracteristicas_tipo, caracteristicas_nps, tipo, nps in exemplos:
+                if tipo is not None:
+                    self._aprender_tipo(*caracteristicas_tipo, tipo, avaliar and epoca == 0)
+                if nps is not None:
+                    self._aprender_nps(*caracteristicas_nps, nps, avaliar and epoca == 0)
+        return len(exemplos)
+
+    def sincronizar(self):
+        """Treina com o que foi acrescentado ao histórico desde a última vez (tudo, na primeira)"""
+        primeira = self._marca[0] is None
+        total = self.treinar(self._novas_propostas(), epocas=3 if primeira else 1)
+        if total:
+            metricas.incrementar("modelo_local_treinadas", total)
+            if self.caminho_modelo:
+                self._salvar()
+        return total
+
+    def estatisticas(self):
+        """Exemplos treinados e acurácia progressiva (prevista antes de aprender cada exemplo)"""
+        avaliados_tipo = max(self._avaliados["tipo"], 1)
+        avaliados_nps = max(self._avaliados["nps"], 1)
+        return {
+            "exemplos_tipo": self.exemplos_tipo,
+            "exemplos_nps": self.exemplos_nps,
+            "acuracia_tipo": round(self._acertos["tipo"] / avaliados_tipo, 4),
+            "acuracia_faixa_nps": round(self._acertos["nps"] / avaliados_nps, 4),
+            "erro_medio_nps": round(self._erro_nps / avaliados_nps, 2),
+            "limiar": self.limiar
+        }
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _zerar(self):
+        self.w_tipo = np.zeros(DIMENSOES, dtype=np.float32)
+        self.b_tipo = 0.0
+        self.w_faixas = np.zeros((len(FAIXAS), DIMENSOES), dtype=np.float32)
+        self.b_faixas = np.zeros(len(FAIXAS), dtype=np.float32)
+        self.w_valor = np.zeros(DIMENSOES, dtype=np.float32)
+        self.b_valor = 0.0
+        self.exemplos_tipo = 0
+        self.exemplos_nps = 0
+        self._passos = {"tipo": 0, "nps": 0}
+        self._acertos = {"tipo": 0, "nps": 0}
+        self._avaliados = {"tipo": 0, "nps": 0}
+        self._erro_nps = 0.0
+        self._vistas = set()
+        self._marca = (None, 0)
+
+    def _prob_tipo(self, indices, valores):
+        z = float(self.w_tipo[indices] @ valores) + self.b_tipo
+        return 1 / (1 + math.exp(-max(min(z, 30), -30)))
+
+    def _prob_faixas(self, indices, valores):
+        z = self.w_faixas[:, indices] @ valores + self.b_faixas
+        z = np.exp(z - z.max())
+        return z / z.sum()
+
+    def _valor_nps(self, indices, valores):
+        return float(self.w_valor[indices] @ valores) + self.b_valor
+
+    def _taxa(self, modelo):
+        """Taxa de aprendizado decrescente com o número de atualizações do modelo"""
+        self._passos[modelo] += 1
+        return self.taxa_aprendizado / math.sqrt(1 + self._passos[modelo] / 1000)
+
+    def _aprender_tipo(self, indices, valores, tipo, avaliar):
+        p = self._prob_tipo(indices, valores)
+        y = 1.0 if tipo == TIPOS[0] else 0.0
+        if avaliar:
+            self._avaliados["tipo"] += 1
+            self._acertos["tipo"] += (p >= 0.5) == (y == 1.0)
+        gradiente = (p - y) * self._taxa("tipo")
+        self.w_tipo[indices] -= gradiente * valores
+        self.b_tipo -= gradiente
+
+    def _aprender_nps(self, indices, valores, nps, avaliar):
+        probabilidades = self._prob_faixas(indices, valores)
+        faixa = faixa_nps(nps)
+        previsto = self._valor_nps(indices, valores)
+        y = (nps - 50) / 50
+        if avaliar:
+            self._avaliados["nps"] += 1
+            self._acertos["nps"] += int(np.argmax(probabilidades)) == faixa
+            self._erro_nps += abs(previsto - y) * 50
+
+        taxa = self._taxa("nps")
+        gradiente = probabilidades
+        gradiente[faixa] -= 1.0
+        self.w_faixas[:, indices] -= taxa * np.outer(gradiente, valores)
+        self.b_faixas -= taxa * gradiente
+        erro = (previsto - y) * taxa
+        self.w_valor[indices] -= erro * valores
+        self.b_valor -= erro
+
+    def _treinar_periodicamente(self):
+        while True:
+            self._talvez_treinar()
+            time.sleep(self.intervalo_treino)
+
+    def _talvez_treinar(self):
+        """Sincroniza a cada intervalo_treino segundos; se outro thread já está treinando, não espera"""
+        if not self.caminho_historico or time.monotonic() < self._proximo_treino:
+            return
+        if not self._trava.acquire(blocking=False):
+            return
+        try:
+            self._proximo_treino = time.monotonic() + self.intervalo_treino
+            self.sincronizar()
+        except Exception:
+            metricas.incrementar("modelo_local_falhas_treino")
+        finally:
+            self._trava.release()
+
+    def _novas_propostas(self):
+        """Primeira vez: histórico inteiro (arquivo + camada quente); depois só as linhas novas do fim"""
+        caminho = self.caminho_historico
+        inode, posicao = self._marca
+        if inode is None:
+            yield from ler_registros(caminho)
+            if os.path.exists(caminho):
+                info = os.stat(caminho)
+                self._marca = (info.st_ino, info.st_size)
+            return
+        if not os.path.exists(caminho):
+            return
+
+        info = os.stat(caminho)
+        if info.st_ino != inode or info.st_size < posicao:
+            # Compactação reescreveu a camada quente: relê (as já vistas são ignoradas pelo ID)
+            posicao = 0
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(posicao)
+            bruto = arquivo.read(info.st_size - posicao)
+        completo = bruto[:bruto.rfind(b"\n") + 1]
+        self._marca = (info.st_ino, posicao + len(completo))
+        for linha in completo.decode("utf-8").splitlines():
+            try:
+                yield RegistroProposta.de_json(json.loads(linha))
+            except (ValueError, AttributeError, TypeError):
+                continue
+
+    def _salvar(self):
+        os.makedirs(os.path.dirname(self.caminho_modelo) or ".", exist_ok=True)
+        temporario = f"{self.caminho_modelo}.tmp.npz"
+        np.savez(
+            temporario,
+            w_tipo=self.w_tipo, b_tipo=self.b_tipo, w_faixas=self.w_faixas, b_faixas=self.b_faixas,
+            w_valor=self.w_valor, b_valor=self.b_valor,
+            exemplos=np.array([self.exemplos_tipo, self.exemplos_nps, self._passos["tipo"], self._passos["nps"]]),
+            avaliacao=np.array([self._acertos["tipo"], self._avaliados["tipo"], self._acertos["nps"],
+                                self._avaliados["nps"], self._erro_nps]),
+            vistas=np.fromiter(self._vistas, dtype=np.uint64, count=len(self._vistas)),
+            marca=np.array([self._marca[0] or 0, self._marca[1]], dtype=np.int64)
+        )
+        os.replace(temporario, self.caminho_modelo)
+
+    def _carregar(self):
+        """Retoma o modelo salvo (se compatível); senão treina do zero na primeira previsão"""
+        if not os.path.exists(self.caminho_modelo):
+            return
+        try:
+            with np.load(self.caminho_modelo) as salvo:
+                if salvo["w_tipo"].shape != (DIMENSOES,) or salvo["w_faixas"].shape != (len(FAIXAS), DIMENSOES):
+                    return
+                self.w_tipo, self.b_tipo = salvo["w_tipo"], float(salvo["b_tipo"])
+                self.w_faixas, self.b_faixas = salvo["w_faixas"], salvo["b_faixas"]
+                self.w_valor, self.b_valor = salvo["w_valor"], float(salvo["b_valor"])
+                self.exemplos_tipo, self.exemplos_nps, passos_tipo, passos_nps = (int(n) for n in salvo["exemplos"])
+                self._passos = {"tipo": passos_tipo, "nps": passos_nps}
+                acertos_tipo, avaliados_tipo, acertos_nps, avaliados_nps, erro = salvo["avaliacao"]
+                self._acertos = {"tipo": int(acertos_tipo), "nps": int(acertos_nps)}
+                self._avaliados = {"tipo": int(avaliados_tipo), "nps": int(avaliados_nps)}
+                self._erro_nps = float(erro)
+                self._vistas = set(int(v) for v in salvo["vistas"])
+                inode, posicao = (int(v) for v in salvo["marca"])
+                self._marca = (inode or None, posicao)
+        except Exception:
+            self._zerar()
+
+
+def _chave_proposta(registro):
+    proposta_id = registro.id
+    if not isinstance(proposta_id, str):
+        return None
+    return int.from_bytes(hashlib.blake2b(proposta_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def avaliar(propostas, limiares, fracao_treino=0.8):
+    """Treina com a parte mais antiga e mede, na mais recente, acurácia e chamadas evitadas por limiar"""
+    propostas = sorted(propostas, key=lambda r: str(r.timestamp))
+    corte = int(len(propostas) * fracao_treino)
+    modelo = ModeloLocal(caminho_historico=None, minimo_exemplos=0)
+    inicio = time.perf_counter()
+    modelo.treinar(propostas[:corte], epocas=3, avaliar=False)
+    duracao_treino = time.perf_counter() - inicio
+
+    previsoes = []
+    inicio = time.perf_counter()
+    for registro in propostas[corte:]:
+        rotulos = rotulos_da_proposta(registro)
+        if rotulos is None:
+            continue
+        ideia, area, foco, tipo, nps = rotulos
+        previsoes.append((modelo.prever_tipo(ideia, area), tipo, modelo.prever_nps(ideia, area, foco), nps))
+    por_previsao_us = (time.perf_counter() - inicio) / max(len(previsoes) * 2, 1) * 1e6
+
+    resultado = {"treino": corte, "teste": len(previsoes), "tempo_treino_s": round(duracao_treino, 2),
+                 "previsao_us": round(por_previsao_us, 1), "limiares": {}}
+    for limiar in limiares:
+        tipo_local = [(p.valor == real) for p, real, _, _ in previsoes if real and p.confianca >= limiar]
+        nps_local = [(p.valor, real) for _, _, p, real in previsoes if real is not None and p.confianca >= limiar]
+        com_tipo = sum(1 for _, real, _, _ in previsoes if real)
+        com_nps = sum(1 for _, _, _, real in previsoes if real is not None)
+        resultado["limiares"][str(limiar)] = {
+            "tipo_evitadas": round(len(tipo_local) / max(com_tipo, 1), 4),
+            "tipo_acuracia": round(sum(tipo_local) / max(len(tipo_local), 1), 4),
+            "nps_evitadas": round(len(nps_local) / max(com_nps, 1), 4),
+            "nps_acuracia_faixa": round(sum(faixa_nps(p) == faixa_nps(r) for p, r in nps_local) / max(len(nps_local), 1), 4),
+            "nps_erro_medio": round(sum(abs(p - r) for p, r in nps_local) / max(len(nps_local), 1), 2)
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--historico", default=os.environ.get("HISTORICO_ARQUIVO", ARQUIVO_PADRAO))
+    parser.add_argument("--limiares", default="0.7,0.8,0.9,0.95")
+    parser.add_argument("--treino", type=float, default=0.8, help="fração (mais antiga) usada no treino")
+    args = parser.parse_args()
+
+    resultado = avaliar(list(ler_registros(args.historico)), [float(l) for l in args.limiares.split(",")], args.treino)
+    print(f"Treino: {resultado['treino']} propostas em {resultado['tempo_treino_s']}s | "
+          f"teste: {resultado['teste']} | {resultado['previsao_us']} µs por previsão")
+    for limiar, medidas in resultado["limiares"].items():
+        print(f"  limiar {limiar}: tipo {medidas['tipo_evitadas']:.0%} evitadas (acurácia {medidas['tipo_acuracia']:.1%}) | "
+              f"NPS {medidas['nps_evitadas']:.0%} evitadas (faixa {medidas['nps_acuracia_faixa']:.1%}, "
+              f"erro médio {medidas['nps_erro_medio']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import hmac
+import os
+from datetime import datetime
+import altair as alt
+import streamlit as st
+import metricas
+import rastreamento
+from historico import arquivo_do_historico, compactar
+from utils import (
+    obter_config, disjuntor_openai, roteador_modelos, limitador_openai, pool_envios, modelo_local,
+    ARQUIVO_HISTORICO, HISTORICO_DIAS_QUENTE, HISTORICO_CODEC, iniciar_servicos
+)
+
+st.set_page_config(page_title="MindGlass V2 – Admin", layout="wide")
+iniciar_servicos()
+
+st.title("🔧 Painel Administrativo")
+
+# Acesso protegido por ADMIN_SENHA; sem senha configurada, o painel fica fechado
+senha_admin = obter_config("ADMIN_SENHA")
+if not senha_admin:
+    st.error("🔒 Painel indisponível: configure ADMIN_SENHA.")
+    st.stop()
+if not hmac.compare_digest(st.text_input("Senha de administrador", type="password"), senha_admin):
+    st.info("🔒 Informe a senha para ver as métricas.")
+    st.stop()
+
+if st.button("🔄 Atualizar"):
+    st.rerun()
+
+instantaneo = metricas.instantaneo()
+contadores = instantaneo["contadores"]
+
+# Estado do disjuntor da OpenAI
+st.header("🔌 OpenAI")
+col_estado, col_falhas, col_bloqueadas = st.columns(3)
+with col_estado:
+    estado = disjuntor_openai.estado
+    icone = "🟢" if estado == "fechado" else "🟡" if estado == "meio_aberto" else "🔴"
+    st.metric("Disjuntor", f"{icone} {estado}")
+with col_falhas:
+    st.metric("Falhas", int(sum(v for k, v in contadores.items() if k.startswith("openai_falhas"))))
+with col_bloqueadas:
+    st.metric("Bloqueadas pelo disjuntor", int(sum(v for k, v in contadores.items() if k.startswith("openai_bloqueadas"))))
+
+# Taxa de vitória do hedge por estágio
+disparos = {k.split("estagio=")[1].rstrip("}"): v for k, v in contadores.items() if k.startswith("hedge_disparado")}
+if disparos:
+    st.subheader("⚡ Hedge")
+    for estagio, total in disparos.items():
+        vitorias = contadores.get(f"hedge_vitoria{{estagio={estagio},vencedor=duplicada}}", 0)
+        st.write(f"• **{estagio}:** {int(total)} cópias disparadas, duplicada venceu {vitorias / total:.0%}")
+
+# Cota compartilhada entre processos: fichas disponíveis, fila e espera por prioridade
+cota = limitador_openai.instantaneo()
+if cota["ativo"]:
+    st.subheader("🚦 Cota da OpenAI")
+    col_req, col_tok = st.columns(2)
+    with col_req:
+        st.metric("Requisições disponíveis", cota["requisicoes_disponiveis"] if cota["requisicoes_disponiveis"] is not None else "∞")
+    with col_tok:
+        st.metric("Tokens disponíveis", cota["tokens_disponiveis"] if cota["tokens_disponiveis"] is not None else "∞")
+    esperas = instantaneo["distribuicoes"]
+    st.dataframe(
+        [
+            {
+                "prioridade": prioridade,
+                "na fila (host)": na_fila,
+                "espera p95 (s)": esperas.get(f"limitador_espera_s{{prioridade={prioridade}}}", {}).get("p95"),
+                "esgotadas": int(contadores.get(f"limitador_esgotadas{{prioridade={prioridade}}}", 0))
+            }
+            for prioridade, na_fila in cota["fila"].items()
+        ],
+        use_container_width=True
+    )
+
+# Latência e erros observados por estágio/modelo (base do roteamento)
+st.subheader("🧭 Roteamento de modelos")
+st.dataframe(
+    [dict({"estágio/modelo": k}, **v) for k, v in roteador_modelos.estatisticas().items()],
+    use_container_width=True
+)
+
+# Propostas completas cortadas (continuação) ou sem seções obrigatórias (só as faltantes)
+geradas = sum(v for k, v in contadores.items() if k.startswith("propostas_completas_geradas"))
+if geradas:
+    st.subheader("✂️ Continuações de propostas")
+    col_cortadas, col_secoes, col_falhas_cont = st.columns(3)
+    with col_cortadas:
+        cortadas = contadores.get("proposta_continuacoes{motivo=cortada}", 0)
+        st.metric("Continuações (cortadas)", f"{cortadas / geradas:.1%}", help=f"{int(cortadas)} de {int(geradas)} propostas")
+    with col_secoes:
+        secoes = contadores.get("proposta_continuacoes{motivo=secoes_faltando}", 0)
+        st.metric("Seções regeneradas", f"{secoes / geradas:.1%}",
+                  help=f"{int(contadores.get('proposta_secoes_regeneradas', 0))} seções em {int(secoes)} propostas")
+    with col_falhas_cont:
+        st.metric("Falhas ao completar", int(contadores.get("proposta_continuacao_falhas", 0)))
+
+# Geração nos dois templates quando o tipo ficou incerto (GERACAO_DUPLA)
+iniciadas = contadores.get("geracao_dupla{resultado=iniciada}", 0)
+if iniciadas:
+    st.subheader("🔀 Geração dupla (tipo incerto)")
+    col_iniciadas, col_guardadas, col_canceladas, col_substitutas = st.columns(4)
+    with col_iniciadas:
+        st.metric("Iniciadas", int(iniciadas))
+    with col_guardadas:
+        guardadas = contadores.get("geracao_dupla{resultado=alternativa}", 0)
+        st.metric("Alternativas guardadas", f"{guardadas / iniciadas:.0%}", help=f"{int(guardadas)} propostas")
+    with col_canceladas:
+        st.metric("Canceladas / falhas", int(contadores.get("geracao_dupla{resultado=cancelada}", 0)
+                                              + contadores.get("geracao_dupla{resultado=falhou}", 0)))
+    with col_substitutas:
+        st.metric("Substituíram a principal", int(contadores.get("geracao_dupla{resultado=substituta}", 0)))
+
+# Envios retomados do diário de estágios (não refizeram o que já estava pronto)
+retomadas = contadores.get("diario_retomadas", 0)
+if retomadas:
+    st.subheader("📓 Envios retomados")
+    col_retomadas, col_estagios_ret, col_tokens_ret = st.columns(3)
+    with col_retomadas:
+        st.metric("Retomadas", int(retomadas))
+    with col_estagios_ret:
+        st.metric("Estágios não refeitos", int(sum(v for k, v in contadores.items() if k.startswith("diario_estagios_retomados"))))
+    with col_tokens_ret:
+        st.metric("Tokens economizados", f"{int(contadores.get('diario_tokens_economizados', 0)):,}".replace(",", "."))
+
+# Estágios degradados pelo orçamento de tempo do envio (PRAZO_ENVIO)
+degradados = {k[len("estagios_degradados{"):-1]: v for k, v in contadores.items() if k.startswith("estagios_degradados")}
+if degradados:
+    st.subheader("⏳ Degradação pelo prazo do envio")
+    st.dataframe(
+        [dict([item.split("=") for item in rotulos.split(",")], envios=int(valor)) for rotulos, valor in sorted(degradados.items())],
+        use_container_width=True, hide_index=True
+    )
+
+# Modelo local: chamadas evitadas e acurácia contra a IA
+st.subheader("🧠 Modelo local (tipo e NPS)")
+estatisticas_modelo = modelo_local.estatisticas()
+linhas_modelo = []
+for estagio in ("tipo", "nps"):
+    locais = contadores.get(f"modelo_local_decisoes{{estagio={estagio},origem=local}}", 0)
+    via_ia = contadores.get(f"modelo_local_decisoes{{estagio={estagio},origem=ia}}", 0)
+    comparacoes = contadores.get(f"modelo_local_comparacoes{{estagio={estagio},faixa=confiante}}", 0)
+    acertos = contadores.get(f"modelo_local_acertos{{estagio={estagio},faixa=confiante}}", 0)
+    linhas_modelo.append({
+        "estágio": estagio,
+        "exemplos de treino": estatisticas_modelo[f"exemplos_{estagio}"],
+        "acurácia no treino": estatisticas_modelo["acuracia_tipo" if estagio == "tipo" else "acuracia_faixa_nps"],
+        "chamadas evitadas": f"{locais / (locais + via_ia):.0%}" if locais + via_ia else "–",
+        "acurácia (amostra confiante)": f"{acertos / comparacoes:.1%}" if comparacoes else "–"
+    })
+st.dataframe(linhas_modelo, use_container_width=True)
+st.caption(f"Limiar de confiança {estatisticas_modelo['limiar']} | erro médio do NPS no treino: "
+           f"{estatisticas_modelo['erro_medio_nps']} pontos")
+
+# Fila de envios em segundo plano
+st.subheader("🧵 Envios em segundo plano")
+estatisticas_envio = pool_envios.estatisticas()
+col_fila, col_exec, col_ok, col_falhas = st.columns(4)
+with col_fila:
+    st.metric("Na fila", f"{estatisticas_envio['na_fila']}/{estatisticas_envio['capacidade']}")
+with col_exec:
+    st.metric("Executando", f"{estatisticas_envio['executando']}/{estatisticas_envio['trabalhadores']} workers")
+with col_ok:
+    st.metric("Concluídos", estatisticas_envio["concluida"])
+with col_falhas:
+    st.metric("Falharam", estatisticas_envio["falhou"])
+
+# Histórico: camada quente (JSONL) e segmentos arquivados
+st.subheader("🗂️ Histórico")
+segmentos = arquivo_do_historico(ARQUIVO_HISTORICO).segmentos()
+col_quente, col_segmentos, col_arquivadas = st.columns(3)
+with col_quente:
+    tamanho_quente = os.path.getsize(ARQUIVO_HISTORICO) if os.path.exists(ARQUIVO_HISTORICO) else 0
+    st.metric("Camada quente", f"{tamanho_quente / 1024 / 1024:.1f} MiB")
+with col_segmentos:
+    st.metric("Segmentos arquivados", f"{len(segmentos)} ({sum(s['bytes'] for s in segmentos) / 1024 / 1024:.1f} MiB)")
+with col_arquivadas:
+    st.metric("Propostas arquivadas", sum(s["registros"] for s in segmentos))
+if st.button(f"🗜️ Compactar agora (arquiva propostas com mais de {HISTORICO_DIAS_QUENTE} dias)"):
+    st.success(f"{compactar(ARQUIVO_HISTORICO, HISTORICO_DIAS_QUENTE, HISTORICO_CODEC)} propostas arquivadas.")
+
+# Rastro de uma submissão: cascata dos trechos (estágios, chamadas à IA, SMTP, gravação)
+st.header("🧵 Rastro de uma submissão")
+st.caption(f"Rastros gravados: {int(contadores.get('rastros_gravados', 0))} neste processo · "
+           f"amostra {float(obter_config('RASTROS_AMOSTRA', 1.0)):.0%}")
+id_rastro = st.text_input("ID da proposta").strip()
+if id_rastro:
+    rastros = rastreamento.ler_rastros(id_rastro)
+    if not rastros:
+        st.info("Nenhum rastro para esta proposta (fora da amostra, ou ainda não gravado).")
+    else:
+        rastro = st.selectbox(
+            "Execução", rastros,
+            format_func=lambda r: f"{r['nome']} · {datetime.fromtimestamp(r['inicio']).strftime('%d/%m %H:%M:%S')} · {r['duracao_ms'] / 1000:.1f}s"
+        )
+        linhas_rastro = [
+            {
+                "ordem": i,
+                "trecho": "  " * t["nivel"] + t["nome"] + (f" [{t['atributos']['estagio']}]" if "estagio" in t["atributos"] else ""),
+                "início (ms)": t["inicio_ms"],
+                "fim (ms)": t["inicio_ms"] + t["duracao_ms"],
+                "duração (ms)": t["duracao_ms"],
+                "situação": "erro" if t["erro"] else "ok",
+                "detalhes": ", ".join(f"{k}={v}" for k, v in t["atributos"].items()) + (f" | {t['erro']}" if t["erro"] else ""),
+                "eventos": "; ".join(e["nome"] + " " + ", ".join(f"{k}={v}" for k, v in e["atributos"].items()) for e in t["eventos"])
+            }
+            for i, t in enumerate(rastro["trechos"])
+        ]
+        cascata = alt.Chart(alt.Data(values=linhas_rastro)).mark_bar().encode(
+            x=alt.X("início (ms):Q", title="ms desde o início"),
+            x2="fim (ms):Q",
+            y=alt.Y("trecho:N", sort=alt.SortField("ordem"), title=None),
+            color=alt.Color("situação:N", scale=alt.Scale(domain=["ok", "erro"], range=["#667eea", "#e45756"]), legend=None),
+            tooltip=["trecho:N", "duração (ms):Q", "detalhes:N", "eventos:N"]
+        ).properties(height=max(120, 22 * len(linhas_rastro)))
+        st.altair_chart(cascata, use_container_width=True)
+        st.dataframe(
+            [{k: v for k, v in linha.items() if k not in ("ordem", "fim (ms)")} for linha in linhas_rastro],
+            use_container_width=True, hide_index=True
+        )
+
+st.header("📊 Contadores")
+st.dataframe([{"métrica": k, "valor": v} for k, v in sorted(contadores.items())], use_container_width=True)
+
+st.header("📏 Medidores")
+st.dataframe([{"métrica": k, "valor": v} for k, v in sorted(instantaneo["medidores"].items())], use_container_width=True)
+
+st.header("⏱️ Latências")
+st.dataframe(
+    [dict({"métrica": k}, **v) for k, v in sorted(instantaneo["distribuicoes"].items())],
+    use_container_width=True
+)
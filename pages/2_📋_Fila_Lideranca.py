@@ -0,0 +1,73 @@
+import hmac
+import streamlit as st
+from utils import obter_config, indice_triagem, iniciar_servicos
+
+st.set_page_config(page_title="MindGlass V2 – Fila da Liderança", layout="wide")
+iniciar_servicos()
+
+st.title("📋 Fila da Liderança")
+st.caption("Propostas pendentes por prioridade (NPS) e prazo de resposta")
+
+# Acesso protegido por senha (LIDERANCA_SENHA ou, se ausente, ADMIN_SENHA); sem senha, a fila fica fechada
+senha = obter_config("LIDERANCA_SENHA") or obter_config("ADMIN_SENHA")
+if not senha:
+    st.error("🔒 Fila indisponível: configure LIDERANCA_SENHA ou ADMIN_SENHA.")
+    st.stop()
+if not hmac.compare_digest(st.text_input("Senha da liderança", type="password"), senha):
+    st.info("🔒 Informe a senha para ver a fila.")
+    st.stop()
+
+if st.button("🔄 Atualizar"):
+    st.rerun()
+
+
+def linha_tabela(item):
+    return {
+        "id": item["id"],
+        "prioridade": item["prioridade"],
+        "NPS": item["pontuacao_nps"],
+        "área": item["area"],
+        "autor": item["autor"],
+        "tipo": item["tipo_projeto"],
+        "recebida": item["criada"].strftime("%d/%m/%Y %H:%M"),
+        "prazo": item["prazo"],
+        "vence em": item["vence_em"].strftime("%d/%m/%Y %H:%M"),
+        "resumo": item["resumo"][:120]
+    }
+
+
+def botao_responder(item, prefixo):
+    if st.button(f"✅ Marcar {item['id']} como respondida", key=f"{prefixo}-{item['id']}"):
+        indice_triagem.marcar_respondida(item["id"])
+        st.rerun()
+
+
+estatisticas = indice_triagem.estatisticas()
+col_pendentes, col_vencidas = st.columns(2)
+with col_pendentes:
+    st.metric("Pendentes", estatisticas["pendentes"])
+with col_vencidas:
+    st.metric("Prazo vencido", estatisticas["vencidas"])
+
+# Prazo vencido (da mais atrasada para a menos)
+st.header("⏰ Prazo de resposta vencido")
+vencidas = indice_triagem.vencidas()
+if vencidas:
+    st.dataframe([linha_tabela(item) for item in vencidas], use_container_width=True, hide_index=True)
+    for item in vencidas[:20]:
+        botao_responder(item, "vencida")
+else:
+    st.success("Nenhuma proposta com prazo vencido.")
+
+# Top-K por área
+st.header("🏆 Mais prioritárias por área")
+k = st.slider("Propostas por área", 1, 50, 5)
+areas = indice_triagem.areas()
+if not areas:
+    st.info("Nenhuma proposta pendente.")
+for area in areas:
+    itens = indice_triagem.top_k(area, k)
+    with st.expander(f"{area} ({len(itens)})", expanded=True):
+        st.dataframe([linha_tabela(item) for item in itens], use_container_width=True, hide_index=True)
+        for item in itens:
+            botao_responder(item, area)
@@ -0,0 +1,185 @@
+"""Grafo declarativo dos estágios da submissão (entradas → saídas) e executor concorrente
+
+Cada estágio declara as chaves que lê e as que produz no contexto (o dict `dados` da
+submissão). O executor roda só os estágios de que os alvos dependem, em paralelo quando são
+independentes (ex: tipo e NPS), e não refaz um estágio cujas saídas já estão no contexto
+(ex: tipo e NPS vindos da triagem, estrutura extraída durante o stream). Cada execução anota
+em contexto["rastro_pipeline"] o início, a duração, a thread e a origem de cada estágio, e
+cada estágio vira um trecho do rastro da submissão (rastreamento), se houver um aberto.
+Com um diário (diario.DiarioEstagios), as saídas de cada estágio executado são gravadas assim
+que ficam prontas, para uma nova tentativa recomeçar do primeiro estágio que falta (só nas
+execuções com gravar_diario=True: um preview não é um envio interrompido).
+"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metricas
+import rastreamento
+
+EXECUTADO = "executado"
+REAPROVEITADO = "contexto"
+ERRO = "erro"
+
+# funcao(contexto) devolve um dict com exatamente as chaves de `saidas`
+Estagio = namedtuple("Estagio", ["nome", "funcao", "entradas", "saidas"])
+
+
+class Grafo:
+    """Estágios ligados pelas chaves que produzem e consomem; valida saídas únicas e ausência de ciclos"""
+
+    def __init__(self, estagios, trabalhadores=8, diario=None):
+        self.estagios = {estagio.nome: estagio for estagio in estagios}
+        self.trabalhadores = trabalhadores
+        self.diario = diario
+        self._executor = None
+        self._trava = threading.Lock()
+
+        self._produtor = {}
+        for estagio in estagios:
+            for saida in estagio.saidas:
+                if saida in self._produtor:
+                    raise ValueError(f"Saída '{saida}' produzida por '{self._produtor[saida]}' e '{estagio.nome}'")
+                self._produtor[saida] = estagio.nome
+
+        # Dependências diretas: os produtores das entradas de cada estágio
+        self.dependencias = {
+            estagio.nome: {self._produtor[e] for e in estagio.entradas if e in self._produtor}
+            for estagio in estagios
+        }
+        self.ordem = self._ordenar()
+
+    def _ordenar(self):
+        """Ordem topológica (levanta ValueError se houver ciclo)"""
+        ordem, visitando, visitados = [], set(), set()
+
+        def visitar(nome):
+            if nome in visitados:
+                return
+            if nome in visitando:
+                raise ValueError(f"Ciclo no grafo de estágios passando por '{nome}'")
+            visitando.add(nome)
+            for dependencia in sorted(self.dependencias[nome]):
+                visitar(dependencia)
+            visitando.discard(nome)
+            visitados.add(nome)
+            ordem.append(nome)
+
+        for nome in self.estagios:
+            visitar(nome)
+        return ordem
+
+    def plano(self, alvos):
+        """Estágios necessários para os alvos (eles e seus ancestrais), em ordem topológica"""
+        necessarios = set()
+        pilha = list(alvos)
+        while pilha:
+            nome = pilha.pop()
+            if nome not in self.estagios:
+                raise KeyError(f"Estágio desconhecido: {nome}")
+            if nome not in necessarios:
+                necessarios.add(nome)
+                pilha.extend(self.dependencias[nome])
+        return [nome for nome in self.ordem if nome in necessarios]
+
+    def _pool(self):
+        with self._trava:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="mindglass-pipeline")
+            return self._executor
+
+    def executar(self, contexto, alvos, gravar_diario=True):
+        """Roda o plano dos alvos sobre o contexto e devolve o contexto com as saídas
+
+        Estágios prontos ao mesmo tempo rodam em paralelo (um na thread atual, os outros no
+        pool). Se um estágio falhar, espera os que já estão rodando e propaga o erro. Com
+        gravar_diario=False, o diário (se houver) não recebe as saídas desta execução.
+        """
+        diario = self.diario if gravar_diario else None
+        plano = self.plano(alvos)
+        for nome in plano:
+            faltando = [e for e in self.estagios[nome].entradas if e not in self._produtor and e not in contexto]
+            if faltando:
+                raise KeyError(f"Estágio '{nome}' sem as entradas: {', '.join(faltando)}")
+
+        rastro = contexto.setdefault("rastro_pipeline", [])
+        inicio = contexto.setdefault("inicio_pipeline", time.perf_counter())
+        # Estágios no pool não herdam o trecho aberto desta thread: vai explícito
+        pai = rastreamento.atual()
+
+        pendentes = {nome: self.dependencias[nome] & set(plano) for nome in plano}
+        prontos = [nome for nome in plano if not pendentes[nome]]
+        em_andamento = {}
+        erro = None
+
+        while (prontos or em_andamento) and erro is None:
+            while len(prontos) > 1:
+                nome = prontos.pop()
+                em_andamento[self._pool().submit(self._rodar, nome, contexto, rastro, inicio, pai, diario)] = nome
+
+            concluidos = []
+            if prontos:
+                nome = prontos.pop()
+                try:
+                    self._rodar(nome, contexto, rastro, inicio, pai, diario)
+                    concluidos.append(nome)
+                except Exception as e:
+                    erro = e
+
+            bloquear = not concluidos and erro is None
+            feitos, _ = wait(list(em_andamento), timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                nome = em_andamento.pop(futuro)
+                try:
+                    futuro.result()
+                    concluidos.append(nome)
+                except Exception as e:
+                    erro = erro or e
+
+            for concluido in concluidos:
+                for nome, dependencias in pendentes.items():
+                    if concluido in dependencias:
+                        dependencias.discard(concluido)
+                        if not dependencias:
+                            prontos.append(nome)
+
+        if erro is not None:
+            # Não deixa estágios ainda rodando escreverem no contexto depois do erro
+            wait(list(em_andamento))
+            raise erro
+        return contexto
+
+    def _rodar(self, nome, contexto, rastro, inicio_execucao, pai=None, diario=None):
+        estagio = self.estagios[nome]
+        inicio = time.perf_counter()
+        origem = EXECUTADO
+        try:
+            with rastreamento.trecho(f"estagio.{nome}", contexto, pai=pai) as trecho:
+                if all(saida in contexto for saida in estagio.saidas):
+                    origem = REAPROVEITADO
+                    metricas.incrementar("pipeline_reaproveitados", estagio=nome)
+                else:
+                    saidas = estagio.funcao(contexto)
+                    if set(saidas) != set(estagio.saidas):
+                        raise ValueError(f"Estágio '{nome}' devolveu {sorted(saidas)} em vez de {sorted(estagio.saidas)}")
+                    contexto.update(saidas)
+                    if diario is not None:
+                        diario.gravar(contexto, nome, saidas)
+                if trecho is not None:
+                    trecho.definir(origem=origem)
+        except Exception:
+            origem = ERRO
+            metricas.incrementar("pipeline_erros", estagio=nome)
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            rastro.append({
+                "estagio": nome,
+                "origem": origem,
+                "inicio_ms": round((inicio - inicio_execucao) * 1000, 1),
+                "duracao_ms": round(duracao * 1000, 1),
+                "thread": threading.current_thread().name
+            })
+            if origem == EXECUTADO:
+                metricas.observar("pipeline_estagio_s", duracao, estagio=nome)
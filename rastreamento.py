@@ -0,0 +1,349 @@
+"""Rastreamento por submissão: trechos (spans) de cada estágio, chamada à IA, SMTP e gravação
+
+Cada preview/envio amostrado vira um rastro: um trecho raiz com os trechos filhos de cada
+estágio do grafo, função do utils, requisição à OpenAI (com as tentativas HTTP como eventos),
+envio SMTP e gravação no histórico. Ao fim, o rastro é gravado como uma linha no formato
+OTLP/JSON (ExportTraceServiceRequest, o mesmo do file exporter do OpenTelemetry Collector),
+e a página Admin mostra a cascata dos trechos pelo ID da proposta.
+
+Propagação: o trecho aberto fica num ContextVar, então vale na thread que o abriu. Em threads
+de pools (estágios paralelos do grafo, hedge, proposta alternativa), o pai vem explícito
+(pai=...) ou é a raiz do rastro em dados["rastro"].
+
+Amostragem: só uma fração AMOSTRA das submissões é rastreada, com no máximo MAX_POR_MINUTO
+rastros por minuto por processo. Fora da amostra, trecho() não registra nada, então o custo
+sob carga fica limitado.
+"""
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+SERVICO = "mindglass"
+
+_config = {
+    "caminho": os.path.join("dados", "rastros.jsonl"),
+    "amostra": 1.0,
+    "max_por_minuto": 60,
+    "tamanho_maximo": 50 * 2**20
+}
+_trava = threading.Lock()
+_janela = {"minuto": None, "rastros": 0}
+_atual = contextvars.ContextVar("trecho_atual", default=None)
+
+
+def configurar(caminho, amostra=1.0, max_por_minuto=60, tamanho_maximo=50 * 2**20):
+    """Arquivo dos rastros, fração amostrada, teto por minuto e tamanho (bytes) que dispara a rotação"""
+    _config.update(caminho=caminho, amostra=amostra, max_por_minuto=max_por_minuto, tamanho_maximo=tamanho_maximo)
+
+
+class Trecho:
+    """Um span: nome, pai, início/fim (ns desde a época), atributos, eventos e erro"""
+    __slots__ = ("rastro", "id", "pai", "nome", "inicio_ns", "fim_ns", "atributos", "eventos", "erro")
+
+    def __init__(self, rastro, nome, pai, atributos, inicio_ns=None):
+        self.rastro = rastro
+        self.id = os.urandom(8).hex()
+        self.pai = pai
+        self.nome = nome
+        self.inicio_ns = inicio_ns or time.time_ns()
+        self.fim_ns = None
+        self.atributos = dict(atributos)
+        self.eventos = []
+        self.erro = None
+
+    def definir(self, **atributos):
+        self.atributos.update(atributos)
+
+    def evento(self, nome, **atributos):
+        self.eventos.append((time.time_ns(), nome, atributos))
+
+    def encerrar(self, fim_ns=None):
+        self.fim_ns = fim_ns or time.time_ns()
+
+
+class Rastro:
+    """Trechos de uma submissão; fora da amostra (amostrado=False) não guarda nada"""
+
+    def __init__(self, nome, amostrado, atributos, inicio_ns=None):
+        self.id = os.urandom(16).hex()
+        self.amostrado = amostrado
+        self.concluido = False
+        self.trechos = []
+        self._trava = threading.Lock()
+        self.raiz = self.abrir(nome, None, atributos, inicio_ns)
+
+    def abrir(self, nome, pai, atributos, inicio_ns=None):
+        trecho = Trecho(self, nome, pai.id if pai else None, atributos, inicio_ns)
+        if self.amostrado:
+            with self._trava:
+                self.trechos.append(trecho)
+        return trecho
+
+
+def _amostrar():
+    if random.random() >= _config["amostra"]:
+        return False
+    minuto = int(time.time() // 60)
+    with _trava:
+        if _janela["minuto"] != minuto:
+            _janela.update(minuto=minuto, rastros=0)
+        if _janela["rastros"] >= _config["max_por_minuto"]:
+            return False
+        _janela["rastros"] += 1
+        return True
+
+
+# ── API ──────────────────────────────────────────────────────────────────────
+
+@contextmanager
+def raiz(dados, nome, inicio_ns=None, **atributos):
+    """Abre o rastro da submissão em dados["rastro"] (decide a amostragem) e grava ao sair
+
+    Se dados já tem um rastro aberto, vira um trecho filho dele. Com inicio_ns (ex: o clique,
+    antes da fila dos workers), o tempo até agora entra como o trecho "fila".
+    """
+    existente = dados.get("rastro")
+    if existente is not None and not existente.concluido:
+        with trecho(nome, dados, **atributos) as aberto:
+            yield aberto
+        return
+
+    rastro = Rastro(nome, _amostrar(), atributos, inicio_ns)
+    dados["rastro"] = rastro
+    if rastro.amostrado and inicio_ns:
+        rastro.abrir("fila", rastro.raiz, {}, inicio_ns).encerrar()
+    token = _atual.set(rastro.raiz)
+    try:
+        yield rastro.raiz
+    except BaseException as e:
+        rastro.raiz.erro = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _atual.reset(token)
+        rastro.raiz.encerrar()
+        rastro.concluido = True
+        if rastro.amostrado:
+            exportar(rastro)
+
+
+@contextmanager
+def trecho(nome, dados=None, pai=None, **atributos):
+    """Trecho filho do trecho atual desta thread (ou de `pai`, ou da raiz de dados["rastro"])
+
+    Sem rastro amostrado, não faz nada e devolve None.
+    """
+    pai = pai or _atual.get()
+    if pai is None and dados is not None:
+        rastro = dados.get("rastro")
+        pai = rastro.raiz if rastro is not None and not rastro.concluido else None
+    if pai is None or not pai.rastro.amostrado:
+        yield None
+        return
+
+    aberto = pai.rastro.abrir(nome, pai, atributos)
+    token = _atual.set(aberto)
+    try:
+        yield aberto
+    except BaseException as e:
+        aberto.erro = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _atual.reset(token)
+        aberto.encerrar()
+
+
+def rastrear(funcao):
+    """Decorador: a função vira um trecho quando chamada dentro de um rastro (fora dele, custo ~zero)"""
+    nome = f"{funcao.__module__}.{funcao.__name__}"
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        if _atual.get() is None:
+            return funcao(*args, **kwargs)
+        with trecho(nome):
+            return funcao(*args, **kwargs)
+    return envolvida
+
+
+def atual():
+    """Trecho aberto nesta thread (None fora de um rastro), para passar como pai a outra thread"""
+    return _atual.get()
+
+
+def definir(**atributos):
+    """Atributos no trecho atual (se houver)"""
+    aberto = _atual.get()
+    if aberto is not None:
+        aberto.definir(**atributos)
+
+
+def evento(nome, **atributos):
+    """Evento com horário no trecho atual (se houver), ex: tentativa HTTP, decisão do modelo local"""
+    aberto = _atual.get()
+    if aberto is not None:
+        aberto.evento(nome, **atributos)
+
+
+# ── Exportação OTLP/JSON ─────────────────────────────────────────────────────
+
+def _valor(valor):
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _atributos(atributos):
+    return [{"key": chave, "value": _valor(valor)} for chave, valor in atributos.items() if valor is not None]
+
+
+def para_otlp(rastro):
+    """ExportTraceServiceRequest (JSON) com os trechos do rastro"""
+    trechos = []
+    for t in rastro.trechos:
+        span = {
+            "traceId": rastro.id,
+            "spanId": t.id,
+            "parentSpanId": t.pai or "",
+            "name": t.nome,
+            "kind": 1,
+            "startTimeUnixNano": str(t.inicio_ns),
+            "endTimeUnixNano": str(t.fim_ns or t.inicio_ns),
+            "attributes": _atributos(t.atributos),
+            "status": {"code": 2, "message": t.erro} if t.erro else {"code": 1}
+        }
+        if t.eventos:
+            span["events"] = [
+                {"timeUnixNano": str(instante), "name": nome, "attributes": _atributos(atributos)}
+                for instante, nome, atributos in t.eventos
+            ]
+        trechos.append(span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _atributos({"service.name": SERVICO, "process.pid": os.getpid()})},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": trechos}]
+    }]}
+
+
+def exportar(rastro):
+    """Acrescenta o rastro (uma linha) ao arquivo; passando do tamanho máximo, o atual vira .1"""
+    caminho = _config["caminho"]
+    linha = json.dumps(para_otlp(rastro), ensure_ascii=False) + "\n"
+    try:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with _trava:
+            if os.path.exists(caminho) and os.path.getsize(caminho) > _config["tamanho_maximo"]:
+                os.replace(caminho, caminho + ".1")
+            with open(caminho, "a", encoding="utf-8") as arquivo:
+                if fcntl:
+                    fcntl.flock(arquivo, fcntl.LOCK_EX)
+                try:
+                    arquivo.write(linha)
+                    arquivo.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(arquivo, fcntl.LOCK_UN)
+        metricas.incrementar("rastros_gravados")
+    except OSError:
+        # Rastreamento nunca derruba a submissão
+        metricas.incrementar("rastros_falhas")
+
+
+# ── Leitura (página Admin) ───────────────────────────────────────────────────
+
+def _valor_lido(valor):
+    if "intValue" in valor:
+        return int(valor["intValue"])
+    return next(iter(valor.values()), None)
+
+
+def ler_rastros(proposta_id, caminho=None):
+    """Rastros da proposta (do mais recente ao mais antigo), com os trechos já em ordem de cascata
+
+    Cada rastro: {id, nome, inicio (s desde a época), duracao_ms, trechos}; cada trecho:
+    {nome, nivel, inicio_ms (relativo à raiz), duracao_ms, atributos, eventos, erro}.
+    """
+    caminho = caminho or _config["caminho"]
+    marcador = f'"{proposta_id}"'
+    rastros = []
+    for arquivo in (caminho + ".1", caminho):
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, encoding="utf-8") as linhas:
+            for linha in linhas:
+                if marcador not in linha:
+                    continue
+                try:
+                    spans = json.loads(linha)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+                except (ValueError, KeyError, IndexError):
+                    continue
+                rastro = _montar_cascata(spans)
+                if rastro and rastro["proposta_id"] == proposta_id:
+                    rastros.append(rastro)
+    return rastros[::-1]
+
+
+def _montar_cascata(spans):
+    por_id = {}
+    for span in spans:
+        por_id[span["spanId"]] = {
+            "id": span["spanId"],
+            "pai": span.get("parentSpanId") or None,
+            "nome": span["name"],
+            "inicio_ns": int(span["startTimeUnixNano"]),
+            "fim_ns": int(span["endTimeUnixNano"]),
+            "atributos": {a["key"]: _valor_lido(a["value"]) for a in span.get("attributes", [])},
+            "eventos": [
+                {"nome": e["name"], "instante_ns": int(e["timeUnixNano"]),
+                 "atributos": {a["key"]: _valor_lido(a["value"]) for a in e.get("attributes", [])}}
+                for e in span.get("events", [])
+            ],
+            "erro": span.get("status", {}).get("message") if span.get("status", {}).get("code") == 2 else None
+        }
+    raizes = [t for t in por_id.values() if t["pai"] not in por_id]
+    if not raizes:
+        return None
+    raiz = min(raizes, key=lambda t: t["inicio_ns"])
+
+    filhos = {}
+    for t in por_id.values():
+        filhos.setdefault(t["pai"], []).append(t)
+
+    ordenados = []
+
+    def visitar(t, nivel):
+        ordenados.append({
+            "nome": t["nome"],
+            "nivel": nivel,
+            "inicio_ms": round((t["inicio_ns"] - raiz["inicio_ns"]) / 1e6, 1),
+            "duracao_ms": round((t["fim_ns"] - t["inicio_ns"]) / 1e6, 1),
+            "atributos": t["atributos"],
+            "eventos": t["eventos"],
+            "erro": t["erro"]
+        })
+        for filho in sorted(filhos.get(t["id"], []), key=lambda f: f["inicio_ns"]):
+            visitar(filho, nivel + 1)
+
+    visitar(raiz, 0)
+    return {
+        "id": spans[0]["traceId"],
+        "nome": raiz["nome"],
+        "proposta_id": raiz["atributos"].get("proposta_id"),
+        "inicio": raiz["inicio_ns"] / 1e9,
+        "duracao_ms": ordenados[0]["duracao_ms"],
+        "trechos": ordenados
+    }
@@ -0,0 +1,509 @@
+"""Registro compacto de uma proposta (o JSON de gerar_json_proposta sem os dicionários aninhados)
+
+RegistroProposta guarda só os campos de origem (formulário, saída da IA, metadados) em __slots__;
+os campos derivados (categoria NPS, complexidade, prioridade, áreas de impacto...) são calculados
+na primeira leitura e ficam guardados no próprio registro. Vindo do histórico, os derivados já
+gravados são reaproveitados como estão (valem o que foi enviado, mesmo que as heurísticas mudem).
+
+para_json() monta o mesmo esquema de sempre, sem copiar os textos: os valores do JSON são os
+próprios objetos do registro. Textos repetidos entre propostas (área, foco, status, categorias,
+palavras-chave) são internados, e dicionários/listas pequenos e repetidos (modelos por estágio,
+degradação, áreas de impacto) são compartilhados entre registros: trate os registros lidos do
+histórico e os JSON montados a partir deles como somente leitura.
+
+Chaves que o esquema atual não conhece (ou que divergem do que o registro deriva) vão para
+`extras` e voltam no para_json(), então de_json(j).para_json() == j para JSON deste esquema.
+"""
+import re
+import sys
+import threading
+from datetime import datetime
+
+from deduplicacao import gerar_id_conteudo
+
+VERSAO = "2.1"
+SISTEMA = "MindGlass V2 - Enhanced"
+
+ETAPAS_APROVACAO = (
+    "Validação de impacto no NPS",
+    "Análise de viabilidade",
+    "Aprovação orçamentária",
+    "Implementação"
+)
+
+PROXIMOS_PASSOS = {
+    "acao_imediata": "Análise de impacto no NPS",
+    "responsavel_proximo": "Liderança + Equipe de CX",
+    "prazo_resposta": "3 dias úteis",
+    "etapas_aprovacao": list(ETAPAS_APROVACAO)
+}
+
+# Chaves de cada bloco do esquema (as demais vão para extras)
+CHAVES = {
+    "metadata": frozenset({"id", "versao", "timestamp", "data_criacao", "sistema", "status",
+                           "modelos_estagio", "continuacoes", "degradacao"}),
+    "autor": frozenset({"nome", "area", "area_detalhada"}),
+    "entrada": frozenset({"ideia_original", "nivel_detalhamento", "foco_principal", "problema_contexto",
+                          "recursos_disponiveis", "prazo_desejado", "caracteres_ideia", "palavras_chave"}),
+    "saida": frozenset({"proposta_completa", "proposta_alternativa", "resumo_executivo", "tecnologias_sugeridas",
+                        "cronograma_estimado", "investimento_estimado", "riscos_identificados", "metricas_sucesso"}),
+    "analise": frozenset({"tipo_projeto", "confianca_tipo", "pontuacao_nps", "justificativa_nps", "categoria_nps",
+                          "complexidade", "categoria_projeto", "viabilidade_tecnica", "impacto_estimado",
+                          "prioridade_sugerida"}),
+    "nps_analysis": frozenset({"pontuacao_total", "categoria", "justificativa", "potencial_melhoria",
+                               "areas_impacto"}),
+    "proximos_passos": frozenset()
+}
+
+# Máximo de dicionários/listas distintos compartilhados entre registros
+MAX_COMPARTILHADOS = 4096
+_compartilhados = {}
+_trava_compartilhados = threading.Lock()
+
+
+# 📊 Heurísticas de análise (sem IA)
+
+def classificar_categoria_nps(pontuacao):
+    """Classifica a categoria baseada na pontuação NPS"""
+    if pontuacao >= 90:
+        return "TRANSFORMADOR"
+    elif pontuacao >= 70:
+        return "ALTO IMPACTO"
+    elif pontuacao >= 50:
+        return "MÉDIO IMPACTO"
+    elif pontuacao >= 30:
+        return "BAIXO IMPACTO"
+    else:
+        return "IMPACTO MÍNIMO"
+
+def calcular_impacto_por_nps(pontuacao):
+    """Calcula impacto baseado na pontuação NPS"""
+    if pontuacao >= 70:
+        return "Alto"
+    elif pontuacao >= 50:
+        return "Médio"
+    else:
+        return "Baixo"
+
+def prioridade_por_nps(pontuacao_nps):
+    """Prioridade sugerida para a pontuação NPS"""
+    if pontuacao_nps >= 80:
+        return "CRÍTICA"
+    elif pontuacao_nps >= 65:
+        return "Alta"
+    elif pontuacao_nps >= 45:
+        return "Média"
+    else:
+        return "Baixa"
+
+def sugerir_prioridade_nps(dados):
+    """Sugere prioridade baseada principalmente no NPS"""
+    return prioridade_por_nps(dados.get("pontuacao_nps", 50))
+
+def calcular_potencial_melhoria(pontuacao):
+    """Calcula potencial de melhoria no NPS"""
+    if pontuacao >= 90:
+        return "Potencial de melhoria de 15-20 pontos no NPS"
+    elif pontuacao >= 70:
+        return "Potencial de melhoria de 10-15 pontos no NPS"
+    elif pontuacao >= 50:
+        return "Potencial de melhoria de 5-10 pontos no NPS"
+    else:
+        return "Potencial de melhoria de 2-5 pontos no NPS"
+
+def identificar_areas_impacto_nps(ideia):
+    """Identifica áreas específicas de impacto no NPS"""
+    areas = []
+    ideia_lower = ideia.lower()
+
+    if any(palavra in ideia_lower for palavra in ['acompanhar', 'status', 'tempo real', 'transparência']):
+        areas.append("Transparência e Comunicação")
+
+    if any(palavra in ideia_lower for palavra in ['rapidez', 'agilidade', 'mais rápido', 'tempo']):
+        areas.append("Velocidade de Atendimento")
+
+    if any(palavra in ideia_lower for palavra in ['qualidade', 'melhor', 'excelência']):
+        areas.append("Qualidade do Serviço")
+
+    if any(palavra in ideia_lower for palavra in ['conveniente', 'fácil', 'simples', 'automático']):
+        areas.append("Conveniência")
+
+    if any(palavra in ideia_lower for palavra in ['atendimento', 'suporte', 'ajuda', 'contato']):
+        areas.append("Atendimento ao Cliente")
+
+    return areas if areas else ["Experiência Geral"]
+
+def extrair_palavras_chave(texto):
+    """Extrai palavras-chave da ideia"""
+    stop_words = {'o', 'a', 'os', 'as', 'um', 'uma', 'uns', 'umas', 'de', 'da', 'do', 'das', 'dos',
+                  'para', 'por', 'com', 'em', 'na', 'no', 'nas', 'nos', 'que', 'se', 'é', 'são',
+                  'ter', 'tem', 'foi', 'ser', 'estar', 'esse', 'essa', 'isso', 'como', 'mais'}
+
+    palavras = re.findall(r'\b\w+\b', texto.lower())
+    palavras_filtradas = [p for p in palavras if len(p) > 3 and p not in stop_words]
+
+    return list(set(palavras_filtradas))[:5]
+
+def avaliar_complexidade(ideia):
+    """Avalia complexidade baseada em palavras-chave"""
+    palavras_alta_complexidade = ['integração', 'machine learning', 'ia', 'blockchain', 'microserviços', 'big data']
+    palavras_media_complexidade = ['automação', 'dashboard', 'relatório', 'api', 'mobile']
+
+    ideia_lower = ideia.lower()
+
+    if any(palavra in ideia_lower for palavra in palavras_alta_complexidade):
+        return "Alta"
+    elif any(palavra in ideia_lower for palavra in palavras_media_complexidade):
+        return "Média"
+    else:
+        return "Baixa"
+
+def classificar_projeto(ideia, foco):
+    """Classifica o tipo de projeto"""
+    categorias = {
+        "Automação": ["automação", "automatizar", "robô", "bot"],
+        "Dashboard/BI": ["dashboard", "relatório", "análise", "dados", "métricas"],
+        "Mobile": ["app", "mobile", "celular", "smartphone"],
+        "Integração": ["integrar", "conectar", "sincronizar", "api"],
+        "UX/Interface": ["interface", "experiência", "usuário", "design"],
+        "Processo": ["processo", "workflow", "fluxo", "otimizar"],
+        "Melhoria de Processo": ["formulário", "papel", "procedimento", "manual"]
+    }
+
+    ideia_lower = ideia.lower()
+    for categoria, palavras in categorias.items():
+        if any(palavra in ideia_lower for palavra in palavras):
+            return categoria
+
+    return foco if foco != "Não especificado" else "Geral"
+
+
+# 🧱 Registro
+
+def _internar(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+def _compartilhar(valor):
+    """Mesmo objeto para dicionários/listas iguais (só de textos/números), até MAX_COMPARTILHADOS"""
+    try:
+        chave = (type(valor), tuple(valor.items()) if isinstance(valor, dict) else tuple(valor))
+        hash(chave)
+    except TypeError:  # valores não hasheáveis: fica o próprio objeto
+        return valor
+    # Leituras do histórico rodam em vários threads (workers, treino, índices): consulta e
+    # inserção juntas, para dois threads não guardarem cópias diferentes nem passarem do limite
+    with _trava_compartilhados:
+        existente = _compartilhados.get(chave)
+        if existente is not None:
+            return existente
+        if len(_compartilhados) >= MAX_COMPARTILHADOS:
+            return valor
+        # Guarda uma cópia: o objeto recebido continua sendo de quem chamou
+        _compartilhados[chave] = copia = type(valor)(valor)
+        return copia
+
+
+class derivado:
+    """Propriedade calculada na primeira leitura e guardada no slot `_<nome>` do registro
+
+    (functools.cached_property precisa de __dict__, que o registro não tem)
+    """
+
+    def __init__(self, funcao):
+        self.funcao = funcao
+        self.__doc__ = funcao.__doc__
+
+    def __set_name__(self, dono, nome):
+        self.slot = getattr(dono, f"_{nome}")
+
+    def __get__(self, registro, dono=None):
+        if registro is None:
+            return self
+        try:
+            return self.slot.__get__(registro, dono)
+        except AttributeError:
+            valor = self.funcao(registro)
+            self.slot.__set__(registro, valor)
+            return valor
+
+
+class RegistroProposta:
+    """Uma proposta: campos de origem em slots e derivados preguiçosos"""
+
+    __slots__ = (
+        # metadata
+        "id", "versao", "timestamp", "data_criacao", "sistema", "status",
+        "modelos_estagio", "continuacoes", "degradacao",
+        # autor e entrada (formulário)
+        "nome", "area", "ideia", "nivel", "foco", "problema", "recursos", "prazo",
+        # saída da IA e estrutura extraída
+        "proposta_completa", "proposta_alternativa", "resumo_executivo", "tecnologias",
+        "cronograma", "investimento", "riscos", "metricas",
+        # análise vinda do pipeline
+        "tipo_projeto", "confianca_tipo", "pontuacao_nps", "justificativa_nps",
+        # {(bloco, chave) ou (bloco,): valor} fora do esquema; None se não houver
+        "extras",
+        # derivados (preenchidos na primeira leitura)
+        "_area_detalhada", "_caracteres_ideia", "_palavras_chave", "_categoria_nps", "_complexidade",
+        "_categoria_projeto", "_viabilidade_tecnica", "_impacto_estimado", "_prioridade_sugerida",
+        "_potencial_melhoria", "_areas_impacto"
+    )
+
+    # ── Derivados ────────────────────────────────────────────────────────────
+
+    @derivado
+    def area_detalhada(self):
+        return self.area.split(" - ")[0] if " - " in self.area else self.area
+
+    @derivado
+    def caracteres_ideia(self):
+        return len(self.ideia.strip())
+
+    @derivado
+    def palavras_chave(self):
+        return extrair_palavras_chave(self.ideia)
+
+    @derivado
+    def categoria_nps(self):
+        return classificar_categoria_nps(self.pontuacao_nps)
+
+    @derivado
+    def complexidade(self):
+        return avaliar_complexidade(self.ideia)
+
+    @derivado
+    def categoria_projeto(self):
+        return classificar_projeto(self.ideia, self.foco)
+
+    @derivado
+    def viabilidade_tecnica(self):
+        return "Alta" if self.tipo_projeto == "PROCESSO" else "Média"
+
+    @derivado
+    def impacto_estimado(self):
+        return calcular_impacto_por_nps(self.pontuacao_nps)
+
+    @derivado
+    def prioridade_sugerida(self):
+        return prioridade_por_nps(self.pontuacao_nps)
+
+    @derivado
+    def potencial_melhoria(self):
+        return calcular_potencial_melhoria(self.pontuacao_nps)
+
+    @derivado
+    def areas_impacto(self):
+        return identificar_areas_impacto_nps(self.ideia)
+
+    # ── Construção ───────────────────────────────────────────────────────────
+
+    @classmethod
+    def de_dados(cls, dados, proposta, estrutura=None, proposta_id=None, timestamp=None):
+        """Registro de uma submissão do pipeline (dados + texto da proposta + estrutura extraída)"""
+        registro = cls.__new__(cls)
+        estrutura = estrutura or {}
+        timestamp = timestamp or datetime.now()
+
+        # ID determinístico: a mesma submissão sempre gera o mesmo ID
+        registro.id = proposta_id or dados.get("id_proposta") or gerar_id_conteudo(dados)
+        registro.versao = VERSAO
+        registro.timestamp = timestamp.isoformat()
+        registro.data_criacao = timestamp.strftime("%d/%m/%Y %H:%M:%S")
+        registro.sistema = SISTEMA
+        registro.status = "provisorio" if dados.get("proposta_provisoria") else "processado"
+        # Cópias: dados continua mudando (ex: enriquecimento) depois que o JSON é montado
+        registro.modelos_estagio = dict(dados.get("modelos_estagio", {}))
+        registro.continuacoes = dados.get("continuacoes", 0)
+        registro.degradacao = dict(dados.get("degradacao", {}))
+
+        registro.nome = dados["nome"]
+        registro.area = dados["area"]
+        registro.ideia = dados["ideia"]
+        registro.nivel = dados.get("nivel", "Intermediário")
+        registro.foco = dados.get("foco", "Não especificado")
+        registro.problema = dados.get("problema", "")
+        registro.recursos = dados.get("recursos", "")
+        registro.prazo = dados.get("prazo", "")
+
+        registro.proposta_completa = proposta
+        # Proposta no outro template, gerada junto quando o tipo ficou incerto (ou None)
+        registro.proposta_alternativa = dados.get("proposta_alternativa")
+        registro.resumo_executivo = estrutura.get("resumo", "")
+        registro.tecnologias = estrutura.get("tecnologias", [])
+        registro.cronograma = estrutura.get("cronograma", "")
+        registro.investimento = estrutura.get("investimento", "")
+        registro.riscos = estrutura.get("riscos", [])
+        registro.metricas = estrutura.get("metricas", [])
+
+        registro.tipo_projeto = dados.get("tipo_projeto", "TECNOLÓGICO")
+        registro.confianca_tipo = dados.get("confianca_tipo")
+        registro.pontuacao_nps = dados.get("pontuacao_nps", 50)
+        registro.justificativa_nps = dados.get("justificativa_nps", "")
+        registro.extras = None
+        if "foco" not in dados:
+            # Sem foco no formulário, a categoria padrão sempre foi "" (e não "Geral")
+            registro._categoria_projeto = classificar_projeto(registro.ideia, "")
+        return registro
+
+    @classmethod
+    def de_json(cls, json_proposta):
+        """Registro de um JSON do histórico (os derivados gravados valem como estão)"""
+        registro = cls.__new__(cls)
+        extras = {}
+        blocos = {}
+        for bloco, chaves in CHAVES.items():
+            valor = json_proposta.get(bloco)
+            if not isinstance(valor, dict):
+                if valor is not None:
+                    extras[(bloco,)] = valor
+                valor = {}
+            elif bloco != "proximos_passos":
+                for chave in valor.keys() - chaves:
+                    extras[(bloco, chave)] = valor[chave]
+            blocos[bloco] = valor
+        for bloco in json_proposta.keys() - CHAVES.keys():
+            extras[(bloco,)] = json_proposta[bloco]
+
+        metadata = blocos["metadata"]
+        registro.id = metadata.get("id")
+        registro.versao = _internar(metadata.get("versao", VERSAO))
+        registro.timestamp = metadata.get("timestamp", "")
+        registro.data_criacao = metadata.get("data_criacao", "")
+        registro.sistema = _internar(metadata.get("sistema", SISTEMA))
+        registro.status = _internar(metadata.get("status", "processado"))
+        registro.modelos_estagio = _compartilhar(metadata.get("modelos_estagio", {}))
+        registro.continuacoes = metadata.get("continuacoes", 0)
+        registro.degradacao = _compartilhar(metadata.get("degradacao", {}))
+
+        autor = blocos["autor"]
+        registro.nome = _internar(autor.get("nome", ""))
+        registro.area = _internar(autor.get("area", ""))
+        if "area_detalhada" in autor:
+            registro._area_detalhada = _internar(autor["area_detalhada"])
+
+        entrada = blocos["entrada"]
+        registro.ideia = entrada.get("ideia_original", "")
+        registro.nivel = _internar(entrada.get("nivel_detalhamento", "Intermediário"))
+        registro.foco = _internar(entrada.get("foco_principal", "Não especificado"))
+        registro.problema = entrada.get("problema_contexto", "")
+        registro.recursos = entrada.get("recursos_disponiveis", "")
+        registro.prazo = _internar(entrada.get("prazo_desejado", ""))
+        if "caracteres_ideia" in entrada:
+            registro._caracteres_ideia = entrada["caracteres_ideia"]
+        if "palavras_chave" in entrada:
+            palavras = entrada["palavras_chave"]
+            if isinstance(palavras, list):
+                # Lista nova: o JSON recebido continua sendo de quem chamou
+                palavras = [_internar(palavra) for palavra in palavras]
+            registro._palavras_chave = palavras
+
+        saida = blocos["saida"]
+        registro.proposta_completa = saida.get("proposta_completa", "")
+        registro.proposta_alternativa = saida.get("proposta_alternativa")
+        registro.resumo_executivo = saida.get("resumo_executivo", "")
+        registro.tecnologias = saida.get("tecnologias_sugeridas", [])
+        registro.cronograma = saida.get("cronograma_estimado", "")
+        registro.investimento = saida.get("investimento_estimado", "")
+        registro.riscos = saida.get("riscos_identificados", [])
+        registro.metricas = saida.get("metricas_sucesso", [])
+
+        analise = blocos["analise"]
+        registro.tipo_projeto = _internar(analise.get("tipo_projeto", "TECNOLÓGICO"))
+        registro.confianca_tipo = analise.get("confianca_tipo")
+        registro.pontuacao_nps = analise.get("pontuacao_nps", 50)
+        registro.justificativa_nps = analise.get("justificativa_nps", "")
+        for chave in ("categoria_nps", "complexidade", "categoria_projeto", "viabilidade_tecnica",
+                      "impacto_estimado", "prioridade_sugerida"):
+            if chave in analise:
+                setattr(registro, f"_{chave}", _internar(analise[chave]))
+
+        # nps_analysis repete a análise: o que divergir (não deveria) fica em extras
+        nps = blocos["nps_analysis"]
+        for chave, atual in (("pontuacao_total", registro.pontuacao_nps), ("justificativa", registro.justificativa_nps)):
+            if chave in nps and nps[chave] != atual:
+                extras[("nps_analysis", chave)] = nps[chave]
+        if "categoria" in nps and nps["categoria"] != registro.categoria_nps:
+            extras[("nps_analysis", "categoria")] = nps["categoria"]
+        if "potencial_melhoria" in nps:
+            registro._potencial_melhoria = _internar(nps["potencial_melhoria"])
+        if "areas_impacto" in nps:
+            registro._areas_impacto = _compartilhar(nps["areas_impacto"])
+
+        if blocos["proximos_passos"] and blocos["proximos_passos"] != PROXIMOS_PASSOS:
+            extras[("proximos_passos",)] = blocos["proximos_passos"]
+
+        registro.extras = extras or None
+        return registro
+
+    # ── Serialização ─────────────────────────────────────────────────────────
+
+    def para_json(self):
+        """JSON no esquema de gerar_json_proposta (os valores são os objetos do registro, sem cópia)"""
+        json_proposta = {
+            "metadata": {
+                "id": self.id,
+                "versao": self.versao,
+                "timestamp": self.timestamp,
+                "data_criacao": self.data_criacao,
+                "sistema": self.sistema,
+                "status": self.status,
+                "modelos_estagio": self.modelos_estagio,
+                "continuacoes": self.continuacoes,
+                "degradacao": self.degradacao
+            },
+            "autor": {
+                "nome": self.nome,
+                "area": self.area,
+                "area_detalhada": self.area_detalhada
+            },
+            "entrada": {
+                "ideia_original": self.ideia,
+                "nivel_detalhamento": self.nivel,
+                "foco_principal": self.foco,
+                "problema_contexto": self.problema,
+                "recursos_disponiveis": self.recursos,
+                "prazo_desejado": self.prazo,
+                "caracteres_ideia": self.caracteres_ideia,
+                "palavras_chave": self.palavras_chave
+            },
+            "saida": {
+                "proposta_completa": self.proposta_completa,
+                "proposta_alternativa": self.proposta_alternativa,
+                "resumo_executivo": self.resumo_executivo,
+                "tecnologias_sugeridas": self.tecnologias,
+                "cronograma_estimado": self.cronograma,
+                "investimento_estimado": self.investimento,
+                "riscos_identificados": self.riscos,
+                "metricas_sucesso": self.metricas
+            },
+            "analise": {
+                "tipo_projeto": self.tipo_projeto,
+                "confianca_tipo": self.confianca_tipo,
+                "pontuacao_nps": self.pontuacao_nps,
+                "justificativa_nps": self.justificativa_nps,
+                "categoria_nps": self.categoria_nps,
+                "complexidade": self.complexidade,
+                "categoria_projeto": self.categoria_projeto,
+                "viabilidade_tecnica": self.viabilidade_tecnica,
+                "impacto_estimado": self.impacto_estimado,
+                "prioridade_sugerida": self.prioridade_sugerida
+            },
+            "nps_analysis": {
+                "pontuacao_total": self.pontuacao_nps,
+                "categoria": self.categoria_nps,
+                "justificativa": self.justificativa_nps,
+                "potencial_melhoria": self.potencial_melhoria,
+                "areas_impacto": self.areas_impacto
+            },
+            "proximos_passos": dict(PROXIMOS_PASSOS, etapas_aprovacao=list(ETAPAS_APROVACAO))
+        }
+        if self.extras:
+            for caminho, valor in self.extras.items():
+                if len(caminho) == 1:
+                    json_proposta[caminho[0]] = valor
+                else:
+                    json_proposta.setdefault(caminho[0], {})[caminho[1]] = valor
+        return json_proposta
+
+    def __repr__(self):
+        return f"RegistroProposta(id={self.id!r}, area={self.area!r}, pontuacao_nps={self.pontuacao_nps!r})"
@@ -0,0 +1,358 @@
+"""Renderização do email da proposta: partes estáticas pré-compiladas uma vez por processo
+
+O corpo clássico (texto completo) continua idêntico ao que era montado via f-string; o formato
+compacto gera um multipart texto+HTML enxuto com a proposta e o JSON em anexo .json.gz.
+"""
+import gzip
+import html
+import json
+from datetime import datetime
+from email.message import EmailMessage
+from string import Template
+
+from triagem import prazo_resposta
+
+# Textos que dependem só do tipo de projeto (resolvidos na compilação, não a cada envio)
+TEXTOS_TIPO = {
+    "TECNOLÓGICO": {
+        "titulo_logica": "TECNOLÓGICOS",
+        "titulo_metodologia": "🏗️ **METODOLOGIA PARA PROJETOS TECNOLÓGICOS:**",
+        "metodologia_1": "• Arquitetura e stack tecnológico",
+        "metodologia_2": "• Cronograma de desenvolvimento",
+        "metodologia_3": "• Métricas de performance técnica",
+        "metodologia_4": "• Riscos de integração e segurança",
+        "metodologia_5": "• DevOps e entrega contínua",
+        "implementacao": "tecnológica",
+        "foco_final": "tecnologia"
+    },
+    "PROCESSO": {
+        "titulo_logica": "DE PROCESSO",
+        "titulo_metodologia": "📋 **METODOLOGIA PARA PROJETOS DE PROCESSO:**",
+        "metodologia_1": "• Mapeamento de processo atual vs proposto",
+        "metodologia_2": "• Documentação e procedimentos",
+        "metodologia_3": "• Plano de treinamento e implementação",
+        "metodologia_4": "• Gestão de mudança e adesão",
+        "metodologia_5": "• Monitoramento e melhoria contínua",
+        "implementacao": "de processo",
+        "foco_final": "processos eficientes"
+    }
+}
+
+# Orçamento de tamanho da mensagem (bytes); acima disso o envio é sinalizado nas métricas
+ORCAMENTO_BYTES_EMAIL = 64 * 1024
+
+MODELO_CORPO = """
+═══════════════════════════════════════════════════════════════
+${emoji_nps} PROPOSTA COM IMPACTO NO NPS - MINDGLASS V2
+═══════════════════════════════════════════════════════════════
+
+📊 PONTUAÇÃO NPS: ${pontuacao_nps}/100 pontos
+🎯 CATEGORIA: ${categoria_nps}
+📋 TIPO DE PROJETO: ${tipo_projeto}
+💡 JUSTIFICATIVA: ${justificativa_nps}
+
+═══════════════════════════════════════════════════════════════
+📋 METADADOS DO PROJETO:
+═══════════════════════════════════════════════════════════════
+
+• Autor: ${nome}
+• Área: ${area}
+• Data: ${data}
+• Tipo: ${tipo_projeto}
+• Nível: ${nivel}
+• Foco: ${foco}
+
+${linha_id}
+${linha_potencial}
+${linha_areas}
+
+═══════════════════════════════════════════════════════════════
+📝 IDEIA ORIGINAL (INPUT):
+═══════════════════════════════════════════════════════════════
+
+"${ideia}"
+
+═══════════════════════════════════════════════════════════════
+🧠 PROPOSTA ESTRUTURADA (OUTPUT IA):
+═══════════════════════════════════════════════════════════════
+
+${proposta}
+
+═══════════════════════════════════════════════════════════════
+📊 ANÁLISE DE IMPACTO NO NPS - METODOLOGIA CARGLASS
+═══════════════════════════════════════════════════════════════
+
+🎯 **COMO CALCULAMOS O IMPACTO NO NPS:**
+
+A pontuação de 0-100 é calculada com base nos seguintes critérios:
+
+📈 **FAIXAS DE PONTUAÇÃO:**
+• 90-100: TRANSFORMADOR - Revoluciona a experiência do cliente
+• 70-89: ALTO IMPACTO - Melhoria significativa e perceptível
+• 50-69: MÉDIO IMPACTO - Melhoria moderada na experiência
+• 30-49: BAIXO IMPACTO - Benefício indireto para o cliente
+• 0-29: IMPACTO MÍNIMO - Benefício principalmente interno
+
+🎯 **CRITÉRIOS DE AVALIAÇÃO:**
+• Impacto direto na experiência do cliente
+• Melhoria na transparência e comunicação
+• Aumento da conveniência e praticidade
+• Redução do tempo de espera
+• Melhoria na qualidade percebida
+• Facilidade de uso e acessibilidade
+
+💡 **PARA ESTA PROPOSTA (${pontuacao_nps}/100):**
+Justificativa: ${justificativa_nps}
+
+🚀 **POTENCIAL DE RESULTADO:**
+${potencial_melhoria}
+
+═══════════════════════════════════════════════════════════════
+🎓 LÓGICA DE ESTRUTURAÇÃO - PROJETOS ${titulo_logica}
+═══════════════════════════════════════════════════════════════
+
+Este projeto foi classificado como **${tipo_projeto}** e estruturado seguindo
+nossa metodologia específica para este tipo de iniciativa.
+
+🔄 **PROCESSO DE ANÁLISE:**
+
+1. **DETECÇÃO DE TIPO**
+   ✓ Análise semântica da ideia
+   ✓ Identificação de palavras-chave
+   ✓ Classificação: Tecnológico vs Processo
+
+2. **AVALIAÇÃO DE NPS**
+   ✓ Análise de impacto no cliente
+   ✓ Pontuação automática 0-100
+   ✓ Justificativa baseada em critérios
+
+3. **ESTRUTURAÇÃO PERSONALIZADA**
+   ✓ Template específico para o tipo
+   ✓ Foco em resultados de NPS
+   ✓ Próximos passos direcionados
+
+${titulo_metodologia}
+
+${metodologia_1}
+${metodologia_2}
+${metodologia_3}
+${metodologia_4}
+${metodologia_5}
+
+═══════════════════════════════════════════════════════════════
+📊 PRÓXIMAS AÇÕES BASEADAS NO NPS:
+═══════════════════════════════════════════════════════════════
+
+${linha_prioridade}
+
+1. **ANÁLISE EXECUTIVA** (${prazo_analise})
+   • Validação de impacto no NPS
+   • Análise de viabilidade
+   • Decisão sobre continuidade
+
+2. **VALIDAÇÃO COM CLIENTES** (${validacao_clientes})
+   • Teste de conceito com clientes
+   • Validação de premissas
+   • Refinamento da proposta
+
+3. **IMPLEMENTAÇÃO**
+   • Formação de equipe
+   • Definição de cronograma
+   • Início do projeto
+
+═══════════════════════════════════════════════════════════════
+🎯 MÉTRICAS DE ACOMPANHAMENTO DO NPS:
+═══════════════════════════════════════════════════════════════
+
+📊 **MÉTRICAS PRIMÁRIAS:**
+• NPS Score (antes e depois)
+• Taxa de recomendação
+• Satisfação do cliente (CSAT)
+• Tempo de resolução
+
+📈 **MÉTRICAS SECUNDÁRIAS:**
+• Taxa de adoção da solução
+• Redução de reclamações
+• Aumento de avaliações positivas
+• Tempo médio de atendimento
+
+💰 **MÉTRICAS DE NEGÓCIO:**
+• Retenção de clientes
+• Lifetime value (LTV)
+• Custo de aquisição (CAC)
+• Receita por cliente
+
+═══════════════════════════════════════════════════════════════
+🤝 COMO RESPONDER COM FOCO NO NPS:
+═══════════════════════════════════════════════════════════════
+
+✅ **SE APROVAR (NPS ${pontuacao_nps}/100):**
+• Confirme o impacto esperado no NPS
+• Defina métricas de acompanhamento
+• Estabeleça cronograma de implementação
+• Designe responsável pelo projeto
+
+🔄 **SE PRECISAR DE AJUSTES:**
+• Especifique como melhorar o impacto no NPS
+• Solicite refinamento via MindGlass
+• Mantenha ${nome} informado
+
+❌ **SE REJEITAR:**
+• Explique critérios de NPS não atendidos
+• Sugira alternativas para melhorar pontuação
+• Oriente sobre tipos de projeto com maior impacto
+
+═══════════════════════════════════════════════════════════════
+📞 CONTATOS PARA ACOMPANHAMENTO:
+═══════════════════════════════════════════════════════════════
+
+• **Autor da ideia:** ${nome} (${area})
+• **Equipe de CX:** Para validação de impacto no NPS
+• **TI/Processos:** Para implementação ${implementacao}
+• **Liderança:** Para aprovação e recursos
+
+═══════════════════════════════════════════════════════════════
+
+Este email foi gerado automaticamente pelo MindGlass V2 Enhanced
+Desenvolvido por Vinícius Augusto | Carglass Innovation Lab
+
+💡 Foco total na melhoria do NPS através de ${foco_final}!
+
+═══════════════════════════════════════════════════════════════
+"""
+
+MODELO_COMPACTO_TEXTO = """$emoji_nps PROPOSTA COM IMPACTO NO NPS - MINDGLASS V2
+
+📊 PONTUAÇÃO NPS: $pontuacao_nps/100 pontos ($categoria_nps)
+📋 TIPO DE PROJETO: $tipo_projeto
+💡 JUSTIFICATIVA: $justificativa_nps
+
+• Autor: $nome ($area)
+• Data: $data
+• Nível: $nivel | Foco: $foco
+• ID da Proposta: $id_proposta
+
+📝 IDEIA ORIGINAL:
+"$ideia"
+
+🧠 RESUMO EXECUTIVO:
+$resumo
+
+$linha_prioridade
+Análise executiva em: $prazo_analise | Validação com clientes: $validacao_clientes
+
+📎 A proposta completa e o JSON estruturado estão no anexo $anexo.
+"""
+
+MODELO_COMPACTO_HTML = """<html><body style="font-family: Arial, sans-serif; color: #333;">
+<h2>$emoji_nps Proposta com impacto no NPS - MindGlass V2</h2>
+<p><b>Pontuação NPS:</b> $pontuacao_nps/100 ($categoria_nps)<br>
+<b>Tipo de projeto:</b> $tipo_projeto<br>
+<b>Justificativa:</b> $justificativa_nps</p>
+<p><b>Autor:</b> $nome ($area)<br><b>Data:</b> $data<br>
+<b>Nível:</b> $nivel | <b>Foco:</b> $foco<br><b>ID da Proposta:</b> $id_proposta</p>
+<h3>📝 Ideia original</h3><blockquote>$ideia</blockquote>
+<h3>🧠 Resumo executivo</h3><p>$resumo</p>
+<p><b>$linha_prioridade</b><br>Análise executiva em: $prazo_analise | Validação com clientes: $validacao_clientes</p>
+<p>📎 A proposta completa e o JSON estruturado estão no anexo <code>$anexo</code>.</p>
+</body></html>
+"""
+
+
+def _compilar(texto):
+    """Quebra o template em partes fixas e nomes de campo, para renderizar só com join"""
+    partes = []
+    posicao = 0
+    for encontrado in Template.pattern.finditer(texto):
+        nome = encontrado.group("named") or encontrado.group("braced")
+        if nome is None:
+            continue
+        partes.append((False, texto[posicao:encontrado.start()]))
+        partes.append((True, nome))
+        posicao = encontrado.end()
+    partes.append((False, texto[posicao:]))
+    return [(campo, valor) for campo, valor in partes if campo or valor]
+
+
+def _renderizar(partes, valores):
+    return "".join(str(valores[valor]) if campo else valor for campo, valor in partes)
+
+
+# Compilados uma única vez por processo (um por tipo de projeto)
+_CORPO_POR_TIPO = {
+    tipo: _compilar(Template(MODELO_CORPO).safe_substitute(textos))
+    for tipo, textos in TEXTOS_TIPO.items()
+}
+_COMPACTO_TEXTO = _compilar(MODELO_COMPACTO_TEXTO)
+_COMPACTO_HTML = _compilar(MODELO_COMPACTO_HTML)
+
+
+def _valores_comuns(dados, categoria_nps, potencial_melhoria):
+    """Campos variáveis compartilhados pelos formatos clássico e compacto"""
+    pontuacao_nps = dados.get("pontuacao_nps", 50)
+    return {
+        "nome": dados["nome"],
+        "area": dados["area"],
+        "ideia": dados["ideia"],
+        "pontuacao_nps": pontuacao_nps,
+        "justificativa_nps": dados.get("justificativa_nps", ""),
+        "tipo_projeto": dados.get("tipo_projeto", "TECNOLÓGICO"),
+        "categoria_nps": categoria_nps,
+        "potencial_melhoria": potencial_melhoria,
+        "nivel": dados.get("nivel", "Intermediário"),
+        "foco": dados.get("foco", "Não especificado"),
+        "data": datetime.now().strftime("%d/%m/%Y às %H:%M"),
+        "emoji_nps": "🚀" if pontuacao_nps >= 80 else "📈" if pontuacao_nps >= 60 else "📊" if pontuacao_nps >= 40 else "⚡",
+        "linha_prioridade": (
+            "🚨 **PRIORIDADE CRÍTICA** (NPS 80+)" if pontuacao_nps >= 80 else
+            "⚡ **PRIORIDADE ALTA** (NPS 65-79)" if pontuacao_nps >= 65 else
+            "📈 **PRIORIDADE MÉDIA** (NPS 45-64)" if pontuacao_nps >= 45 else
+            "📋 **PRIORIDADE BAIXA** (NPS <45)"
+        ),
+        "prazo_analise": prazo_resposta(pontuacao_nps)[1],
+        "validacao_clientes": "Imediata" if pontuacao_nps >= 70 else "Após aprovação interna"
+    }
+
+
+def renderizar_corpo(dados, proposta, json_proposta, categoria_nps, potencial_melhoria):
+    """Corpo clássico do email (texto completo, com a proposta inline)"""
+    valores = _valores_comuns(dados, categoria_nps, potencial_melhoria)
+    valores["proposta"] = proposta
+    valores["linha_id"] = f"🆔 ID da Proposta: {json_proposta['metadata']['id']}" if json_proposta else ""
+    valores["linha_potencial"] = (
+        f"📈 Potencial de Melhoria: {json_proposta['nps_analysis']['potencial_melhoria']}" if json_proposta else ""
+    )
+    valores["linha_areas"] = (
+        f"🎯 Áreas de Impacto: {', '.join(json_proposta['nps_analysis']['areas_impacto'])}" if json_proposta else ""
+    )
+
+    partes = _CORPO_POR_TIPO["TECNOLÓGICO" if valores["tipo_projeto"] == "TECNOLÓGICO" else "PROCESSO"]
+    return _renderizar(partes, valores)
+
+
+def montar_email_compacto(remetente, destino, assunto, dados, proposta, json_proposta,
+                          categoria_nps, potencial_melhoria):
+    """Multipart texto+HTML enxuto; proposta completa e JSON vão comprimidos em anexo"""
+    valores = _valores_comuns(dados, categoria_nps, potencial_melhoria)
+    saida = (json_proposta or {}).get("saida", {})
+    id_proposta = (json_proposta or {}).get("metadata", {}).get("id") or dados.get("id_proposta", "proposta")
+    valores["id_proposta"] = id_proposta
+    valores["resumo"] = saida.get("resumo_executivo") or proposta[:600]
+    valores["anexo"] = f"proposta-{id_proposta}.json.gz"
+
+    mensagem = EmailMessage()
+    mensagem["From"] = remetente
+    mensagem["To"] = destino
+    mensagem["Subject"] = assunto
+    mensagem.set_content(_renderizar(_COMPACTO_TEXTO, valores))
+    mensagem.add_alternative(
+        _renderizar(_COMPACTO_HTML, {k: html.escape(str(v)) for k, v in valores.items()}),
+        subtype="html"
+    )
+
+    conteudo = json_proposta or {"metadata": {"id": id_proposta}, "saida": {"proposta_completa": proposta}}
+    mensagem.add_attachment(
+        gzip.compress(json.dumps(conteudo, ensure_ascii=False).encode("utf-8")),
+        maintype="application", subtype="gzip", filename=valores["anexo"]
+    )
+    return mensagem
@@ -0,0 +1,129 @@
+"""Disjuntor (circuit breaker) e requisições com hedge para as chamadas à OpenAI"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metricas
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+_CODIGO_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+# Threads para as cópias com hedge (a perdedora termina em segundo plano e é descartada)
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="mindglass-hedge")
+
+
+class CircuitoAberto(Exception):
+    """O provedor está falhando e o disjuntor bloqueou a chamada"""
+
+
+class Disjuntor:
+    """Abre após `limite_falhas` falhas seguidas e libera uma chamada de teste após `tempo_abertura` s"""
+
+    def __init__(self, nome, limite_falhas=5, tempo_abertura=30.0):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_abertura = tempo_abertura
+        self._trava = threading.Lock()
+        self._estado = FECHADO
+        self._falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._dono_teste = None
+        self._publicar()
+
+    @property
+    def estado(self):
+        with self._trava:
+            if self._estado == ABERTO and time.monotonic() - self._aberto_em >= self.tempo_abertura:
+                return MEIO_ABERTO
+            return self._estado
+
+    def permitir(self):
+        """True se a chamada pode seguir para o provedor"""
+        with self._trava:
+            if self._estado == FECHADO:
+                return True
+
+            if self._estado == ABERTO and time.monotonic() - self._aberto_em >= self.tempo_abertura:
+                self._mudar(MEIO_ABERTO)
+
+            # Meio aberto: só uma chamada de teste por vez
+            if self._estado == MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                self._dono_teste = threading.get_ident()
+                return True
+
+            return False
+
+    def liberar_teste(self):
+        """Encerra sem resultado a chamada de teste desta thread (cancelada, sem cota, sem prazo)
+
+        Sem isso o disjuntor ficaria meio aberto com o teste "em andamento" para sempre,
+        bloqueando todas as chamadas seguintes.
+        """
+        with self._trava:
+            if self._teste_em_andamento and self._dono_teste == threading.get_ident():
+                self._teste_em_andamento = False
+                self._dono_teste = None
+
+    def registrar_sucesso(self):
+        with self._trava:
+            self._falhas_seguidas = 0
+            self._teste_em_andamento = False
+            if self._estado != FECHADO:
+                self._mudar(FECHADO)
+
+    def registrar_falha(self):
+        with self._trava:
+            self._falhas_seguidas += 1
+            self._teste_em_andamento = False
+            if self._estado == MEIO_ABERTO or self._falhas_seguidas >= self.limite_falhas:
+                self._aberto_em = time.monotonic()
+                if self._estado != ABERTO:
+                    self._mudar(ABERTO)
+
+    def _mudar(self, estado):
+        self._estado = estado
+        metricas.incrementar("disjuntor_transicoes", disjuntor=self.nome, para=estado)
+        self._publicar()
+
+    def _publicar(self):
+        metricas.definir("disjuntor_estado", _CODIGO_ESTADO[self._estado], disjuntor=self.nome)
+
+
+def executar_com_hedge(funcao, atraso, estagio, ao_duplicar=None):
+    """Executa `funcao`; se não responder em `atraso` s, dispara uma cópia e usa a primeira que der certo
+
+    ao_duplicar() roda antes de disparar a cópia (ex: cobrar a cota da requisição extra); se
+    levantar, a cópia não é disparada e fica valendo só a original.
+    """
+    original = _executor.submit(funcao)
+    concluidas, _ = wait([original], timeout=atraso)
+    if concluidas:
+        return original.result()
+
+    if ao_duplicar is not None:
+        try:
+            ao_duplicar()
+        except Exception:
+            metricas.incrementar("hedge_sem_cota", estagio=estagio)
+            return original.result()
+
+    duplicada = _executor.submit(funcao)
+    metricas.incrementar("hedge_disparado", estagio=estagio)
+
+    pendentes = {original, duplicada}
+    erro = None
+    while pendentes:
+        concluidas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in concluidas:
+            if futuro.exception() is None:
+                vencedor = "original" if futuro is original else "duplicada"
+                metricas.incrementar("hedge_vitoria", estagio=estagio, vencedor=vencedor)
+                return futuro.result()
+            erro = futuro.exception()
+
+    raise erro
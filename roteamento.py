@@ -0,0 +1,95 @@
+"""Roteamento de modelo por estágio do pipeline, com troca para nível mais rápido quando o p95 estoura"""
+import threading
+from collections import defaultdict, deque
+
+import metricas
+
+# Níveis do mais rápido para o mais capaz
+ORDEM_NIVEIS = ["rapido", "padrao"]
+
+# A cada N chamadas degradadas, uma volta ao nível configurado para reavaliar a latência
+INTERVALO_SONDAGEM = 20
+
+
+class Roteador:
+    """Escolhe o modelo de cada estágio e acompanha latência e taxa de erro observadas"""
+
+    def __init__(self, modelos_nivel, nivel_estagio, orcamento_p95, janela=50, min_amostras=10,
+                 taxa_erro_maxima=0.5, adaptativo=True):
+        self.modelos_nivel = modelos_nivel
+        self.nivel_estagio = nivel_estagio
+        self.orcamento_p95 = orcamento_p95
+        self.min_amostras = min_amostras
+        self.taxa_erro_maxima = taxa_erro_maxima
+        self.adaptativo = adaptativo
+        self._trava = threading.Lock()
+        self._latencias = defaultdict(lambda: deque(maxlen=janela))
+        self._resultados = defaultdict(lambda: deque(maxlen=janela))
+        self._degradadas = defaultdict(int)
+
+    def escolher(self, estagio):
+        """Modelo a usar no estágio (o configurado ou um nível mais rápido se estiver fora do orçamento)"""
+        nivel = self.nivel_estagio.get(estagio, ORDEM_NIVEIS[-1])
+        if not self.adaptativo:
+            return self.modelos_nivel[nivel]
+
+        with self._trava:
+            indice = ORDEM_NIVEIS.index(nivel)
+            while indice > 0 and self._fora_do_orcamento(estagio, self.modelos_nivel[ORDEM_NIVEIS[indice]]):
+                indice -= 1
+
+            if indice == ORDEM_NIVEIS.index(nivel):
+                return self.modelos_nivel[nivel]
+
+            # Degradado: de tempos em tempos sonda o nível configurado para poder voltar
+            self._degradadas[estagio] += 1
+            if self._degradadas[estagio] % INTERVALO_SONDAGEM == 0:
+                return self.modelos_nivel[nivel]
+
+        metricas.incrementar("roteamento_degradado", estagio=estagio, nivel=ORDEM_NIVEIS[indice])
+        return self.modelos_nivel[ORDEM_NIVEIS[indice]]
+
+    def registrar(self, estagio, modelo, latencia=None, erro=False):
+        """Registra o resultado de uma chamada (latência em segundos)"""
+        with self._trava:
+            self._resultados[(estagio, modelo)].append(0 if erro else 1)
+            if latencia is not None and not erro:
+                self._latencias[(estagio, modelo)].append(latencia)
+
+    def p95(self, estagio):
+        """Menor p95 observado entre os modelos do estágio (None sem amostras suficientes)"""
+        with self._trava:
+            valores = [_p95(latencias) for (nome, _), latencias in self._latencias.items()
+                       if nome == estagio and len(latencias) >= self.min_amostras]
+        return min(valores) if valores else None
+
+    def _fora_do_orcamento(self, estagio, modelo):
+        latencias = self._latencias[(estagio, modelo)]
+        resultados = self._resultados[(estagio, modelo)]
+
+        if len(resultados) >= self.min_amostras and 1 - sum(resultados) / len(resultados) > self.taxa_erro_maxima:
+            return True
+
+        orcamento = self.orcamento_p95.get(estagio)
+        if orcamento is None or len(latencias) < self.min_amostras:
+            return False
+        return _p95(latencias) > orcamento
+
+    def estatisticas(self):
+        """p95 e taxa de erro por estágio/modelo, para o painel admin"""
+        with self._trava:
+            resumo = {}
+            for estagio, modelo in sorted(set(self._resultados) | set(self._latencias)):
+                latencias = self._latencias[(estagio, modelo)]
+                resultados = self._resultados[(estagio, modelo)]
+                resumo[f"{estagio}/{modelo}"] = {
+                    "chamadas": len(resultados),
+                    "p95_s": round(_p95(latencias), 3) if latencias else None,
+                    "taxa_erro": round(1 - sum(resultados) / len(resultados), 3) if resultados else None
+                }
+            return resumo
+
+
+def _p95(valores):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * 0.95), len(ordenados) - 1)]
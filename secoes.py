@@ -0,0 +1,240 @@
+"""Parser incremental das seções da proposta em markdown (alimentado trecho a trecho pelo stream)"""
+import re
+import unicodedata
+
+# Palavras-chave do título (em maiúsculas) → campo da estrutura; a primeira que casar vence
+CAMPOS_POR_TITULO = [
+    ("RESUMO EXECUTIVO", "resumo"),
+    ("TECNOLOGIAS", "tecnologias"),
+    ("STACK", "tecnologias"),
+    ("ARQUITETURA", "tecnologias"),
+    ("CRONOGRAMA", "cronograma"),
+    ("PLANO DE IMPLEMENTAÇÃO", "cronograma"),
+    ("INVESTIMENTO", "investimento"),
+    ("RISCOS", "riscos"),
+    ("MÉTRICAS", "metricas"),
+]
+
+CAMPOS_LISTA = ("tecnologias", "riscos", "metricas")
+
+
+def estrutura_vazia():
+    """Mesmo formato devolvido por extrair_estrutura_proposta"""
+    return {
+        "resumo": "",
+        "tecnologias": [],
+        "cronograma": "",
+        "investimento": "",
+        "riscos": [],
+        "metricas": []
+    }
+
+
+def limpar_item(linha):
+    """Remove marcadores de lista, checkbox, numeração e negrito"""
+    texto = linha.strip()
+    for marcador in ("- ", "* ", "• "):
+        if texto.startswith(marcador):
+            texto = texto[len(marcador):]
+            break
+    if texto.startswith("[ ] ") or texto.startswith("[x] "):
+        texto = texto[4:]
+    numero, ponto, resto = texto.partition(". ")
+    if ponto and numero.isdigit():
+        texto = resto
+    return texto.replace("*", "").strip()
+
+
+class ParserSecoes:
+    """Recebe o texto em pedaços e fecha cada seção assim que o próximo título chega"""
+
+    def __init__(self):
+        self.estrutura = estrutura_vazia()
+        self._pendente = ""
+        self._campo = None
+        self._nivel = 0
+        self._linhas = []
+        self._subtitulos = []
+        self._em_codigo = False
+
+    def alimentar(self, trecho):
+        """Processa as linhas completas do trecho; devolve [(campo, valor)] das seções fechadas"""
+        self._pendente += trecho
+        if "\n" not in self._pendente:
+            return []
+
+        *linhas, self._pendente = self._pendente.split("\n")
+        fechadas = []
+        for linha in linhas:
+            fechada = self._processar_linha(linha)
+            if fechada:
+                fechadas.append(fechada)
+        return fechadas
+
+    def finalizar(self):
+        """Processa o resto do buffer e fecha a última seção"""
+        fechadas = []
+        if self._pendente:
+            fechada = self._processar_linha(self._pendente)
+            self._pendente = ""
+            if fechada:
+                fechadas.append(fechada)
+
+        fechada = self._fechar_secao()
+        if fechada:
+            fechadas.append(fechada)
+        return fechadas
+
+    def _processar_linha(self, linha):
+        linha_clean = linha.strip()
+
+        if linha_clean.startswith("```"):
+            self._em_codigo = not self._em_codigo
+            return None
+        if self._em_codigo or not linha_clean:
+            return None
+
+        if not linha_clean.startswith("#"):
+            if self._campo:
+                self._linhas.append(linha_clean)
+            return None
+
+        # Título: só aqui o texto é convertido para maiúsculas
+        nivel = len(linha_clean) - len(linha_clean.lstrip("#"))
+        titulo = linha_clean.upper()
+        campo = next((c for chave, c in CAMPOS_POR_TITULO if chave in titulo), None)
+
+        # Subtítulo sem campo próprio continua a seção atual (ex: "### Sprint 1-2")
+        if campo is None and self._campo and nivel > self._nivel:
+            self._subtitulos.append(limpar_item(linha_clean.lstrip("#")))
+            return None
+        if campo is not None and campo == self._campo and nivel > self._nivel:
+            return None
+
+        fechada = self._fechar_secao()
+        self._campo = campo
+        self._nivel = nivel
+        return fechada
+
+    def _fechar_secao(self):
+        campo, linhas, subtitulos = self._campo, self._linhas, self._subtitulos
+        self._campo, self._linhas, self._subtitulos = None, [], []
+        if campo is None or not (linhas or subtitulos):
+            return None
+
+        if campo == "resumo":
+            valor = " ".join(linhas)
+            self.estrutura["resumo"] = (self.estrutura["resumo"] + " " + valor).strip()
+        elif campo == "tecnologias":
+            # Como antes: só linhas com destaque em negrito (ex: "- **Frontend:** React")
+            valor = [limpar_item(l) for l in linhas if "**" in l]
+            self.estrutura["tecnologias"].extend(v for v in valor if v)
+        elif campo in CAMPOS_LISTA:
+            valor = [v for v in (limpar_item(l) for l in linhas) if v]
+            self.estrutura[campo].extend(valor)
+        else:
+            # Cronograma usa os subtítulos (fases/sprints) quando houver
+            partes = subtitulos if campo == "cronograma" and subtitulos else [limpar_item(l) for l in linhas]
+            valor = "; ".join(p for p in partes if p)
+            self.estrutura[campo] = "; ".join(p for p in (self.estrutura[campo], valor) if p)
+
+        return campo, valor
+
+
+# Seções (títulos ##) obrigatórias de cada template da proposta completa, na ordem (a posição
+# na lista é o número da seção menos 1): (palavra-chave procurada no título quando ele não traz
+# o número, título pedido ao modelo quando faltar)
+SECOES_OBRIGATORIAS = {
+    "TECNOLÓGICO": [
+        ("IMPACTO NO NPS", "## 📊 **1. IMPACTO NO NPS**"),
+        ("RESUMO EXECUTIVO", "## 📋 **2. RESUMO EXECUTIVO**"),
+        ("PROBLEMA & OPORTUNIDADE", "## 🎯 **3. PROBLEMA & OPORTUNIDADE**"),
+        ("ARQUITETURA TECNOLÓGICA", "## 🏗️ **4. ARQUITETURA TECNOLÓGICA**"),
+        ("ESTRUTURA DE DESENVOLVIMENTO", "## 📂 **5. ESTRUTURA DE DESENVOLVIMENTO**"),
+        ("CRONOGRAMA", "## 📅 **6. CRONOGRAMA DE DESENVOLVIMENTO**"),
+        ("MÉTRICAS DE SUCESSO", "## 🎯 **7. MÉTRICAS DE SUCESSO**"),
+        ("INVESTIMENTO", "## 💰 **8. ANÁLISE DE INVESTIMENTO**"),
+        ("RISCOS", "## ⚠️ **9. RISCOS TECNOLÓGICOS**"),
+        ("PRÓXIMOS PASSOS", "## 🚀 **10. PRÓXIMOS PASSOS**"),
+    ],
+    "PROCESSO": [
+        ("IMPACTO NO NPS", "## 📊 **1. IMPACTO NO NPS**"),
+        ("RESUMO EXECUTIVO", "## 📋 **2. RESUMO EXECUTIVO**"),
+        ("PROCESSO ATUAL", "## 🎯 **3. PROCESSO ATUAL vs PROPOSTO**"),
+        ("DOCUMENTAÇÃO", "## 📋 **4. DOCUMENTAÇÃO NECESSÁRIA**"),
+        ("PLANO DE IMPLEMENTAÇÃO", "## 👥 **5. PLANO DE IMPLEMENTAÇÃO**"),
+        ("MÉTRICAS", "## 🎯 **6. MÉTRICAS DE PROCESSO**"),
+        ("INVESTIMENTO", "## 💰 **7. INVESTIMENTO NECESSÁRIO**"),
+        ("RISCOS", "## ⚠️ **8. RISCOS E RESISTÊNCIAS**"),
+        ("PRÓXIMOS PASSOS", "## 🚀 **9. PRÓXIMOS PASSOS**"),
+        ("EQUIPE", "## 👥 **10. EQUIPE NECESSÁRIA**"),
+    ]
+}
+
+
+def _normalizar_titulo(titulo):
+    """Maiúsculas, sem acentos, "&" como "E" e só letras/números separados por um espaço"""
+    titulo = unicodedata.normalize("NFKD", titulo.upper().replace("&", " E "))
+    titulo = "".join(c for c in titulo if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[A-Z0-9]+", titulo))
+
+
+def _indice_secao(titulo, obrigatorias):
+    """Posição do título (linha ##) na lista de seções obrigatórias, ou None
+
+    O número da seção ("## 📊 **3. ...**") decide; sem número (ou fora do template), vale a
+    primeira palavra-chave que aparecer como palavras inteiras no título.
+    """
+    titulo = _normalizar_titulo(titulo)
+    numero = re.match(r"(\d+) ", titulo)
+    if numero and 1 <= int(numero.group(1)) <= len(obrigatorias):
+        return int(numero.group(1)) - 1
+    return next(
+        (i for i, (chave, _) in enumerate(obrigatorias) if f" {_normalizar_titulo(chave)} " in f" {titulo} "),
+        None
+    )
+
+
+def dividir_secoes(texto):
+    """Blocos [(título ## ou None para o preâmbulo, texto do bloco)]; títulos dentro de ``` não contam"""
+    blocos = [[None, []]]
+    em_codigo = False
+    for linha in texto.split("\n"):
+        limpa = linha.strip()
+        if limpa.startswith("```"):
+            em_codigo = not em_codigo
+        elif not em_codigo and limpa.startswith("## "):
+            blocos.append([limpa, []])
+        blocos[-1][1].append(linha)
+    return [(titulo, "\n".join(linhas)) for titulo, linhas in blocos if titulo or any(l.strip() for l in linhas)]
+
+
+def _tem_corpo(bloco):
+    return any(linha.strip() for linha in bloco.split("\n")[1:])
+
+
+def secoes_faltando(texto, tipo_projeto):
+    """Seções obrigatórias ausentes ou só com o título: [(palavra-chave, título)] na ordem do template"""
+    obrigatorias = SECOES_OBRIGATORIAS[tipo_projeto]
+    presentes = {
+        _indice_secao(titulo, obrigatorias)
+        for titulo, bloco in dividir_secoes(texto) if titulo and _tem_corpo(bloco)
+    }
+    return [secao for i, secao in enumerate(obrigatorias) if i not in presentes]
+
+
+def inserir_secoes(texto, novas, tipo_projeto):
+    """Encaixa as seções de `novas` na posição do template (substituindo títulos vazios)"""
+    obrigatorias = SECOES_OBRIGATORIAS[tipo_projeto]
+    blocos = [
+        (_indice_secao(titulo, obrigatorias) if titulo else None, bloco)
+        for titulo, bloco in dividir_secoes(texto)
+        if not titulo or _tem_corpo(bloco)
+    ]
+    for titulo, bloco in dividir_secoes(novas):
+        indice = _indice_secao(titulo, obrigatorias) if titulo else None
+        if indice is None or not _tem_corpo(bloco) or any(i == indice for i, _ in blocos):
+            continue
+        posicao = next((p for p, (i, _) in enumerate(blocos) if i is not None and i > indice), len(blocos))
+        blocos.insert(posicao, (indice, bloco.rstrip() + "\n"))
+    return "\n".join(bloco.rstrip("\n") + "\n" for _, bloco in blocos).rstrip() + "\n"
@@ -1,22 +1,32 @@
 import streamlit as st
 from utils import (
-    estruturar_ideia_avancada, 
-    enviar_email_estruturado, 
+    executar_pipeline,
+    ALVOS_TRIAGEM,
+    ALVOS_PREVIEW,
     validar_entrada, 
-    salvar_historico, 
-    gerar_json_proposta,
+    salvar_json_proposta, 
     detectar_tipo_projeto,
-    calcular_pontuacao_nps,
-    classificar_categoria_nps
+    sugerir_ideias_parecidas,
+    enviar_submissao,
+    retomar_submissao,
+    consultar_submissao,
+    iniciar_servicos
 )
 import time
 
+# Intervalo (s) entre consultas ao estado do envio em andamento
+INTERVALO_CONSULTA = 1.5
+
+# Caracteres mínimos da ideia para consultar as ideias parecidas
+MIN_CARACTERES_SUGESTOES = 15
+
 # 🎨 Configuração da interface
 st.set_page_config(
     page_title="MindGlass V2 – Ideias Inteligentes com Foco em NPS", 
     layout="wide",
     initial_sidebar_state="expanded"
 )
+iniciar_servicos()
 
 # CSS customizado para melhor UX
 st.markdown("""
@@ -127,6 +137,18 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.header("📝 Conte sua ideia")
     
+    # Detalhes da ideia fora do formulário: cada edição (ao sair do campo ou com Ctrl+Enter) roda
+    # o app de novo e atualiza as ideias parecidas, sem precisar enviar o formulário
+    st.subheader("💭 Sua Ideia")
+    st.info("💡 **Dica:** Seja natural e específico! Qualquer ideia é válida - nossa IA vai estruturar profissionalmente.")
+    
+    ideia_curta = st.text_area(
+        "Descreva sua ideia (tecnológica ou de processo)",
+        placeholder="Ex: Que tal se os clientes pudessem acompanhar o reparo em tempo real? OU Podemos simplificar o processo de check-in na oficina?",
+        height=120,
+        key="ideia"
+    )
+    
     # Formulário principal
     with st.form("formulario_mindglass_v2_enhanced"):
         # Informações básicas
@@ -149,16 +171,6 @@ with col1:
             ]
             area = st.selectbox("Área de atuação", areas_detalhadas)
         
-        # Detalhes da ideia
-        st.subheader("💭 Sua Ideia")
-        st.info("💡 **Dica:** Seja natural e específico! Qualquer ideia é válida - nossa IA vai estruturar profissionalmente.")
-        
-        ideia_curta = st.text_area(
-            "Descreva sua ideia (tecnológica ou de processo)",
-            placeholder="Ex: Que tal se os clientes pudessem acompanhar o reparo em tempo real? OU Podemos simplificar o processo de check-in na oficina?",
-            height=120
-        )
-        
         # Configurações avançadas
         st.subheader("⚙️ Configurações")
         col_nivel, col_foco = st.columns(2)
@@ -193,6 +205,18 @@ with col1:
 with col2:
     st.header("📊 Análise em Tempo Real")
     
+    # Ideias parecidas já enviadas (índice local, sem IA): consulta pelo texto digitado até agora,
+    # antes de qualquer validação ou detecção de tipo, para evitar duplicatas antes do envio
+    if ideia_curta and len(ideia_curta.strip()) >= MIN_CARACTERES_SUGESTOES:
+        parecidas = sugerir_ideias_parecidas(ideia_curta)
+        if parecidas:
+            st.subheader("🔎 Ideias parecidas já enviadas")
+            for sugestao in parecidas:
+                estado = {"pendente": "⏳ aguardando liderança", "respondida": "✅ respondida"}.get(
+                    sugestao["estado"], "📁 " + (sugestao["status"] or "registrada"))
+                st.caption(f"**{sugestao['similaridade']:.0%}** · {sugestao['area']} · {sugestao['data']} · {estado}")
+                st.markdown(f"> {sugestao['resumo']}")
+    
     # Validação em tempo real
     if nome and ideia_curta:
         validacao = validar_entrada(nome, ideia_curta)
@@ -201,7 +225,12 @@ with col2:
             
             # Análise preliminar
             if len(ideia_curta.strip()) > 20:
-                tipo_detectado = detectar_tipo_projeto(ideia_curta, area)
+                # Uma detecção por texto: cada edição da ideia (fora do formulário) roda o app de novo
+                chave_tipo = (ideia_curta, area)
+                if st.session_state.get("tipo_detectado_para") != chave_tipo:
+                    st.session_state["tipo_detectado"] = detectar_tipo_projeto(ideia_curta, area)
+                    st.session_state["tipo_detectado_para"] = chave_tipo
+                tipo_detectado = st.session_state["tipo_detectado"]
                 st.info(f"🔍 **Tipo detectado:** {tipo_detectado}")
                 
                 # Análise de potencial (sem mostrar NPS)
@@ -261,23 +290,19 @@ if gerar_preview:
                     "foco": foco_principal,
                     "problema": problema_atual,
                     "recursos": recursos_disponiveis,
-                    "prazo": prazo_desejado
+                    "prazo": prazo_desejado,
+                    "prioridade": "preview"
                 }
                 
-                # Detecta tipo e calcula NPS (mas não mostra detalhes)
-                tipo_projeto = detectar_tipo_projeto(ideia_curta, area)
-                pontuacao_nps, justificativa_nps = calcular_pontuacao_nps(ideia_curta, area, foco_principal)
-                
-                # Adiciona aos dados
-                preview_data["tipo_projeto"] = tipo_projeto
-                preview_data["pontuacao_nps"] = pontuacao_nps
-                preview_data["justificativa_nps"] = justificativa_nps
+                # Detecta tipo e calcula NPS em paralelo (mas não mostra detalhes)
+                executar_pipeline(preview_data, ALVOS_TRIAGEM)
+                tipo_projeto = preview_data["tipo_projeto"]
                 
                 # Mostra apenas análise básica (sem NPS)
                 st.info(f"🔍 **Análise:** Projeto {tipo_projeto} detectado")
                 
-                # Gera preview
-                proposta_preview = estruturar_ideia_avancada(preview_data, preview_mode=True)
+                # Gera preview (tipo e NPS já estão em preview_data e não são refeitos)
+                proposta_preview = executar_pipeline(preview_data, ALVOS_PREVIEW)["proposta_preview"]
                 
                 st.markdown('<div class="preview-box">', unsafe_allow_html=True)
                 st.subheader("👁️ Preview da Proposta")
@@ -297,146 +322,153 @@ if enviar_final:
         if not validacao["valido"]:
             st.error(f"❌ {validacao['erro']}")
         else:
-            with st.spinner("🚀 Estruturando sua ideia com análise inteligente..."):
-                dados_completos = {
-                    "nome": nome,
-                    "area": area,
-                    "ideia": ideia_curta,
-                    "nivel": nivel_detalhamento,
-                    "foco": foco_principal,
-                    "problema": problema_atual,
-                    "recursos": recursos_disponiveis,
-                    "prazo": prazo_desejado
-                }
-                
-                # Detecta tipo e calcula NPS (em background)
-                tipo_projeto = detectar_tipo_projeto(ideia_curta, area)
-                pontuacao_nps, justificativa_nps = calcular_pontuacao_nps(ideia_curta, area, foco_principal)
-                
-                # Adiciona análise aos dados
-                dados_completos["tipo_projeto"] = tipo_projeto
-                dados_completos["pontuacao_nps"] = pontuacao_nps
-                dados_completos["justificativa_nps"] = justificativa_nps
-                
-                # Mostra apenas tipo de projeto (sem NPS)
-                st.info(f"🔍 **Projeto {tipo_projeto}** detectado e sendo estruturado...")
-                
-                # Gera proposta completa
-                proposta_completa = estruturar_ideia_avancada(dados_completos)
-                
-                # Gera JSON estruturado
-                json_proposta = None
-                try:
-                    json_proposta = gerar_json_proposta(dados_completos, proposta_completa)
-                    
-                    if json_proposta:
-                        st.success("📄 Proposta estruturada e dados organizados!")
-                        
-                        # Mostra métricas básicas (sem NPS)
-                        col_json1, col_json2, col_json3 = st.columns(3)
-                        with col_json1:
-                            st.metric("🆔 ID", json_proposta['metadata']['id'])
-                        with col_json2:
-                            st.metric("🔍 Tipo", json_proposta['analise']['tipo_projeto'])
-                        with col_json3:
-                            st.metric("📈 Complexidade", json_proposta['analise']['complexidade'])
-                            
-                except Exception as e:
-                    st.warning(f"⚠️ Erro ao gerar dados estruturados: {str(e)}")
+            dados_completos = {
+                "nome": nome,
+                "area": area,
+                "ideia": ideia_curta,
+                "nivel": nivel_detalhamento,
+                "foco": foco_principal,
+                "problema": problema_atual,
+                "recursos": recursos_disponiveis,
+                "prazo": prazo_desejado
+            }
+            
+            try:
+                # Vira uma tarefa em segundo plano: o ID volta na hora e o processamento
+                # continua mesmo se a aba for fechada
+                id_tarefa, _ = enviar_submissao(dados_completos)
+                st.session_state["tarefa_envio"] = id_tarefa
+                st.query_params["tarefa"] = id_tarefa
+            except Exception as e:
+                st.error(f"⚠️ Erro ao processar: {str(e)}")
+                st.info("🔧 Nossa equipe foi notificada. Tente novamente em alguns minutos.")
+
+# Acompanhamento do envio (também ao reabrir a página pelo link com ?tarefa=<id>)
+id_tarefa = st.session_state.get("tarefa_envio") or st.query_params.get("tarefa")
+if id_tarefa:
+    status = consultar_submissao(id_tarefa)
+    
+    if status is None:
+        st.warning(f"⚠️ Proposta {id_tarefa} não encontrada. Se o envio foi há muito tempo, confira com a liderança.")
+    elif status["estado"] in ("na_fila", "executando"):
+        if status["estado"] == "na_fila":
+            st.info(f"⏳ Proposta **{id_tarefa}** na fila (posição {status['posicao']})...")
+        else:
+            st.info(f"🚀 Estruturando a proposta **{id_tarefa}** com análise inteligente...")
+        st.caption("Pode fechar esta página: o processamento continua e o resultado fica disponível por este mesmo link.")
+        
+        # Consulta de novo em instantes
+        time.sleep(INTERVALO_CONSULTA)
+        st.rerun()
+    elif status["estado"] == "falhou":
+        st.error(f"⚠️ Erro ao processar: {status['erro']}")
+        st.info("🔧 Nossa equipe foi notificada. Tente novamente em alguns minutos.")
+        # O que já ficou pronto (tipo, análise, proposta) não é refeito: retoma do estágio que falhou
+        if st.button("🔁 Tentar novamente", type="primary"):
+            if retomar_submissao(id_tarefa) is None:
+                st.warning("Não há dados guardados deste envio; preencha o formulário e envie de novo.")
+            else:
+                st.rerun()
+    else:
+        resultado, compartilhado = status["resultado"]
+        dados_completos = resultado["dados"]
+        proposta_completa = resultado["proposta"]
+        json_proposta = resultado["json_proposta"]
+        tipo_projeto = dados_completos["tipo_projeto"]
+        
+        if compartilhado:
+            st.info("🔁 Esta mesma proposta já estava sendo processada - reaproveitamos o resultado sem enviar outro email.")
+        
+        if dados_completos.get("proposta_provisoria"):
+            st.warning("🧩 **Versão provisória:** a IA estava indisponível, então montamos a estrutura básica da sua proposta. A versão completa será gerada e enviada automaticamente assim que o serviço voltar.")
+        
+        # Mostra apenas tipo de projeto (sem NPS)
+        st.info(f"🔍 **Projeto {tipo_projeto}** detectado e estruturado!")
+        
+        if json_proposta:
+            st.success("📄 Proposta estruturada e dados organizados!")
+            
+            # Mostra métricas básicas (sem NPS)
+            col_json1, col_json2, col_json3 = st.columns(3)
+            with col_json1:
+                st.metric("🆔 ID", json_proposta['metadata']['id'])
+            with col_json2:
+                st.metric("🔍 Tipo", json_proposta['analise']['tipo_projeto'])
+            with col_json3:
+                st.metric("📈 Complexidade", json_proposta['analise']['complexidade'])
+        else:
+            st.warning("⚠️ Erro ao gerar dados estruturados")
+        
+        # O estágio "persistir" do worker já gravou a proposta no histórico: aqui só exibe o JSON
+        # (cada rerun de ?tarefa=<id> passa por aqui, em qualquer processo)
+        proposta_id = salvar_json_proposta(json_proposta) if json_proposta else None
+        
+        # Feedback de sucesso (sem mencionar NPS)
+        st.markdown('<div class="success-box">', unsafe_allow_html=True)
+        st.markdown("### 🎉 Proposta Enviada com Sucesso!")
+        st.markdown(f"""
+        **{dados_completos['nome']}**, sua ideia foi estruturada e enviada profissionalmente!
+        
+        🔍 **Tipo:** Projeto {tipo_projeto}
+        📧 **Email enviado para:** Liderança Carglass  
+        📋 **Nível:** {dados_completos['nivel']}  
+        🎯 **Foco:** {dados_completos['foco']}  
+        ⏱️ **Processado em:** {time.strftime("%H:%M:%S")}
+        📄 **ID da Proposta:** {proposta_id if proposta_id else "Gerado"}
+        """)
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Animação de sucesso (só na primeira exibição do resultado)
+        if st.session_state.get("tarefa_exibida") != id_tarefa:
+            st.session_state["tarefa_exibida"] = id_tarefa
+            st.balloons()
+        st.success("🎊 **PARABÉNS!** Sua ideia foi transformada em uma proposta executável!")
+        
+        # Próximos passos (sem mencionar NPS)
+        st.subheader("🎯 Próximos Passos")
+        st.info("📋 **Expectativa:** A liderança analisará sua proposta e retornará em breve com feedback")
+        st.markdown("""
+        **O que acontece agora:**
+        - ✅ Sua proposta foi enviada com estrutura completa
+        - 📊 Análise de viabilidade será realizada
+        - 👥 Equipe técnica avaliará implementação
+        - 💬 Feedback será enviado diretamente para você
+        """)
+        
+        # Mostra resumo da proposta
+        with st.expander("📋 Resumo da Proposta Enviada"):
+            st.markdown(proposta_completa[:500] + "...")
+            st.info("💌 **A versão completa foi enviada por email com estrutura detalhada de projeto!**")
+        
+        # Tipo incerto: a proposta também foi gerada no outro template
+        alternativa = dados_completos.get("proposta_alternativa")
+        if alternativa:
+            with st.expander(f"🔀 Versão alternativa: projeto {alternativa['tipo_projeto']}"):
+                st.caption("O tipo da sua ideia ficou incerto, então também estruturamos a proposta como o outro tipo de projeto.")
+                st.markdown(alternativa["proposta_completa"])
+        
+        # Mostra informações técnicas básicas
+        if json_proposta:
+            with st.expander("🔧 Detalhes Técnicos da Análise"):
+                col_analise1, col_analise2 = st.columns(2)
                 
-                try:
-                    # Envia email (com pontuação NPS no título para liderança)
-                    enviar_email_estruturado(dados_completos, proposta_completa, json_proposta)
+                with col_analise1:
+                    st.markdown("**📊 Análise do Projeto:**")
+                    st.write(f"• **Tipo:** {json_proposta['analise']['tipo_projeto']}")
+                    st.write(f"• **Complexidade:** {json_proposta['analise']['complexidade']}")
+                    st.write(f"• **Categoria:** {json_proposta['analise']['categoria_projeto']}")
                     
-                    # Salva no histórico
-                    proposta_id, json_salvo = salvar_historico(dados_completos, proposta_completa)
-                    
-                    # Feedback de sucesso (sem mencionar NPS)
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"### 🎉 Proposta Enviada com Sucesso!")
-                    st.markdown(f"""
-                    **{nome}**, sua ideia foi estruturada e enviada profissionalmente!
-                    
-                    🔍 **Tipo:** Projeto {tipo_projeto}
-                    📧 **Email enviado para:** Liderança Carglass  
-                    📋 **Nível:** {nivel_detalhamento}  
-                    🎯 **Foco:** {foco_principal}  
-                    ⏱️ **Processado em:** {time.strftime("%H:%M:%S")}
-                    📄 **ID da Proposta:** {proposta_id if proposta_id else "Gerado"}
-                    """)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # Animação de sucesso
-                    st.balloons()
-                    st.success("🎊 **PARABÉNS!** Sua ideia foi transformada em uma proposta executável!")
-                    
-                    # Próximos passos (sem mencionar NPS)
-                    st.subheader("🎯 Próximos Passos")
-                    st.info("📋 **Expectativa:** A liderança analisará sua proposta e retornará em breve com feedback")
-                    st.markdown("""
-                    **O que acontece agora:**
-                    - ✅ Sua proposta foi enviada com estrutura completa
-                    - 📊 Análise de viabilidade será realizada
-                    - 👥 Equipe técnica avaliará implementação
-                    - 💬 Feedback será enviado diretamente para você
-                    """)
-                    
-                    # Mostra resumo da proposta
-                    with st.expander("📋 Resumo da Proposta Enviada"):
-                        st.markdown(proposta_completa[:500] + "...")
-                        st.info("💌 **A versão completa foi enviada por email com estrutura detalhada de projeto!**")
-                    
-                    # Mostra informações técnicas básicas
-                    if json_proposta:
-                        with st.expander("🔧 Detalhes Técnicos da Análise"):
-                            col_analise1, col_analise2 = st.columns(2)
-                            
-                            with col_analise1:
-                                st.markdown("**📊 Análise do Projeto:**")
-                                st.write(f"• **Tipo:** {json_proposta['analise']['tipo_projeto']}")
-                                st.write(f"• **Complexidade:** {json_proposta['analise']['complexidade']}")
-                                st.write(f"• **Categoria:** {json_proposta['analise']['categoria_projeto']}")
-                                
-                            with col_analise2:
-                                st.markdown("**⚡ Características:**")
-                                st.write(f"• **Viabilidade:** {json_proposta['analise']['viabilidade_tecnica']}")
-                                st.write(f"• **Impacto:** {json_proposta['analise']['impacto_estimado']}")
-                                st.write(f"• **Prioridade:** {json_proposta['analise']['prioridade_sugerida']}")
-                    
-                    # Motivação para próximas ideias
-                    st.subheader("💡 Continue Inovando!")
-                    st.success("Sua participação é valiosa! Continue enviando ideias - cada contribuição ajuda a Carglass a evoluir.")
-                    
-                except Exception as e:
-                    st.error(f"⚠️ Erro ao processar: {str(e)}")
-                    st.info("🔧 Nossa equipe foi notificada. Tente novamente em alguns minutos.") if pontuacao_nps >= 50 else "warning"
-                    
-                    st.markdown('<div class="success-box">', unsafe_allow_html=True)
-                    st.markdown(f"### {emoji_sucesso} Proposta Enviada com Sucesso!")
-                    st.markdown(f"""
-                    **{nome}**, sua ideia foi estruturada e enviada com foco no NPS!
-                    
-                    📊 **Pontuação NPS:** {pontuacao_nps}/100 ({categoria_nps})
-                    🔍 **Tipo:** Projeto {tipo_projeto}
-                    📧 **Email enviado para:** Liderança Carglass  
-                    📋 **Nível:** {nivel_detalhamento}  
-                    🎯 **Foco:** {foco_principal}  
-                    ⏱️ **Processado em:** {time.strftime("%H:%M:%S")}
-                    📄 **JSON ID:** {proposta_id if proposta_id else "Não gerado"}
-                    """)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                    
-                    # Animação baseada na pontuação
-                    if pontuacao_nps >= 80:
-                        st.balloons()
-                        st.success("🎉 **PARABÉNS!** Sua ideia tem potencial TRANSFORMADOR para o NPS!")
-                    elif pontuacao_nps >= 65:
-                        st.balloons()
-                        st.info("🎊 **MUITO BOM!** Sua ideia pode ter ALTO IMPACTO no NPS!")
-                    elif pontuacao_nps >= 45:
-                        st.info("👏 **BOM TRABALHO!** Sua ideia tem MÉDIO IMPACTO no NPS.")
-                    else:
-                        st.warning("💡 **DICA:** Para maior impacto no NPS, foque mais na experiência direta do cliente.")
+                with col_analise2:
+                    st.markdown("**⚡ Características:**")
+                    st.write(f"• **Viabilidade:** {json_proposta['analise']['viabilidade_tecnica']}")
+                    st.write(f"• **Impacto:** {json_proposta['analise']['impacto_estimado']}")
+                    st.write(f"• **Prioridade:** {json_proposta['analise']['prioridade_sugerida']}")
+        
+        # Motivação para próximas ideias
+        st.subheader("💡 Continue Inovando!")
+        st.success("Sua participação é valiosa! Continue enviando ideias - cada contribuição ajuda a Carglass a evoluir.")
+        
+
 # Seção educativa
 st.divider()
 st.header("🎓 Aprenda sobre Estruturação de Projetos")
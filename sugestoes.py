@@ -0,0 +1,238 @@
+"""Sugestões de ideias parecidas já enviadas, enquanto a pessoa digita (sem chamar a IA)
+
+Índice em memória sobre as ideias do histórico:
+- vocabulário ordenado (busca por prefixo com bisect) para completar a palavra que está sendo
+  digitada;
+- índice invertido palavra → propostas (array de inteiros, em ordem de chegada).
+
+A consulta usa as palavras mais raras do texto (até MAX_TERMOS), com peso IDF, e só as
+ocorrências mais recentes de cada uma (LIMITE_POR_TERMO), então o custo não cresce com o
+histórico. A similaridade é a fração do peso da consulta coberta pela proposta.
+
+O índice acompanha o fim do arquivo quente do histórico (como o índice de triagem): propostas
+gravadas por outros processos entram na consulta seguinte, sem reconstruir nada.
+"""
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from array import array
+
+import numpy as np
+
+from historico import ler_registros
+from registro_proposta import RegistroProposta
+
+# Palavras curtas e muito comuns que não ajudam a achar ideias parecidas
+PALAVRAS_VAZIAS = {
+    "que", "para", "por", "com", "uma", "uns", "umas", "dos", "das", "nos", "nas", "pelo", "pela",
+    "isso", "esse", "essa", "este", "esta", "como", "mais", "muito", "quando", "onde", "seria",
+    "ser", "ter", "tem", "sao", "foi", "vai", "podemos", "poderia", "pode", "fazer", "nossa", "nosso",
+    "tambem", "sobre", "entre", "todo", "toda", "todos", "cada", "sem", "ate", "qual", "quais"
+}
+
+# Termos da consulta considerados (os mais raros) e ocorrências recentes lidas por termo
+MAX_TERMOS = 8
+LIMITE_POR_TERMO = 2000
+
+# Completações da última palavra (incompleta) e o peso delas em relação a uma palavra inteira
+MAX_COMPLETACOES = 3
+PESO_COMPLETACAO = 0.5
+MIN_PREFIXO = 3
+
+
+def _normalizar(texto):
+    # NFKD separa os acentos; o encode em ASCII descarta acentos (e o que não for letra latina)
+    return unicodedata.normalize("NFKD", str(texto or "").lower()).encode("ascii", "ignore").decode("ascii")
+
+
+def extrair_termos(texto):
+    """Palavras normalizadas (sem acento, 3+ letras, sem palavras vazias), na ordem do texto"""
+    return [p for p in re.findall(r"\w+", _normalizar(texto)) if len(p) >= 3 and p not in PALAVRAS_VAZIAS]
+
+
+class IndiceSugestoes:
+    """Ideias do histórico indexadas por palavra e por prefixo"""
+
+    def __init__(self, caminho_historico, tamanho_resumo=140):
+        self.caminho_historico = caminho_historico
+        self.tamanho_resumo = tamanho_resumo
+        self._trava = threading.RLock()
+        self._carregado = False
+        self._posicao = (None, 0)
+
+        # Vocabulário: palavra → id, palavras em ordem alfabética e ocorrências por id
+        self._termos = {}
+        self._ordenados = []
+        self._ocorrencias = []
+
+        # Propostas por posição de chegada
+        self._ids = []
+        self._resumos = []
+        self._areas = []
+        self._datas = []
+        self._status = []
+        self._posicao_id = {}
+
+    def adicionar(self, json_proposta):
+        """Indexa a proposta (o mesmo ID de novo só atualiza o status: o conteúdo é o mesmo)"""
+        with self._trava:
+            self._adicionar(RegistroProposta.de_json(json_proposta))
+
+    def sugerir(self, texto, k=5, minimo=0.3):
+        """Até k propostas parecidas com o texto (similaridade ≥ minimo), da mais parecida para a menos"""
+        if k <= 0:
+            return []
+        with self._trava:
+            self.sincronizar()
+            pesos = self._pesos_consulta(texto)
+            if not pesos:
+                return []
+
+            # Termos mais raros primeiro: são os que distinguem a ideia
+            termos = sorted(pesos, key=lambda t: len(self._ocorrencias[t]))[:MAX_TERMOS]
+            blocos = [np.frombuffer(self._ocorrencias[t], dtype=np.int32)[-LIMITE_POR_TERMO:] for t in termos]
+            posicoes = np.concatenate(blocos)
+            if not len(posicoes):
+                return []
+            valores = np.repeat(np.array([pesos[t] for t in termos], dtype=np.float64), [len(b) for b in blocos])
+            del blocos
+
+            # Cada bloco já vem em ordem crescente: a ordenação estável (timsort) só intercala os blocos
+            ordem = np.argsort(posicoes, kind="stable")
+            posicoes, valores = posicoes[ordem], valores[ordem]
+            novas = np.empty(len(posicoes), dtype=bool)
+            novas[0] = True
+            np.not_equal(posicoes[1:], posicoes[:-1], out=novas[1:])
+            unicas = posicoes[novas]
+            pontuacao = np.add.reduceat(valores, np.flatnonzero(novas)) / sum(pesos[t] for t in termos)
+            melhores = np.argpartition(-pontuacao, k - 1)[:k] if len(pontuacao) > k else np.arange(len(pontuacao))
+            melhores = sorted(melhores, key=lambda i: (-pontuacao[i], -unicas[i]))
+
+            return [self._resumo(int(unicas[i]), float(pontuacao[i])) for i in melhores if pontuacao[i] >= minimo]
+
+    def estatisticas(self):
+        with self._trava:
+            self.sincronizar()
+            return {
+                "propostas": len(self._ids),
+                "vocabulario": len(self._termos),
+                "ocorrencias": sum(len(o) for o in self._ocorrencias)
+            }
+
+    # ── Sincronização com o histórico ────────────────────────────────────────
+
+    def sincronizar(self):
+        """Carrega tudo na primeira vez; depois só as linhas novas do arquivo quente"""
+        with self._trava:
+            if not self._carregado:
+                for registro in ler_registros(self.caminho_historico):
+                    self._adicionar(registro)
+                if os.path.exists(self.caminho_historico):
+                    info = os.stat(self.caminho_historico)
+                    self._posicao = (info.st_ino, info.st_size)
+                self._carregado = True
+                return
+
+            for registro in self._novas_linhas():
+                self._adicionar(registro)
+
+    def _novas_linhas(self):
+        """Propostas acrescentadas desde a última leitura (relê tudo se o arquivo foi substituído)"""
+        if not os.path.exists(self.caminho_historico):
+            return []
+        inode, posicao = self._posicao
+        info = os.stat(self.caminho_historico)
+        if info.st_ino != inode or info.st_size < posicao:
+            posicao = 0
+        if info.st_size == posicao:
+            return []
+
+        with open(self.caminho_historico, "rb") as arquivo:
+            arquivo.seek(posicao)
+            bruto = arquivo.read(info.st_size - posicao)
+        # Só linhas completas; uma gravação pela metade fica para a próxima leitura
+        completo = bruto[:bruto.rfind(b"\n") + 1]
+        self._posicao = (info.st_ino, posicao + len(completo))
+
+        registros = []
+        for linha in completo.decode("utf-8").splitlines():
+            try:
+                registros.append(RegistroProposta.de_json(json.loads(linha)))
+            except (ValueError, AttributeError, TypeError):
+                continue
+        return registros
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _adicionar(self, registro):
+        proposta_id, status, ideia = registro.id, registro.status, registro.ideia
+        if not proposta_id or not isinstance(ideia, str):
+            return
+
+        existente = self._posicao_id.get(proposta_id)
+        if existente is not None:
+            self._status[existente] = status
+            return
+
+        posicao = len(self._ids)
+        self._posicao_id[proposta_id] = posicao
+        self._ids.append(proposta_id)
+        self._resumos.append(" ".join(ideia.split())[:self.tamanho_resumo])
+        self._areas.append(registro.area)
+        self._datas.append(str(registro.timestamp)[:10])
+        self._status.append(status)
+
+        for termo in set(extrair_termos(ideia)):
+            indice = self._termos.get(termo)
+            if indice is None:
+                indice = len(self._ocorrencias)
+                self._termos[termo] = indice
+                self._ocorrencias.append(array("i"))
+                bisect.insort(self._ordenados, termo)
+            self._ocorrencias[indice].append(posicao)
+
+    def _pesos_consulta(self, texto):
+        """{id do termo: peso IDF}; a última palavra, se ainda incompleta, vale pelas completações"""
+        termos = extrair_termos(texto)
+        incompleta = None
+        if termos and texto and texto[-1].isalnum():
+            incompleta = termos.pop()
+            # Palavra que já existe inteira no vocabulário vale com peso cheio (e ainda completa)
+            if incompleta in self._termos:
+                termos.append(incompleta)
+
+        total = len(self._ids) or 1
+        pesos = {}
+        for termo in termos:
+            indice = self._termos.get(termo)
+            if indice is not None:
+                pesos[indice] = math.log(1 + total / len(self._ocorrencias[indice]))
+
+        if incompleta and len(incompleta) >= MIN_PREFIXO:
+            for indice in self._completar(incompleta):
+                pesos.setdefault(indice, PESO_COMPLETACAO * math.log(1 + total / len(self._ocorrencias[indice])))
+        return pesos
+
+    def _completar(self, prefixo, varredura=64):
+        """Ids das palavras mais frequentes que começam com o prefixo (olha no máximo `varredura` palavras)"""
+        inicio = bisect.bisect_left(self._ordenados, prefixo)
+        candidatas = []
+        for termo in self._ordenados[inicio:inicio + varredura]:
+            if not termo.startswith(prefixo):
+                break
+            candidatas.append(self._termos[termo])
+        return sorted(candidatas, key=lambda i: -len(self._ocorrencias[i]))[:MAX_COMPLETACOES]
+
+    def _resumo(self, posicao, similaridade):
+        return {
+            "id": self._ids[posicao],
+            "resumo": self._resumos[posicao],
+            "area": self._areas[posicao],
+            "data": self._datas[posicao],
+            "status": self._status[posicao],
+            "similaridade": round(similaridade, 3)
+        }
@@ -0,0 +1,167 @@
+"""Pool de workers em segundo plano para tarefas longas (ex: envio da proposta), com fila limitada
+
+A tarefa roda numa thread do processo, fora do script do Streamlit: se o navegador fechar ou o
+websocket cair, ela continua e o resultado fica disponível pelo ID para consulta posterior.
+Uma tarefa que precisa esperar (ex: provedor fora do ar) levanta Reagendar: o worker fica livre
+e a tarefa volta para a fila depois do atraso, com o mesmo ID.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import metricas
+
+NA_FILA = "na_fila"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+
+
+class FilaCheia(Exception):
+    """A fila de tarefas atingiu a capacidade"""
+    pass
+
+
+class Reagendar(Exception):
+    """Levantada pela tarefa para rodar de novo daqui a `atraso` segundos (sem ocupar o worker)"""
+
+    def __init__(self, atraso, motivo=""):
+        super().__init__(motivo or f"Reagendada para daqui a {atraso:.0f}s")
+        self.atraso = atraso
+
+
+class PoolTarefas:
+    """Executa funções em N workers; cada tarefa é consultada pelo ID informado na submissão"""
+
+    def __init__(self, nome, trabalhadores=2, capacidade=50, max_retidas=1000):
+        self.nome = nome
+        self.trabalhadores = trabalhadores
+        self.max_retidas = max_retidas
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._trava = threading.Lock()
+        self._tarefas = OrderedDict()
+        self._threads = []
+
+    def submeter(self, id_tarefa, funcao):
+        """Enfileira funcao() sob id_tarefa e devolve (id, nova) sem esperar a execução
+
+        Se já houver uma tarefa com o mesmo ID na fila, executando ou concluída, ela é
+        reaproveitada (nova=False). Levanta FilaCheia se a fila estiver na capacidade.
+        """
+        with self._trava:
+            existente = self._tarefas.get(id_tarefa)
+            if existente and existente["estado"] != FALHOU:
+                return id_tarefa, False
+
+            tarefa = {
+                "id": id_tarefa,
+                "estado": NA_FILA,
+                "criada": time.time(),
+                "iniciada": None,
+                "concluida": None,
+                "resultado": None,
+                "erro": None,
+                "reagendamentos": 0
+            }
+            try:
+                self._fila.put_nowait((tarefa, funcao))
+            except queue.Full:
+                metricas.incrementar("tarefas_recusadas", pool=self.nome)
+                raise FilaCheia(f"Fila '{self.nome}' cheia ({self._fila.maxsize} tarefas aguardando)")
+
+            self._tarefas[id_tarefa] = tarefa
+            self._tarefas.move_to_end(id_tarefa)
+            self._descartar_antigas()
+            self._iniciar_workers()
+
+        metricas.definir("tarefas_fila", self._fila.qsize(), pool=self.nome)
+        return id_tarefa, True
+
+    def status(self, id_tarefa):
+        """Cópia do estado da tarefa (com posição na fila quando aguardando) ou None"""
+        with self._trava:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None:
+                return None
+            copia = dict(tarefa)
+            if tarefa["estado"] == NA_FILA:
+                copia["posicao"] = sum(
+                    1 for t in self._tarefas.values() if t["estado"] == NA_FILA and t["criada"] <= tarefa["criada"]
+                )
+            return copia
+
+    def estatisticas(self):
+        """Tarefas por estado e configuração do pool, para o painel admin"""
+        with self._trava:
+            por_estado = {estado: 0 for estado in (NA_FILA, EXECUTANDO, CONCLUIDA, FALHOU)}
+            for tarefa in self._tarefas.values():
+                por_estado[tarefa["estado"]] += 1
+            return dict(por_estado, trabalhadores=self.trabalhadores, capacidade=self._fila.maxsize)
+
+    def _iniciar_workers(self):
+        # Chamado com a trava: os workers só sobem na primeira submissão
+        while len(self._threads) < self.trabalhadores:
+            thread = threading.Thread(
+                target=self._trabalhar, name=f"{self.nome}-{len(self._threads)}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _descartar_antigas(self):
+        # Chamado com a trava: esquece as tarefas terminadas mais antigas além de max_retidas
+        excedentes = len(self._tarefas) - self.max_retidas
+        for id_tarefa in list(self._tarefas):
+            if excedentes <= 0:
+                break
+            if self._tarefas[id_tarefa]["estado"] in (CONCLUIDA, FALHOU):
+                del self._tarefas[id_tarefa]
+                excedentes -= 1
+
+    def _trabalhar(self):
+        while True:
+            tarefa, funcao = self._fila.get()
+            with self._trava:
+                tarefa["estado"] = EXECUTANDO
+                tarefa["iniciada"] = time.time()
+            metricas.definir("tarefas_fila", self._fila.qsize(), pool=self.nome)
+            metricas.observar("tarefas_espera_s", tarefa["iniciada"] - tarefa["criada"], pool=self.nome)
+
+            try:
+                resultado = funcao()
+                estado, erro = CONCLUIDA, None
+            except Reagendar as e:
+                self._reagendar(tarefa, funcao, e)
+                self._fila.task_done()
+                continue
+            except Exception as e:
+                resultado, estado, erro = None, FALHOU, str(e)
+
+            with self._trava:
+                tarefa["resultado"] = resultado
+                tarefa["erro"] = erro
+                tarefa["concluida"] = time.time()
+                tarefa["estado"] = estado
+            metricas.incrementar("tarefas_finalizadas", pool=self.nome, estado=estado)
+            metricas.observar("tarefas_duracao_s", tarefa["concluida"] - tarefa["iniciada"], pool=self.nome)
+            self._fila.task_done()
+
+    def _reagendar(self, tarefa, funcao, pedido):
+        with self._trava:
+            tarefa["estado"] = NA_FILA
+            tarefa["erro"] = str(pedido)
+            tarefa["reagendamentos"] += 1
+        metricas.incrementar("tarefas_reagendadas", pool=self.nome)
+        temporizador = threading.Timer(pedido.atraso, self._reenfileirar, (tarefa, funcao))
+        temporizador.daemon = True
+        temporizador.start()
+
+    def _reenfileirar(self, tarefa, funcao):
+        try:
+            self._fila.put_nowait((tarefa, funcao))
+        except queue.Full:
+            metricas.incrementar("tarefas_recusadas", pool=self.nome)
+            with self._trava:
+                tarefa["estado"] = FALHOU
+                tarefa["erro"] = f"Fila '{self.nome}' cheia ao reagendar"
+                tarefa["concluida"] = time.time()
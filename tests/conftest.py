@@ -0,0 +1,15 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+# Os módulos ficam na raiz do projeto; utils cria o cliente da OpenAI na importação
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-teste")
+
+# Histórico, modelo local, rastros e diário derivam de HISTORICO_ARQUIVO: num diretório
+# temporário, os testes nunca tocam nos dados do projeto
+_DIRETORIO_DADOS = tempfile.mkdtemp(prefix="mindglass-testes-")
+atexit.register(shutil.rmtree, _DIRETORIO_DADOS, ignore_errors=True)
+os.environ["HISTORICO_ARQUIVO"] = os.path.join(_DIRETORIO_DADOS, "historico_propostas.jsonl")
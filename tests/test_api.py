@@ -0,0 +1,93 @@
+import importlib
+
+import pytest
+from starlette.testclient import TestClient
+
+from tarefas import CONCLUIDA, FALHOU, NA_FILA
+
+FORMULARIO = {"nome": "Ana", "area": "Atendimento",
+              "ideia": "Portal para o cliente acompanhar o reparo do vidro em tempo real"}
+
+
+def carregar(monkeypatch, token):
+    if token is None:
+        monkeypatch.delenv("API_TOKEN", raising=False)
+    else:
+        monkeypatch.setenv("API_TOKEN", token)
+    import api
+    return importlib.reload(api)
+
+
+def test_sem_api_token_todas_as_rotas_recusam(monkeypatch):
+    cliente = TestClient(carregar(monkeypatch, None).app)
+    assert cliente.get("/v1/saude").status_code == 503
+    resposta = cliente.post("/v1/validar", json=FORMULARIO, headers={"Authorization": "Bearer "})
+    assert resposta.status_code == 503
+    assert "API_TOKEN" in resposta.json()["erro"]
+
+
+def test_token_obrigatorio(monkeypatch):
+    cliente = TestClient(carregar(monkeypatch, "segredo").app)
+    assert cliente.get("/v1/saude").status_code == 401
+    assert cliente.get("/v1/saude", headers={"Authorization": "Bearer outro"}).status_code == 401
+    assert cliente.get("/v1/saude", headers={"Authorization": "Bearer segredo"}).status_code == 200
+
+
+@pytest.mark.parametrize("rota", ["/v1/triagem", "/v1/preview"])
+def test_erro_ao_montar_o_json_vira_500_sem_streamlit(monkeypatch, rota):
+    api = carregar(monkeypatch, "segredo")
+    utils = api.utils
+
+    def pipeline(dados, alvos):
+        dados.update(tipo_projeto="PROCESSO", pontuacao_nps=70, proposta_preview="")
+        return dados
+
+    def quebrar(texto):
+        raise RuntimeError("estrutura inválida")
+
+    def interface(*args, **kwargs):
+        pytest.fail("a API não pode chamar a interface do Streamlit")
+
+    monkeypatch.setattr(utils, "executar_pipeline", pipeline)
+    monkeypatch.setattr(utils, "extrair_estrutura_proposta", quebrar)
+    monkeypatch.setattr(utils.st, "error", interface)
+    resposta = TestClient(api.app).post(rota, json=FORMULARIO, headers={"Authorization": "Bearer segredo"})
+    assert resposta.status_code == 500
+    assert "estrutura inválida" in resposta.json()["erro"]
+
+
+def test_triagem_devolve_prazo_de_resposta(monkeypatch):
+    api = carregar(monkeypatch, "segredo")
+
+    def pipeline(dados, alvos):
+        dados.update(tipo_projeto="PROCESSO", pontuacao_nps=85)
+        return dados
+
+    monkeypatch.setattr(api.utils, "executar_pipeline", pipeline)
+    resposta = TestClient(api.app).post("/v1/triagem", json=FORMULARIO, headers={"Authorization": "Bearer segredo"})
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["metadata"]["status"] == "triagem"
+    assert "saida" not in corpo
+    assert corpo["proximos_passos"]["prazo_resposta"] == "24 horas"
+    assert corpo["proximos_passos"]["prazo_resposta_horas"] == 24
+
+
+@pytest.mark.parametrize("status,codigo", [
+    ({"estado": CONCLUIDA, "resultado": ({"json_proposta": {"metadata": {"id": "p1"}}}, False)}, 200),
+    ({"estado": CONCLUIDA, "resultado": ({"json_proposta": None}, False)}, 500),
+    ({"estado": FALHOU, "erro": "modelo fora"}, 500),
+    ({"estado": NA_FILA, "posicao": 3}, 202),
+    (None, 404),
+])
+def test_consultar_proposta(monkeypatch, status, codigo):
+    api = carregar(monkeypatch, "segredo")
+    monkeypatch.setattr(api.utils, "consultar_submissao", lambda id_proposta: status)
+    resposta = TestClient(api.app).get("/v1/propostas/p1", headers={"Authorization": "Bearer segredo"})
+    assert resposta.status_code == codigo
+    corpo = resposta.json()
+    assert corpo is not None
+    if codigo == 200:
+        assert corpo == {"metadata": {"id": "p1"}}
+    elif codigo == 500:
+        assert corpo["estado"] == FALHOU and corpo["erro"]
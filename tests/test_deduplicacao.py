@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import deduplicacao
+import metricas
+from deduplicacao import executar_uma_vez, gerar_id_conteudo
+
+FORMULARIO = {"nome": "Ana", "area": "Atendimento", "ideia": "Portal para o cliente acompanhar o reparo",
+              "nivel": "Intermediário", "foco": "Transparência", "problema": "", "recursos": "", "prazo": ""}
+
+
+@pytest.fixture(autouse=True)
+def estado_limpo(monkeypatch):
+    monkeypatch.setattr(deduplicacao, "_em_andamento", {})
+    monkeypatch.setattr(deduplicacao, "_concluidas", {})
+
+
+def esperar(condicao, limite=5):
+    fim = time.monotonic() + limite
+    while not condicao():
+        assert time.monotonic() < fim
+        time.sleep(0.001)
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def monotonic(self):
+        return self.agora
+
+
+def test_mesmo_conteudo_normalizado_da_o_mesmo_id():
+    variacao = dict(FORMULARIO, nome="  ANA ", ideia="Portal  para o CLIENTE\nacompanhar o reparo",
+                    nivel="Intermediário")
+    assert gerar_id_conteudo(variacao) == gerar_id_conteudo(FORMULARIO)
+    assert len(gerar_id_conteudo(FORMULARIO)) == 12
+    # Campos fora da submissão não contam; campos ausentes valem como vazios
+    assert gerar_id_conteudo(dict(FORMULARIO, id_sessao="x")) == gerar_id_conteudo(FORMULARIO)
+    assert gerar_id_conteudo({k: v for k, v in FORMULARIO.items() if v}) == gerar_id_conteudo(FORMULARIO)
+
+
+def test_conteudo_diferente_da_outro_id():
+    assert gerar_id_conteudo(dict(FORMULARIO, ideia="Outra ideia")) != gerar_id_conteudo(FORMULARIO)
+    assert gerar_id_conteudo(dict(FORMULARIO, area="TI")) != gerar_id_conteudo(FORMULARIO)
+
+
+def test_chamadas_simultaneas_compartilham_uma_execucao():
+    liberar, execucoes = threading.Event(), []
+
+    def lenta():
+        execucoes.append(1)
+        liberar.wait(5)
+        return "proposta"
+
+    with ThreadPoolExecutor(6) as executor:
+        futuros = [executor.submit(executar_uma_vez, "chave", lenta) for _ in range(6)]
+        esperar(lambda: execucoes)
+        liberar.set()
+        resultados = [f.result(5) for f in futuros]
+
+    assert execucoes == [1]
+    assert all(resultado == "proposta" for resultado, _ in resultados)
+    assert sorted(compartilhado for _, compartilhado in resultados) == [False] + [True] * 5
+    assert deduplicacao._em_andamento == {}
+
+
+def test_erro_libera_a_chave_e_chega_a_quem_esperava():
+    liberar = threading.Event()
+
+    def falha():
+        liberar.wait(5)
+        raise RuntimeError("modelo fora")
+
+    with ThreadPoolExecutor(2) as executor:
+        lider = executor.submit(executar_uma_vez, "chave", falha)
+        esperar(lambda: "chave" in deduplicacao._em_andamento)
+        coalescidas = metricas.valor_contador("submissoes_coalescidas", origem="em_andamento")
+        seguidor = executor.submit(executar_uma_vez, "chave", lambda: "não executa")
+        # O seguidor já está esperando o futuro do líder
+        esperar(lambda: metricas.valor_contador("submissoes_coalescidas", origem="em_andamento") > coalescidas)
+        liberar.set()
+        with pytest.raises(RuntimeError, match="modelo fora"):
+            lider.result(5)
+        with pytest.raises(RuntimeError, match="modelo fora"):
+            seguidor.result(5)
+
+    assert deduplicacao._em_andamento == {} and deduplicacao._concluidas == {}
+    assert executar_uma_vez("chave", lambda: "nova tentativa") == ("nova tentativa", False)
+
+
+def test_resultado_vale_ate_o_ttl(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(deduplicacao.time, "monotonic", relogio.monotonic)
+
+    assert executar_uma_vez("a", lambda: 1) == (1, False)
+    relogio.agora += deduplicacao.TTL_RESULTADO
+    assert executar_uma_vez("a", lambda: 2) == (1, True)
+
+    relogio.agora += 1
+    assert executar_uma_vez("a", lambda: 3) == (3, False)
+
+
+def test_vencidos_saem_na_proxima_chamada(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(deduplicacao.time, "monotonic", relogio.monotonic)
+
+    executar_uma_vez("a", lambda: 1)
+    relogio.agora += 10
+    executar_uma_vez("b", lambda: 2)
+    relogio.agora += deduplicacao.TTL_RESULTADO - 5
+    # Sem chamadas, nada é limpo
+    assert list(deduplicacao._concluidas) == ["a", "b"]
+
+    executar_uma_vez("c", lambda: 3)
+    assert list(deduplicacao._concluidas) == ["b", "c"]
@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from roteamento import Roteador
+
+DADOS = {"nome": "Ana", "area": "Atendimento", "ideia": "Aplicativo para o cliente acompanhar o reparo do vidro",
+         "foco": "Experiência do cliente", "problema": "Muitas ligações ao SAC", "recursos": "", "prazo": "",
+         "nivel": "Intermediário"}
+
+
+@pytest.fixture
+def utils_prazo(monkeypatch):
+    """utils sem latências observadas (vale o TEMPO_MINIMO_ESTAGIO) e sem modelo local"""
+    import utils
+
+    monkeypatch.setattr(utils, "roteador_modelos", Roteador({"rapido": "mini", "padrao": "grande"}, {}, {}))
+    monkeypatch.setattr(utils, "MODELO_LOCAL_ATIVO", False)
+    return utils
+
+
+def com_prazo(segundos, **extras):
+    return dict(DADOS, limite_envio=time.monotonic() + segundos, **extras)
+
+
+def test_cabe_no_prazo(utils_prazo):
+    utils = utils_prazo
+    assert utils.cabe_no_prazo("proposta", dict(DADOS))
+    assert utils.cabe_no_prazo("proposta", com_prazo(60))
+    assert not utils.cabe_no_prazo("proposta", com_prazo(10))
+    assert utils.cabe_no_prazo("preview", com_prazo(10))
+    assert not utils.cabe_no_prazo("email", com_prazo(-1))
+
+
+def test_p95_observado_acima_do_minimo_vale_no_prazo(utils_prazo):
+    utils = utils_prazo
+    for _ in range(10):
+        utils.roteador_modelos.registrar("tipo", "mini", 4.0)
+    assert utils.tempo_necessario("tipo") == 4.0
+    assert not utils.cabe_no_prazo("tipo", com_prazo(3))
+
+
+def test_tipo_sem_prazo_vai_para_a_heuristica(utils_prazo):
+    utils = utils_prazo
+    dados = com_prazo(0.5)
+    assert utils.detectar_tipo_projeto(dados["ideia"], dados["area"], dados) == utils.tipo_heuristico(dados["ideia"])
+    assert dados["modelos_estagio"]["tipo"] == "heuristica"
+    assert dados["degradacao"] == {"tipo": "heuristica"}
+    assert dados["confianca_tipo"] == utils.CONFIANCA_TIPO_HEURISTICA
+
+
+def test_nps_sem_prazo_vai_para_a_heuristica(utils_prazo):
+    utils = utils_prazo
+    dados = com_prazo(1)
+    resultado = utils.calcular_pontuacao_nps(dados["ideia"], dados["area"], dados["foco"], dados)
+    assert resultado == utils.nps_heuristico(dados["ideia"])
+    assert dados["modelos_estagio"]["nps"] == "heuristica"
+    assert dados["degradacao"] == {"nps": "heuristica"}
+
+
+def test_falha_que_nao_e_prazo_nao_conta_como_degradacao(utils_prazo, monkeypatch):
+    utils = utils_prazo
+
+    def fora(*args, **kwargs):
+        raise utils.CircuitoAberto("fora")
+
+    monkeypatch.setattr(utils, "chamar_modelo", fora)
+    dados = dict(DADOS)
+    utils.detectar_tipo_projeto(dados["ideia"], dados["area"], dados)
+    assert dados["modelos_estagio"]["tipo"] == "heuristica"
+    assert "degradacao" not in dados
+
+
+def test_proposta_sem_tempo_sai_no_tamanho_do_preview(utils_prazo, monkeypatch):
+    utils = utils_prazo
+    chamadas = []
+
+    def chamar_modelo(estagio, messages, temperature, max_tokens, dados=None, ao_receber=None):
+        chamadas.append((estagio, max_tokens))
+        return utils.RespostaModelo("## 📋 **RESUMO EXECUTIVO**\nPortal de acompanhamento.", "stop", "mini", None)
+
+    monkeypatch.setattr(utils, "chamar_modelo", chamar_modelo)
+    dados = com_prazo(10, tipo_projeto="TECNOLÓGICO", pontuacao_nps=72, justificativa_nps="Menos ligações")
+    proposta = utils.estruturar_ideia_avancada(dados)
+    assert proposta.startswith("## 📋")
+    assert chamadas == [("preview", 800)]
+    assert dados["degradacao"] == {"proposta": "preview"}
+    assert dados["proposta_provisoria"] is True
+
+
+def test_email_sem_tempo_vai_para_a_fila(utils_prazo, monkeypatch):
+    utils = utils_prazo
+    agendados = []
+    monkeypatch.setattr(utils, "agendar_email", lambda dados, proposta, json_proposta: agendados.append(json_proposta))
+    monkeypatch.setattr(utils, "enviar_email_estruturado", lambda *args: pytest.fail("email enviado na hora"))
+
+    dados = com_prazo(1, tipo_projeto="PROCESSO", pontuacao_nps=50, proposta="Proposta", id_proposta="p1")
+    dados["json_proposta"] = utils.montar_json_proposta(dados, "Proposta")
+    assert utils._estagio_email(dados) == {"email": "fila"}
+    assert agendados == [dados["json_proposta"]]
+    assert dados["json_proposta"]["metadata"]["degradacao"] == {"email": "fila"}
+
+
+def test_envio_sem_prazo_grava_a_degradacao_no_json(utils_prazo, monkeypatch):
+    utils = utils_prazo
+    gravados, agendados = [], []
+    monkeypatch.setattr(utils, "registrar_proposta", lambda json_proposta, caminho, substituir=False: gravados.append(json_proposta))
+    monkeypatch.setattr(utils, "agendar_email", lambda dados, proposta, json_proposta: agendados.append(json_proposta))
+    monkeypatch.setattr(utils, "agendar_enriquecimento", lambda dados: None)
+
+    # Sem tempo para nenhum estágio do modelo: tudo sai local e o email vai para a fila
+    dados = com_prazo(0.5)
+    dados["id_proposta"] = utils.gerar_id_conteudo(dados)
+    utils.executar_pipeline(dados, utils.ALVOS_ENVIO)
+
+    json_proposta = gravados[0]
+    assert agendados == [json_proposta]
+    assert json_proposta["metadata"]["degradacao"] == {
+        "tipo": "heuristica", "nps": "heuristica", "proposta": "esqueleto", "email": "fila"
+    }
+    assert json_proposta["metadata"]["modelos_estagio"]["proposta"] == "esqueleto"
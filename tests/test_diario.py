@@ -0,0 +1,151 @@
+import os
+import time
+
+import pytest
+
+from deduplicacao import gerar_id_conteudo
+from diario import DiarioEstagios
+from pipeline import Estagio, Grafo
+
+FORMULARIO = {"nome": "Ana", "area": "Atendimento", "ideia": "Portal de acompanhamento do serviço",
+              "nivel": "", "foco": "", "problema": "", "recursos": "", "prazo": ""}
+
+
+@pytest.fixture
+def diario(tmp_path):
+    return DiarioEstagios(str(tmp_path / "diario"), estagios=("tipo", "nps", "proposta"),
+                          extras={"tipo": ("confianca_tipo",)}, contar_tokens=lambda dados, estagio: 100)
+
+
+def test_grava_entrada_e_estagios(diario):
+    dados = dict(FORMULARIO, confianca_tipo=0.9, modelos_estagio={"tipo": "gpt-4o-mini"})
+    diario.gravar(dados, "tipo", {"tipo_projeto": "PROCESSO"})
+    diario.gravar(dados, "nps", {"pontuacao_nps": 70})
+    chave = gerar_id_conteudo(dados)
+    linhas = diario.ler(chave)
+    assert [linha["estagio"] for linha in linhas] == ["_entrada", "tipo", "nps"]
+    assert diario.entrada(chave) == FORMULARIO
+    assert linhas[1]["extras"] == {"confianca_tipo": 0.9}
+    assert linhas[1]["modelos"] == {"tipo": "gpt-4o-mini"}
+
+
+def test_estagio_fora_do_diario_nao_e_gravado(diario):
+    diario.gravar(dict(FORMULARIO), "email", {"email": True})
+    assert diario.ler(gerar_id_conteudo(FORMULARIO)) == []
+    assert diario.entrada(gerar_id_conteudo(FORMULARIO)) is None
+
+
+def test_restaurar_preenche_so_o_que_falta(diario):
+    anterior = dict(FORMULARIO, confianca_tipo=0.8, modelos_estagio={"tipo": "gpt-4o-mini"})
+    diario.gravar(anterior, "tipo", {"tipo_projeto": "TECNOLÓGICO"})
+    diario.gravar(anterior, "nps", {"pontuacao_nps": 85})
+
+    dados = dict(FORMULARIO, pontuacao_nps=60)
+    assert diario.restaurar(dados) == ["tipo"]
+    assert dados["tipo_projeto"] == "TECNOLÓGICO"
+    assert dados["confianca_tipo"] == 0.8
+    assert dados["pontuacao_nps"] == 60
+    assert dados["modelos_estagio"] == {"tipo": "gpt-4o-mini"}
+    assert dados["estagios_retomados"] == ["tipo"]
+
+
+def test_linha_incompleta_e_ignorada(diario):
+    diario.gravar(dict(FORMULARIO), "tipo", {"tipo_projeto": "PROCESSO"})
+    chave = gerar_id_conteudo(FORMULARIO)
+    with open(diario.caminho(chave), "a", encoding="utf-8") as arquivo:
+        arquivo.write('{"estagio": "nps", "saidas": {"pontuacao_')
+    assert [linha["estagio"] for linha in diario.ler(chave)] == ["_entrada", "tipo"]
+
+
+def test_descartar_e_expirar(diario):
+    diario.gravar(dict(FORMULARIO), "tipo", {"tipo_projeto": "PROCESSO"})
+    outro = dict(FORMULARIO, ideia="Outra ideia")
+    diario.gravar(outro, "tipo", {"tipo_projeto": "PROCESSO"})
+
+    diario.descartar(gerar_id_conteudo(FORMULARIO))
+    diario.descartar(gerar_id_conteudo(FORMULARIO))
+    assert diario.entrada(gerar_id_conteudo(FORMULARIO)) is None
+
+    assert diario.limpar_expirados(time.time()) == 0
+    assert diario.limpar_expirados(time.time() + diario.ttl + 1) == 1
+    assert os.listdir(diario.diretorio) == []
+
+
+def test_retomada_pelo_grafo_pula_estagios_concluidos(diario):
+    chamadas = []
+
+    def estagio(nome, saidas):
+        def funcao(contexto):
+            chamadas.append(nome)
+            if nome == "proposta" and len(chamadas) < 4:
+                raise RuntimeError("falhou no meio")
+            return saidas
+        return funcao
+
+    grafo = Grafo([
+        Estagio("tipo", estagio("tipo", {"tipo_projeto": "PROCESSO"}), ["ideia"], ["tipo_projeto"]),
+        Estagio("nps", estagio("nps", {"pontuacao_nps": 70}), ["ideia"], ["pontuacao_nps"]),
+        Estagio("proposta", estagio("proposta", {"proposta": "texto"}), ["tipo_projeto", "pontuacao_nps"], ["proposta"]),
+    ], diario=diario)
+
+    with pytest.raises(RuntimeError):
+        grafo.executar(dict(FORMULARIO), ["proposta"])
+    assert sorted(chamadas) == ["nps", "proposta", "tipo"]
+
+    dados = dict(FORMULARIO)
+    assert sorted(diario.restaurar(dados)) == ["nps", "tipo"]
+    grafo.executar(dados, ["proposta"])
+    assert chamadas[3:] == ["proposta"]
+    assert dados["proposta"] == "texto"
+
+
+# ── utils.executar_pipeline: só o envio usa o diário ─────────────────────────
+
+@pytest.fixture
+def grafo_utils(diario, tmp_path, monkeypatch):
+    import utils
+
+    def estagio(saidas):
+        return lambda contexto: saidas
+
+    grafo = Grafo([
+        Estagio("tipo", estagio({"tipo_projeto": "PROCESSO"}), ["ideia"], ["tipo_projeto"]),
+        Estagio("nps", estagio({"pontuacao_nps": 70}), ["ideia"], ["pontuacao_nps"]),
+        Estagio("preview", estagio({"proposta_preview": "resumo"}), ["tipo_projeto", "pontuacao_nps"],
+                ["proposta_preview"]),
+        Estagio("email", estagio({"email": True}), ["tipo_projeto", "pontuacao_nps"], ["email"]),
+        Estagio("persistir", estagio({"persistida": True}), ["email"], ["persistida"]),
+    ], diario=diario)
+    monkeypatch.setattr(utils, "grafo_submissao", grafo)
+    monkeypatch.setattr(utils, "diario_estagios", diario)
+    monkeypatch.setattr(utils, "ARQUIVO_HISTORICO", str(tmp_path / "propostas.jsonl"))
+    return utils
+
+
+def test_preview_nao_grava_no_diario(grafo_utils, diario):
+    utils = grafo_utils
+    dados = dict(FORMULARIO, prioridade="preview")
+    utils.executar_pipeline(dados, utils.ALVOS_PREVIEW)
+    assert dados["proposta_preview"] == "resumo"
+    assert not os.path.exists(diario.diretorio) or os.listdir(diario.diretorio) == []
+    assert utils.consultar_submissao(gerar_id_conteudo(FORMULARIO)) is None
+
+
+def test_triagem_nao_restaura_do_diario(grafo_utils, diario):
+    utils = grafo_utils
+    diario.gravar(dict(FORMULARIO), "tipo", {"tipo_projeto": "TECNOLÓGICO"})
+    dados = dict(FORMULARIO)
+    utils.executar_pipeline(dados, utils.ALVOS_TRIAGEM)
+    assert dados["tipo_projeto"] == "PROCESSO"
+    assert "estagios_retomados" not in dados
+
+
+def test_envio_restaura_e_grava_no_diario(grafo_utils, diario):
+    utils = grafo_utils
+    diario.gravar(dict(FORMULARIO), "tipo", {"tipo_projeto": "TECNOLÓGICO"})
+    dados = dict(FORMULARIO)
+    utils.executar_pipeline(dados, utils.ALVOS_ENVIO)
+    assert dados["tipo_projeto"] == "TECNOLÓGICO"
+    assert dados["estagios_retomados"] == ["tipo"]
+    estagios = [linha["estagio"] for linha in diario.ler(gerar_id_conteudo(FORMULARIO))]
+    assert estagios == ["_entrada", "tipo", "nps"]
@@ -0,0 +1,330 @@
+import gzip
+import json
+import smtplib
+from datetime import datetime
+from email import message_from_bytes, policy
+
+import pytest
+import yagmail
+
+import metricas
+import renderizador_email
+from registro_proposta import RegistroProposta, calcular_potencial_melhoria, classificar_categoria_nps
+from renderizador_email import montar_email_compacto, renderizar_corpo
+
+INSTANTE = datetime(2025, 3, 14, 9, 26)
+DADOS = {"nome": "Ana", "area": "Atendimento - SAC", "ideia": "Portal para o cliente acompanhar o reparo do vidro",
+         "foco": "Transparência", "nivel": "Completo", "justificativa_nps": "Menos ligações ao SAC"}
+PROPOSTA = "## 📋 **2. RESUMO EXECUTIVO**\nPortal de acompanhamento.\n"
+
+
+class _Relogio(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return INSTANTE
+
+
+@pytest.fixture(autouse=True)
+def relogio_fixo(monkeypatch):
+    monkeypatch.setattr(renderizador_email, "datetime", _Relogio)
+
+
+def corpo_antigo(dados, proposta, json_proposta=None):
+    """Corpo montado pela f-string de antes dos templates pré-compilados (copiada sem alterações)"""
+    nome = dados["nome"]
+    area = dados["area"]
+    pontuacao_nps = dados.get("pontuacao_nps", 50)
+    justificativa_nps = dados.get("justificativa_nps", "")
+    tipo_projeto = dados.get("tipo_projeto", "TECNOLÓGICO")
+    categoria_nps = classificar_categoria_nps(pontuacao_nps)
+    emoji_nps = "🚀" if pontuacao_nps >= 80 else "📈" if pontuacao_nps >= 60 else "📊" if pontuacao_nps >= 40 else "⚡"
+
+    return f"""
+═══════════════════════════════════════════════════════════════
+{emoji_nps} PROPOSTA COM IMPACTO NO NPS - MINDGLASS V2
+═══════════════════════════════════════════════════════════════
+
+📊 PONTUAÇÃO NPS: {pontuacao_nps}/100 pontos
+🎯 CATEGORIA: {categoria_nps}
+📋 TIPO DE PROJETO: {tipo_projeto}
+💡 JUSTIFICATIVA: {justificativa_nps}
+
+═══════════════════════════════════════════════════════════════
+📋 METADADOS DO PROJETO:
+═══════════════════════════════════════════════════════════════
+
+• Autor: {nome}
+• Área: {area}
+• Data: {INSTANTE.strftime("%d/%m/%Y às %H:%M")}
+• Tipo: {tipo_projeto}
+• Nível: {dados.get('nivel', 'Intermediário')}
+• Foco: {dados.get('foco', 'Não especificado')}
+
+{f"🆔 ID da Proposta: {json_proposta['metadata']['id']}" if json_proposta else ""}
+{f"📈 Potencial de Melhoria: {json_proposta['nps_analysis']['potencial_melhoria']}" if json_proposta else ""}
+{f"🎯 Áreas de Impacto: {', '.join(json_proposta['nps_analysis']['areas_impacto'])}" if json_proposta else ""}
+
+═══════════════════════════════════════════════════════════════
+📝 IDEIA ORIGINAL (INPUT):
+═══════════════════════════════════════════════════════════════
+
+"{dados['ideia']}"
+
+═══════════════════════════════════════════════════════════════
+🧠 PROPOSTA ESTRUTURADA (OUTPUT IA):
+═══════════════════════════════════════════════════════════════
+
+{proposta}
+
+═══════════════════════════════════════════════════════════════
+📊 ANÁLISE DE IMPACTO NO NPS - METODOLOGIA CARGLASS
+═══════════════════════════════════════════════════════════════
+
+🎯 **COMO CALCULAMOS O IMPACTO NO NPS:**
+
+A pontuação de 0-100 é calculada com base nos seguintes critérios:
+
+📈 **FAIXAS DE PONTUAÇÃO:**
+• 90-100: TRANSFORMADOR - Revoluciona a experiência do cliente
+• 70-89: ALTO IMPACTO - Melhoria significativa e perceptível
+• 50-69: MÉDIO IMPACTO - Melhoria moderada na experiência
+• 30-49: BAIXO IMPACTO - Benefício indireto para o cliente
+• 0-29: IMPACTO MÍNIMO - Benefício principalmente interno
+
+🎯 **CRITÉRIOS DE AVALIAÇÃO:**
+• Impacto direto na experiência do cliente
+• Melhoria na transparência e comunicação
+• Aumento da conveniência e praticidade
+• Redução do tempo de espera
+• Melhoria na qualidade percebida
+• Facilidade de uso e acessibilidade
+
+💡 **PARA ESTA PROPOSTA ({pontuacao_nps}/100):**
+Justificativa: {justificativa_nps}
+
+🚀 **POTENCIAL DE RESULTADO:**
+{calcular_potencial_melhoria(pontuacao_nps)}
+
+═══════════════════════════════════════════════════════════════
+🎓 LÓGICA DE ESTRUTURAÇÃO - PROJETOS {'TECNOLÓGICOS' if tipo_projeto == 'TECNOLÓGICO' else 'DE PROCESSO'}
+═══════════════════════════════════════════════════════════════
+
+Este projeto foi classificado como **{tipo_projeto}** e estruturado seguindo
+nossa metodologia específica para este tipo de iniciativa.
+
+🔄 **PROCESSO DE ANÁLISE:**
+
+1. **DETECÇÃO DE TIPO**
+   ✓ Análise semântica da ideia
+   ✓ Identificação de palavras-chave
+   ✓ Classificação: Tecnológico vs Processo
+
+2. **AVALIAÇÃO DE NPS**
+   ✓ Análise de impacto no cliente
+   ✓ Pontuação automática 0-100
+   ✓ Justificativa baseada em critérios
+
+3. **ESTRUTURAÇÃO PERSONALIZADA**
+   ✓ Template específico para o tipo
+   ✓ Foco em resultados de NPS
+   ✓ Próximos passos direcionados
+
+{'🏗️ **METODOLOGIA PARA PROJETOS TECNOLÓGICOS:**' if tipo_projeto == 'TECNOLÓGICO' else '📋 **METODOLOGIA PARA PROJETOS DE PROCESSO:**'}
+
+{'• Arquitetura e stack tecnológico' if tipo_projeto == 'TECNOLÓGICO' else '• Mapeamento de processo atual vs proposto'}
+{'• Cronograma de desenvolvimento' if tipo_projeto == 'TECNOLÓGICO' else '• Documentação e procedimentos'}
+{'• Métricas de performance técnica' if tipo_projeto == 'TECNOLÓGICO' else '• Plano de treinamento e implementação'}
+{'• Riscos de integração e segurança' if tipo_projeto == 'TECNOLÓGICO' else '• Gestão de mudança e adesão'}
+{'• DevOps e entrega contínua' if tipo_projeto == 'TECNOLÓGICO' else '• Monitoramento e melhoria contínua'}
+
+═══════════════════════════════════════════════════════════════
+📊 PRÓXIMAS AÇÕES BASEADAS NO NPS:
+═══════════════════════════════════════════════════════════════
+
+{'🚨 **PRIORIDADE CRÍTICA** (NPS 80+)' if pontuacao_nps >= 80 else '⚡ **PRIORIDADE ALTA** (NPS 65-79)' if pontuacao_nps >= 65 else '📈 **PRIORIDADE MÉDIA** (NPS 45-64)' if pontuacao_nps >= 45 else '📋 **PRIORIDADE BAIXA** (NPS <45)'}
+
+1. **ANÁLISE EXECUTIVA** ({'24 horas' if pontuacao_nps >= 80 else '48 horas' if pontuacao_nps >= 65 else '1 semana' if pontuacao_nps >= 45 else '2 semanas'})
+   • Validação de impacto no NPS
+   • Análise de viabilidade
+   • Decisão sobre continuidade
+
+2. **VALIDAÇÃO COM CLIENTES** ({'Imediata' if pontuacao_nps >= 70 else 'Após aprovação interna'})
+   • Teste de conceito com clientes
+   • Validação de premissas
+   • Refinamento da proposta
+
+3. **IMPLEMENTAÇÃO**
+   • Formação de equipe
+   • Definição de cronograma
+   • Início do projeto
+
+═══════════════════════════════════════════════════════════════
+🎯 MÉTRICAS DE ACOMPANHAMENTO DO NPS:
+═══════════════════════════════════════════════════════════════
+
+📊 **MÉTRICAS PRIMÁRIAS:**
+• NPS Score (antes e depois)
+• Taxa de recomendação
+• Satisfação do cliente (CSAT)
+• Tempo de resolução
+
+📈 **MÉTRICAS SECUNDÁRIAS:**
+• Taxa de adoção da solução
+• Redução de reclamações
+• Aumento de avaliações positivas
+• Tempo médio de atendimento
+
+💰 **MÉTRICAS DE NEGÓCIO:**
+• Retenção de clientes
+• Lifetime value (LTV)
+• Custo de aquisição (CAC)
+• Receita por cliente
+
+═══════════════════════════════════════════════════════════════
+🤝 COMO RESPONDER COM FOCO NO NPS:
+═══════════════════════════════════════════════════════════════
+
+✅ **SE APROVAR (NPS {pontuacao_nps}/100):**
+• Confirme o impacto esperado no NPS
+• Defina métricas de acompanhamento
+• Estabeleça cronograma de implementação
+• Designe responsável pelo projeto
+
+🔄 **SE PRECISAR DE AJUSTES:**
+• Especifique como melhorar o impacto no NPS
+• Solicite refinamento via MindGlass
+• Mantenha {nome} informado
+
+❌ **SE REJEITAR:**
+• Explique critérios de NPS não atendidos
+• Sugira alternativas para melhorar pontuação
+• Oriente sobre tipos de projeto com maior impacto
+
+═══════════════════════════════════════════════════════════════
+📞 CONTATOS PARA ACOMPANHAMENTO:
+═══════════════════════════════════════════════════════════════
+
+• **Autor da ideia:** {nome} ({area})
+• **Equipe de CX:** Para validação de impacto no NPS
+• **TI/Processos:** Para implementação {'tecnológica' if tipo_projeto == 'TECNOLÓGICO' else 'de processo'}
+• **Liderança:** Para aprovação e recursos
+
+═══════════════════════════════════════════════════════════════
+
+Este email foi gerado automaticamente pelo MindGlass V2 Enhanced
+Desenvolvido por Vinícius Augusto | Carglass Innovation Lab
+
+💡 Foco total na melhoria do NPS através de {'tecnologia' if tipo_projeto == 'TECNOLÓGICO' else 'processos eficientes'}!
+
+═══════════════════════════════════════════════════════════════
+"""
+
+
+def json_de(dados):
+    return RegistroProposta.de_dados(dados, PROPOSTA, proposta_id="0123456789abcdef").para_json()
+
+
+@pytest.mark.parametrize("tipo", ["TECNOLÓGICO", "PROCESSO"])
+@pytest.mark.parametrize("nps", [95, 82, 70, 61, 50, 41, 20])
+@pytest.mark.parametrize("com_json", [True, False])
+def test_corpo_classico_identico_ao_antigo(tipo, nps, com_json):
+    dados = dict(DADOS, tipo_projeto=tipo, pontuacao_nps=nps)
+    json_proposta = json_de(dados) if com_json else None
+    novo = renderizar_corpo(dados, PROPOSTA, json_proposta, classificar_categoria_nps(nps), calcular_potencial_melhoria(nps))
+    assert novo.encode("utf-8") == corpo_antigo(dados, PROPOSTA, json_proposta).encode("utf-8")
+
+
+def test_email_compacto_multipart_com_anexo():
+    dados = dict(DADOS, tipo_projeto="PROCESSO", pontuacao_nps=82)
+    json_proposta = json_de(dados)
+    mensagem = montar_email_compacto("de@example.com", "para@example.com", "Assunto", dados, PROPOSTA,
+                                     json_proposta, classificar_categoria_nps(82), calcular_potencial_melhoria(82))
+    lida = message_from_bytes(mensagem.as_bytes(), policy=policy.default)
+    assert lida["To"] == "para@example.com" and lida["Subject"] == "Assunto"
+
+    texto = lida.get_body(("plain",)).get_content()
+    html = lida.get_body(("html",)).get_content()
+    assert "82/100" in texto and "82/100" in html
+    assert "proposta-0123456789abcdef.json.gz" in texto
+
+    anexos = list(lida.iter_attachments())
+    assert [a.get_filename() for a in anexos] == ["proposta-0123456789abcdef.json.gz"]
+    assert json.loads(gzip.decompress(anexos[0].get_content())) == json_proposta
+
+
+class _ServidorFalso:
+    """Conexão SMTP que cai nas `quedas` primeiras tentativas de sendmail"""
+
+    def __init__(self, entregues, quedas):
+        self.entregues, self.quedas = entregues, quedas
+
+    def sendmail(self, remetente, destinatarios, conteudo):
+        if self.quedas[0]:
+            self.quedas[0] -= 1
+            raise smtplib.SMTPServerDisconnected("conexão encerrada")
+        self.entregues.append((remetente, destinatarios, conteudo))
+        return {}
+
+
+@pytest.fixture
+def smtp_falso(monkeypatch):
+    """utils com conectar_smtp devolvendo um yagmail.SMTP de verdade sobre um servidor falso"""
+    import utils
+
+    entregues, logins, quedas, observadas = [], [], [0], []
+
+    def conectar():
+        yag = yagmail.SMTP("mindglass@example.com", "senha", host="localhost", port=2525)
+
+        def login():
+            logins.append(1)
+            yag.smtp = _ServidorFalso(entregues, quedas)
+
+        yag.login = login
+        return yag
+
+    monkeypatch.setattr(utils, "conectar_smtp", conectar)
+    monkeypatch.setattr(utils, "EMAIL_ESPERA_RECONEXAO", 0)
+    monkeypatch.setenv("EMAIL_DESTINO", "lideranca@example.com")
+    monkeypatch.setattr(metricas, "observar", lambda metrica, valor, **rotulos: observadas.append((metrica, valor, rotulos)))
+    utils.entregues, utils.logins, utils.quedas, utils.observadas = entregues, logins, quedas, observadas
+    return utils
+
+
+@pytest.mark.parametrize("compacto", ["false", "true"])
+def test_reconecta_quando_o_servidor_derruba_a_conexao(smtp_falso, monkeypatch, compacto):
+    utils = smtp_falso
+    monkeypatch.setenv("EMAIL_COMPACTO", compacto)
+    utils.quedas[0] = 2
+    dados = dict(DADOS, tipo_projeto="TECNOLÓGICO", pontuacao_nps=82)
+    utils.enviar_email_estruturado(dados, PROPOSTA, json_de(dados))
+    assert len(utils.logins) == 3
+    assert len(utils.entregues) == 1
+    assert utils.entregues[0][1] == ["lideranca@example.com"]
+
+
+def test_desiste_depois_das_tentativas(smtp_falso, monkeypatch):
+    utils = smtp_falso
+    monkeypatch.delenv("EMAIL_COMPACTO", raising=False)
+    utils.quedas[0] = utils.EMAIL_TENTATIVAS
+    dados = dict(DADOS, pontuacao_nps=82)
+    with pytest.raises(Exception, match="Erro ao enviar email: conexão encerrada"):
+        utils.enviar_email_estruturado(dados, PROPOSTA)
+    assert len(utils.logins) == utils.EMAIL_TENTATIVAS
+    assert utils.entregues == []
+
+
+@pytest.mark.parametrize("compacto,formato", [("false", "completo"), ("true", "compacto")])
+def test_tamanho_antes_e_depois(smtp_falso, monkeypatch, compacto, formato):
+    utils = smtp_falso
+    monkeypatch.setenv("EMAIL_COMPACTO", compacto)
+    dados = dict(DADOS, tipo_projeto="PROCESSO", pontuacao_nps=82)
+    utils.enviar_email_estruturado(dados, PROPOSTA * 200, json_de(dados))
+    tamanhos = {metrica: (valor, rotulos) for metrica, valor, rotulos in utils.observadas}
+    enviado, classico = tamanhos["email_bytes"], tamanhos["email_bytes_classico"]
+    assert enviado[1] == classico[1] == {"formato": formato}
+    assert enviado[0] == len(utils.entregues[0][2])
+    if compacto == "true":
+        assert enviado[0] < classico[0]
+    else:
+        assert enviado[0] == classico[0]
@@ -0,0 +1,155 @@
+import time
+
+import pytest
+
+from esqueleto import AVISO_PROVISORIO, renderizar_esqueleto
+from secoes import ParserSecoes, secoes_faltando
+from tarefas import CONCLUIDA, FALHOU, NA_FILA, PoolTarefas
+
+DADOS = {"nome": "Ana", "area": "Atendimento", "ideia": "Aplicativo para o cliente acompanhar o reparo do vidro",
+         "foco": "Experiência do cliente", "problema": "Muitas ligações ao SAC", "recursos": "", "prazo": "",
+         "nivel": "Intermediário", "pontuacao_nps": 72, "justificativa_nps": "Menos contatos ao SAC",
+         "confianca_tipo": 1.0}
+ANALISE = {"complexidade": "Média", "categoria": "Mobile", "areas_impacto": ["Transparência", "Agilidade"],
+           "prioridade": "Alta", "palavras_chave": ["aplicativo", "reparo", "vidro"]}
+
+
+def estruturar(texto):
+    parser = ParserSecoes()
+    parser.alimentar(texto)
+    parser.finalizar()
+    return parser.estrutura
+
+
+@pytest.mark.parametrize("tipo", ["TECNOLÓGICO", "PROCESSO"])
+def test_esqueleto_tem_as_secoes_do_template(tipo):
+    texto = renderizar_esqueleto(dict(DADOS, tipo_projeto=tipo), ANALISE)
+    assert texto.startswith(AVISO_PROVISORIO)
+    assert "(72/100)" in texto
+    assert "Problema atual:** Muitas ligações ao SAC" in texto
+    estrutura = estruturar(texto)
+    assert estrutura["resumo"] == DADOS["ideia"]
+    assert estrutura["riscos"]
+    assert estrutura["metricas"]
+    assert estrutura["cronograma"].startswith("Fase 1:")
+
+
+def test_esqueleto_tecnologico_usa_o_stack_da_categoria():
+    estrutura = estruturar(renderizar_esqueleto(dict(DADOS, tipo_projeto="TECNOLÓGICO"), ANALISE))
+    assert estrutura["tecnologias"][0] == "Mobile: React Native ou Flutter"
+    assert "8 semanas" in renderizar_esqueleto(dict(DADOS, tipo_projeto="TECNOLÓGICO"), ANALISE)
+
+
+def test_esqueleto_de_preview_e_curto():
+    texto = renderizar_esqueleto(dict(DADOS, tipo_projeto="PROCESSO"), ANALISE, preview=True)
+    assert texto.startswith(AVISO_PROVISORIO)
+    assert "CRONOGRAMA" not in texto.upper()
+    assert "Prioridade sugerida: Alta" in texto
+
+
+# ── Esqueleto no lugar da proposta e enriquecimento depois ───────────────────
+
+@pytest.fixture
+def utils_isolado(tmp_path, monkeypatch):
+    import utils
+    from resiliencia import Disjuntor
+
+    monkeypatch.setattr(utils, "disjuntor_openai", Disjuntor("teste", limite_falhas=1, tempo_abertura=0.2))
+    monkeypatch.setattr(utils, "pool_enriquecimento", PoolTarefas("enriquecimento-teste", trabalhadores=1))
+    monkeypatch.setattr(utils, "ENRIQUECIMENTO_INTERVALO", 0.05)
+    monkeypatch.setattr(utils, "ENRIQUECIMENTO_TENTATIVAS", 3)
+    gravados, enviados = [], []
+    monkeypatch.setattr(utils, "registrar_proposta", lambda j, caminho, substituir=False: gravados.append(j))
+    monkeypatch.setattr(utils, "enviar_email_estruturado", lambda d, p, j=None: enviados.append(j))
+    utils.gravados, utils.enviados = gravados, enviados
+    return utils
+
+
+def esperar(pool, id_tarefa, limite=5):
+    fim = time.monotonic() + limite
+    while pool.status(id_tarefa)["estado"] not in (CONCLUIDA, FALHOU):
+        assert time.monotonic() < fim
+        time.sleep(0.005)
+    return pool.status(id_tarefa)
+
+
+def test_modelo_fora_gera_esqueleto_provisorio(utils_isolado, monkeypatch):
+    utils = utils_isolado
+
+    def fora(*args, **kwargs):
+        raise utils.CircuitoAberto("fora")
+
+    monkeypatch.setattr(utils, "chamar_modelo", fora)
+    dados = dict(DADOS, tipo_projeto="TECNOLÓGICO", id_proposta="p1")
+    proposta = utils.estruturar_ideia_avancada(dados)
+    assert proposta.startswith(AVISO_PROVISORIO)
+    assert dados["proposta_provisoria"] is True
+    assert dados["modelos_estagio"]["proposta"] == "esqueleto"
+    assert dados["estrutura_proposta"]["resumo"] == DADOS["ideia"]
+    assert secoes_faltando(proposta, "TECNOLÓGICO")
+
+    with pytest.raises(utils.CircuitoAberto):
+        utils.estruturar_ideia_avancada(dict(DADOS, tipo_projeto="TECNOLÓGICO"), permitir_esqueleto=False)
+
+
+def test_enriquecimento_reagenda_as_falhas_e_grava_a_versao_completa(utils_isolado, monkeypatch):
+    utils = utils_isolado
+    chamadas = []
+
+    def gerar(dados, permitir_esqueleto=True):
+        assert permitir_esqueleto is False
+        chamadas.append(time.monotonic())
+        if len(chamadas) < 3:
+            raise RuntimeError("timeout")
+        dados["estrutura_proposta"] = {"resumo": "Completa"}
+        dados["proposta_provisoria"] = False
+        return "## RESUMO EXECUTIVO\nCompleta"
+
+    monkeypatch.setattr(utils, "estruturar_ideia_avancada", gerar)
+    dados = dict(DADOS, tipo_projeto="PROCESSO", id_proposta="p2", proposta_provisoria=True,
+                 modelos_estagio={"proposta": "esqueleto"}, limite_envio=0)
+    utils.agendar_enriquecimento(dados)
+    status = esperar(utils.pool_enriquecimento, "p2")
+
+    assert status["estado"] == CONCLUIDA
+    assert status["reagendamentos"] == 2
+    # Espera dobra a cada tentativa (ENRIQUECIMENTO_INTERVALO * 2 ** tentativa)
+    assert chamadas[1] - chamadas[0] >= 0.05
+    assert chamadas[2] - chamadas[1] >= 0.1
+    assert utils.gravados[0]["metadata"]["status"] == "processado"
+    assert utils.gravados[0]["saida"]["resumo_executivo"] == "Completa"
+    assert len(utils.enviados) == 1
+
+
+def test_enriquecimento_desiste_com_erro_proprio(utils_isolado, monkeypatch):
+    utils = utils_isolado
+
+    def falhar(dados, permitir_esqueleto=True):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(utils, "estruturar_ideia_avancada", falhar)
+    utils.agendar_enriquecimento(dict(DADOS, tipo_projeto="PROCESSO", id_proposta="p3", proposta_provisoria=True))
+    status = esperar(utils.pool_enriquecimento, "p3")
+    assert status["estado"] == FALHOU
+    assert "após 3 tentativas" in status["erro"]
+    assert status["reagendamentos"] == 2
+    assert utils.gravados == []
+
+
+def test_enriquecimento_espera_o_disjuntor_sem_gastar_tentativa(utils_isolado, monkeypatch):
+    utils = utils_isolado
+    utils.disjuntor_openai.registrar_falha()
+    chamadas = []
+
+    def gerar(dados, permitir_esqueleto=True):
+        chamadas.append(utils.disjuntor_openai.estado)
+        return "texto"
+
+    monkeypatch.setattr(utils, "estruturar_ideia_avancada", gerar)
+    utils.agendar_enriquecimento(dict(DADOS, tipo_projeto="PROCESSO", id_proposta="p4", proposta_provisoria=True))
+    time.sleep(0.02)
+    assert utils.pool_enriquecimento.status("p4")["estado"] == NA_FILA
+    status = esperar(utils.pool_enriquecimento, "p4")
+    assert status["estado"] == CONCLUIDA
+    assert status["reagendamentos"] >= 1
+    assert len(chamadas) == 1
@@ -0,0 +1,105 @@
+import csv
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+import exportacao
+from exportacao import Marca, anotar_exportadas, blocos_de_linhas, gravar_marca, ler_marca, nova_marca
+from registro_proposta import RegistroProposta
+
+INICIO = datetime(2025, 1, 1)
+
+
+def proposta(i, minutos, versao=0):
+    dados = {"nome": f"Autor {i}", "area": "Atendimento", "ideia": f"Ideia número {i}", "pontuacao_nps": 50 + versao}
+    return RegistroProposta.de_dados(dados, "", proposta_id=f"p{i}", timestamp=INICIO + timedelta(minutes=minutos))
+
+
+def exportar_incremental(propostas, marca, janela=timedelta(hours=1)):
+    """(ids exportados, nova marca) de uma rodada incremental"""
+    exportadas = set()
+    linhas = [linha for bloco in anotar_exportadas(blocos_de_linhas(propostas, marca, 2, janela), exportadas, janela)
+              for linha in bloco]
+    return [linha["id"] for linha in linhas], nova_marca(marca, exportadas, janela)
+
+
+def test_proposta_gravada_com_atraso_sai_na_rodada_seguinte():
+    historico = [proposta(1, 0), proposta(2, 10)]
+    ids, marca = exportar_incremental(historico, None)
+    assert ids == ["p1", "p2"] and marca.instante == INICIO + timedelta(minutes=10)
+
+    # p3 foi montada antes de p2 ser exportada, mas só chegou ao histórico depois
+    historico += [proposta(3, 5), proposta(4, 20)]
+    ids, marca = exportar_incremental(historico, marca)
+    assert ids == ["p3", "p4"]
+
+    ids, _ = exportar_incremental(historico, marca)
+    assert ids == []
+
+
+def test_nova_versao_da_mesma_proposta_sai_de_novo():
+    ids, marca = exportar_incremental([proposta(1, 0)], None)
+    ids, _ = exportar_incremental([proposta(1, 0), proposta(1, 1, versao=1)], marca)
+    assert ids == ["p1"]
+
+
+def test_fora_da_janela_nao_volta():
+    _, marca = exportar_incremental([proposta(1, 120)], None)
+    ids, _ = exportar_incremental([proposta(1, 120), proposta(2, 30)], marca)
+    assert ids == []
+
+
+def test_marca_guarda_so_as_versoes_da_janela(tmp_path):
+    historico = [proposta(i, i * 30) for i in range(6)]
+    _, marca = exportar_incremental(historico, None)
+    assert marca.instante == INICIO + timedelta(minutes=150)
+    assert {proposta_id for proposta_id, _ in marca.vistas} == {"p4", "p5"}
+
+    caminho = str(tmp_path / "exportacao.marca")
+    gravar_marca(caminho, marca)
+    assert ler_marca(caminho) == marca
+
+
+def test_marca_no_formato_antigo(tmp_path):
+    caminho = tmp_path / "exportacao.marca"
+    caminho.write_text("2025-01-01T00:10:00", encoding="utf-8")
+    assert ler_marca(str(caminho)) == Marca(INICIO + timedelta(minutes=10), frozenset())
+    assert ler_marca(str(tmp_path / "ausente.marca")) is None
+
+
+def test_main_incremental_em_csv(tmp_path, monkeypatch):
+    import json
+
+    historico = tmp_path / "propostas.jsonl"
+    marca = tmp_path / "exportacao.marca"
+
+    def gravar(*propostas):
+        with open(historico, "a", encoding="utf-8") as arquivo:
+            for p in propostas:
+                arquivo.write(json.dumps(p.para_json(), ensure_ascii=False) + "\n")
+
+    def rodar(saida):
+        monkeypatch.setattr(sys, "argv", ["exportacao", "--formato", "csv", "--saida", str(saida),
+                                          "--historico", str(historico), "--marca", str(marca)])
+        exportacao.main()
+        if not saida.exists():
+            return []
+        with open(saida, encoding="utf-8") as arquivo:
+            return [linha["id"] for linha in csv.DictReader(arquivo)]
+
+    gravar(proposta(1, 0), proposta(2, 10))
+    assert rodar(tmp_path / "a.csv") == ["p1", "p2"]
+    gravar(proposta(3, 5))
+    assert rodar(tmp_path / "b.csv") == ["p3"]
+    assert rodar(tmp_path / "c.csv") == []
+
+
+def test_parquet_com_o_esquema_completo(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    saida = str(tmp_path / "propostas.parquet")
+    total, maior = exportacao.exportar(blocos_de_linhas([proposta(i, i) for i in range(5)], None, 2), "parquet", saida)
+    tabela = pq.read_table(saida)
+    assert total == tabela.num_rows == 5
+    assert maior == INICIO + timedelta(minutes=4)
+    assert tabela.column_names == [coluna for coluna, _, _ in exportacao.ESQUEMA]
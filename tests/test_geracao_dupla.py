@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from secoes import SECOES_OBRIGATORIAS, secoes_faltando
+
+DADOS = {"nome": "Ana", "area": "Atendimento", "ideia": "Aplicativo para o cliente acompanhar o reparo do vidro",
+         "foco": "Experiência do cliente", "problema": "Muitas ligações ao SAC", "recursos": "", "prazo": "",
+         "nivel": "Intermediário", "pontuacao_nps": 72, "justificativa_nps": "Menos contatos ao SAC",
+         "tipo_projeto": "TECNOLÓGICO", "confianca_tipo": 0.55}
+
+
+def proposta(tipo, pular=()):
+    return "\n\n".join(
+        f"{titulo}\nConteúdo {tipo} {i + 1}." for i, (_, titulo) in enumerate(SECOES_OBRIGATORIAS[tipo]) if i not in pular
+    ) + "\n"
+
+
+@pytest.fixture
+def utils_duplo(monkeypatch):
+    """utils com geração dupla ligada e chamar_modelo respondendo por tipo (respostas[tipo] = função)"""
+    import utils
+
+    monkeypatch.setattr(utils, "GERACAO_DUPLA", True)
+    monkeypatch.setattr(utils, "GERACAO_DUPLA_LIMIAR", 0.75)
+    respostas, chamadas = {}, []
+
+    def chamar_modelo(estagio, messages, temperature, max_tokens, dados=None, ao_receber=None):
+        chamadas.append((dados["tipo_projeto"], estagio))
+        texto = respostas[dados["tipo_projeto"]](estagio, messages, ao_receber)
+        utils.registrar_modelo(dados, estagio, "gpt-4o")
+        return utils.RespostaModelo(texto, "stop", "gpt-4o", None)
+
+    monkeypatch.setattr(utils, "chamar_modelo", chamar_modelo)
+    utils.respostas, utils.chamadas = respostas, chamadas
+    return utils
+
+
+@pytest.mark.parametrize("ligada,opcoes,esperado", [
+    (True, {"confianca_tipo": 0.5}, True),
+    (True, {"confianca_tipo": 0.9}, False),
+    (True, {}, False),
+    (True, {"confianca_tipo": 0.5, "prioridade": "fundo"}, False),
+    (False, {"confianca_tipo": 0.5}, False),
+])
+def test_usar_geracao_dupla(monkeypatch, ligada, opcoes, esperado):
+    import utils
+
+    monkeypatch.setattr(utils, "GERACAO_DUPLA", ligada)
+    monkeypatch.setattr(utils, "GERACAO_DUPLA_LIMIAR", 0.75)
+    assert utils.usar_geracao_dupla(opcoes) is esperado
+
+
+def test_alternativa_passa_pela_conferencia_das_secoes(utils_duplo):
+    utils = utils_duplo
+    faltando = SECOES_OBRIGATORIAS["PROCESSO"][9][1]
+    utils.respostas["TECNOLÓGICO"] = lambda estagio, mensagens, ao_receber: proposta("TECNOLÓGICO")
+    utils.respostas["PROCESSO"] = lambda estagio, mensagens, ao_receber: (
+        proposta("PROCESSO", pular=(9,)) if estagio == "proposta" else f"{faltando}\nConteúdo PROCESSO 10.\n"
+    )
+
+    dados = dict(DADOS)
+    texto = utils.estruturar_ideia_avancada(dados)
+    assert texto == proposta("TECNOLÓGICO").strip()
+    alternativa = dados["proposta_alternativa"]
+    assert alternativa["tipo_projeto"] == "PROCESSO"
+    assert secoes_faltando(alternativa["proposta_completa"], "PROCESSO") == []
+    assert ("PROCESSO", "continuacao") in utils.chamadas
+    assert dados["continuacoes"] == 0
+
+
+def test_alternativa_que_chega_dentro_da_tolerancia_e_guardada(utils_duplo, monkeypatch):
+    utils = utils_duplo
+    monkeypatch.setattr(utils, "GERACAO_DUPLA_TOLERANCIA", 2)
+    utils.respostas["TECNOLÓGICO"] = lambda estagio, mensagens, ao_receber: proposta("TECNOLÓGICO")
+
+    def atrasada(estagio, mensagens, ao_receber):
+        time.sleep(0.2)
+        return proposta("PROCESSO")
+
+    utils.respostas["PROCESSO"] = atrasada
+    dados = dict(DADOS)
+    inicio = time.monotonic()
+    utils.estruturar_ideia_avancada(dados)
+    assert time.monotonic() - inicio >= 0.2
+    assert dados["proposta_alternativa"]["proposta_completa"] == proposta("PROCESSO").strip()
+
+
+def test_alternativa_atrasada_e_cancelada_no_meio_do_stream(utils_duplo, monkeypatch):
+    utils = utils_duplo
+    monkeypatch.setattr(utils, "GERACAO_DUPLA_TOLERANCIA", 0.05)
+    utils.respostas["TECNOLÓGICO"] = lambda estagio, mensagens, ao_receber: proposta("TECNOLÓGICO")
+    interrompida = threading.Event()
+
+    def interminavel(estagio, mensagens, ao_receber):
+        try:
+            while True:
+                ao_receber("mais texto ")
+                time.sleep(0.01)
+        except utils.GeracaoCancelada:
+            interrompida.set()
+            raise
+
+    utils.respostas["PROCESSO"] = interminavel
+    dados = dict(DADOS)
+    assert utils.estruturar_ideia_avancada(dados) == proposta("TECNOLÓGICO").strip()
+    assert "proposta_alternativa" not in dados
+    assert interrompida.wait(2)
+
+
+def test_alternativa_substitui_a_principal_que_falhou(utils_duplo):
+    utils = utils_duplo
+
+    def falha(estagio, mensagens, ao_receber):
+        raise utils.CircuitoAberto("fora")
+
+    def lenta(estagio, mensagens, ao_receber):
+        time.sleep(0.05)
+        return proposta("PROCESSO")
+
+    utils.respostas["TECNOLÓGICO"] = falha
+    utils.respostas["PROCESSO"] = lenta
+    dados = dict(DADOS)
+    texto = utils.estruturar_ideia_avancada(dados)
+    assert texto == proposta("PROCESSO").strip()
+    assert dados["tipo_projeto"] == "PROCESSO"
+    assert dados["proposta_provisoria"] is False
+    assert dados["modelos_estagio"]["proposta"] == "gpt-4o"
+    assert "proposta_alternativa" not in dados
+
+
+def test_tipo_confiante_gera_um_template_so(utils_duplo):
+    utils = utils_duplo
+    utils.respostas["TECNOLÓGICO"] = lambda estagio, mensagens, ao_receber: proposta("TECNOLÓGICO")
+    utils.estruturar_ideia_avancada(dict(DADOS, confianca_tipo=0.95))
+    assert utils.chamadas == [("TECNOLÓGICO", "proposta")]
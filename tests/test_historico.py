@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import historico
+from historico import buscar_proposta, ler_propostas, registrar_proposta
+from registro_proposta import RegistroProposta
+
+
+def proposta(i, nps=50, timestamp=None):
+    dados = {"nome": f"Autor {i}", "area": "Atendimento", "ideia": f"Ideia número {i}", "pontuacao_nps": nps}
+    return RegistroProposta.de_dados(dados, "", proposta_id=f"p{i}", timestamp=timestamp).para_json()
+
+
+@pytest.fixture
+def caminho(tmp_path, monkeypatch):
+    monkeypatch.setattr(historico, "_gravadas", historico.OrderedDict())
+    return str(tmp_path / "propostas.jsonl")
+
+
+def test_mesma_proposta_gravada_uma_vez(caminho):
+    assert registrar_proposta(proposta(0), caminho)
+    assert not registrar_proposta(proposta(0), caminho)
+    assert len(list(ler_propostas(caminho))) == 1
+
+
+def test_substituir_grava_nova_versao(caminho):
+    registrar_proposta(proposta(0, nps=40), caminho)
+    assert registrar_proposta(proposta(0, nps=90), caminho, substituir=True)
+    assert buscar_proposta("p0", caminho)["nps_analysis"]["pontuacao_total"] == 90
+
+
+def test_ids_lembrados_sao_limitados(caminho, monkeypatch):
+    monkeypatch.setattr(historico, "MAX_GRAVADAS", 3)
+    for i in range(5):
+        registrar_proposta(proposta(i), caminho)
+    assert len(historico._gravadas) == 3
+    assert (caminho, "p0") not in historico._gravadas
+    assert not registrar_proposta(proposta(4), caminho)
+
+
+def test_compactar_arquiva_as_antigas_e_a_busca_continua(caminho):
+    agora = datetime.now()
+    for i in range(6):
+        registrar_proposta(proposta(i, timestamp=agora - timedelta(days=90 if i % 2 else 1)), caminho)
+
+    assert historico.compactar(caminho, dias_quente=30) == 3
+    with open(caminho, encoding="utf-8") as quente:
+        assert [json.loads(linha)["metadata"]["id"] for linha in quente] == ["p0", "p2", "p4"]
+    assert sorted(p["metadata"]["id"] for p in ler_propostas(caminho)) == [f"p{i}" for i in range(6)]
+    assert buscar_proposta("p3", caminho)["metadata"]["id"] == "p3"
+    assert buscar_proposta("p9", caminho) is None
+    assert historico.compactar(caminho, dias_quente=30) == 0
+
+
+def test_compactacao_periodica_sobe_em_iniciar_servicos(monkeypatch):
+    import utils
+
+    chamadas = []
+    monkeypatch.setattr(utils, "iniciar_compactacao_periodica", lambda caminho, **opcoes: chamadas.append((caminho, opcoes)))
+    monkeypatch.setattr(utils, "MODELO_LOCAL_ATIVO", False)
+    monkeypatch.setattr(utils, "LEMBRETES_HORAS", 0)
+    monkeypatch.setattr(utils, "HISTORICO_COMPACTACAO_HORAS", 2)
+    utils.iniciar_servicos()
+    assert chamadas == [(utils.ARQUIVO_HISTORICO, {"intervalo": 7200, "dias_quente": utils.HISTORICO_DIAS_QUENTE,
+                                                  "codec": utils.HISTORICO_CODEC})]
+
+    chamadas.clear()
+    monkeypatch.setattr(utils, "HISTORICO_COMPACTACAO_HORAS", 0)
+    utils.iniciar_servicos()
+    assert chamadas == []
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+
+import pytest
+
+from limitador import VALIDADE_ESPERA, FilaEsgotada, LimitadorCompartilhado
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "limitador.json")
+
+
+def esvaziar(caminho, espera=None):
+    """Baldes vazios agora (só o reabastecimento libera novas chamadas)"""
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"requisicoes": 0, "tokens": 0, "instante": time.time(), "espera": espera or {}}, arquivo)
+
+
+def test_inativo_nao_espera(caminho):
+    limitador = LimitadorCompartilhado(caminho)
+    assert not limitador.ativo
+    assert limitador.adquirir(1000) == 0.0
+    assert limitador.instantaneo() == {"ativo": False}
+
+
+def test_consome_requisicoes_e_tokens(caminho):
+    limitador = LimitadorCompartilhado(caminho, requisicoes_por_minuto=10, tokens_por_minuto=1000)
+    limitador.adquirir(300, prioridade="envio")
+    estado = limitador.instantaneo()
+    assert estado["requisicoes_disponiveis"] == pytest.approx(9, abs=0.1)
+    assert estado["tokens_disponiveis"] == pytest.approx(700, abs=5)
+
+
+def test_sem_cota_no_prazo_levanta_e_sai_da_fila(caminho):
+    limitador = LimitadorCompartilhado(caminho, requisicoes_por_minuto=2)
+    limitador.adquirir(0)
+    limitador.adquirir(0)
+    with pytest.raises(FilaEsgotada):
+        limitador.adquirir(0, prioridade="preview", prazo=0)
+    assert limitador._fila == []
+    assert limitador.instantaneo()["fila"] == {"envio": 0, "preview": 0, "fundo": 0}
+
+
+def test_pedido_maior_que_o_balde_nao_trava(caminho):
+    limitador = LimitadorCompartilhado(caminho, tokens_por_minuto=100)
+    assert limitador.adquirir(10 ** 6, prazo=1) < 1
+
+
+def test_ajustar_tokens_devolve_ate_o_limite(caminho):
+    limitador = LimitadorCompartilhado(caminho, tokens_por_minuto=1000)
+    limitador.adquirir(600)
+    limitador.ajustar_tokens(200)
+    assert limitador.instantaneo()["tokens_disponiveis"] == pytest.approx(600, abs=5)
+    limitador.ajustar_tokens(10 ** 6)
+    assert limitador.instantaneo()["tokens_disponiveis"] == 1000
+
+
+def test_envio_passa_na_frente_do_fundo(caminho):
+    limitador = LimitadorCompartilhado(caminho, requisicoes_por_minuto=600)
+    esvaziar(caminho)
+    ordem = []
+
+    def chamar(prioridade):
+        limitador.adquirir(0, prioridade=prioridade, prazo=5)
+        ordem.append(prioridade)
+
+    fundo = threading.Thread(target=chamar, args=("fundo",))
+    fundo.start()
+    time.sleep(0.02)
+    envio = threading.Thread(target=chamar, args=("envio",))
+    envio.start()
+    fundo.join()
+    envio.join()
+    assert ordem == ["envio", "fundo"]
+
+
+def test_espera_mais_prioritaria_de_outro_processo_bloqueia(caminho):
+    limitador = LimitadorCompartilhado(caminho, requisicoes_por_minuto=60)
+    # Outro processo (pid fictício) com uma chamada de envio esperando
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"espera": {"999999999": [time.time(), 1, 0, 0]}}, arquivo)
+    with pytest.raises(FilaEsgotada):
+        limitador.adquirir(0, prioridade="fundo", prazo=0.2)
+
+
+def test_espera_expirada_de_outro_processo_e_ignorada(caminho):
+    limitador = LimitadorCompartilhado(caminho, requisicoes_por_minuto=60)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump({"espera": {"999999999": [time.time() - VALIDADE_ESPERA - 1, 1, 0, 0]}}, arquivo)
+    assert limitador.adquirir(0, prioridade="fundo", prazo=0.2) < 0.2
+
+
+def test_dois_limitadores_no_mesmo_arquivo_dividem_a_cota(caminho):
+    primeiro = LimitadorCompartilhado(caminho, requisicoes_por_minuto=3)
+    segundo = LimitadorCompartilhado(caminho, requisicoes_por_minuto=3)
+    primeiro.adquirir(0)
+    segundo.adquirir(0)
+    primeiro.adquirir(0)
+    with pytest.raises(FilaEsgotada):
+        segundo.adquirir(0, prazo=0)
@@ -0,0 +1,184 @@
+import json
+import os
+
+import numpy as np
+
+import modelo_local
+from benchmarks.bench_registro import gravar_historico
+from modelo_local import ModeloLocal, Previsao, avaliar, extrair_caracteristicas
+from registro_proposta import RegistroProposta
+
+IDEIAS = {
+    "TECNOLÓGICO": "Criar um aplicativo com sistema de agendamento online integrado à API da oficina",
+    "PROCESSO": "Revisar o fluxo de atendimento no balcão e padronizar o checklist da equipe",
+}
+
+
+def gravar(caminho, quantidade, inicio=0, tipo=None, modo="w"):
+    """Histórico com ideias separáveis por tipo (alternadas, ou todas do tipo dado)"""
+    gravar_historico(caminho + ".modelo", 1, 0)
+    with open(caminho + ".modelo", encoding="utf-8") as arquivo:
+        modelo = json.loads(arquivo.readline())
+    with open(caminho, modo, encoding="utf-8") as arquivo:
+        for i in range(inicio, inicio + quantidade):
+            tipo_registro = tipo or modelo_local.TIPOS[i % 2]
+            registro = json.loads(json.dumps(modelo))
+            registro["metadata"]["id"] = f"{i:016x}"
+            registro["metadata"]["timestamp"] = f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}"
+            registro["entrada"]["ideia_original"] = f"{IDEIAS[tipo_registro]} {i}"
+            registro["analise"]["tipo_projeto"] = tipo_registro
+            registro["analise"]["pontuacao_nps"] = 85 if tipo_registro == "TECNOLÓGICO" else 30
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def registros(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [RegistroProposta.de_json(json.loads(linha)) for linha in arquivo]
+
+
+def test_caracteristicas_deterministicas_e_sem_acento():
+    indices, valores = extrair_caracteristicas("Automação do Balcão", "TI")
+    outros_indices, outros_valores = extrair_caracteristicas("automacao do balcao", "ti")
+    np.testing.assert_array_equal(indices, outros_indices)
+    np.testing.assert_array_equal(valores, outros_valores)
+    assert indices.dtype == np.int64 and valores.dtype == np.float32
+    assert indices.max() < modelo_local.DIMENSOES
+
+
+def test_caracteristicas_normalizadas_pelo_numero_de_termos():
+    # 3 palavras + 2 bigramas + área + foco = 7 termos, cada um ±1 / √7
+    indices, valores = extrair_caracteristicas("troca de pneus", "Oficina", "Agilidade")
+    assert len(indices) == 7
+    np.testing.assert_allclose(np.abs(valores), 1 / np.sqrt(7), rtol=1e-6)
+    assert not np.array_equal(indices, extrair_caracteristicas("troca de pneus", "Oficina")[0])
+
+
+def test_sem_exemplos_suficientes_nao_preve(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 10)
+    modelo = ModeloLocal(caminho, minimo_exemplos=50)
+    modelo.sincronizar()
+    assert modelo.prever_tipo(IDEIAS["PROCESSO"], "TI - Desenvolvimento") is None
+    assert modelo.prever_nps(IDEIAS["PROCESSO"], "TI - Desenvolvimento", "Automação") is None
+
+
+def test_prever_nao_treina_no_thread_de_quem_chama(tmp_path, monkeypatch):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 10)
+    modelo = ModeloLocal(caminho, minimo_exemplos=0)
+    monkeypatch.setattr(modelo, "sincronizar", lambda: (_ for _ in ()).throw(AssertionError("treinou")))
+    modelo.prever_tipo(IDEIAS["PROCESSO"], "TI - Desenvolvimento")
+    modelo.prever_nps(IDEIAS["PROCESSO"], "TI - Desenvolvimento", "Automação")
+    assert modelo.exemplos_tipo == 0
+
+
+def test_sincronizar_incremental_e_apos_reescrita(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 20)
+    modelo = ModeloLocal(caminho, minimo_exemplos=0)
+    assert modelo.sincronizar() == 20
+    assert modelo.sincronizar() == 0
+
+    gravar(caminho, 5, inicio=20, modo="a")
+    assert modelo.sincronizar() == 5
+    assert modelo.exemplos_tipo == 25
+
+    # Compactação reescreve a camada quente (novo inode): só as propostas nunca vistas contam
+    novo = caminho + ".novo"
+    gravar(novo, 3, inicio=23)
+    os.replace(novo, caminho)
+    assert modelo.sincronizar() == 1
+    assert modelo.exemplos_tipo == 26
+
+
+def test_linha_incompleta_fica_para_a_proxima_sincronizacao(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 4)
+    modelo = ModeloLocal(caminho, minimo_exemplos=0)
+    modelo.sincronizar()
+
+    gravar(caminho + ".extra", 1, inicio=4)
+    with open(caminho + ".extra", encoding="utf-8") as arquivo:
+        linha = arquivo.read()
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(linha[:40])
+    assert modelo.sincronizar() == 0
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write(linha[40:])
+    assert modelo.sincronizar() == 1
+
+
+def test_modelo_salvo_e_recarregado(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 40)
+    salvo = str(tmp_path / "modelo.npz")
+    modelo = ModeloLocal(caminho, caminho_modelo=salvo, minimo_exemplos=0)
+    modelo.sincronizar()
+    recarregado = ModeloLocal(caminho, caminho_modelo=salvo, minimo_exemplos=0)
+    assert recarregado.exemplos_tipo == 40
+    assert recarregado.prever_tipo(IDEIAS["PROCESSO"], "TI - Desenvolvimento") == \
+        modelo.prever_tipo(IDEIAS["PROCESSO"], "TI - Desenvolvimento")
+    assert recarregado.sincronizar() == 0
+
+
+def test_estagios_da_heuristica_nao_viram_rotulo(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 6)
+    with open(caminho, encoding="utf-8") as arquivo:
+        linhas = [json.loads(linha) for linha in arquivo]
+    for registro in linhas:
+        registro["metadata"]["modelos_estagio"] = {"tipo": "heuristica", "nps": "local"}
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in linhas)
+    modelo = ModeloLocal(caminho, minimo_exemplos=0)
+    assert modelo.sincronizar() == 0
+
+
+def test_avaliar_aprende_ideias_separaveis(tmp_path):
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 200)
+    resultado = avaliar(registros(caminho), [0.0, 0.99])
+    assert resultado["treino"] == 160 and resultado["teste"] == 40
+    sem_limiar = resultado["limiares"]["0.0"]
+    assert sem_limiar["tipo_evitadas"] == 1.0
+    assert sem_limiar["tipo_acuracia"] == 1.0
+    assert sem_limiar["nps_acuracia_faixa"] == 1.0
+    assert resultado["limiares"]["0.99"]["tipo_evitadas"] <= sem_limiar["tipo_evitadas"]
+
+
+def test_usar_previsao_local_respeita_o_limiar(monkeypatch):
+    import utils
+
+    monkeypatch.setattr(utils, "MODELO_LOCAL_ATIVO", True)
+    monkeypatch.setattr(utils, "MODELO_LOCAL_AMOSTRA", 0)
+    monkeypatch.setattr(utils.modelo_local, "limiar", 0.9)
+
+    dados = {}
+    assert utils.usar_previsao_local("tipo", Previsao("PROCESSO", 0.95), dados)
+    assert dados["modelos_estagio"]["tipo"] == "local"
+    assert not utils.usar_previsao_local("tipo", Previsao("PROCESSO", 0.5), {})
+    assert not utils.usar_previsao_local("tipo", None, {})
+
+    # Amostra para medir a acurácia: mesmo com confiança alta, a IA responde
+    monkeypatch.setattr(utils, "MODELO_LOCAL_AMOSTRA", 1)
+    assert not utils.usar_previsao_local("tipo", Previsao("PROCESSO", 0.95), {})
+    monkeypatch.setattr(utils, "MODELO_LOCAL_AMOSTRA", 0)
+    monkeypatch.setattr(utils, "MODELO_LOCAL_ATIVO", False)
+    assert not utils.usar_previsao_local("tipo", Previsao("PROCESSO", 0.95), {})
+
+
+def test_iniciar_treino_abre_um_thread_so(tmp_path, monkeypatch):
+    import threading
+
+    caminho = str(tmp_path / "historico.jsonl")
+    gravar(caminho, 10)
+    modelo = ModeloLocal(caminho, minimo_exemplos=0, intervalo_treino=3600)
+    treinou = threading.Event()
+    sincronizar = modelo.sincronizar
+    monkeypatch.setattr(modelo, "sincronizar", lambda: (sincronizar(), treinou.set()))
+    antes = threading.active_count()
+    modelo.iniciar_treino()
+    modelo.iniciar_treino()
+    assert treinou.wait(5)
+    assert threading.active_count() == antes + 1
+    assert modelo.exemplos_tipo == 10
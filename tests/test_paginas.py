@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+PAGINAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages")
+
+
+def abrir(nome):
+    return AppTest.from_file(os.path.join(PAGINAS, nome), default_timeout=60).run()
+
+
+@pytest.fixture
+def sem_senhas(monkeypatch):
+    monkeypatch.delenv("LIDERANCA_SENHA", raising=False)
+    monkeypatch.delenv("ADMIN_SENHA", raising=False)
+
+
+def test_fila_fechada_sem_senha_configurada(sem_senhas):
+    pagina = abrir("2_📋_Fila_Lideranca.py")
+    assert "LIDERANCA_SENHA" in pagina.error[0].value
+    assert not pagina.text_input
+    assert not pagina.button
+
+
+def test_fila_pede_a_senha(sem_senhas, monkeypatch):
+    monkeypatch.setenv("ADMIN_SENHA", "segredo")
+    pagina = abrir("2_📋_Fila_Lideranca.py")
+    assert not pagina.error
+    assert not pagina.button
+    pagina.text_input[0].input("errada").run()
+    assert not pagina.button
+
+
+def test_admin_fechado_sem_senha_configurada(sem_senhas):
+    pagina = abrir("1_🔧_Admin.py")
+    assert "ADMIN_SENHA" in pagina.error[0].value
+    assert not pagina.text_input
+    assert not pagina.button
+
+
+def test_admin_pede_a_senha(sem_senhas, monkeypatch):
+    monkeypatch.setenv("ADMIN_SENHA", "segredo")
+    pagina = abrir("1_🔧_Admin.py")
+    assert not pagina.button
+    pagina.text_input[0].input("errada").run()
+    assert not pagina.button
@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import ERRO, EXECUTADO, REAPROVEITADO, Estagio, Grafo
+
+
+class DiarioFalso:
+    def __init__(self):
+        self.gravados = []
+
+    def gravar(self, contexto, estagio, saidas):
+        self.gravados.append(estagio)
+
+
+def grafo_exemplo(chamadas=None, diario=None, atraso=0):
+    chamadas = chamadas if chamadas is not None else []
+
+    def estagio(nome, saidas, valor):
+        def funcao(contexto):
+            chamadas.append(nome)
+            time.sleep(atraso)
+            return {saida: valor(contexto) for saida in saidas}
+        return funcao
+
+    return Grafo([
+        Estagio("tipo", estagio("tipo", ["tipo_projeto"], lambda c: "PROCESSO"), ["ideia"], ["tipo_projeto"]),
+        Estagio("nps", estagio("nps", ["pontuacao_nps"], lambda c: 70), ["ideia"], ["pontuacao_nps"]),
+        Estagio("proposta", estagio("proposta", ["proposta"], lambda c: f"{c['tipo_projeto']} {c['pontuacao_nps']}"),
+                ["tipo_projeto", "pontuacao_nps"], ["proposta"]),
+        Estagio("email", estagio("email", ["email_enviado"], lambda c: True), ["proposta"], ["email_enviado"]),
+    ], trabalhadores=4, diario=diario)
+
+
+def test_ordem_topologica():
+    ordem = grafo_exemplo().ordem
+    assert ordem.index("tipo") < ordem.index("proposta")
+    assert ordem.index("nps") < ordem.index("proposta")
+    assert ordem.index("proposta") < ordem.index("email")
+
+
+def test_plano_so_com_ancestrais():
+    grafo = grafo_exemplo()
+    assert grafo.plano(["nps"]) == ["nps"]
+    assert set(grafo.plano(["proposta"])) == {"tipo", "nps", "proposta"}
+    with pytest.raises(KeyError):
+        grafo.plano(["inexistente"])
+
+
+def test_saida_duplicada_e_ciclo_sao_recusados():
+    with pytest.raises(ValueError):
+        Grafo([Estagio("a", None, [], ["x"]), Estagio("b", None, [], ["x"])])
+    with pytest.raises(ValueError):
+        Grafo([Estagio("a", None, ["y"], ["x"]), Estagio("b", None, ["x"], ["y"])])
+
+
+def test_entrada_faltando():
+    with pytest.raises(KeyError):
+        grafo_exemplo().executar({}, ["tipo"])
+
+
+def test_executa_e_anota_o_rastro():
+    contexto = grafo_exemplo().executar({"ideia": "x"}, ["email"])
+    assert contexto["proposta"] == "PROCESSO 70"
+    assert contexto["email_enviado"] is True
+    origens = {passo["estagio"]: passo["origem"] for passo in contexto["rastro_pipeline"]}
+    assert origens == {nome: EXECUTADO for nome in ("tipo", "nps", "proposta", "email")}
+
+
+def test_estagios_independentes_rodam_em_paralelo():
+    inicio = time.perf_counter()
+    contexto = grafo_exemplo(atraso=0.2).executar({"ideia": "x"}, ["tipo", "nps"])
+    assert time.perf_counter() - inicio < 0.35
+    assert len({passo["thread"] for passo in contexto["rastro_pipeline"]}) == 2
+
+
+def test_reaproveita_saidas_do_contexto():
+    chamadas = []
+    contexto = grafo_exemplo(chamadas).executar({"ideia": "x", "tipo_projeto": "TECNOLÓGICO", "pontuacao_nps": 90},
+                                                ["proposta"])
+    assert chamadas == ["proposta"]
+    assert contexto["proposta"] == "TECNOLÓGICO 90"
+    origens = {passo["estagio"]: passo["origem"] for passo in contexto["rastro_pipeline"]}
+    assert origens["tipo"] == origens["nps"] == REAPROVEITADO
+
+
+def test_erro_propaga_e_marca_o_estagio():
+    def falhar(contexto):
+        raise RuntimeError("falhou")
+
+    grafo = Grafo([
+        Estagio("a", lambda c: {"x": 1}, [], ["x"]),
+        Estagio("b", falhar, ["x"], ["y"]),
+        Estagio("c", lambda c: {"z": 1}, ["y"], ["z"]),
+    ])
+    contexto = {}
+    with pytest.raises(RuntimeError):
+        grafo.executar(contexto, ["c"])
+    assert "z" not in contexto
+    assert [p["origem"] for p in contexto["rastro_pipeline"]] == [EXECUTADO, ERRO]
+
+
+def test_saidas_diferentes_das_declaradas():
+    grafo = Grafo([Estagio("a", lambda c: {"outra": 1}, [], ["x"])])
+    with pytest.raises(ValueError):
+        grafo.executar({}, ["a"])
+
+
+def test_diario_recebe_os_estagios_executados():
+    diario = DiarioFalso()
+    grafo_exemplo(diario=diario).executar({"ideia": "x", "tipo_projeto": "PROCESSO"}, ["proposta"])
+    assert sorted(diario.gravados) == ["nps", "proposta"]
+
+
+def test_sem_gravar_diario_nada_e_gravado():
+    diario = DiarioFalso()
+    grafo_exemplo(diario=diario).executar({"ideia": "x"}, ["proposta"], gravar_diario=False)
+    assert diario.gravados == []
+
+
+def test_execucoes_simultaneas_nao_se_misturam():
+    grafo = grafo_exemplo(atraso=0.01)
+    resultados = {}
+
+    def rodar(i):
+        resultados[i] = grafo.executar({"ideia": str(i), "pontuacao_nps": i}, ["proposta"])["proposta"]
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resultados == {i: f"PROCESSO {i}" for i in range(8)}
+
+
+# ── Envio pelo grafo do utils: o JSON com erro derruba o envio ───────────────
+
+def test_erro_no_json_falha_o_envio_sem_email_nem_historico(tmp_path, monkeypatch):
+    import utils
+
+    monkeypatch.setattr(utils, "ARQUIVO_HISTORICO", str(tmp_path / "propostas.jsonl"))
+    monkeypatch.setattr(utils.diario_estagios, "diretorio", str(tmp_path / "diario"))
+    monkeypatch.setattr(utils, "PRAZO_ENVIO", 0)
+
+    def quebrar(dados, proposta):
+        raise RuntimeError("JSON inválido")
+
+    enviados, gravados = [], []
+    monkeypatch.setattr(utils, "montar_json_proposta", quebrar)
+    monkeypatch.setattr(utils, "enviar_email_estruturado", lambda *args: enviados.append(args))
+    monkeypatch.setattr(utils, "registrar_proposta", lambda *args, **kwargs: gravados.append(args))
+
+    dados = {"nome": "Ana", "area": "Atendimento", "ideia": "Portal para acompanhar o reparo do vidro",
+             "nivel": "", "foco": "", "tipo_projeto": "PROCESSO", "pontuacao_nps": 70, "justificativa_nps": "",
+             "proposta": "## RESUMO EXECUTIVO\nTexto", "estrutura_proposta": {"resumo": "Texto"}}
+    id_proposta, _ = utils.enviar_submissao(dados)
+    status = utils.pool_envios.status(id_proposta)
+    while status["estado"] not in (utils.CONCLUIDA, utils.FALHOU):
+        time.sleep(0.01)
+        status = utils.pool_envios.status(id_proposta)
+
+    assert status["estado"] == utils.FALHOU
+    assert "JSON inválido" in status["erro"]
+    assert enviados == [] and gravados == []
@@ -0,0 +1,102 @@
+import copy
+import json
+from datetime import datetime
+
+import pytest
+
+from benchmarks.bench_registro import gravar_historico
+from historico import ler_propostas, ler_registros
+from registro_proposta import (
+    RegistroProposta, calcular_potencial_melhoria, classificar_categoria_nps, identificar_areas_impacto_nps,
+    prioridade_por_nps
+)
+
+DADOS = {"nome": "Ana", "area": "Atendimento - SAC", "ideia": "Portal para o cliente acompanhar o reparo do vidro",
+         "pontuacao_nps": 82, "tipo_projeto": "TECNOLÓGICO", "modelos_estagio": {"tipo": "gpt-4o-mini"},
+         "degradacao": {"preview": "heuristica"}}
+
+
+@pytest.fixture
+def historico(tmp_path):
+    caminho = str(tmp_path / "propostas.jsonl")
+    gravar_historico(caminho, 200, 60)
+    return caminho
+
+
+def test_ida_e_volta_do_json(historico):
+    for json_proposta in ler_propostas(historico):
+        original = copy.deepcopy(json_proposta)
+        assert RegistroProposta.de_json(json_proposta).para_json() == original
+
+
+def test_chaves_fora_do_esquema_sobrevivem():
+    json_proposta = RegistroProposta.de_dados(DADOS, "texto", timestamp=datetime(2025, 1, 1)).para_json()
+    json_proposta["metadata"]["origem"] = "api"
+    json_proposta["anexos"] = ["foto.jpg"]
+    json_proposta["analise"]["nota_manual"] = 7
+    assert RegistroProposta.de_json(copy.deepcopy(json_proposta)).para_json() == json_proposta
+
+
+def test_derivados_iguais_as_funcoes_de_origem():
+    registro = RegistroProposta.de_dados(DADOS, "texto")
+    assert registro.area_detalhada == "Atendimento"
+    assert registro.categoria_nps == classificar_categoria_nps(82)
+    assert registro.prioridade_sugerida == prioridade_por_nps(82)
+    assert registro.potencial_melhoria == calcular_potencial_melhoria(82)
+    assert registro.areas_impacto == identificar_areas_impacto_nps(DADOS["ideia"])
+
+
+def test_de_dados_copia_os_dicionarios_mutaveis():
+    dados = copy.deepcopy(DADOS)
+    registro = RegistroProposta.de_dados(dados, "texto")
+    dados["modelos_estagio"]["proposta"] = "gpt-4o"
+    dados["degradacao"]["proposta"] = "provisoria"
+    assert registro.modelos_estagio == {"tipo": "gpt-4o-mini"}
+    assert registro.degradacao == {"preview": "heuristica"}
+
+
+def test_ler_registros_igual_a_ler_propostas(historico):
+    registros = list(ler_registros(historico))
+    propostas = list(ler_propostas(historico))
+    assert len(registros) == len(propostas) == 200
+    assert [r.para_json() for r in registros] == propostas
+    assert [r.prioridade_sugerida for r in registros] == [p["analise"]["prioridade_sugerida"] for p in propostas]
+
+
+def test_ler_registros_pula_linhas_invalidas(tmp_path):
+    caminho = str(tmp_path / "propostas.jsonl")
+    valida = RegistroProposta.de_dados(DADOS, "texto").para_json()
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(valida, ensure_ascii=False) + "\n")
+        arquivo.write("{linha cortada\n")
+        arquivo.write(json.dumps(valida, ensure_ascii=False) + "\n")
+    assert [r.id for r in ler_registros(caminho)] == [valida["metadata"]["id"]] * 2
+
+
+def test_de_json_nao_altera_o_json_recebido():
+    json_proposta = RegistroProposta.de_dados(DADOS, "").para_json()
+    palavras = ["".join(["vid", "ro"]), "reparo"]
+    json_proposta["entrada"]["palavras_chave"] = palavras
+    registro = RegistroProposta.de_json(json_proposta)
+    assert json_proposta["entrada"]["palavras_chave"] is palavras
+    assert registro.para_json()["entrada"]["palavras_chave"] is not palavras
+    assert registro.para_json()["entrada"]["palavras_chave"] == ["vidro", "reparo"]
+
+
+def test_compartilhamento_entre_threads_usa_um_objeto_so(monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import registro_proposta
+
+    monkeypatch.setattr(registro_proposta, "_compartilhados", {})
+    barreira = threading.Barrier(8)
+
+    def compartilhar(_):
+        barreira.wait()
+        return registro_proposta._compartilhar({"tipo": "gpt-4o-mini", "nps": "gpt-4o"})
+
+    with ThreadPoolExecutor(8) as executor:
+        resultados = list(executor.map(compartilhar, range(8)))
+    assert len({id(r) for r in resultados}) == 1
+    assert len(registro_proposta._compartilhados) == 1
@@ -0,0 +1,192 @@
+import threading
+import time
+import types
+
+import pytest
+
+from resiliencia import ABERTO, FECHADO, MEIO_ABERTO, Disjuntor, executar_com_hedge
+
+
+def abrir(disjuntor):
+    for _ in range(disjuntor.limite_falhas):
+        assert disjuntor.permitir()
+        disjuntor.registrar_falha()
+    assert disjuntor.estado in (ABERTO, MEIO_ABERTO)
+
+
+def test_abre_apos_falhas_seguidas():
+    disjuntor = Disjuntor("teste", limite_falhas=3, tempo_abertura=60)
+    for _ in range(2):
+        disjuntor.registrar_falha()
+    assert disjuntor.estado == FECHADO
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == ABERTO
+    assert not disjuntor.permitir()
+
+
+def test_sucesso_zera_falhas():
+    disjuntor = Disjuntor("teste", limite_falhas=2, tempo_abertura=60)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_sucesso()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == FECHADO
+
+
+def test_meio_aberto_libera_um_teste_por_vez():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=0)
+    abrir(disjuntor)
+    assert disjuntor.estado == MEIO_ABERTO
+    assert disjuntor.permitir()
+    assert not disjuntor.permitir()
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == FECHADO
+    assert disjuntor.permitir()
+
+
+def test_falha_no_teste_reabre():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=0.05)
+    abrir(disjuntor)
+    time.sleep(0.06)
+    assert disjuntor.permitir()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == ABERTO
+    assert not disjuntor.permitir()
+
+
+def test_liberar_teste_devolve_a_vaga():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=0)
+    abrir(disjuntor)
+    assert disjuntor.permitir()
+    disjuntor.liberar_teste()
+    assert disjuntor.estado == MEIO_ABERTO
+    assert disjuntor.permitir()
+
+
+def test_liberar_teste_so_vale_para_a_thread_dona():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=0)
+    abrir(disjuntor)
+    assert disjuntor.permitir()
+    outra = threading.Thread(target=disjuntor.liberar_teste)
+    outra.start()
+    outra.join()
+    assert not disjuntor.permitir()
+
+
+def test_liberar_teste_sem_teste_nao_faz_nada():
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=60)
+    disjuntor.liberar_teste()
+    assert disjuntor.estado == FECHADO
+    assert disjuntor.permitir()
+
+
+def test_hedge_resposta_rapida_nao_duplica():
+    chamadas = []
+    resultado = executar_com_hedge(lambda: chamadas.append(1) or "ok", 1.0, "teste",
+                                   ao_duplicar=lambda: pytest.fail("não deveria duplicar"))
+    assert resultado == "ok"
+    assert chamadas == [1]
+
+
+def test_hedge_duplica_e_usa_a_primeira():
+    chamadas = []
+    trava = threading.Lock()
+
+    def funcao():
+        with trava:
+            chamadas.append(1)
+            primeira = len(chamadas) == 1
+        time.sleep(0.5 if primeira else 0)
+        return "original" if primeira else "duplicada"
+
+    cotas = []
+    assert executar_com_hedge(funcao, 0.05, "teste", ao_duplicar=lambda: cotas.append(1)) == "duplicada"
+    assert cotas == [1]
+
+
+def test_hedge_sem_cota_fica_com_a_original():
+    chamadas = []
+
+    def funcao():
+        chamadas.append(1)
+        time.sleep(0.1)
+        return "original"
+
+    def sem_cota():
+        raise RuntimeError("sem cota")
+
+    assert executar_com_hedge(funcao, 0.01, "teste", ao_duplicar=sem_cota) == "original"
+    assert chamadas == [1]
+
+
+def test_hedge_propaga_erro_quando_as_duas_falham():
+    def funcao():
+        time.sleep(0.02)
+        raise ValueError("falhou")
+
+    with pytest.raises(ValueError):
+        executar_com_hedge(funcao, 0.01, "teste")
+
+
+# ── chamar_modelo: o teste do disjuntor não pode ficar preso ─────────────────
+
+@pytest.fixture
+def meio_aberto(monkeypatch):
+    """Disjuntor novo no utils, já meio aberto (próxima chamada é o teste)"""
+    import utils
+
+    disjuntor = Disjuntor("teste", limite_falhas=1, tempo_abertura=0)
+    abrir(disjuntor)
+    monkeypatch.setattr(utils, "disjuntor_openai", disjuntor)
+    return disjuntor
+
+
+def cliente_falso(create):
+    completions = types.SimpleNamespace(create=create)
+    cliente = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    cliente.with_options = lambda **_: cliente
+    return cliente
+
+
+def test_teste_liberado_quando_falta_cota(meio_aberto, monkeypatch):
+    import utils
+    from limitador import FilaEsgotada
+
+    def sem_cota(*args, **kwargs):
+        raise FilaEsgotada("sem cota")
+
+    monkeypatch.setattr(utils.limitador_openai, "adquirir", sem_cota)
+    with pytest.raises(FilaEsgotada):
+        utils.chamar_modelo("tipo", [{"role": "user", "content": "x"}], 0, 10)
+    assert meio_aberto.estado == MEIO_ABERTO
+    assert meio_aberto.permitir()
+
+
+def test_teste_liberado_quando_a_geracao_e_cancelada(meio_aberto, monkeypatch):
+    import utils
+
+    def cancelar(**kwargs):
+        raise utils.GeracaoCancelada("cancelada")
+
+    monkeypatch.setattr(utils, "client", cliente_falso(cancelar))
+    with pytest.raises(utils.GeracaoCancelada):
+        utils.chamar_modelo("tipo", [{"role": "user", "content": "x"}], 0, 10)
+    assert meio_aberto.estado == MEIO_ABERTO
+    assert meio_aberto.permitir()
+
+
+def test_prazo_do_envio_esgotado_nao_conta_falha(meio_aberto, monkeypatch):
+    import utils
+
+    dados = {"prioridade": "envio"}
+
+    def estourar_prazo(**kwargs):
+        dados["limite_envio"] = time.monotonic() - 1
+        raise TimeoutError("timeout")
+
+    monkeypatch.setattr(utils, "client", cliente_falso(estourar_prazo))
+    monkeypatch.setattr(utils, "tempo_necessario", lambda estagio: 0)
+    dados["limite_envio"] = time.monotonic() + 5
+    with pytest.raises(utils.PrazoEsgotado):
+        utils.chamar_modelo("tipo", [{"role": "user", "content": "x"}], 0, 10, dados=dados)
+    assert meio_aberto.estado == MEIO_ABERTO
+    assert meio_aberto.permitir()
@@ -0,0 +1,76 @@
+import pytest
+
+from roteamento import INTERVALO_SONDAGEM, Roteador
+
+MODELOS = {"rapido": "gpt-4o-mini", "padrao": "gpt-4o"}
+
+
+def roteador(**opcoes):
+    return Roteador(MODELOS, {"proposta": "padrao", "tipo": "rapido"}, {"proposta": 10.0},
+                    janela=20, min_amostras=5, **opcoes)
+
+
+def registrar(rot, modelo, latencias, estagio="proposta", erro=False):
+    for latencia in latencias:
+        rot.registrar(estagio, modelo, latencia, erro=erro)
+
+
+def test_dentro_do_orcamento_usa_o_nivel_configurado():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [8.0] * 10)
+    assert rot.escolher("proposta") == "gpt-4o"
+    assert rot.escolher("tipo") == "gpt-4o-mini"
+    # Estágio sem nível configurado: o mais capaz
+    assert rot.escolher("outro") == "gpt-4o"
+
+
+def test_poucas_amostras_nao_degradam():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [30.0] * 4)
+    assert rot.escolher("proposta") == "gpt-4o"
+
+
+def test_p95_acima_do_orcamento_degrada():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [12.0] * 10)
+    assert rot.escolher("proposta") == "gpt-4o-mini"
+
+
+def test_taxa_de_erro_alta_degrada_mesmo_sem_orcamento():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [None] * 6, estagio="resumo", erro=True)
+    registrar(rot, "gpt-4o", [1.0] * 4, estagio="resumo")
+    assert rot.escolher("resumo") == "gpt-4o-mini"
+
+
+def test_degradado_sonda_o_nivel_configurado_a_cada_intervalo():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [12.0] * 10)
+    escolhas = [rot.escolher("proposta") for _ in range(3 * INTERVALO_SONDAGEM)]
+    sondagens = [i + 1 for i, modelo in enumerate(escolhas) if modelo == "gpt-4o"]
+    assert sondagens == [INTERVALO_SONDAGEM, 2 * INTERVALO_SONDAGEM, 3 * INTERVALO_SONDAGEM]
+
+
+def test_volta_ao_nivel_configurado_quando_a_latencia_melhora():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [12.0] * 10)
+    assert rot.escolher("proposta") == "gpt-4o-mini"
+    # As sondagens trazem latências boas e empurram as antigas para fora da janela
+    registrar(rot, "gpt-4o", [5.0] * 20)
+    assert rot.escolher("proposta") == "gpt-4o"
+
+
+@pytest.mark.parametrize("latencia,erro", [(30.0, False), (None, True)])
+def test_nao_adaptativo_ignora_latencia_e_erros(latencia, erro):
+    rot = roteador(adaptativo=False)
+    registrar(rot, "gpt-4o", [latencia] * 10, erro=erro)
+    assert all(rot.escolher("proposta") == "gpt-4o" for _ in range(2 * INTERVALO_SONDAGEM))
+
+
+def test_estatisticas_e_p95():
+    rot = roteador()
+    registrar(rot, "gpt-4o", [float(i) for i in range(1, 11)])
+    rot.registrar("proposta", "gpt-4o", None, erro=True)
+    assert rot.p95("proposta") == 10.0
+    assert rot.p95("tipo") is None
+    assert rot.estatisticas()["proposta/gpt-4o"] == {"chamadas": 11, "p95_s": 10.0, "taxa_erro": round(1 / 11, 3)}
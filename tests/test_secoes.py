@@ -0,0 +1,207 @@
+import pytest
+
+from secoes import (
+    SECOES_OBRIGATORIAS, ParserSecoes, _indice_secao, estrutura_vazia, inserir_secoes, limpar_item, secoes_faltando
+)
+
+PROPOSTA = """# Proposta: Portal de acompanhamento
+
+## 📋 **2. RESUMO EXECUTIVO**
+Portal para o cliente acompanhar o serviço.
+Reduz ligações ao SAC.
+
+## 🏗️ **4. ARQUITETURA TECNOLÓGICA**
+- **Frontend:** React
+- **Backend:** FastAPI
+- Hospedagem a definir
+
+```python
+## RISCOS dentro de código não é título
+```
+
+## 📅 **6. CRONOGRAMA DE DESENVOLVIMENTO**
+### Sprint 1-2: Descoberta
+- Entrevistas
+### Sprint 3-4: MVP
+- Portal básico
+
+## 💰 **8. ANÁLISE DE INVESTIMENTO**
+- R$ 50.000
+
+## ⚠️ **9. RISCOS TECNOLÓGICOS**
+1. Integração com o legado
+2. **Adesão** dos clientes
+
+## 🎯 **7. MÉTRICAS DE SUCESSO**
+- [ ] NPS +10 pontos
+* Tempo de resposta
+"""
+
+
+def estruturar(texto, tamanho=None):
+    parser = ParserSecoes()
+    if tamanho is None:
+        parser.alimentar(texto)
+    else:
+        for i in range(0, len(texto), tamanho):
+            parser.alimentar(texto[i:i + tamanho])
+    parser.finalizar()
+    return parser.estrutura
+
+
+def test_extrai_as_secoes():
+    estrutura = estruturar(PROPOSTA)
+    assert estrutura["resumo"] == "Portal para o cliente acompanhar o serviço. Reduz ligações ao SAC."
+    assert estrutura["tecnologias"] == ["Frontend: React", "Backend: FastAPI"]
+    assert estrutura["cronograma"] == "Sprint 1-2: Descoberta; Sprint 3-4: MVP"
+    assert estrutura["investimento"] == "R$ 50.000"
+    assert estrutura["riscos"] == ["Integração com o legado", "Adesão dos clientes"]
+    assert estrutura["metricas"] == ["NPS +10 pontos", "Tempo de resposta"]
+
+
+@pytest.mark.parametrize("tamanho", [1, 3, 7, 64])
+def test_stream_em_pedacos_da_o_mesmo_resultado(tamanho):
+    assert estruturar(PROPOSTA, tamanho) == estruturar(PROPOSTA)
+
+
+def test_secao_fecha_quando_o_proximo_titulo_chega():
+    parser = ParserSecoes()
+    assert parser.alimentar("## RESUMO EXECUTIVO\nPrimeira linha\n") == []
+    assert parser.alimentar("## RISCOS\n") == [("resumo", "Primeira linha")]
+    assert parser.alimentar("- Prazo curto") == []
+    assert parser.finalizar() == [("riscos", ["Prazo curto"])]
+
+
+def test_titulo_dentro_de_codigo_e_ignorado():
+    assert estruturar(PROPOSTA)["riscos"] == ["Integração com o legado", "Adesão dos clientes"]
+
+
+def test_texto_sem_secoes():
+    assert estruturar("Só um parágrafo, sem títulos.") == estrutura_vazia()
+    assert estruturar("") == estrutura_vazia()
+
+
+@pytest.mark.parametrize("linha,esperado", [
+    ("- item", "item"),
+    ("* item", "item"),
+    ("• item", "item"),
+    ("- [x] feito", "feito"),
+    ("3. terceiro", "terceiro"),
+    ("**Negrito**: valor", "Negrito: valor"),
+    ("v1.2 sem numeração", "v1.2 sem numeração"),
+])
+def test_limpar_item(linha, esperado):
+    assert limpar_item(linha) == esperado
+
+
+def proposta_completa(tipo, pular=(), vazias=()):
+    """Proposta com as seções do template (menos as puladas; as vazias só com o título)"""
+    blocos = ["# Proposta"]
+    for i, (_, titulo) in enumerate(SECOES_OBRIGATORIAS[tipo]):
+        if i in pular:
+            continue
+        blocos.append(titulo if i in vazias else f"{titulo}\nConteúdo da seção {i + 1}.")
+    return "\n\n".join(blocos) + "\n"
+
+
+@pytest.mark.parametrize("tipo", ["TECNOLÓGICO", "PROCESSO"])
+def test_proposta_completa_nao_tem_secoes_faltando(tipo):
+    assert secoes_faltando(proposta_completa(tipo), tipo) == []
+
+
+def test_secoes_ausentes_ou_so_com_titulo():
+    obrigatorias = SECOES_OBRIGATORIAS["TECNOLÓGICO"]
+    texto = proposta_completa("TECNOLÓGICO", pular=(2,), vazias=(8,))
+    assert secoes_faltando(texto, "TECNOLÓGICO") == [obrigatorias[2], obrigatorias[8]]
+
+
+@pytest.mark.parametrize("titulo,indice", [
+    ("## 🎯 **3. PROBLEMA E OPORTUNIDADE**", 2),
+    ("## Problema & Oportunidade", 2),
+    ("## 7. METRICAS", 6),
+    ("## Métricas de sucesso", 6),
+    # O número vence a palavra-chave de outra seção contida no título
+    ("## 🏗️ **4. ARQUITETURA (RISCOS E CRONOGRAMA)**", 3),
+    ("## Conclusão", None),
+    ("## 12. Anexos", None),
+])
+def test_titulo_reconhecido_pelo_numero_ou_pela_palavra_chave(titulo, indice):
+    assert _indice_secao(titulo, SECOES_OBRIGATORIAS["TECNOLÓGICO"]) == indice
+
+
+def test_palavra_chave_so_como_palavra_inteira():
+    # "EQUIPE" não casa com "EQUIPES" de outra seção sem número
+    assert _indice_secao("## Treinamento das equipes", SECOES_OBRIGATORIAS["PROCESSO"]) is None
+
+
+def test_inserir_secoes_na_posicao_do_template():
+    obrigatorias = SECOES_OBRIGATORIAS["PROCESSO"]
+    texto = proposta_completa("PROCESSO", pular=(3, 9), vazias=(6,))
+    novas = (f"{obrigatorias[9][1]}\nConteúdo da seção 10.\n\n{obrigatorias[3][1]}\nConteúdo da seção 4.\n\n"
+             f"{obrigatorias[6][1]}\nConteúdo da seção 7.\n\n{obrigatorias[0][1]}\nRepetida: fica a original.\n")
+    completo = inserir_secoes(texto, novas, "PROCESSO")
+    assert completo == proposta_completa("PROCESSO")
+    assert secoes_faltando(completo, "PROCESSO") == []
+
+
+def test_titulo_vazio_e_substituido():
+    obrigatorias = SECOES_OBRIGATORIAS["TECNOLÓGICO"]
+    texto = proposta_completa("TECNOLÓGICO", vazias=(9,))
+    completo = inserir_secoes(texto, f"{obrigatorias[9][1]}\nConteúdo da seção 10.\n", "TECNOLÓGICO")
+    assert completo.count(obrigatorias[9][1]) == 1
+    assert completo == proposta_completa("TECNOLÓGICO")
+
+
+@pytest.fixture
+def utils_falso(monkeypatch):
+    """utils com chamar_modelo respondendo, em ordem, as respostas da lista `respostas`"""
+    import utils
+
+    chamadas = []
+
+    def chamar_modelo(estagio, messages, **opcoes):
+        chamadas.append(messages[-1]["content"])
+        return respostas.pop(0)
+
+    respostas = []
+    monkeypatch.setattr(utils, "chamar_modelo", chamar_modelo)
+    return utils, respostas, chamadas
+
+
+def test_completar_proposta_cortada_continua_do_ponto(utils_falso):
+    utils, respostas, chamadas = utils_falso
+    texto = proposta_completa("TECNOLÓGICO")
+    corte = texto.index("## ⚠️")
+    respostas.append(utils.RespostaModelo(texto[corte:], "stop", "gpt-4o", None))
+
+    dados = {}
+    completo = utils.completar_proposta(dados, "TECNOLÓGICO", [], utils.RespostaModelo(texto[:corte], "length", "gpt-4o", None))
+    assert completo == texto
+    assert dados["continuacoes"] == 1
+    assert len(chamadas) == 1 and chamadas[0].startswith("CONTINUAÇÃO")
+    assert dados["estrutura_proposta"]["investimento"]
+
+
+def test_completar_proposta_pede_so_as_secoes_que_faltam(utils_falso):
+    utils, respostas, chamadas = utils_falso
+    obrigatorias = SECOES_OBRIGATORIAS["PROCESSO"]
+    respostas.append(utils.RespostaModelo(
+        f"{obrigatorias[4][1]}\nConteúdo da seção 5.\n\n{obrigatorias[7][1]}\nConteúdo da seção 8.\n", "stop", "gpt-4o", None
+    ))
+
+    dados = {}
+    texto = proposta_completa("PROCESSO", pular=(4, 7))
+    completo = utils.completar_proposta(dados, "PROCESSO", [], utils.RespostaModelo(texto, "stop", "gpt-4o", None))
+    assert completo == proposta_completa("PROCESSO")
+    assert dados["continuacoes"] == 1
+    assert chamadas[0].startswith("SEÇÕES FALTANTES")
+    assert obrigatorias[4][1] in chamadas[0] and obrigatorias[7][1] in chamadas[0]
+    assert obrigatorias[0][1] not in chamadas[0]
+
+
+def test_completar_proposta_completa_nao_chama_o_modelo(utils_falso):
+    utils, _, chamadas = utils_falso
+    dados = {}
+    texto = proposta_completa("TECNOLÓGICO")
+    assert utils.completar_proposta(dados, "TECNOLÓGICO", [], utils.RespostaModelo(texto, "stop", "gpt-4o", None)) == texto
+    assert chamadas == [] and dados["continuacoes"] == 0
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from registro_proposta import RegistroProposta
+from sugestoes import IndiceSugestoes
+
+IDEIAS = [
+    "Portal para o cliente acompanhar o reparo do vidro em tempo real",
+    "Aplicativo de agendamento de troca de para-brisa pelo celular",
+    "Checklist digital da vistoria do veículo nas lojas",
+    "Treinamento dos atendentes do SAC sobre sinistros de vidro",
+]
+
+
+def proposta(i, ideia, status=None):
+    dados = {"nome": f"Autor {i}", "area": "Atendimento", "ideia": ideia, "proposta_provisoria": status == "provisorio"}
+    return RegistroProposta.de_dados(dados, "", proposta_id=f"p{i}",
+                                     timestamp=datetime(2025, 1, 1) + timedelta(days=i)).para_json()
+
+
+def gravar(caminho, propostas):
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for json_proposta in propostas:
+            arquivo.write(json.dumps(json_proposta, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def indice(tmp_path):
+    caminho = str(tmp_path / "propostas.jsonl")
+    gravar(caminho, [proposta(i, ideia) for i, ideia in enumerate(IDEIAS)])
+    return IndiceSugestoes(caminho)
+
+
+def test_mais_parecida_primeiro(indice):
+    sugestoes = indice.sugerir("acompanhar o reparo do vidro pelo portal ")
+    assert sugestoes[0]["id"] == "p0"
+    assert sugestoes[0]["similaridade"] == pytest.approx(1.0)
+    assert sugestoes[0]["data"] == "2025-01-01"
+    similaridades = [s["similaridade"] for s in sugestoes]
+    assert similaridades == sorted(similaridades, reverse=True)
+
+
+def test_completa_a_ultima_palavra(indice):
+    assert [s["id"] for s in indice.sugerir("agendamento de troca de para-bri", minimo=0.5)] == ["p1"]
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_k_nao_positivo_nao_sugere(indice, k):
+    assert indice.sugerir("reparo do vidro ", k=k) == []
+
+
+def test_sem_termos_conhecidos(indice):
+    assert indice.sugerir("") == []
+    assert indice.sugerir("xyzzy quux ") == []
+    assert indice.sugerir("xyz") == []
+
+
+def test_limita_a_k(indice):
+    assert len(indice.sugerir("vidro cliente lojas atendentes ", k=1, minimo=0)) == 1
+
+
+def test_acompanha_o_historico_e_atualiza_o_status(indice):
+    assert indice.estatisticas()["propostas"] == 4
+    gravar(indice.caminho_historico, [proposta(9, "Reciclagem dos vidros descartados nas lojas")])
+    assert indice.sugerir("reciclagem ")[0]["id"] == "p9"
+
+    indice.adicionar(proposta(9, "Reciclagem dos vidros descartados nas lojas", status="provisorio"))
+    assert indice.estatisticas()["propostas"] == 5
+    assert indice.sugerir("reciclagem ")[0]["status"] == "provisorio"
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from tarefas import CONCLUIDA, FALHOU, NA_FILA, FilaCheia, PoolTarefas, Reagendar
+
+
+def esperar(pool, id_tarefa, estados=(CONCLUIDA, FALHOU), limite=5):
+    fim = time.monotonic() + limite
+    status = pool.status(id_tarefa)
+    while status["estado"] not in estados:
+        assert time.monotonic() < fim, f"tarefa {id_tarefa} ainda em {status['estado']}"
+        time.sleep(0.005)
+        status = pool.status(id_tarefa)
+    return status
+
+
+def test_resultado_e_erro_pelo_id():
+    pool = PoolTarefas("teste", trabalhadores=1)
+    pool.submeter("ok", lambda: 42)
+    pool.submeter("erro", lambda: 1 / 0)
+    assert esperar(pool, "ok")["resultado"] == 42
+    status = esperar(pool, "erro")
+    assert status["estado"] == FALHOU
+    assert "division" in status["erro"]
+
+
+def test_mesmo_id_reaproveita_e_falha_pode_ser_refeita():
+    pool = PoolTarefas("teste", trabalhadores=1)
+    liberar = threading.Event()
+    assert pool.submeter("a", liberar.wait) == ("a", True)
+    assert pool.submeter("a", lambda: None) == ("a", False)
+    liberar.set()
+    esperar(pool, "a")
+
+    pool.submeter("b", lambda: 1 / 0)
+    esperar(pool, "b")
+    assert pool.submeter("b", lambda: "refeita") == ("b", True)
+    assert esperar(pool, "b")["resultado"] == "refeita"
+
+
+def test_fila_cheia():
+    pool = PoolTarefas("teste", trabalhadores=1, capacidade=1)
+    liberar = threading.Event()
+    pool.submeter("rodando", liberar.wait)
+    esperar(pool, "rodando", estados=("executando",))
+    pool.submeter("na_fila", lambda: None)
+    with pytest.raises(FilaCheia):
+        pool.submeter("recusada", lambda: None)
+    liberar.set()
+
+
+def test_reagendada_libera_o_worker_e_volta_com_o_mesmo_id():
+    pool = PoolTarefas("teste", trabalhadores=1)
+    execucoes = []
+
+    def instavel():
+        execucoes.append(time.monotonic())
+        if len(execucoes) < 3:
+            raise Reagendar(0.2, "provedor fora")
+        return "pronta"
+
+    pool.submeter("instavel", instavel)
+    while not execucoes:
+        time.sleep(0.005)
+    status = esperar(pool, "instavel", estados=(NA_FILA,))
+    assert status["reagendamentos"] == 1
+    assert status["erro"] == "provedor fora"
+
+    # Enquanto a primeira espera o atraso, o único worker atende a outra tarefa
+    pool.submeter("rapida", lambda: "ok")
+    assert esperar(pool, "rapida", limite=0.15)["resultado"] == "ok"
+
+    status = esperar(pool, "instavel")
+    assert status["resultado"] == "pronta"
+    assert status["reagendamentos"] == 2
+    assert execucoes[1] - execucoes[0] >= 0.2
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from registro_proposta import RegistroProposta
+from triagem import ORDEM_PRIORIDADE, PENDENTE, RESPONDIDA, IndiceTriagem, enviar_lembretes, prazo_resposta
+
+INICIO = datetime(2025, 1, 6, 9, 0)
+
+
+def proposta(i, area="Atendimento", nps=50, criada=None, ideia=None):
+    dados = {"nome": f"Autor {i}", "area": area, "ideia": ideia or f"Ideia número {i}", "pontuacao_nps": nps,
+             "tipo_projeto": "PROCESSO"}
+    return RegistroProposta.de_dados(dados, "", {"resumo": f"Resumo {i}"}, proposta_id=f"p{i}",
+                                     timestamp=criada or INICIO + timedelta(minutes=i)).para_json()
+
+
+def gravar(caminho, propostas):
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        for json_proposta in propostas:
+            arquivo.write(json.dumps(json_proposta, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "propostas.jsonl")
+
+
+@pytest.mark.parametrize("nps,horas,texto", [
+    (100, 24, "24 horas"), (80, 24, "24 horas"), (79, 48, "48 horas"), (65, 48, "48 horas"),
+    (64, 168, "1 semana"), (45, 168, "1 semana"), (44, 336, "2 semanas"), (0, 336, "2 semanas"),
+    (-5, 336, "2 semanas"),
+])
+def test_prazo_resposta(nps, horas, texto):
+    assert prazo_resposta(nps) == (horas, texto)
+
+
+def test_top_k_por_prioridade_nps_e_antiguidade(caminho):
+    gravar(caminho, [proposta(i, nps=nps) for i, nps in enumerate([30, 90, 60, 90, 75, 10])])
+    indice = IndiceTriagem(caminho)
+    topo = indice.top_k(k=4)
+    assert [item["id"] for item in topo] == ["p1", "p3", "p4", "p2"]
+    chaves = [(ORDEM_PRIORIDADE[item["prioridade"]], -item["pontuacao_nps"], item["criada"]) for item in topo]
+    assert chaves == sorted(chaves)
+    assert topo[0]["prazo"] == "24 horas"
+    assert topo[0]["resumo"] == "Resumo 1"
+
+
+def test_top_k_por_area(caminho):
+    gravar(caminho, [proposta(0, "Lojas", 90), proposta(1, "Atendimento", 80), proposta(2, "Lojas", 40)])
+    indice = IndiceTriagem(caminho)
+    assert [item["id"] for item in indice.top_k("Lojas")] == ["p0", "p2"]
+    assert indice.top_k("Inexistente") == []
+    assert indice.areas() == ["Atendimento", "Lojas"]
+
+
+def test_marcar_respondida_vale_para_outro_indice(caminho):
+    gravar(caminho, [proposta(0, nps=90), proposta(1, nps=50)])
+    indice = IndiceTriagem(caminho)
+    indice.marcar_respondida("p0", "Liderança")
+    assert indice.estado("p0") == RESPONDIDA
+    assert [item["id"] for item in indice.top_k()] == ["p1"]
+
+    outro = IndiceTriagem(caminho)
+    assert outro.estado("p0") == RESPONDIDA
+    assert outro.estado("p1") == PENDENTE
+    assert outro.estado("inexistente") is None
+
+
+def test_acompanha_o_historico_gravado_por_outro_processo(caminho):
+    gravar(caminho, [proposta(0, nps=50)])
+    indice = IndiceTriagem(caminho)
+    assert len(indice.top_k()) == 1
+    gravar(caminho, [proposta(1, nps=90)])
+    assert [item["id"] for item in indice.top_k()] == ["p1", "p0"]
+
+
+def test_nova_versao_substitui_e_mantem_a_data(caminho):
+    gravar(caminho, [proposta(0, nps=40)])
+    indice = IndiceTriagem(caminho)
+    indice.sincronizar()
+    indice.adicionar(proposta(0, nps=85, criada=INICIO + timedelta(days=1)))
+    topo = indice.top_k()
+    assert len(topo) == 1
+    assert topo[0]["pontuacao_nps"] == 85
+    assert topo[0]["criada"] == INICIO
+    assert topo[0]["vence_em"] == INICIO + timedelta(hours=24)
+
+
+def test_vencidas_em_ordem_de_atraso(caminho):
+    gravar(caminho, [proposta(0, nps=90), proposta(1, nps=70), proposta(2, nps=20)])
+    indice = IndiceTriagem(caminho)
+    assert indice.vencidas(INICIO + timedelta(hours=1)) == []
+    assert [item["id"] for item in indice.vencidas(INICIO + timedelta(hours=50))] == ["p0", "p1"]
+    assert indice.estatisticas()["pendentes"] == 3
+
+
+def test_reconstroi_quando_os_invalidos_dominam(caminho):
+    gravar(caminho, [proposta(i, nps=50) for i in range(200)])
+    indice = IndiceTriagem(caminho)
+    for i in range(150):
+        indice.marcar_respondida(f"p{i}")
+    estatisticas = indice.estatisticas()
+    assert estatisticas["pendentes"] == 50
+    assert estatisticas["invalidas"] < 100
+    assert [item["id"] for item in indice.top_k(k=3)] == ["p150", "p151", "p152"]
+
+
+def test_lembretes_nao_repetem_dentro_do_intervalo(caminho):
+    gravar(caminho, [proposta(0, nps=90), proposta(1, nps=20)])
+    indice = IndiceTriagem(caminho)
+    enviados = []
+    agora = INICIO + timedelta(days=2)
+    assert enviar_lembretes(indice, enviados.append, agora=agora) == 1
+    assert [item["id"] for item in enviados[0]] == ["p0"]
+    assert enviar_lembretes(indice, enviados.append, agora=agora) == 0
+    assert len(enviados) == 1
+
+
+def test_lembretes_periodicos_sobem_em_iniciar_servicos(monkeypatch):
+    import utils
+
+    chamadas = []
+    monkeypatch.setattr(utils, "iniciar_lembretes_periodicos", lambda indice, enviar, **opcoes: chamadas.append(opcoes))
+    monkeypatch.setattr(utils, "MODELO_LOCAL_ATIVO", False)
+    monkeypatch.setattr(utils, "HISTORICO_COMPACTACAO_HORAS", 0)
+    monkeypatch.setattr(utils, "LEMBRETES_HORAS", 0.5)
+
+    # Sem destinatário, não há para quem lembrar
+    monkeypatch.delenv("EMAIL_DESTINO", raising=False)
+    utils.iniciar_servicos()
+    assert chamadas == []
+
+    monkeypatch.setenv("EMAIL_DESTINO", "lideranca@example.com")
+    utils.iniciar_servicos()
+    assert chamadas == [{"intervalo": 1800, "repetir_horas": utils.LEMBRETE_REPETIR_HORAS}]
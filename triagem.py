@@ -0,0 +1,350 @@
+"""Índice de triagem das propostas pendentes: heaps por prioridade (por área) e por prazo de resposta (SLA)
+
+O prazo de resposta prometido no email depende da pontuação NPS (24 horas, 48 horas, 1 semana,
+2 semanas). Cada atualização custa O(log n): a entrada antiga fica inválida no heap (remoção
+preguiçosa) e é descartada quando aparece no topo, ou numa reconstrução se os inválidos passarem
+da metade.
+
+O índice é montado a partir do histórico e acompanha o fim do arquivo quente, então propostas
+gravadas por outros processos aparecem na próxima consulta. Respostas da liderança e lembretes
+ficam num JSONL de eventos ao lado do histórico.
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from historico import ler_registros
+from registro_proposta import RegistroProposta
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# (pontuação NPS mínima, prazo em horas, texto usado no email)
+SLA_POR_NPS = [
+    (80, 24, "24 horas"),
+    (65, 48, "48 horas"),
+    (45, 7 * 24, "1 semana"),
+    (0, 14 * 24, "2 semanas")
+]
+
+# Ordem das prioridades de sugerir_prioridade_nps (menor = mais urgente)
+ORDEM_PRIORIDADE = {"CRÍTICA": 0, "Alta": 1, "Média": 2, "Baixa": 3}
+
+PENDENTE = "pendente"
+RESPONDIDA = "respondida"
+
+_lembretes_iniciados = set()
+_trava_lembretes = threading.Lock()
+
+
+def prazo_resposta(pontuacao_nps):
+    """(horas, texto) do prazo de resposta da liderança para a pontuação"""
+    for minimo, horas, texto in SLA_POR_NPS:
+        if pontuacao_nps >= minimo:
+            return horas, texto
+    return SLA_POR_NPS[-1][1], SLA_POR_NPS[-1][2]
+
+
+class IndiceTriagem:
+    """Propostas pendentes com top-K por área e lista de vencidas"""
+
+    def __init__(self, caminho_historico):
+        self.caminho_historico = caminho_historico
+        self.caminho_eventos = os.path.join(os.path.dirname(caminho_historico) or ".", "triagem.jsonl")
+        self._trava = threading.RLock()
+        self._itens = {}
+        self._por_area = {}
+        self._por_prazo = []
+        self._invalidos = 0
+        self._carregado = False
+        self._posicao = {}
+
+    # ── Atualização ──────────────────────────────────────────────────────────
+
+    def adicionar(self, json_proposta):
+        """Inclui ou atualiza a proposta (a versão mais nova do mesmo ID substitui a anterior)"""
+        with self._trava:
+            self._adicionar(RegistroProposta.de_json(json_proposta))
+
+    def marcar_respondida(self, proposta_id, responsavel=""):
+        """Tira a proposta da fila e grava o evento (vale para todos os processos)"""
+        self._gravar_evento({"id": proposta_id, "evento": RESPONDIDA, "responsavel": responsavel})
+        with self._trava:
+            self._aplicar_evento({"id": proposta_id, "evento": RESPONDIDA})
+
+    def registrar_lembrete(self, proposta_id):
+        self._gravar_evento({"id": proposta_id, "evento": "lembrete"})
+        with self._trava:
+            self._aplicar_evento({"id": proposta_id, "evento": "lembrete", "em": time.time()})
+
+    # ── Consultas ────────────────────────────────────────────────────────────
+
+    def top_k(self, area=None, k=10):
+        """As k pendentes mais prioritárias da área (ou de todas): prioridade, depois NPS e antiguidade"""
+        with self._trava:
+            self.sincronizar()
+            if area is not None:
+                return [self._resumo(i) for i in _menores_validos(self._por_area.get(area, []), k, self._valido)]
+            candidatas = []
+            for heap in self._por_area.values():
+                candidatas.extend(_menores_validos(heap, k, self._valido))
+            return [self._resumo(i) for i in sorted(candidatas)[:k]]
+
+    def vencidas(self, agora=None):
+        """Pendentes com prazo vencido, da mais atrasada para a menos"""
+        agora = agora or datetime.now()
+        with self._trava:
+            self.sincronizar()
+            resultado = []
+            for entrada in _em_ordem_validos(self._por_prazo, self._valido):
+                if entrada[0] > agora:
+                    break
+                resultado.append(self._resumo(entrada))
+            return resultado
+
+    def estado(self, proposta_id):
+        """PENDENTE, RESPONDIDA ou None (proposta fora do índice)"""
+        with self._trava:
+            self.sincronizar()
+            item = self._itens.get(proposta_id)
+            return item["estado"] if item else None
+
+    def areas(self):
+        with self._trava:
+            self.sincronizar()
+            return sorted(area for area, heap in self._por_area.items() if any(self._valido(e) for e in heap))
+
+    def estatisticas(self):
+        with self._trava:
+            self.sincronizar()
+            pendentes = sum(1 for item in self._itens.values() if item["estado"] == PENDENTE)
+            return {
+                "pendentes": pendentes,
+                "vencidas": len(self.vencidas()),
+                "entradas_heap": len(self._por_prazo) + sum(len(h) for h in self._por_area.values()),
+                "invalidas": self._invalidos
+            }
+
+    # ── Sincronização com o histórico ────────────────────────────────────────
+
+    def sincronizar(self):
+        """Carrega tudo na primeira vez; depois só o que foi acrescentado ao histórico e aos eventos"""
+        with self._trava:
+            if not self._carregado:
+                for registro in ler_registros(self.caminho_historico):
+                    self._adicionar(registro)
+                self._posicao[self.caminho_historico] = _assinatura_fim(self.caminho_historico)
+                for evento in _ler_jsonl(self.caminho_eventos):
+                    self._aplicar_evento(evento)
+                self._posicao[self.caminho_eventos] = _assinatura_fim(self.caminho_eventos)
+                self._carregado = True
+                return
+
+            for json_proposta in self._novas_linhas(self.caminho_historico):
+                if isinstance(json_proposta, dict):
+                    self._adicionar(RegistroProposta.de_json(json_proposta))
+            for evento in self._novas_linhas(self.caminho_eventos):
+                self._aplicar_evento(evento)
+
+    def _novas_linhas(self, caminho):
+        """Linhas acrescentadas desde a última leitura (relê tudo se o arquivo foi substituído)"""
+        if not os.path.exists(caminho):
+            return []
+        inode, posicao = self._posicao.get(caminho, (None, 0))
+        info = os.stat(caminho)
+        if info.st_ino != inode or info.st_size < posicao:
+            posicao = 0
+        if info.st_size == posicao:
+            return []
+
+        with open(caminho, "rb") as arquivo:
+            arquivo.seek(posicao)
+            bruto = arquivo.read(info.st_size - posicao)
+        # Só linhas completas; uma gravação pela metade fica para a próxima leitura
+        completo = bruto[:bruto.rfind(b"\n") + 1]
+        self._posicao[caminho] = (info.st_ino, posicao + len(completo))
+
+        linhas = []
+        for linha in completo.decode("utf-8").splitlines():
+            try:
+                linhas.append(json.loads(linha))
+            except ValueError:
+                continue
+        return linhas
+
+    # ── Internos ─────────────────────────────────────────────────────────────
+
+    def _adicionar(self, registro):
+        proposta_id, area = registro.id, registro.area
+        try:
+            criada = datetime.fromisoformat(registro.timestamp)
+            pontuacao = int(registro.pontuacao_nps)
+            prioridade = registro.prioridade_sugerida
+        except (TypeError, ValueError):
+            return
+        if not proposta_id:
+            return
+
+        anterior = self._itens.get(proposta_id)
+        if anterior is not None:
+            # Nova versão (ex: proposta provisória enriquecida): mantém a data original e o estado
+            criada = min(criada, anterior["criada"])
+            if anterior["estado"] == PENDENTE:
+                self._invalidos += 2
+
+        horas, texto = prazo_resposta(pontuacao)
+        item = {
+            "id": proposta_id,
+            "area": area,
+            "autor": registro.nome,
+            "tipo_projeto": registro.tipo_projeto,
+            "resumo": registro.resumo_executivo or registro.ideia[:200],
+            "pontuacao_nps": pontuacao,
+            "prioridade": prioridade,
+            "criada": criada,
+            "vence_em": criada + timedelta(hours=horas),
+            "prazo": texto,
+            "estado": anterior["estado"] if anterior else PENDENTE,
+            "ultimo_lembrete": anterior["ultimo_lembrete"] if anterior else None,
+            "versao": (anterior["versao"] + 1) if anterior else 0
+        }
+        self._itens[proposta_id] = item
+
+        if item["estado"] == PENDENTE:
+            chave_prioridade = (ORDEM_PRIORIDADE.get(prioridade, len(ORDEM_PRIORIDADE)), -pontuacao, criada)
+            heapq.heappush(self._por_area.setdefault(area, []), (*chave_prioridade, proposta_id, item["versao"]))
+            heapq.heappush(self._por_prazo, (item["vence_em"], proposta_id, item["versao"]))
+        self._reconstruir_se_preciso()
+
+    def _aplicar_evento(self, evento):
+        item = self._itens.get(evento.get("id"))
+        if item is None:
+            return
+        if evento.get("evento") == RESPONDIDA and item["estado"] == PENDENTE:
+            item["estado"] = RESPONDIDA
+            self._invalidos += 2
+            self._reconstruir_se_preciso()
+        elif evento.get("evento") == "lembrete":
+            item["ultimo_lembrete"] = evento.get("em")
+
+    def _valido(self, entrada):
+        proposta_id, versao = entrada[-2], entrada[-1]
+        item = self._itens.get(proposta_id)
+        return item is not None and item["versao"] == versao and item["estado"] == PENDENTE
+
+    def _resumo(self, entrada):
+        return dict(self._itens[entrada[-2]])
+
+    def _reconstruir_se_preciso(self):
+        total = len(self._por_prazo) + sum(len(h) for h in self._por_area.values())
+        if self._invalidos <= 64 or self._invalidos * 2 < total:
+            return
+        self._por_area = {
+            area: [e for e in heap if self._valido(e)] for area, heap in self._por_area.items()
+        }
+        self._por_area = {area: heap for area, heap in self._por_area.items() if heap}
+        for heap in self._por_area.values():
+            heapq.heapify(heap)
+        self._por_prazo = [e for e in self._por_prazo if self._valido(e)]
+        heapq.heapify(self._por_prazo)
+        self._invalidos = 0
+
+    def _gravar_evento(self, evento):
+        evento = dict(evento, em=time.time())
+        os.makedirs(os.path.dirname(self.caminho_eventos) or ".", exist_ok=True)
+        with open(self.caminho_eventos, "a", encoding="utf-8") as arquivo:
+            if fcntl:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            arquivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+
+
+def enviar_lembretes(indice, enviar, repetir_horas=24, agora=None):
+    """Chama enviar(vencidas) com as pendentes vencidas sem lembrete nas últimas repetir_horas
+
+    Só um processo envia por vez (os demais desistem na hora); devolve quantas foram lembradas.
+    """
+    os.makedirs(os.path.dirname(indice.caminho_eventos) or ".", exist_ok=True)
+    with open(indice.caminho_eventos + ".lock", "w") as trava:
+        if fcntl:
+            try:
+                fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+
+        limite = time.time() - repetir_horas * 3600
+        vencidas = [
+            item for item in indice.vencidas(agora)
+            if item["ultimo_lembrete"] is None or item["ultimo_lembrete"] < limite
+        ]
+        if not vencidas:
+            return 0
+
+        enviar(vencidas)
+        for item in vencidas:
+            indice.registrar_lembrete(item["id"])
+        return len(vencidas)
+
+
+def iniciar_lembretes_periodicos(indice, enviar, intervalo=3600, repetir_horas=24):
+    """Thread em segundo plano (uma por processo e histórico) que envia os lembretes a cada intervalo segundos"""
+    with _trava_lembretes:
+        if indice.caminho_historico in _lembretes_iniciados:
+            return
+        _lembretes_iniciados.add(indice.caminho_historico)
+
+    def ciclo():
+        while True:
+            time.sleep(intervalo)
+            try:
+                enviar_lembretes(indice, enviar, repetir_horas)
+            except Exception:
+                continue
+
+    threading.Thread(target=ciclo, name="lembretes-triagem", daemon=True).start()
+
+
+def _menores_validos(heap, k, valido):
+    """As k menores entradas válidas do heap sem modificá-lo: O(k log k) + inválidas visitadas"""
+    resultado = []
+    for entrada in _em_ordem_validos(heap, valido):
+        resultado.append(entrada)
+        if len(resultado) >= k:
+            break
+    return resultado
+
+
+def _em_ordem_validos(heap, valido):
+    """Percorre o heap em ordem crescente (busca pela melhor fronteira), pulando inválidas"""
+    if not heap:
+        return
+    fronteira = [(heap[0], 0)]
+    while fronteira:
+        entrada, indice = heapq.heappop(fronteira)
+        if valido(entrada):
+            yield entrada
+        for filho in (2 * indice + 1, 2 * indice + 2):
+            if filho < len(heap):
+                heapq.heappush(fronteira, (heap[filho], filho))
+
+
+def _assinatura_fim(caminho):
+    if not os.path.exists(caminho):
+        return (None, 0)
+    info = os.stat(caminho)
+    return (info.st_ino, info.st_size)
+
+
+def _ler_jsonl(caminho):
+    if not os.path.exists(caminho):
+        return
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                continue
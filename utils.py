@@ -4,10 +4,422 @@ import yagmail
 import json
 import re
 from datetime import datetime
-import hashlib
+import os
+import random
+import smtplib
+import tempfile
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+import metricas
+import rastreamento
+from resiliencia import ABERTO, CircuitoAberto, Disjuntor, executar_com_hedge
+from limitador import LimitadorCompartilhado
+from roteamento import Roteador
+from secoes import ParserSecoes, inserir_secoes, secoes_faltando
+from deduplicacao import executar_uma_vez, gerar_id_conteudo
+from historico import ARQUIVO_PADRAO, buscar_proposta, iniciar_compactacao_periodica, registrar_proposta
+from tarefas import CONCLUIDA, FALHOU, FilaCheia, PoolTarefas, Reagendar
+from esqueleto import renderizar_esqueleto
+from triagem import IndiceTriagem, iniciar_lembretes_periodicos
+from modelo_local import ModeloLocal
+from sugestoes import IndiceSugestoes
+from pipeline import Estagio, Grafo
+from diario import DiarioEstagios
+from renderizador_email import ORCAMENTO_BYTES_EMAIL, montar_email_compacto, renderizar_corpo
+from registro_proposta import (
+    RegistroProposta, avaliar_complexidade, calcular_potencial_melhoria, classificar_categoria_nps,
+    classificar_projeto, extrair_palavras_chave, identificar_areas_impacto_nps, sugerir_prioridade_nps
+)
+
+def obter_config(chave, padrao=None):
+    """Lê configuração da variável de ambiente ou do st.secrets"""
+    valor = os.environ.get(chave)
+    if valor is not None:
+        return valor
+    
+    try:
+        return st.secrets[chave]
+    except Exception:
+        return padrao
 
 # 🔑 Conectando ao OpenAI com modelo mais avançado
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+# (OPENAI_BASE_URL permite apontar para um servidor compatível, ex: benchmarks locais)
+# Cada tentativa HTTP (inclusive os retries do SDK) vira um evento no trecho da chamada
+def _evento_requisicao_http(requisicao):
+    rastreamento.evento("http.requisicao", metodo=requisicao.method, caminho=requisicao.url.path)
+
+def _evento_resposta_http(resposta):
+    rastreamento.evento("http.resposta", status=resposta.status_code)
+
+try:
+    from openai import DefaultHttpxClient
+    _cliente_http = DefaultHttpxClient(event_hooks={"request": [_evento_requisicao_http], "response": [_evento_resposta_http]})
+except ImportError:  # openai antigo: sem eventos HTTP nos rastros
+    _cliente_http = None
+client = OpenAI(api_key=obter_config("OPENAI_API_KEY"), base_url=obter_config("OPENAI_BASE_URL"), http_client=_cliente_http)
+
+MODELO_PADRAO = "gpt-4-turbo-preview"
+MODELO_RAPIDO = "gpt-4o-mini"
+
+# 🧭 Nível de modelo por estágio (MODELOS_ESTAGIO em JSON sobrescreve, ex: {"preview": "rapido"})
+NIVEL_ESTAGIO = {
+    "tipo": "rapido",
+    "nps": "rapido",
+    "preview": "padrao",
+    "proposta": "padrao",
+    "continuacao": "padrao"
+}
+NIVEL_ESTAGIO.update(json.loads(obter_config("MODELOS_ESTAGIO", "{}")))
+
+# Orçamento de p95 (segundos) por estágio; acima dele o roteador usa um nível mais rápido
+ORCAMENTO_P95_ESTAGIO = {
+    "tipo": 2,
+    "nps": 3,
+    "preview": 15,
+    "proposta": 60,
+    "continuacao": 30
+}
+
+# ⏱️ Prazo máximo (segundos) de cada chamada ao modelo, por estágio do pipeline
+PRAZOS_ESTAGIO = {
+    "tipo": 8,
+    "nps": 10,
+    "preview": 30,
+    "proposta": 90,
+    "continuacao": 60
+}
+
+# ✂️ Proposta cortada por max_tokens: até N continuações de TOKENS_CONTINUACAO tokens cada
+MAX_CONTINUACOES = int(obter_config("PROPOSTA_MAX_CONTINUACOES", 2))
+TOKENS_CONTINUACAO = 1200
+# Tokens pedidos por seção obrigatória que faltou (só elas são regeneradas)
+TOKENS_POR_SECAO = 300
+
+# ⏳ Orçamento de tempo do envio (s), do clique até o email; 0 desliga. Estágio que não cabe no que
+# resta é degradado: heurística no tipo/NPS, proposta no tamanho do preview (ou esqueleto), email na fila
+PRAZO_ENVIO = float(obter_config("PRAZO_ENVIO", 0))
+
+# Tempo mínimo (s) para tentar cada estágio dentro do orçamento; com histórico, vale o p95 observado
+TEMPO_MINIMO_ESTAGIO = {
+    "tipo": 1,
+    "nps": 1.5,
+    "preview": 6,
+    "proposta": 15,
+    "continuacao": 5,
+    "email": 2
+}
+TEMPO_MINIMO_ESTAGIO.update(json.loads(obter_config("TEMPOS_MINIMOS_ESTAGIO", "{}")))
+
+# 🔀 Tipo incerto (confiança abaixo do limiar): a proposta completa é gerada nos dois templates ao
+# mesmo tempo; fica a do tipo escolhido e a outra é guardada como alternativa (ou cancelada se
+# não terminar até GERACAO_DUPLA_TOLERANCIA s depois da principal)
+GERACAO_DUPLA = str(obter_config("GERACAO_DUPLA", "false")).lower() == "true"
+GERACAO_DUPLA_LIMIAR = float(obter_config("GERACAO_DUPLA_LIMIAR", 0.75))
+GERACAO_DUPLA_TOLERANCIA = float(obter_config("GERACAO_DUPLA_TOLERANCIA", 3))
+TIPOS_PROJETO = ("TECNOLÓGICO", "PROCESSO")
+# A heurística de palavras-chave acerta o tipo pouco mais que o acaso (A/B offline)
+CONFIANCA_TIPO_HEURISTICA = 0.5
+executor_alternativas = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mindglass-alternativa")
+Alternativa = namedtuple("Alternativa", ["tipo_projeto", "futuro", "cancelar", "dados"])
+
+# Estágios curtos que aceitam hedge: após este atraso (s) sem resposta, dispara uma cópia
+ATRASO_HEDGE_ESTAGIO = {
+    "tipo": 1.5,
+    "nps": 2.0
+}
+
+# 🔌 Disjuntor compartilhado: com o provedor falhando, vai direto para o fallback heurístico
+disjuntor_openai = Disjuntor(
+    "openai",
+    limite_falhas=int(obter_config("OPENAI_DISJUNTOR_FALHAS", 5)),
+    tempo_abertura=float(obter_config("OPENAI_DISJUNTOR_ESPERA", 30))
+)
+
+# 🚦 Cota da OpenAI compartilhada por todos os processos do host (RPM/TPM); sem limites, fica inativa
+limitador_openai = LimitadorCompartilhado(
+    obter_config("OPENAI_LIMITE_ARQUIVO", os.path.join(tempfile.gettempdir(), "mindglass-limite-openai.json")),
+    requisicoes_por_minuto=int(obter_config("OPENAI_LIMITE_RPM", 0)) or None,
+    tokens_por_minuto=int(obter_config("OPENAI_LIMITE_TPM", 0)) or None
+)
+
+# 🗂️ Histórico persistente das propostas (JSONL); as antigas vão para segmentos comprimidos
+ARQUIVO_HISTORICO = obter_config("HISTORICO_ARQUIVO", ARQUIVO_PADRAO)
+HISTORICO_DIAS_QUENTE = int(obter_config("HISTORICO_DIAS_QUENTE", 30))
+HISTORICO_CODEC = obter_config("HISTORICO_CODEC", "gzip")
+
+# 🧵 Rastros por submissão (cascata na página Admin), gravados em OTLP/JSON ao lado do histórico
+rastreamento.configurar(
+    obter_config("RASTROS_ARQUIVO", os.path.join(os.path.dirname(ARQUIVO_HISTORICO) or ".", "rastros.jsonl")),
+    amostra=float(obter_config("RASTROS_AMOSTRA", 1.0)),
+    max_por_minuto=int(obter_config("RASTROS_MAX_POR_MINUTO", 60)),
+    tamanho_maximo=int(float(obter_config("RASTROS_MAX_MB", 50)) * 2**20)
+)
+
+# Compactação periódica do histórico (0 desliga); a thread sobe em iniciar_servicos
+HISTORICO_COMPACTACAO_HORAS = float(obter_config("HISTORICO_COMPACTACAO_HORAS", 6))
+
+# 🧵 Envios rodam em workers em segundo plano, fora do script do Streamlit
+pool_envios = PoolTarefas(
+    "envio",
+    trabalhadores=int(obter_config("TAREFAS_TRABALHADORES", 2)),
+    capacidade=int(obter_config("TAREFAS_CAPACIDADE", 50))
+)
+
+# ✉️ Emails adiados quando o orçamento do envio acaba antes do SMTP
+pool_emails = PoolTarefas(
+    "email",
+    trabalhadores=1,
+    capacidade=int(obter_config("EMAIL_FILA_CAPACIDADE", 200))
+)
+
+# 🧩 Propostas provisórias (esqueleto sem IA) voltam ao modelo quando o provedor se recupera
+pool_enriquecimento = PoolTarefas(
+    "enriquecimento",
+    trabalhadores=1,
+    capacidade=int(obter_config("ENRIQUECIMENTO_CAPACIDADE", 200))
+)
+ENRIQUECIMENTO_TENTATIVAS = int(obter_config("ENRIQUECIMENTO_TENTATIVAS", 5))
+ENRIQUECIMENTO_INTERVALO = float(obter_config("ENRIQUECIMENTO_INTERVALO", 30))
+
+# 📋 Fila da liderança: pendentes por prioridade/área e por prazo de resposta (SLA do NPS)
+indice_triagem = IndiceTriagem(ARQUIVO_HISTORICO)
+LEMBRETE_REPETIR_HORAS = float(obter_config("LEMBRETE_REPETIR_HORAS", 24))
+
+# 🔎 Ideias parecidas já enviadas, mostradas enquanto a pessoa digita (índice em memória, sem IA)
+indice_sugestoes = IndiceSugestoes(ARQUIVO_HISTORICO)
+SUGESTOES_QUANTIDADE = int(obter_config("SUGESTOES_QUANTIDADE", 3))
+SUGESTOES_SIMILARIDADE_MINIMA = float(obter_config("SUGESTOES_SIMILARIDADE_MINIMA", 0.35))
+
+# 🧠 Modelo local (treinado com as respostas da IA no histórico) para tipo e NPS; a IA só é
+# chamada quando a confiança fica abaixo do limiar (e numa amostra, para medir a acurácia)
+modelo_local = ModeloLocal(
+    ARQUIVO_HISTORICO,
+    caminho_modelo=obter_config("MODELO_LOCAL_ARQUIVO", os.path.join(os.path.dirname(ARQUIVO_HISTORICO) or ".", "modelo_local.npz")),
+    limiar=float(obter_config("MODELO_LOCAL_LIMIAR", 0.9)),
+    minimo_exemplos=int(obter_config("MODELO_LOCAL_MINIMO_EXEMPLOS", 200))
+)
+MODELO_LOCAL_ATIVO = str(obter_config("MODELO_LOCAL", "true")).lower() == "true"
+MODELO_LOCAL_AMOSTRA = float(obter_config("MODELO_LOCAL_AMOSTRA", 0.05))
+
+roteador_modelos = Roteador(
+    {
+        "rapido": obter_config("MODELO_RAPIDO", MODELO_RAPIDO),
+        "padrao": obter_config("MODELO_PADRAO", MODELO_PADRAO)
+    },
+    NIVEL_ESTAGIO,
+    ORCAMENTO_P95_ESTAGIO,
+    adaptativo=str(obter_config("ROTEAMENTO_ADAPTATIVO", "true")).lower() == "true"
+)
+
+# Resposta normalizada de chamar_modelo (com ou sem stream)
+RespostaModelo = namedtuple("RespostaModelo", ["texto", "finish_reason", "modelo", "uso"])
+
+class PrazoEsgotado(TimeoutError):
+    """O que resta do orçamento do envio não comporta o estágio"""
+    pass
+
+class GeracaoCancelada(Exception):
+    """Geração alternativa interrompida no meio do stream (a principal já terminou)"""
+    pass
+
+class EnriquecimentoEsgotado(Exception):
+    """A proposta provisória não foi refeita pelo modelo em ENRIQUECIMENTO_TENTATIVAS tentativas"""
+    pass
+
+def tempo_restante(dados):
+    """Segundos que restam do orçamento do envio (None sem orçamento, ex: preview)"""
+    limite = (dados or {}).get("limite_envio")
+    return None if limite is None else limite - time.monotonic()
+
+def tempo_necessario(estagio):
+    """Tempo para tentar o estágio: o mínimo configurado ou o p95 observado, o que for maior"""
+    return max(TEMPO_MINIMO_ESTAGIO[estagio], roteador_modelos.p95(estagio) or 0)
+
+def cabe_no_prazo(estagio, dados):
+    """True se o estágio cabe no que resta do orçamento do envio (ou se não há orçamento)"""
+    restante = tempo_restante(dados)
+    return restante is None or restante >= tempo_necessario(estagio)
+
+def registrar_degradacao(dados, estagio, modo):
+    """Anota o estágio degradado pelo prazo do envio (vai para metadata.degradacao)"""
+    dados.setdefault("degradacao", {})[estagio] = modo
+    metricas.incrementar("estagios_degradados", estagio=estagio, modo=modo)
+
+def registrar_modelo(dados, estagio, modelo):
+    """Anota em dados qual modelo (ou 'heuristica') atendeu cada estágio"""
+    if dados is not None:
+        dados.setdefault("modelos_estagio", {})[estagio] = modelo
+
+def registrar_tokens(dados, estagio, tokens):
+    """Soma em dados os tokens gastos por estágio do modelo (o diário mede a economia ao retomar)"""
+    if dados is not None:
+        por_estagio = dados.setdefault("tokens_estagio", {})
+        por_estagio[estagio] = por_estagio.get(estagio, 0) + tokens
+
+def _consumir_stream(stream, ao_receber, modelo, limite):
+    """Lê o stream repassando cada trecho para ao_receber; aborta se passar do limite (monotonic)"""
+    partes = []
+    finish_reason = None
+    uso = None
+    
+    for evento in stream:
+        if time.monotonic() > limite:
+            stream.close()
+            raise TimeoutError("Prazo do estágio esgotado durante o stream")
+        
+        if getattr(evento, "usage", None):
+            uso = evento.usage
+        if not evento.choices:
+            continue
+        
+        escolha = evento.choices[0]
+        if escolha.delta and escolha.delta.content:
+            partes.append(escolha.delta.content)
+            ao_receber(escolha.delta.content)
+        if escolha.finish_reason:
+            finish_reason = escolha.finish_reason
+    
+    return RespostaModelo("".join(partes), finish_reason, modelo, uso)
+
+def estimar_tokens(messages, max_tokens):
+    """Estimativa de tokens da chamada (≈4 caracteres por token no prompt + teto da resposta)"""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+@rastreamento.rastrear
+def chamar_modelo(estagio, messages, temperature, max_tokens, dados=None, ao_receber=None):
+    """Chama o chat da OpenAI com modelo roteado, prazo por estágio, disjuntor e hedge opcional
+    
+    Com ao_receber, a resposta vem por stream e cada trecho de texto é repassado à função.
+    A prioridade na fila da cota vem de dados["prioridade"] (envio > preview > fundo). Com
+    orçamento do envio (dados["limite_envio"]), o prazo da chamada é o que resta dele; se não
+    couber o estágio, levanta PrazoEsgotado sem chamar o modelo.
+    """
+    rastreamento.definir(estagio=estagio, max_tokens=max_tokens, stream=ao_receber is not None)
+    prazo = PRAZOS_ESTAGIO[estagio]
+    restante = tempo_restante(dados)
+    if restante is not None:
+        if restante < tempo_necessario(estagio):
+            raise PrazoEsgotado(f"Restam {max(restante, 0):.1f}s do prazo do envio para o estágio {estagio}")
+        prazo = min(prazo, restante)
+    
+    if not disjuntor_openai.permitir():
+        metricas.incrementar("openai_bloqueadas", estagio=estagio)
+        raise CircuitoAberto(f"OpenAI indisponível (disjuntor aberto) no estágio {estagio}")
+    
+    tokens_estimados = estimar_tokens(messages, max_tokens)
+    prioridade = (dados or {}).get("prioridade", "fundo")
+    inicio_cota = time.perf_counter()
+    try:
+        limitador_openai.adquirir(tokens_estimados, prioridade=prioridade, prazo=prazo)
+    except BaseException:
+        # Sem cota a chamada nem chegou ao provedor: se era o teste do disjuntor, libera
+        disjuntor_openai.liberar_teste()
+        raise
+    rastreamento.definir(espera_cota_ms=round((time.perf_counter() - inicio_cota) * 1000, 1), prazo_s=round(prazo, 1))
+    
+    cliente = client.with_options(
+        timeout=prazo,
+        max_retries=int(obter_config("OPENAI_MAX_RETRIES", 0))
+    )
+    
+    modelo = roteador_modelos.escolher(estagio)
+    rastreamento.definir(modelo=modelo)
+    # O hedge roda a requisição em outra thread: o pai do trecho vai explícito
+    trecho_chamada = rastreamento.atual()
+    
+    def requisicao():
+        with rastreamento.trecho("openai.requisicao", pai=trecho_chamada, modelo=modelo):
+            return _requisitar()
+    
+    def _requisitar():
+        if ao_receber is None:
+            bruta = cliente.chat.completions.create(
+                model=modelo,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            escolha = bruta.choices[0]
+            return RespostaModelo(escolha.message.content or "", escolha.finish_reason, modelo, bruta.usage)
+        
+        stream = cliente.chat.completions.create(
+            model=modelo,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        return _consumir_stream(stream, ao_receber, modelo, time.monotonic() + prazo)
+    
+    usar_hedge = str(obter_config("OPENAI_HEDGE", "false")).lower() == "true"
+    inicio = time.perf_counter()
+    try:
+        if usar_hedge and ao_receber is None and estagio in ATRASO_HEDGE_ESTAGIO:
+            # A cópia é outra requisição: paga a própria cota (sem cota, fica só a original)
+            resposta = executar_com_hedge(
+                requisicao, ATRASO_HEDGE_ESTAGIO[estagio], estagio,
+                ao_duplicar=lambda: limitador_openai.adquirir(tokens_estimados, prioridade=prioridade, prazo=0)
+            )
+        else:
+            resposta = requisicao()
+    except GeracaoCancelada:
+        # Interrompida por nós, não pelo provedor: não conta no disjuntor nem na latência
+        disjuntor_openai.liberar_teste()
+        raise
+    except Exception as e:
+        # Cortada pelo orçamento do envio, não pelo provedor: não conta no disjuntor
+        if prazo < PRAZOS_ESTAGIO[estagio] and tempo_restante(dados) <= 0:
+            disjuntor_openai.liberar_teste()
+            roteador_modelos.registrar(estagio, modelo, erro=True)
+            raise PrazoEsgotado(f"Prazo do envio esgotado durante o estágio {estagio}") from e
+        disjuntor_openai.registrar_falha()
+        roteador_modelos.registrar(estagio, modelo, erro=True)
+        metricas.incrementar("openai_falhas", estagio=estagio, modelo=modelo)
+        raise
+    
+    latencia = time.perf_counter() - inicio
+    disjuntor_openai.registrar_sucesso()
+    if resposta.uso:
+        limitador_openai.ajustar_tokens(tokens_estimados - resposta.uso.total_tokens)
+    roteador_modelos.registrar(estagio, modelo, latencia)
+    metricas.observar("openai_latencia_s", latencia, estagio=estagio, modelo=modelo)
+    registrar_modelo(dados, estagio, modelo)
+    # Stream sem uso informado pelo provedor: estimativa pelo tamanho do texto
+    registrar_tokens(dados, estagio, resposta.uso.total_tokens if resposta.uso else estimar_tokens(messages, len(resposta.texto) // 4))
+    rastreamento.definir(
+        finish_reason=resposta.finish_reason,
+        tokens_entrada=getattr(resposta.uso, "prompt_tokens", None),
+        tokens_saida=getattr(resposta.uso, "completion_tokens", None)
+    )
+    return resposta
+
+def registrar_confianca_tipo(dados, confianca):
+    """Anota em dados a confiança do tipo detectado (decide a geração nos dois templates)"""
+    if dados is not None:
+        dados["confianca_tipo"] = round(confianca, 3)
+
+def confianca_tipo_ia(tipo, previsao):
+    """Confiança do tipo dado pela IA: média do voto da IA com a probabilidade do modelo local para o mesmo tipo"""
+    if previsao is None:
+        return 1.0
+    probabilidade = previsao.confianca if previsao.valor == tipo else 1 - previsao.confianca
+    return (1 + probabilidade) / 2
+
+def usar_previsao_local(estagio, previsao, dados=None):
+    """True se a previsão do modelo local dispensa a chamada à IA neste estágio"""
+    if (not MODELO_LOCAL_ATIVO or previsao is None or previsao.confianca < modelo_local.limiar
+            or random.random() < MODELO_LOCAL_AMOSTRA):
+        metricas.incrementar("modelo_local_decisoes", estagio=estagio, origem="ia")
+        if previsao is not None:
+            rastreamento.evento("modelo_local", estagio=estagio, origem="ia", confianca=round(previsao.confianca, 3))
+        return False
+    metricas.incrementar("modelo_local_decisoes", estagio=estagio, origem="local")
+    rastreamento.evento("modelo_local", estagio=estagio, origem="local", confianca=round(previsao.confianca, 3))
+    registrar_modelo(dados, estagio, "local")
+    return True
 
 def validar_entrada(nome, ideia):
     """Valida as entradas do usuário"""
@@ -26,10 +438,18 @@ def validar_entrada(nome, ideia):
     
     return {"valido": True, "erro": None}
 
-def detectar_tipo_projeto(ideia, area):
-    """Detecta se é projeto tecnológico ou de processo usando IA"""
-    
-    prompt_deteccao = f"""
+def sugerir_ideias_parecidas(ideia):
+    """Ideias parecidas do histórico, com o estado na fila da liderança (pendente/respondida)"""
+    inicio = time.perf_counter()
+    sugestoes = indice_sugestoes.sugerir(ideia, k=SUGESTOES_QUANTIDADE, minimo=SUGESTOES_SIMILARIDADE_MINIMA)
+    metricas.observar("sugestoes_consulta_s", time.perf_counter() - inicio)
+    for sugestao in sugestoes:
+        sugestao["estado"] = indice_triagem.estado(sugestao["id"])
+    return sugestoes
+
+def prompt_tipo(ideia, area):
+    """Prompt da classificação TECNOLÓGICO × PROCESSO"""
+    return f"""
     Analise a seguinte ideia e determine se é um projeto TECNOLÓGICO ou de PROCESSO:
     
     ÁREA: {area}
@@ -41,34 +461,55 @@ def detectar_tipo_projeto(ideia, area):
     
     Responda apenas com: "TECNOLÓGICO" ou "PROCESSO"
     """
+
+def tipo_heuristico(ideia):
+    """Tipo do projeto por palavras-chave (fallback sem IA)"""
+    palavras_tech = ['app', 'sistema', 'software', 'digital', 'automação', 'api', 'dashboard', 'site', 'plataforma']
+    palavras_processo = ['formulário', 'papel', 'procedimento', 'manual', 'treinamento', 'política', 'workflow']
+    
+    ideia_lower = ideia.lower()
+    
+    score_tech = sum(1 for palavra in palavras_tech if palavra in ideia_lower)
+    score_processo = sum(1 for palavra in palavras_processo if palavra in ideia_lower)
+    
+    return "TECNOLÓGICO" if score_tech > score_processo else "PROCESSO"
+
+@rastreamento.rastrear
+def detectar_tipo_projeto(ideia, area, dados=None):
+    """Detecta se é projeto tecnológico ou de processo usando IA"""
+    
+    previsao = modelo_local.prever_tipo(ideia, area) if MODELO_LOCAL_ATIVO else None
+    if usar_previsao_local("tipo", previsao, dados):
+        registrar_confianca_tipo(dados, previsao.confianca)
+        return previsao.valor
     
     try:
-        resposta = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[{"role": "user", "content": prompt_deteccao}],
+        resposta = chamar_modelo(
+            "tipo",
+            messages=[{"role": "user", "content": prompt_tipo(ideia, area)}],
             temperature=0.1,
-            max_tokens=20
+            max_tokens=20,
+            dados=dados
         )
         
-        resultado = resposta.choices[0].message.content.strip().upper()
-        return "TECNOLÓGICO" if "TECNOLÓGICO" in resultado else "PROCESSO"
+        resultado = resposta.texto.strip().upper()
+        tipo = "TECNOLÓGICO" if "TECNOLÓGICO" in resultado else "PROCESSO"
+        modelo_local.comparar("tipo", previsao, tipo)
+        registrar_confianca_tipo(dados, confianca_tipo_ia(tipo, previsao))
+        return tipo
         
-    except Exception:
+    except Exception as e:
         # Fallback: usa palavras-chave para detectar
-        palavras_tech = ['app', 'sistema', 'software', 'digital', 'automação', 'api', 'dashboard', 'site', 'plataforma']
-        palavras_processo = ['formulário', 'papel', 'procedimento', 'manual', 'treinamento', 'política', 'workflow']
-        
-        ideia_lower = ideia.lower()
-        
-        score_tech = sum(1 for palavra in palavras_tech if palavra in ideia_lower)
-        score_processo = sum(1 for palavra in palavras_processo if palavra in ideia_lower)
-        
-        return "TECNOLÓGICO" if score_tech > score_processo else "PROCESSO"
+        metricas.incrementar("fallback_heuristico", estagio="tipo")
+        registrar_modelo(dados, "tipo", "heuristica")
+        if isinstance(e, PrazoEsgotado):
+            registrar_degradacao(dados, "tipo", "heuristica")
+        registrar_confianca_tipo(dados, CONFIANCA_TIPO_HEURISTICA)
+        return tipo_heuristico(ideia)
 
-def calcular_pontuacao_nps(ideia, area, foco):
-    """Calcula pontuação de 0-100 baseada no impacto no NPS usando IA"""
-    
-    prompt_nps = f"""
+def prompt_nps(ideia, area, foco):
+    """Prompt da pontuação de impacto no NPS (0-100 e justificativa)"""
+    return f"""
     Como especialista em NPS (Net Promoter Score), avalie esta ideia de 0 a 100 pontos:
     
     CONTEXTO CARGLASS:
@@ -97,16 +538,41 @@ def calcular_pontuacao_nps(ideia, area, foco):
     RESPONDA APENAS COM O NÚMERO (0-100) E UMA JUSTIFICATIVA DE 1 LINHA:
     Formato: "85 - Justificativa aqui"
     """
+
+def nps_heuristico(ideia):
+    """(pontuação, justificativa) por palavras-chave (fallback sem IA)"""
+    palavras_alto_nps = ['cliente', 'experiência', 'acompanhar', 'transparência', 'comunicação', 'rapidez']
+    palavras_medio_nps = ['processo', 'qualidade', 'eficiência', 'automação']
+    
+    ideia_lower = ideia.lower()
+    score_alto = sum(1 for palavra in palavras_alto_nps if palavra in ideia_lower)
+    score_medio = sum(1 for palavra in palavras_medio_nps if palavra in ideia_lower)
+    
+    if score_alto >= 2:
+        return 75, "Alto impacto potencial na experiência do cliente"
+    elif score_medio >= 1:
+        return 55, "Impacto médio na operação e indiretamente no cliente"
+    else:
+        return 35, "Impacto principalmente interno"
+
+@rastreamento.rastrear
+def calcular_pontuacao_nps(ideia, area, foco, dados=None):
+    """Calcula pontuação de 0-100 baseada no impacto no NPS usando IA"""
+    
+    previsao = modelo_local.prever_nps(ideia, area, foco) if MODELO_LOCAL_ATIVO else None
+    if usar_previsao_local("nps", previsao, dados):
+        return previsao.valor, "Estimativa a partir de propostas semelhantes já avaliadas"
     
     try:
-        resposta = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[{"role": "user", "content": prompt_nps}],
+        resposta = chamar_modelo(
+            "nps",
+            messages=[{"role": "user", "content": prompt_nps(ideia, area, foco)}],
             temperature=0.2,
-            max_tokens=100
+            max_tokens=100,
+            dados=dados
         )
         
-        resultado = resposta.choices[0].message.content.strip()
+        resultado = resposta.texto.strip()
         
         # Extrai o número da resposta
         match = re.search(r'(\d+)', resultado)
@@ -114,29 +580,22 @@ def calcular_pontuacao_nps(ideia, area, foco):
             pontuacao = int(match.group(1))
             # Extrai justificativa
             justificativa = resultado.split('-', 1)[1].strip() if '-' in resultado else "Avaliação automática"
-            return min(max(pontuacao, 0), 100), justificativa
+            pontuacao = min(max(pontuacao, 0), 100)
+            modelo_local.comparar("nps", previsao, pontuacao)
+            return pontuacao, justificativa
         else:
             return 50, "Avaliação padrão"
             
-    except Exception:
+    except Exception as e:
         # Fallback baseado em palavras-chave
-        palavras_alto_nps = ['cliente', 'experiência', 'acompanhar', 'transparência', 'comunicação', 'rapidez']
-        palavras_medio_nps = ['processo', 'qualidade', 'eficiência', 'automação']
-        
-        ideia_lower = ideia.lower()
-        score_alto = sum(1 for palavra in palavras_alto_nps if palavra in ideia_lower)
-        score_medio = sum(1 for palavra in palavras_medio_nps if palavra in ideia_lower)
-        
-        if score_alto >= 2:
-            return 75, "Alto impacto potencial na experiência do cliente"
-        elif score_medio >= 1:
-            return 55, "Impacto médio na operação e indiretamente no cliente"
-        else:
-            return 35, "Impacto principalmente interno"
+        metricas.incrementar("fallback_heuristico", estagio="nps")
+        registrar_modelo(dados, "nps", "heuristica")
+        if isinstance(e, PrazoEsgotado):
+            registrar_degradacao(dados, "nps", "heuristica")
+        return nps_heuristico(ideia)
 
-def estruturar_ideia_avancada(dados, preview_mode=False):
-    """Gera proposta estruturada usando GPT-4 com diferenciação por tipo de projeto"""
-    
+def mensagens_proposta(dados, tipo_projeto, preview_mode=False):
+    """Mensagens do chat para o preview ou para a proposta completa no template do tipo"""
     nome = dados["nome"]
     area = dados["area"]
     ideia = dados["ideia"]
@@ -145,17 +604,8 @@ def estruturar_ideia_avancada(dados, preview_mode=False):
     problema = dados.get("problema", "")
     recursos = dados.get("recursos", "")
     prazo = dados.get("prazo", "")
-    
-    # Detecta tipo de projeto
-    tipo_projeto = detectar_tipo_projeto(ideia, area)
-    
-    # Calcula pontuação NPS
-    pontuacao_nps, justificativa_nps = calcular_pontuacao_nps(ideia, area, foco)
-    
-    # Armazena no dados para uso posterior
-    dados["tipo_projeto"] = tipo_projeto
-    dados["pontuacao_nps"] = pontuacao_nps
-    dados["justificativa_nps"] = justificativa_nps
+    pontuacao_nps = dados["pontuacao_nps"]
+    justificativa_nps = dados.get("justificativa_nps", "")
     
     if preview_mode:
         prompt = f"""
@@ -413,477 +863,384 @@ def estruturar_ideia_avancada(dados, preview_mode=False):
             **Proposta de processo gerada por:** MindGlass V2 | **Autor:** {nome} | **Data:** {datetime.now().strftime("%d/%m/%Y")}
             """
     
+    mensagens = [
+        {
+            "role": "system", 
+            "content": f"Você é um consultor especializado em projetos {'tecnológicos' if tipo_projeto == 'TECNOLÓGICO' else 'de processo'} focado em melhorar NPS. Seja específico e prático."
+        },
+        {
+            "role": "user", 
+            "content": prompt
+        }
+    ]
+    return mensagens
+
+def usar_geracao_dupla(dados):
+    """True se o tipo ficou incerto e o envio não é de fundo (o enriquecimento não tem pressa)"""
+    return (GERACAO_DUPLA and dados.get("prioridade") != "fundo"
+            and dados.get("confianca_tipo", 1.0) < GERACAO_DUPLA_LIMIAR)
+
+def outro_tipo(tipo_projeto):
+    return TIPOS_PROJETO[1] if tipo_projeto == TIPOS_PROJETO[0] else TIPOS_PROJETO[0]
+
+def iniciar_alternativa(dados, tipo_projeto):
+    """Começa a proposta completa no template do tipo em segundo plano (mesmo prazo do envio)
+
+    Passa pela mesma conferência da principal (completar_proposta): cortada ou sem seções do
+    template, é continuada antes de virar alternativa ou substituta.
+    """
+    copia = dict(dados, tipo_projeto=tipo_projeto, modelos_estagio={}, degradacao={})
+    mensagens = mensagens_proposta(copia, tipo_projeto)
+    cancelar = threading.Event()
+    pai = rastreamento.atual()
+    
+    def ao_receber(trecho):
+        if cancelar.is_set():
+            raise GeracaoCancelada(f"Alternativa {tipo_projeto} cancelada")
+    
+    def gerar():
+        with rastreamento.trecho("proposta_alternativa", pai=pai, tipo_projeto=tipo_projeto):
+            resposta = chamar_modelo("proposta", messages=mensagens, temperature=0.3, max_tokens=2500,
+                                     dados=copia, ao_receber=ao_receber)
+            return completar_proposta(copia, tipo_projeto, mensagens, resposta, ao_receber=ao_receber).strip()
+    
+    metricas.incrementar("geracao_dupla", resultado="iniciada")
+    return Alternativa(tipo_projeto, executor_alternativas.submit(gerar), cancelar, copia)
+
+def concluir_alternativa(alternativa, espera=None):
+    """Texto da alternativa se ficar pronta em `espera` s (None = até o prazo dela); senão cancela e devolve None"""
+    wait([alternativa.futuro], timeout=espera)
+    if not alternativa.futuro.done():
+        alternativa.cancelar.set()
+        metricas.incrementar("geracao_dupla", resultado="cancelada")
+        return None
+    if alternativa.futuro.exception() is not None:
+        metricas.incrementar("geracao_dupla", resultado="falhou")
+        return None
+    return alternativa.futuro.result()
+
+@rastreamento.rastrear
+def estruturar_ideia_avancada(dados, preview_mode=False, permitir_esqueleto=True):
+    """Gera proposta estruturada usando GPT-4 com diferenciação por tipo de projeto
+    
+    Se o modelo falhar, devolve o esqueleto local marcado como provisório
+    (ou propaga o erro, com permitir_esqueleto=False).
+    """
+    
+    area = dados["area"]
+    ideia = dados["ideia"]
+    foco = dados["foco"]
+    
+    # Tipo e NPS já calculados (pelo pipeline ou pela triagem) não são pedidos de novo ao modelo
+    if "tipo_projeto" not in dados:
+        dados["tipo_projeto"] = detectar_tipo_projeto(ideia, area, dados)
+    if "pontuacao_nps" not in dados:
+        dados["pontuacao_nps"], dados["justificativa_nps"] = calcular_pontuacao_nps(ideia, area, foco, dados)
+    
+    tipo_projeto = dados["tipo_projeto"]
+    
+    # Sem tempo para a proposta completa no orçamento do envio: gera no tamanho do preview
+    # (provisória, refeita depois pelo enriquecimento)
+    reduzida = not preview_mode and not cabe_no_prazo("proposta", dados) and cabe_no_prazo("preview", dados)
+    if reduzida:
+        registrar_degradacao(dados, "proposta", "preview")
+        preview_mode = True
+    
+    mensagens = mensagens_proposta(dados, tipo_projeto, preview_mode)
+    
+    # Tipo incerto: o outro template começa a ser gerado em paralelo, como alternativa
+    alternativa = None
+    if not preview_mode and usar_geracao_dupla(dados):
+        alternativa = iniciar_alternativa(dados, outro_tipo(tipo_projeto))
+    
+    # As seções são extraídas enquanto o texto chega, prontas para o JSON ao fim do stream
+    parser = ParserSecoes()
+    
     try:
-        resposta = client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"Você é um consultor especializado em projetos {'tecnológicos' if tipo_projeto == 'TECNOLÓGICO' else 'de processo'} focado em melhorar NPS. Seja específico e prático."
-                },
-                {
-                    "role": "user", 
-                    "content": prompt
-                }
-            ],
+        resposta = chamar_modelo(
+            "preview" if preview_mode else "proposta",
+            messages=mensagens,
             temperature=0.3,
             max_tokens=2500 if not preview_mode else 800,
+            dados=dados,
+            ao_receber=parser.alimentar
         )
         
-        return resposta.choices[0].message.content.strip()
+        parser.finalizar()
+        dados["estrutura_proposta"] = parser.estrutura
+        dados["proposta_provisoria"] = reduzida
+        if preview_mode:
+            return resposta.texto.strip()
+        proposta = completar_proposta(dados, tipo_projeto, mensagens, resposta).strip()
+        if alternativa is not None:
+            texto = concluir_alternativa(alternativa, GERACAO_DUPLA_TOLERANCIA)
+            if texto:
+                dados["proposta_alternativa"] = {"tipo_projeto": alternativa.tipo_projeto, "proposta_completa": texto}
+                metricas.incrementar("geracao_dupla", resultado="alternativa")
+        return proposta
         
     except Exception as e:
-        return f"Erro ao processar com IA: {str(e)}"
+        # O template escolhido falhou: fica o outro, se já estava sendo gerado e deu certo
+        texto = concluir_alternativa(alternativa) if alternativa is not None else None
+        if texto:
+            metricas.incrementar("geracao_dupla", resultado="substituta")
+            dados["tipo_projeto"] = alternativa.tipo_projeto
+            dados["estrutura_proposta"] = extrair_estrutura_proposta(texto)
+            dados["proposta_provisoria"] = False
+            dados["continuacoes"] = alternativa.dados.get("continuacoes", 0)
+            registrar_modelo(dados, "proposta", alternativa.dados.get("modelos_estagio", {}).get("proposta"))
+            return texto
+        
+        if not permitir_esqueleto:
+            raise
+        
+        # Fallback: esqueleto local a partir do formulário e das heurísticas
+        estagio = "preview" if preview_mode and not reduzida else "proposta"
+        metricas.incrementar("proposta_provisoria", estagio=estagio)
+        registrar_modelo(dados, estagio, "esqueleto")
+        if isinstance(e, PrazoEsgotado):
+            registrar_degradacao(dados, "proposta", "esqueleto")
+        proposta = renderizar_esqueleto(dados, analisar_heuristicas(dados), preview=preview_mode and not reduzida)
+        dados["estrutura_proposta"] = extrair_estrutura_proposta(proposta)
+        dados["proposta_provisoria"] = True
+        return proposta
+
+@rastreamento.rastrear
+def completar_proposta(dados, tipo_projeto, mensagens, resposta, ao_receber=None):
+    """Completa a proposta cortada (finish_reason "length") ou sem seções obrigatórias do template
+    
+    Em vez de gerar tudo de novo: pede a continuação do ponto onde o texto parou e, se ainda
+    faltarem seções, só as que faltam, encaixadas na posição do template. Se essas chamadas
+    falharem, fica o que já foi gerado. ao_receber (opcional) acompanha o stream das
+    continuações; GeracaoCancelada levantada por ele é propagada.
+    """
+    texto = resposta.texto
+    dados["continuacoes"] = 0
+    metricas.incrementar("propostas_completas_geradas", tipo=tipo_projeto)
+    
+    try:
+        while resposta.finish_reason == "length" and dados["continuacoes"] < MAX_CONTINUACOES:
+            dados["continuacoes"] += 1
+            metricas.incrementar("proposta_continuacoes", motivo="cortada")
+            resposta = chamar_modelo(
+                "continuacao",
+                messages=mensagens + [
+                    {"role": "assistant", "content": texto},
+                    {"role": "user", "content": "CONTINUAÇÃO: a resposta foi cortada. Continue exatamente do ponto onde o texto parou, sem repetir nada do que já foi escrito, mantendo o mesmo formato."}
+                ],
+                temperature=0.3,
+                max_tokens=TOKENS_CONTINUACAO,
+                dados=dados,
+                ao_receber=ao_receber
+            )
+            texto += resposta.texto
+        
+        faltando = secoes_faltando(texto, tipo_projeto)
+        if faltando:
+            dados["continuacoes"] += 1
+            metricas.incrementar("proposta_continuacoes", motivo="secoes_faltando")
+            metricas.incrementar("proposta_secoes_regeneradas", len(faltando))
+            titulos = "\n".join(titulo for _, titulo in faltando)
+            resposta = chamar_modelo(
+                "continuacao",
+                messages=mensagens + [
+                    {"role": "assistant", "content": texto},
+                    {"role": "user", "content": f"SEÇÕES FALTANTES: escreva apenas as seções abaixo, com estes títulos e no mesmo formato, sem repetir as demais:\n{titulos}"}
+                ],
+                temperature=0.3,
+                max_tokens=TOKENS_POR_SECAO * len(faltando),
+                dados=dados,
+                ao_receber=ao_receber
+            )
+            texto = inserir_secoes(texto, resposta.texto, tipo_projeto)
+    except GeracaoCancelada:
+        raise
+    except PrazoEsgotado:
+        registrar_degradacao(dados, "continuacao", "omitida")
+    except Exception:
+        metricas.incrementar("proposta_continuacao_falhas")
+    
+    if dados["continuacoes"]:
+        dados["estrutura_proposta"] = extrair_estrutura_proposta(texto)
+    return texto
+
+def analisar_heuristicas(dados):
+    """Análise local da ideia (sem IA) usada no esqueleto da proposta"""
+    return {
+        "complexidade": avaliar_complexidade(dados["ideia"]),
+        "categoria": classificar_projeto(dados["ideia"], dados.get("foco", "")),
+        "areas_impacto": identificar_areas_impacto_nps(dados["ideia"]),
+        "prioridade": sugerir_prioridade_nps(dados),
+        "palavras_chave": extrair_palavras_chave(dados["ideia"])
+    }
+
+@rastreamento.rastrear
+def montar_json_proposta(dados, proposta):
+    """JSON estruturado da proposta, sem interface (erros sobem para quem chamou, ex: a API)"""
+    # Estrutura já extraída durante o stream (ou extrai agora do texto completo)
+    proposta_estruturada = dados.get("estrutura_proposta") or extrair_estrutura_proposta(proposta)
+    # Derivados (categoria, prioridade, áreas...) calculados uma vez cada, no registro
+    return RegistroProposta.de_dados(dados, proposta, proposta_estruturada).para_json()
 
 def gerar_json_proposta(dados, proposta):
     """Gera JSON estruturado com pontuação NPS e tipo de projeto"""
     try:
-        # Gera ID único
-        proposta_id = hashlib.md5(f"{dados['nome']}{dados['ideia']}{datetime.now()}".encode()).hexdigest()[:8]
-        timestamp = datetime.now()
-        
-        # Extrai estrutura da proposta
-        proposta_estruturada = extrair_estrutura_proposta(proposta)
-        
-        json_proposta = {
-            "metadata": {
-                "id": proposta_id,
-                "versao": "2.1",
-                "timestamp": timestamp.isoformat(),
-                "data_criacao": timestamp.strftime("%d/%m/%Y %H:%M:%S"),
-                "sistema": "MindGlass V2 - Enhanced",
-                "status": "processado"
-            },
-            "autor": {
-                "nome": dados["nome"],
-                "area": dados["area"],
-                "area_detalhada": dados.get("area", "").split(" - ")[0] if " - " in dados.get("area", "") else dados.get("area", "")
-            },
-            "entrada": {
-                "ideia_original": dados["ideia"],
-                "nivel_detalhamento": dados.get("nivel", "Intermediário"),
-                "foco_principal": dados.get("foco", "Não especificado"),
-                "problema_contexto": dados.get("problema", ""),
-                "recursos_disponiveis": dados.get("recursos", ""),
-                "prazo_desejado": dados.get("prazo", ""),
-                "caracteres_ideia": len(dados["ideia"].strip()),
-                "palavras_chave": extrair_palavras_chave(dados["ideia"])
-            },
-            "saida": {
-                "proposta_completa": proposta,
-                "resumo_executivo": proposta_estruturada.get("resumo", ""),
-                "tecnologias_sugeridas": proposta_estruturada.get("tecnologias", []),
-                "cronograma_estimado": proposta_estruturada.get("cronograma", ""),
-                "investimento_estimado": proposta_estruturada.get("investimento", ""),
-                "riscos_identificados": proposta_estruturada.get("riscos", []),
-                "metricas_sucesso": proposta_estruturada.get("metricas", [])
-            },
-            "analise": {
-                "tipo_projeto": dados.get("tipo_projeto", "TECNOLÓGICO"),
-                "pontuacao_nps": dados.get("pontuacao_nps", 50),
-                "justificativa_nps": dados.get("justificativa_nps", ""),
-                "categoria_nps": classificar_categoria_nps(dados.get("pontuacao_nps", 50)),
-                "complexidade": avaliar_complexidade(dados["ideia"]),
-                "categoria_projeto": classificar_projeto(dados["ideia"], dados.get("foco", "")),
-                "viabilidade_tecnica": "Alta" if dados.get("tipo_projeto") == "PROCESSO" else "Média",
-                "impacto_estimado": calcular_impacto_por_nps(dados.get("pontuacao_nps", 50)),
-                "prioridade_sugerida": sugerir_prioridade_nps(dados)
-            },
-            "nps_analysis": {
-                "pontuacao_total": dados.get("pontuacao_nps", 50),
-                "categoria": classificar_categoria_nps(dados.get("pontuacao_nps", 50)),
-                "justificativa": dados.get("justificativa_nps", ""),
-                "potencial_melhoria": calcular_potencial_melhoria(dados.get("pontuacao_nps", 50)),
-                "areas_impacto": identificar_areas_impacto_nps(dados["ideia"])
-            },
-            "proximos_passos": {
-                "acao_imediata": "Análise de impacto no NPS",
-                "responsavel_proximo": "Liderança + Equipe de CX",
-                "prazo_resposta": "3 dias úteis",
-                "etapas_aprovacao": [
-                    "Validação de impacto no NPS",
-                    "Análise de viabilidade",
-                    "Aprovação orçamentária",
-                    "Implementação"
-                ]
-            }
-        }
-        
-        return json_proposta
+        return montar_json_proposta(dados, proposta)
         
     except Exception as e:
         st.error(f"Erro ao gerar JSON: {str(e)}")
         return None
 
-def classificar_categoria_nps(pontuacao):
-    """Classifica a categoria baseada na pontuação NPS"""
-    if pontuacao >= 90:
-        return "TRANSFORMADOR"
-    elif pontuacao >= 70:
-        return "ALTO IMPACTO"
-    elif pontuacao >= 50:
-        return "MÉDIO IMPACTO"
-    elif pontuacao >= 30:
-        return "BAIXO IMPACTO"
-    else:
-        return "IMPACTO MÍNIMO"
-
-def calcular_impacto_por_nps(pontuacao):
-    """Calcula impacto baseado na pontuação NPS"""
-    if pontuacao >= 70:
-        return "Alto"
-    elif pontuacao >= 50:
-        return "Médio"
-    else:
-        return "Baixo"
-
-def sugerir_prioridade_nps(dados):
-    """Sugere prioridade baseada principalmente no NPS"""
-    pontuacao_nps = dados.get("pontuacao_nps", 50)
-    
-    if pontuacao_nps >= 80:
-        return "CRÍTICA"
-    elif pontuacao_nps >= 65:
-        return "Alta"
-    elif pontuacao_nps >= 45:
-        return "Média"
-    else:
-        return "Baixa"
-
-def calcular_potencial_melhoria(pontuacao):
-    """Calcula potencial de melhoria no NPS"""
-    if pontuacao >= 90:
-        return "Potencial de melhoria de 15-20 pontos no NPS"
-    elif pontuacao >= 70:
-        return "Potencial de melhoria de 10-15 pontos no NPS"
-    elif pontuacao >= 50:
-        return "Potencial de melhoria de 5-10 pontos no NPS"
-    else:
-        return "Potencial de melhoria de 2-5 pontos no NPS"
-
-def identificar_areas_impacto_nps(ideia):
-    """Identifica áreas específicas de impacto no NPS"""
-    areas = []
-    ideia_lower = ideia.lower()
-    
-    if any(palavra in ideia_lower for palavra in ['acompanhar', 'status', 'tempo real', 'transparência']):
-        areas.append("Transparência e Comunicação")
-    
-    if any(palavra in ideia_lower for palavra in ['rapidez', 'agilidade', 'mais rápido', 'tempo']):
-        areas.append("Velocidade de Atendimento")
-    
-    if any(palavra in ideia_lower for palavra in ['qualidade', 'melhor', 'excelência']):
-        areas.append("Qualidade do Serviço")
-    
-    if any(palavra in ideia_lower for palavra in ['conveniente', 'fácil', 'simples', 'automático']):
-        areas.append("Conveniência")
-    
-    if any(palavra in ideia_lower for palavra in ['atendimento', 'suporte', 'ajuda', 'contato']):
-        areas.append("Atendimento ao Cliente")
-    
-    return areas if areas else ["Experiência Geral"]
+# Tentativas de envio quando o servidor SMTP derruba a conexão (como o yag.send faz), com
+# espera de tentativa × EMAIL_ESPERA_RECONEXAO s antes de reconectar
+EMAIL_TENTATIVAS = 3
+EMAIL_ESPERA_RECONEXAO = 3
 
+@rastreamento.rastrear
 def enviar_email_estruturado(dados, proposta, json_proposta=None):
     """Envia email com pontuação NPS no título e conteúdo"""
     
     nome = dados["nome"]
     area = dados["area"]
     pontuacao_nps = dados.get("pontuacao_nps", 50)
-    justificativa_nps = dados.get("justificativa_nps", "")
-    tipo_projeto = dados.get("tipo_projeto", "TECNOLÓGICO")
     
     # Assunto com pontuação NPS
     categoria_nps = classificar_categoria_nps(pontuacao_nps)
     assunto = f"🚀 NOVA PROPOSTA ESTRUTURADA - {nome} ({area}) | MindGlass V2 (Pontuação {pontuacao_nps}/100)"
+    if dados.get("proposta_provisoria"):
+        assunto = f"[PROVISÓRIA] {assunto}"
+    elif dados.get("proposta_enriquecida"):
+        assunto = f"[VERSÃO COMPLETA] {assunto}"
     
-    # Emoji baseado na pontuação
-    emoji_nps = "🚀" if pontuacao_nps >= 80 else "📈" if pontuacao_nps >= 60 else "📊" if pontuacao_nps >= 40 else "⚡"
+    potencial_melhoria = calcular_potencial_melhoria(pontuacao_nps)
+    destino = obter_config("EMAIL_DESTINO")
+    compacto = str(obter_config("EMAIL_COMPACTO", "false")).lower() == "true"
     
-    # Corpo do email com foco no NPS
-    corpo_email = f"""
-═══════════════════════════════════════════════════════════════
-{emoji_nps} PROPOSTA COM IMPACTO NO NPS - MINDGLASS V2
-═══════════════════════════════════════════════════════════════
-
-📊 PONTUAÇÃO NPS: {pontuacao_nps}/100 pontos
-🎯 CATEGORIA: {categoria_nps}
-📋 TIPO DE PROJETO: {tipo_projeto}
-💡 JUSTIFICATIVA: {justificativa_nps}
-
-═══════════════════════════════════════════════════════════════
-📋 METADADOS DO PROJETO:
-═══════════════════════════════════════════════════════════════
-
-• Autor: {nome}
-• Área: {area}
-• Data: {datetime.now().strftime("%d/%m/%Y às %H:%M")}
-• Tipo: {tipo_projeto}
-• Nível: {dados.get('nivel', 'Intermediário')}
-• Foco: {dados.get('foco', 'Não especificado')}
-
-{f"🆔 ID da Proposta: {json_proposta['metadata']['id']}" if json_proposta else ""}
-{f"📈 Potencial de Melhoria: {json_proposta['nps_analysis']['potencial_melhoria']}" if json_proposta else ""}
-{f"🎯 Áreas de Impacto: {', '.join(json_proposta['nps_analysis']['areas_impacto'])}" if json_proposta else ""}
-
-═══════════════════════════════════════════════════════════════
-📝 IDEIA ORIGINAL (INPUT):
-═══════════════════════════════════════════════════════════════
+    # Envio do email (corpo montado a partir dos templates pré-compilados). A mensagem clássica
+    # é montada também no formato compacto, para medir o tamanho antes e depois.
+    try:
+        yag = conectar_smtp()
+        corpo_email = renderizar_corpo(dados, proposta, json_proposta, categoria_nps, potencial_melhoria)
+        # prettify_html=False: o corpo é texto puro, o premailer só custava CPU
+        destinatarios, classico = yag.prepare_send(to=destino, subject=assunto, contents=corpo_email, prettify_html=False)
+        classico = classico.encode("utf-8")
+        if compacto:
+            mensagem = montar_email_compacto(
+                yag.user, destino, assunto, dados, proposta, json_proposta,
+                categoria_nps, potencial_melhoria
+            )
+            destinatarios, conteudo = [destino], mensagem.as_bytes()
+        else:
+            conteudo = classico
+        yag.login()
+        enviar_smtp(yag, destinatarios, conteudo)
+    except Exception as e:
+        raise Exception(f"Erro ao enviar email: {str(e)}")
+    
+    registrar_tamanho_email(len(conteudo), "compacto" if compacto else "completo", len(classico))
 
-"{dados['ideia']}"
-
-═══════════════════════════════════════════════════════════════
-🧠 PROPOSTA ESTRUTURADA (OUTPUT IA):
-═══════════════════════════════════════════════════════════════
-
-{proposta}
-
-═══════════════════════════════════════════════════════════════
-📊 ANÁLISE DE IMPACTO NO NPS - METODOLOGIA CARGLASS
-═══════════════════════════════════════════════════════════════
-
-🎯 **COMO CALCULAMOS O IMPACTO NO NPS:**
-
-A pontuação de 0-100 é calculada com base nos seguintes critérios:
-
-📈 **FAIXAS DE PONTUAÇÃO:**
-• 90-100: TRANSFORMADOR - Revoluciona a experiência do cliente
-• 70-89: ALTO IMPACTO - Melhoria significativa e perceptível
-• 50-69: MÉDIO IMPACTO - Melhoria moderada na experiência
-• 30-49: BAIXO IMPACTO - Benefício indireto para o cliente
-• 0-29: IMPACTO MÍNIMO - Benefício principalmente interno
-
-🎯 **CRITÉRIOS DE AVALIAÇÃO:**
-• Impacto direto na experiência do cliente
-• Melhoria na transparência e comunicação
-• Aumento da conveniência e praticidade
-• Redução do tempo de espera
-• Melhoria na qualidade percebida
-• Facilidade de uso e acessibilidade
-
-💡 **PARA ESTA PROPOSTA ({pontuacao_nps}/100):**
-Justificativa: {justificativa_nps}
-
-🚀 **POTENCIAL DE RESULTADO:**
-{calcular_potencial_melhoria(pontuacao_nps)}
-
-═══════════════════════════════════════════════════════════════
-🎓 LÓGICA DE ESTRUTURAÇÃO - PROJETOS {'TECNOLÓGICOS' if tipo_projeto == 'TECNOLÓGICO' else 'DE PROCESSO'}
-═══════════════════════════════════════════════════════════════
-
-Este projeto foi classificado como **{tipo_projeto}** e estruturado seguindo
-nossa metodologia específica para este tipo de iniciativa.
-
-🔄 **PROCESSO DE ANÁLISE:**
-
-1. **DETECÇÃO DE TIPO**
-   ✓ Análise semântica da ideia
-   ✓ Identificação de palavras-chave
-   ✓ Classificação: Tecnológico vs Processo
-
-2. **AVALIAÇÃO DE NPS**
-   ✓ Análise de impacto no cliente
-   ✓ Pontuação automática 0-100
-   ✓ Justificativa baseada em critérios
-
-3. **ESTRUTURAÇÃO PERSONALIZADA**
-   ✓ Template específico para o tipo
-   ✓ Foco em resultados de NPS
-   ✓ Próximos passos direcionados
-
-{'🏗️ **METODOLOGIA PARA PROJETOS TECNOLÓGICOS:**' if tipo_projeto == 'TECNOLÓGICO' else '📋 **METODOLOGIA PARA PROJETOS DE PROCESSO:**'}
-
-{'• Arquitetura e stack tecnológico' if tipo_projeto == 'TECNOLÓGICO' else '• Mapeamento de processo atual vs proposto'}
-{'• Cronograma de desenvolvimento' if tipo_projeto == 'TECNOLÓGICO' else '• Documentação e procedimentos'}
-{'• Métricas de performance técnica' if tipo_projeto == 'TECNOLÓGICO' else '• Plano de treinamento e implementação'}
-{'• Riscos de integração e segurança' if tipo_projeto == 'TECNOLÓGICO' else '• Gestão de mudança e adesão'}
-{'• DevOps e entrega contínua' if tipo_projeto == 'TECNOLÓGICO' else '• Monitoramento e melhoria contínua'}
-
-═══════════════════════════════════════════════════════════════
-📊 PRÓXIMAS AÇÕES BASEADAS NO NPS:
-═══════════════════════════════════════════════════════════════
-
-{'🚨 **PRIORIDADE CRÍTICA** (NPS 80+)' if pontuacao_nps >= 80 else '⚡ **PRIORIDADE ALTA** (NPS 65-79)' if pontuacao_nps >= 65 else '📈 **PRIORIDADE MÉDIA** (NPS 45-64)' if pontuacao_nps >= 45 else '📋 **PRIORIDADE BAIXA** (NPS <45)'}
-
-1. **ANÁLISE EXECUTIVA** ({'24 horas' if pontuacao_nps >= 80 else '48 horas' if pontuacao_nps >= 65 else '1 semana' if pontuacao_nps >= 45 else '2 semanas'})
-   • Validação de impacto no NPS
-   • Análise de viabilidade
-   • Decisão sobre continuidade
-
-2. **VALIDAÇÃO COM CLIENTES** ({'Imediata' if pontuacao_nps >= 70 else 'Após aprovação interna'})
-   • Teste de conceito com clientes
-   • Validação de premissas
-   • Refinamento da proposta
-
-3. **IMPLEMENTAÇÃO**
-   • Formação de equipe
-   • Definição de cronograma
-   • Início do projeto
+def enviar_smtp(yag, destinatarios, conteudo):
+    """sendmail da mensagem pronta; se o servidor derrubar a conexão, reconecta e tenta de novo"""
+    for tentativa in range(1, EMAIL_TENTATIVAS + 1):
+        try:
+            with rastreamento.trecho("smtp.sendmail", bytes=len(conteudo), destinatarios=len(destinatarios),
+                                     tentativa=tentativa):
+                return yag.smtp.sendmail(yag.user, destinatarios, conteudo)
+        except smtplib.SMTPServerDisconnected:
+            if tentativa == EMAIL_TENTATIVAS:
+                raise
+            metricas.incrementar("email_reconexoes")
+            time.sleep(tentativa * EMAIL_ESPERA_RECONEXAO)
+            yag.login()
 
-═══════════════════════════════════════════════════════════════
-🎯 MÉTRICAS DE ACOMPANHAMENTO DO NPS:
-═══════════════════════════════════════════════════════════════
+def registrar_tamanho_email(tamanho, formato, tamanho_classico=None):
+    """Registra o tamanho da mensagem e sinaliza quando passa de ORCAMENTO_BYTES_EMAIL
 
-📊 **MÉTRICAS PRIMÁRIAS:**
-• NPS Score (antes e depois)
-• Taxa de recomendação
-• Satisfação do cliente (CSAT)
-• Tempo de resolução
+    tamanho_classico: bytes da mesma mensagem no formato clássico (o "antes" da compactação).
+    """
+    metricas.observar("email_bytes", tamanho, formato=formato)
+    if tamanho_classico is not None:
+        metricas.observar("email_bytes_classico", tamanho_classico, formato=formato)
+    orcamento = int(obter_config("ORCAMENTO_BYTES_EMAIL", ORCAMENTO_BYTES_EMAIL))
+    if tamanho > orcamento:
+        metricas.incrementar("email_acima_orcamento", formato=formato)
 
-📈 **MÉTRICAS SECUNDÁRIAS:**
-• Taxa de adoção da solução
-• Redução de reclamações
-• Aumento de avaliações positivas
-• Tempo médio de atendimento
+@rastreamento.rastrear
+def conectar_smtp():
+    """Abre conexão SMTP (Gmail por padrão; EMAIL_HOST/EMAIL_PORT para outro servidor)"""
+    host = obter_config("EMAIL_HOST", "smtp.gmail.com")
+    porta = obter_config("EMAIL_PORT")
+    porta = int(porta) if porta else None
+    
+    if str(obter_config("EMAIL_SSL", "true")).lower() == "false":
+        # Servidor local sem TLS nem autenticação (ex: sink SMTP dos benchmarks)
+        return yagmail.SMTP(
+            obter_config("EMAIL_USER"), obter_config("EMAIL_PASS"),
+            host=host, port=porta,
+            smtp_ssl=False, smtp_starttls=False, smtp_skip_login=True
+        )
+    
+    return yagmail.SMTP(obter_config("EMAIL_USER"), obter_config("EMAIL_PASS"), host=host, port=porta)
 
-💰 **MÉTRICAS DE NEGÓCIO:**
-• Retenção de clientes
-• Lifetime value (LTV)
-• Custo de aquisição (CAC)
-• Receita por cliente
-
-═══════════════════════════════════════════════════════════════
-🤝 COMO RESPONDER COM FOCO NO NPS:
-═══════════════════════════════════════════════════════════════
-
-✅ **SE APROVAR (NPS {pontuacao_nps}/100):**
-• Confirme o impacto esperado no NPS
-• Defina métricas de acompanhamento
-• Estabeleça cronograma de implementação
-• Designe responsável pelo projeto
-
-🔄 **SE PRECISAR DE AJUSTES:**
-• Especifique como melhorar o impacto no NPS
-• Solicite refinamento via MindGlass
-• Mantenha {nome} informado
-
-❌ **SE REJEITAR:**
-• Explique critérios de NPS não atendidos
-• Sugira alternativas para melhorar pontuação
-• Oriente sobre tipos de projeto com maior impacto
-
-═══════════════════════════════════════════════════════════════
-📞 CONTATOS PARA ACOMPANHAMENTO:
-═══════════════════════════════════════════════════════════════
-
-• **Autor da ideia:** {nome} ({area})
-• **Equipe de CX:** Para validação de impacto no NPS
-• **TI/Processos:** Para implementação {'tecnológica' if tipo_projeto == 'TECNOLÓGICO' else 'de processo'}
-• **Liderança:** Para aprovação e recursos
-
-═══════════════════════════════════════════════════════════════
-
-Este email foi gerado automaticamente pelo MindGlass V2 Enhanced
-Desenvolvido por Vinícius Augusto | Carglass Innovation Lab
-
-💡 Foco total na melhoria do NPS através de {'tecnologia' if tipo_projeto == 'TECNOLÓGICO' else 'processos eficientes'}!
-
-═══════════════════════════════════════════════════════════════
-"""
-    
-    # Envio do email
+def enviar_lembrete_vencidas(vencidas):
+    """Email para EMAIL_DESTINO com as propostas pendentes além do prazo de resposta"""
+    linhas = [
+        f"• [{item['prioridade']}] {item['id']} – {item['autor']} ({item['area']}) | NPS {item['pontuacao_nps']}/100 | "
+        f"prazo de {item['prazo']} vencido em {item['vence_em'].strftime('%d/%m/%Y %H:%M')}"
+        for item in vencidas
+    ]
+    corpo = "⏰ Propostas aguardando resposta da liderança além do prazo:\n\n" + "\n".join(linhas)
     try:
-        yag = yagmail.SMTP(st.secrets["EMAIL_USER"], st.secrets["EMAIL_PASS"])
+        yag = conectar_smtp()
         yag.send(
-            to=st.secrets["EMAIL_DESTINO"],
-            subject=assunto,
-            contents=corpo_email
+            to=obter_config("EMAIL_DESTINO"),
+            subject=f"⏰ MindGlass V2 – {len(vencidas)} proposta(s) com prazo de resposta vencido",
+            contents=corpo,
+            prettify_html=False
         )
     except Exception as e:
-        raise Exception(f"Erro ao enviar email: {str(e)}")
+        raise Exception(f"Erro ao enviar lembrete: {str(e)}")
+    metricas.incrementar("lembretes_enviados", len(vencidas))
+
+# Lembretes periódicos das propostas com prazo vencido (0 desliga); a thread sobe em iniciar_servicos
+LEMBRETES_HORAS = float(obter_config("LEMBRETES_HORAS", 1))
+
+def iniciar_servicos():
+    """Threads de fundo do processo (compactação do histórico, lembretes e treino do modelo local)
+
+    Chamada pelo app e pela API na inicialização, nunca na importação: testes, benchmarks e
+    ferramentas de linha de comando importam o utils sem mexer no diretório de dados. Pode ser
+    chamada a cada rerun (cada serviço sobe uma vez por processo).
+    """
+    if HISTORICO_COMPACTACAO_HORAS > 0:
+        iniciar_compactacao_periodica(
+            ARQUIVO_HISTORICO,
+            intervalo=HISTORICO_COMPACTACAO_HORAS * 3600,
+            dias_quente=HISTORICO_DIAS_QUENTE,
+            codec=HISTORICO_CODEC
+        )
+    if LEMBRETES_HORAS > 0 and obter_config("EMAIL_DESTINO"):
+        iniciar_lembretes_periodicos(
+            indice_triagem,
+            enviar_lembrete_vencidas,
+            intervalo=LEMBRETES_HORAS * 3600,
+            repetir_horas=LEMBRETE_REPETIR_HORAS
+        )
+    if MODELO_LOCAL_ATIVO:
+        modelo_local.iniciar_treino()
 
 # Funções auxiliares existentes (mantidas)
 def extrair_estrutura_proposta(proposta):
     """Extrai informações estruturadas da proposta gerada pela IA"""
-    estrutura = {
-        "resumo": "",
-        "tecnologias": [],
-        "cronograma": "",
-        "investimento": "",
-        "riscos": [],
-        "metricas": []
-    }
+    parser = ParserSecoes()
     
     try:
-        linhas = proposta.split('\n')
-        secao_atual = ""
-        
-        for linha in linhas:
-            linha_clean = linha.strip()
-            
-            # Identifica seções
-            if "RESUMO EXECUTIVO" in linha_clean.upper():
-                secao_atual = "resumo"
-            elif "TECNOLOGIAS" in linha_clean.upper() or "STACK" in linha_clean.upper():
-                secao_atual = "tecnologias"
-            elif "CRONOGRAMA" in linha_clean.upper():
-                secao_atual = "cronograma"
-            elif "INVESTIMENTO" in linha_clean.upper():
-                secao_atual = "investimento"
-            elif "RISCOS" in linha_clean.upper():
-                secao_atual = "riscos"
-            elif "MÉTRICAS" in linha_clean.upper():
-                secao_atual = "metricas"
-            
-            # Extrai conteúdo baseado na seção
-            elif secao_atual == "resumo" and linha_clean and not linha_clean.startswith('#'):
-                if estrutura["resumo"]:
-                    estrutura["resumo"] += " " + linha_clean
-                else:
-                    estrutura["resumo"] = linha_clean
-            
-            elif secao_atual == "tecnologias" and "**" in linha_clean:
-                tech = linha_clean.replace("*", "").replace("-", "").strip()
-                if tech:
-                    estrutura["tecnologias"].append(tech)
-                    
+        parser.alimentar(proposta)
+        parser.finalizar()
     except Exception:
         pass
     
-    return estrutura
-
-def extrair_palavras_chave(texto):
-    """Extrai palavras-chave da ideia"""
-    stop_words = {'o', 'a', 'os', 'as', 'um', 'uma', 'uns', 'umas', 'de', 'da', 'do', 'das', 'dos', 
-                  'para', 'por', 'com', 'em', 'na', 'no', 'nas', 'nos', 'que', 'se', 'é', 'são', 
-                  'ter', 'tem', 'foi', 'ser', 'estar', 'esse', 'essa', 'isso', 'como', 'mais'}
-    
-    palavras = re.findall(r'\b\w+\b', texto.lower())
-    palavras_filtradas = [p for p in palavras if len(p) > 3 and p not in stop_words]
-    
-    return list(set(palavras_filtradas))[:5]
-
-def avaliar_complexidade(ideia):
-    """Avalia complexidade baseada em palavras-chave"""
-    palavras_alta_complexidade = ['integração', 'machine learning', 'ia', 'blockchain', 'microserviços', 'big data']
-    palavras_media_complexidade = ['automação', 'dashboard', 'relatório', 'api', 'mobile']
-    
-    ideia_lower = ideia.lower()
-    
-    if any(palavra in ideia_lower for palavra in palavras_alta_complexidade):
-        return "Alta"
-    elif any(palavra in ideia_lower for palavra in palavras_media_complexidade):
-        return "Média"
-    else:
-        return "Baixa"
-
-def classificar_projeto(ideia, foco):
-    """Classifica o tipo de projeto"""
-    categorias = {
-        "Automação": ["automação", "automatizar", "robô", "bot"],
-        "Dashboard/BI": ["dashboard", "relatório", "análise", "dados", "métricas"],
-        "Mobile": ["app", "mobile", "celular", "smartphone"],
-        "Integração": ["integrar", "conectar", "sincronizar", "api"],
-        "UX/Interface": ["interface", "experiência", "usuário", "design"],
-        "Processo": ["processo", "workflow", "fluxo", "otimizar"],
-        "Melhoria de Processo": ["formulário", "papel", "procedimento", "manual"]
-    }
-    
-    ideia_lower = ideia.lower()
-    for categoria, palavras in categorias.items():
-        if any(palavra in ideia_lower for palavra in palavras):
-            return categoria
-    
-    return foco if foco != "Não especificado" else "Geral"
+    return parser.estrutura
 
 def salvar_json_proposta(json_proposta):
     """Salva o JSON da proposta"""
@@ -900,12 +1257,14 @@ def salvar_json_proposta(json_proposta):
         st.error(f"Erro ao salvar JSON: {str(e)}")
         return None
 
-def salvar_historico(dados, proposta):
-    """Salva histórico da proposta"""
+def salvar_historico(dados, proposta, json_proposta=None):
+    """Salva histórico da proposta (reaproveita o JSON já gerado, se informado)"""
     try:
-        json_proposta = gerar_json_proposta(dados, proposta)
+        if json_proposta is None:
+            json_proposta = gerar_json_proposta(dados, proposta)
         
         if json_proposta:
+            registrar_proposta(json_proposta, ARQUIVO_HISTORICO)
             proposta_id = salvar_json_proposta(json_proposta)
             st.success(f"📝 Proposta {proposta_id} processada com pontuação NPS {dados.get('pontuacao_nps', 0)}/100!")
             return proposta_id, json_proposta
@@ -915,3 +1274,234 @@ def salvar_historico(dados, proposta):
     except Exception as e:
         st.error(f"Erro ao salvar histórico: {str(e)}")
         return None, None
+
+# 🕸️ Estágios da submissão declarados como grafo (entradas → saídas em dados)
+def _estagio_validar(dados):
+    validacao = validar_entrada(dados["nome"], dados["ideia"])
+    if not validacao["valido"]:
+        raise ValueError(validacao["erro"])
+    return {"validacao": validacao}
+
+def _estagio_tipo(dados):
+    return {"tipo_projeto": detectar_tipo_projeto(dados["ideia"], dados["area"], dados)}
+
+def _estagio_nps(dados):
+    pontuacao, justificativa = calcular_pontuacao_nps(dados["ideia"], dados["area"], dados["foco"], dados)
+    return {"pontuacao_nps": pontuacao, "justificativa_nps": justificativa}
+
+def _estagio_preview(dados):
+    return {"proposta_preview": estruturar_ideia_avancada(dados, preview_mode=True)}
+
+def _estagio_proposta(dados):
+    return {"proposta": estruturar_ideia_avancada(dados)}
+
+def _estagio_estrutura(dados):
+    # Normalmente já vem do parser do stream e o estágio é reaproveitado
+    return {"estrutura_proposta": extrair_estrutura_proposta(dados["proposta"])}
+
+def _estagio_json(dados):
+    # Roda nos workers (sem interface): um erro derruba o estágio e o envio pode ser refeito
+    return {"json_proposta": montar_json_proposta(dados, dados["proposta"])}
+
+def _estagio_email(dados):
+    json_proposta = dados["json_proposta"]
+    if not cabe_no_prazo("email", dados):
+        registrar_degradacao(dados, "email", "fila")
+        json_proposta["metadata"]["degradacao"] = dados["degradacao"]
+        agendar_email(dados, dados["proposta"], json_proposta)
+        return {"email": "fila"}
+    enviar_email_estruturado(dados, dados["proposta"], json_proposta)
+    return {"email": "enviado"}
+
+def _estagio_persistir(dados):
+    if dados.get("limite_envio") is not None:
+        metricas.observar("envio_folga_s", tempo_restante(dados))
+    with rastreamento.trecho("historico.registrar_proposta"):
+        registrar_proposta(dados["json_proposta"], ARQUIVO_HISTORICO)
+    diario_estagios.descartar(dados["id_proposta"])
+    if dados.get("proposta_provisoria"):
+        agendar_enriquecimento(dados)
+    return {"persistida": True}
+
+# 📓 Diário dos estágios concluídos: uma nova tentativa do mesmo conteúdo recomeça do primeiro
+# estágio que falta (ex: só o email, depois de uma geração de 30 s que já estava pronta)
+ESTAGIOS_MODELO = {"proposta": ("proposta", "continuacao")}
+
+def tokens_do_estagio(dados, estagio):
+    """Tokens gastos pelo estágio do grafo (a proposta inclui as continuações)"""
+    gastos = dados.get("tokens_estagio", {})
+    return sum(gastos.get(nome, 0) for nome in ESTAGIOS_MODELO.get(estagio, (estagio,)))
+
+diario_estagios = DiarioEstagios(
+    obter_config("DIARIO_DIRETORIO", os.path.join(os.path.dirname(ARQUIVO_HISTORICO) or ".", "diario")),
+    estagios=("tipo", "nps", "preview", "proposta", "json", "email"),
+    extras={
+        "tipo": ("confianca_tipo",),
+        "proposta": ("estrutura_proposta", "proposta_provisoria", "continuacoes", "degradacao", "proposta_alternativa")
+    },
+    contar_tokens=tokens_do_estagio,
+    ttl_horas=float(obter_config("DIARIO_TTL_HORAS", 24))
+)
+DIARIO_ATIVO = str(obter_config("DIARIO", "true")).lower() == "true"
+
+grafo_submissao = Grafo([
+    Estagio("validar", _estagio_validar, ("nome", "ideia"), ("validacao",)),
+    Estagio("tipo", _estagio_tipo, ("validacao", "ideia", "area"), ("tipo_projeto",)),
+    Estagio("nps", _estagio_nps, ("validacao", "ideia", "area", "foco"), ("pontuacao_nps", "justificativa_nps")),
+    Estagio("preview", _estagio_preview, ("tipo_projeto", "pontuacao_nps", "justificativa_nps"), ("proposta_preview",)),
+    Estagio("proposta", _estagio_proposta, ("tipo_projeto", "pontuacao_nps", "justificativa_nps"), ("proposta",)),
+    Estagio("estrutura", _estagio_estrutura, ("proposta",), ("estrutura_proposta",)),
+    Estagio("json", _estagio_json, ("proposta", "estrutura_proposta"), ("json_proposta",)),
+    Estagio("email", _estagio_email, ("json_proposta",), ("email",)),
+    # Grava só depois do email: se o email falhar, o envio pode ser refeito sem duplicar a linha
+    Estagio("persistir", _estagio_persistir, ("json_proposta", "email"), ("persistida",))
+], trabalhadores=int(obter_config("PIPELINE_TRABALHADORES", 8)), diario=diario_estagios if DIARIO_ATIVO else None)
+
+# Alvos do grafo: o preview e o envio completo compartilham validação, tipo e NPS
+ALVOS_TRIAGEM = ("tipo", "nps")
+ALVOS_PREVIEW = ("preview",)
+ALVOS_ENVIO = ("email", "persistir")
+
+# Nome do rastro de cada conjunto de alvos
+NOMES_ALVOS = {ALVOS_TRIAGEM: "triagem", ALVOS_PREVIEW: "preview", ALVOS_ENVIO: "envio"}
+
+def executar_pipeline(dados, alvos):
+    """Roda os estágios do grafo necessários para os alvos; o que já está em dados não é refeito
+    
+    A execução vira um rastro (se amostrada); no envio, a espera na fila dos workers entra
+    como o trecho "fila". Só o envio usa o diário: estágios já concluídos numa tentativa
+    anterior do mesmo envio vêm dele e não são refeitos; triagem e preview não gravam nada
+    (não são envios interrompidos).
+    """
+    envio = tuple(alvos) == ALVOS_ENVIO
+    with rastreamento.raiz(
+        dados, NOMES_ALVOS.get(tuple(alvos), "pipeline"), inicio_ns=dados.pop("enfileirado_ns", None),
+        proposta_id=dados.get("id_proposta") or gerar_id_conteudo(dados), prioridade=dados.get("prioridade")
+    ):
+        if envio and grafo_submissao.diario is not None:
+            retomados = grafo_submissao.diario.restaurar(dados)
+            if retomados:
+                rastreamento.definir(estagios_retomados=",".join(retomados))
+        return grafo_submissao.executar(dados, alvos, gravar_diario=envio)
+
+def processar_submissao(dados):
+    """Pipeline do envio final (tipo, NPS, proposta, JSON e email) executado uma vez por conteúdo
+    
+    Submissões idênticas simultâneas (duplo clique, outra aba, outro colega) compartilham
+    a mesma execução e o mesmo email. Devolve (resultado, compartilhado).
+    """
+    dados["id_proposta"] = gerar_id_conteudo(dados)
+    dados.setdefault("prioridade", "envio")
+    iniciar_prazo_envio(dados)
+    
+    def executar():
+        executar_pipeline(dados, ALVOS_ENVIO)
+        return {"dados": dados, "proposta": dados["proposta"], "json_proposta": dados["json_proposta"]}
+    
+    return executar_uma_vez(dados["id_proposta"], executar)
+
+def iniciar_prazo_envio(dados):
+    """Marca o fim do orçamento do envio (PRAZO_ENVIO a partir de agora), se ainda não marcado"""
+    if PRAZO_ENVIO > 0:
+        dados.setdefault("limite_envio", time.monotonic() + PRAZO_ENVIO)
+
+def agendar_email(dados, proposta, json_proposta):
+    """Envia o email em segundo plano (o orçamento do envio acabou); com a fila cheia, envia agora"""
+    try:
+        pool_emails.submeter(dados["id_proposta"], lambda: enviar_email_estruturado(dados, proposta, json_proposta))
+    except FilaCheia:
+        metricas.incrementar("email_fila_cheia")
+        enviar_email_estruturado(dados, proposta, json_proposta)
+
+def agendar_enriquecimento(dados):
+    """Coloca a proposta provisória na fila para ser refeita pelo modelo (sem o prazo do envio)"""
+    copia = dict(dados, modelos_estagio=dict(dados.get("modelos_estagio", {})), degradacao={})
+    copia.pop("limite_envio", None)
+    # O enriquecimento tem rastro próprio (o do envio é gravado antes de ele rodar)
+    copia.pop("rastro", None)
+    # Tipo/NPS que saíram da heurística são refeitos pelo modelo junto com a proposta
+    for estagio, chaves in (("tipo", ("tipo_projeto", "confianca_tipo")), ("nps", ("pontuacao_nps", "justificativa_nps"))):
+        if copia["modelos_estagio"].get(estagio) == "heuristica":
+            for chave in chaves:
+                copia.pop(chave, None)
+    try:
+        return pool_enriquecimento.submeter(dados["id_proposta"], lambda: enriquecer_proposta(copia))
+    except Exception:
+        metricas.incrementar("enriquecimento_nao_agendado")
+        return None, False
+
+def enriquecer_proposta(dados):
+    """Refaz a proposta com o modelo quando o disjuntor fechar; grava e reenvia a versão completa"""
+    dados["prioridade"] = "fundo"
+    with rastreamento.raiz(dados, "enriquecimento", proposta_id=dados["id_proposta"]):
+        return _enriquecer_proposta(dados)
+
+def _enriquecer_proposta(dados):
+    # As esperas viram reagendamentos na fila: o único worker atende as outras provisórias
+    if disjuntor_openai.estado == ABERTO:
+        raise Reagendar(ENRIQUECIMENTO_INTERVALO, "OpenAI indisponível (disjuntor aberto)")
+    tentativa = dados.get("tentativas_enriquecimento", 0)
+    try:
+        proposta = estruturar_ideia_avancada(dados, permitir_esqueleto=False)
+    except Exception as e:
+        metricas.incrementar("enriquecimento_falhas")
+        dados["tentativas_enriquecimento"] = tentativa + 1
+        if tentativa + 1 >= ENRIQUECIMENTO_TENTATIVAS:
+            raise EnriquecimentoEsgotado(
+                f"Proposta {dados['id_proposta']} continua provisória após {ENRIQUECIMENTO_TENTATIVAS} tentativas"
+            ) from e
+        raise Reagendar(ENRIQUECIMENTO_INTERVALO * 2 ** tentativa, f"Tentativa {tentativa + 1} falhou: {e}")
+    
+    dados["proposta_enriquecida"] = True
+    json_proposta = montar_json_proposta(dados, proposta)
+    registrar_proposta(json_proposta, ARQUIVO_HISTORICO, substituir=True)
+    enviar_email_estruturado(dados, proposta, json_proposta)
+    metricas.incrementar("propostas_enriquecidas")
+    return {"dados": dados, "proposta": proposta, "json_proposta": json_proposta}
+
+def enviar_submissao(dados):
+    """Coloca o envio na fila dos workers e devolve (id, nova) na hora, sem esperar o processamento"""
+    dados["id_proposta"] = gerar_id_conteudo(dados)
+    # O orçamento conta desde o clique, incluindo a espera na fila dos workers
+    iniciar_prazo_envio(dados)
+    dados["enfileirado_ns"] = time.time_ns()
+    return pool_envios.submeter(dados["id_proposta"], lambda: processar_submissao(dados))
+
+def retomar_submissao(id_proposta):
+    """Reenvia a submissão pelo ID com os campos guardados no diário; devolve (id, nova) ou None sem diário"""
+    entrada = diario_estagios.entrada(id_proposta)
+    if entrada is None:
+        return None
+    return enviar_submissao(dict(entrada))
+
+def consultar_submissao(id_proposta):
+    """Estado do envio pelo ID: da fila de tarefas ou, se já não estiver lá, do histórico
+    
+    Com estado "concluida", "resultado" traz (resultado, compartilhado) como processar_submissao.
+    """
+    status = pool_envios.status(id_proposta)
+    if status is not None:
+        return status
+    
+    json_proposta = buscar_proposta(id_proposta, ARQUIVO_HISTORICO)
+    if json_proposta is None:
+        # Começou (há diário) mas não terminou neste processo: pode ser retomada
+        if diario_estagios.entrada(id_proposta) is not None:
+            return {"id": id_proposta, "estado": FALHOU, "resultado": None,
+                    "erro": "Envio interrompido antes de concluir (pode ser retomado de onde parou)"}
+        return None
+    
+    registro = RegistroProposta.de_json(json_proposta)
+    dados = {
+        "id_proposta": id_proposta,
+        "nome": registro.nome,
+        "area": registro.area,
+        "ideia": registro.ideia,
+        "nivel": registro.nivel,
+        "foco": registro.foco,
+        "tipo_projeto": registro.tipo_projeto,
+        "pontuacao_nps": registro.pontuacao_nps,
+        "proposta_provisoria": registro.status == "provisorio"
+    }
+    resultado = {"dados": dados, "proposta": registro.proposta_completa, "json_proposta": json_proposta}
+    return {"id": id_proposta, "estado": CONCLUIDA, "resultado": (resultado, True), "erro": None}